@@ -1,7 +1,7 @@
-from pandas_datareader import data
+from chapter9.marketdatastore import load_financial_data
 start_date = '2014-01-01'
 end_date = '2018-01-01'
-goog_data = data.DataReader('GOOG', 'yahoo', start_date, end_date)
+goog_data = load_financial_data(start_date, end_date)
 
 
 import numpy as np
@@ -1,16 +1,12 @@
 import pandas as pd
 
-from pandas_datareader import data
+from chapter9.marketdatastore import load_financial_data
 
 start_date = '2014-01-01'
 end_date = '2018-01-01'
 SRC_DATA_FILENAME = 'goog_data.pkl'
 
-try:
-  goog_data2 = pd.read_pickle(SRC_DATA_FILENAME)
-except FileNotFoundError:
-  goog_data2 = data.DataReader('GOOG', 'yahoo', start_date, end_date)
-  goog_data2.to_pickle(SRC_DATA_FILENAME)
+goog_data2 = load_financial_data(start_date, end_date, SRC_DATA_FILENAME)
 
 goog_data = goog_data2.tail(620)
 
@@ -59,31 +55,20 @@ Middle Band = MA
 Lower Band = MA - delta
 
  '''
-import statistics as stats
-import math as math
+from chapter2.indicators import BollingerBands
 
 time_period = 20 # history length for Simple Moving Average for middle band
 stdev_factor = 2 # Standard Deviation Scaling factor for the upper and lower bands
-history = [] # price history for computing simple moving average
+bbands = BollingerBands(time_period, stdev_factor) # running mean and variance of the last 'time_period' prices
 sma_values = [] # moving average of prices for visualization purposes
 upper_band = [] # upper band values
 lower_band = [] # lower band values
 
 for close_price in close:
-  history.append(close_price)
-  if len(history) > time_period: # we only want to maintain at most 'time_period' number of price observations
-    del (history[0])
-
-  sma = stats.mean(history)
+  sma, upper, lower = bbands.update(close_price)
   sma_values.append(sma) # simple moving average or middle band
-  variance = 0 # variance is the square of standard deviation
-  for hist_price in history:
-    variance = variance + ((hist_price - sma) ** 2)
-
-  stdev = math.sqrt(variance / len(history)) # use square root to get standard deviation
-
-  upper_band.append(sma + stdev_factor * stdev)
-  lower_band.append(sma - stdev_factor * stdev)
+  upper_band.append(upper)
+  lower_band.append(lower)
 
 goog_data = goog_data.assign(ClosePrice=pd.Series(close, index=goog_data.index))
 goog_data = goog_data.assign(MiddleBollingerBand20DaySMA=pd.Series(sma_values, index=goog_data.index))
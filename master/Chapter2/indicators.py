@@ -0,0 +1,268 @@
+'''
+Streaming versions of the Chapter 2 indicators.
+
+Each indicator class takes one price at a time with update(price), which
+costs O(1) whatever the time period: the last prices are kept in a ring
+buffer and the window statistics in running sums (Welford updates for the
+variance) instead of being recomputed over the whole history. The windows
+grow up to time_period prices at the start, like in the scripts.
+
+The functions at the bottom compute the same series over a whole NumPy
+array at once and agree with the streaming classes to rounding error.
+'''
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class RollingWindow:
+  # Ring buffer of the last `size` values
+  def __init__(self, size):
+    if size < 1:
+      raise ValueError('window size must be at least 1, got %r' % (size,))
+    self.size = size
+    self.values = []
+    self.count = 0 # number of values pushed so far
+
+  def __len__(self):
+    return len(self.values)
+
+  def push(self, value):
+    # Adds value and returns the one it replaces, None until the window is full
+    index = self.count % self.size
+    self.count += 1
+    if len(self.values) < self.size:
+      self.values.append(value)
+      return None
+    old = self.values[index]
+    self.values[index] = value
+    return old
+
+  def oldest(self):
+    if len(self.values) < self.size:
+      return self.values[0]
+    return self.values[self.count % self.size]
+
+  def wrapped(self):
+    # True every time the buffer has been completely refilled
+    return self.count % self.size == 0
+
+
+class SMA:
+  def __init__(self, time_period=20):
+    self.window = RollingWindow(time_period)
+    self.total = 0.0
+    self.nonzero = 0 # nonzero values in the window, an all zero window averages to exactly 0
+    self.value = None
+
+  def update(self, price):
+    old = self.window.push(price)
+    if old is None:
+      self.total += price
+    else:
+      self.total += price - old
+      if old != 0:
+        self.nonzero -= 1
+    if price != 0:
+      self.nonzero += 1
+    if self.nonzero == 0:
+      self.total = 0.0
+    elif self.window.wrapped():
+      # sum the window again once per period so rounding errors do not add up
+      self.total = math.fsum(self.window.values)
+    self.value = self.total / len(self.window)
+    return self.value
+
+
+class StdDev:
+  # Population standard deviation of the window, with its mean
+  def __init__(self, time_period=20):
+    self.window = RollingWindow(time_period)
+    self.mean = 0.0
+    self.m2 = 0.0 # sum of squared differences from the mean
+    self.value = None
+
+  def update(self, price):
+    old = self.window.push(price)
+    n = len(self.window)
+    if old is None:
+      delta = price - self.mean
+      self.mean += delta / n
+      self.m2 += delta * (price - self.mean)
+    else:
+      old_mean = self.mean
+      self.mean += (price - old) / n
+      self.m2 += (price - old) * (price - self.mean + old - old_mean)
+    if self.window.wrapped():
+      values = self.window.values
+      self.mean = math.fsum(values) / n
+      self.m2 = math.fsum((value - self.mean) ** 2 for value in values)
+    self.value = math.sqrt(max(self.m2, 0.0) / n)
+    return self.value
+
+
+class BollingerBands:
+  # update() returns (middle, upper, lower)
+  def __init__(self, time_period=20, stdev_factor=2):
+    self.stddev = StdDev(time_period)
+    self.stdev_factor = stdev_factor
+    self.value = None
+
+  def update(self, price):
+    stdev = self.stddev.update(price)
+    middle = self.stddev.mean
+    self.value = (middle, middle + self.stdev_factor * stdev, middle - self.stdev_factor * stdev)
+    return self.value
+
+
+class EMA:
+  # Starts at the first price, like the scripts
+  def __init__(self, time_period=20):
+    self.K = 2 / (time_period + 1)
+    self.value = None
+
+  def update(self, price):
+    if self.value is None: # first observation
+      self.value = price
+    else:
+      self.value = (price - self.value) * self.K + self.value
+    return self.value
+
+
+class APO:
+  def __init__(self, time_period_fast=10, time_period_slow=40):
+    self.ema_fast = EMA(time_period_fast)
+    self.ema_slow = EMA(time_period_slow)
+    self.value = None
+
+  def update(self, price):
+    self.value = self.ema_fast.update(price) - self.ema_slow.update(price)
+    return self.value
+
+
+class MACD:
+  # update() returns (macd, signal, histogram)
+  def __init__(self, time_period_fast=10, time_period_slow=40, time_period_macd=20):
+    self.apo = APO(time_period_fast, time_period_slow)
+    self.ema_macd = EMA(time_period_macd)
+    self.value = None
+
+  def update(self, price):
+    macd = self.apo.update(price)
+    signal = self.ema_macd.update(macd)
+    self.value = (macd, signal, macd - signal)
+    return self.value
+
+
+class RSI:
+  # update() returns (avg_gain, avg_loss, rsi), rsi is 0 while there
+  # are no losses in the window, like in rsi.py
+  def __init__(self, time_period=20):
+    self.gains = SMA(time_period)
+    self.losses = SMA(time_period)
+    self.last_price = None
+    self.value = None
+
+  def update(self, price):
+    if self.last_price is None:
+      self.last_price = price
+    avg_gain = self.gains.update(max(0, price - self.last_price))
+    avg_loss = self.losses.update(max(0, self.last_price - price))
+    self.last_price = price
+    rs = avg_gain / avg_loss if avg_loss > 0 else 0
+    self.value = (avg_gain, avg_loss, 100 - (100 / (1 + rs)))
+    return self.value
+
+
+class Momentum:
+  # Difference with the oldest price of the window
+  def __init__(self, time_period=20):
+    self.window = RollingWindow(time_period)
+    self.value = None
+
+  def update(self, price):
+    self.window.push(price)
+    self.value = price - self.window.oldest()
+    return self.value
+
+
+def _rolling(prices, time_period, reduce):
+  # reduce(windows) over prices[max(0, k - time_period + 1):k + 1] for every k
+  prices = np.asarray(prices, dtype=np.float64)
+  if time_period < 1:
+    raise ValueError('time period must be at least 1, got %r' % (time_period,))
+  values = np.empty(len(prices))
+  head = min(time_period - 1, len(prices))
+  for k in range(head):
+    values[k] = reduce(prices[np.newaxis, :k + 1])[0]
+  if len(prices) >= time_period:
+    values[head:] = reduce(sliding_window_view(prices, time_period))
+  return values
+
+
+def sma(prices, time_period=20):
+  return _rolling(prices, time_period, lambda windows: windows.mean(axis=1))
+
+
+def stddev(prices, time_period=20):
+  return _rolling(prices, time_period, lambda windows: windows.std(axis=1))
+
+
+def bollinger_bands(prices, time_period=20, stdev_factor=2):
+  middle = sma(prices, time_period)
+  stdev = stddev(prices, time_period)
+  return middle, middle + stdev_factor * stdev, middle - stdev_factor * stdev
+
+
+def ema(prices, time_period=20):
+  # ema[k] = K * prices[k] + a * ema[k - 1] with a = 1 - K. Inside a block
+  # of prices starting from a zero EMA this is a^k * K * cumsum(a^-j * prices[j]),
+  # the blocks are then chained with the EMA at the end of the previous one.
+  # The blocks are short enough that a^-j stays below 1e4.
+  prices = np.asarray(prices, dtype=np.float64)
+  K = 2 / (time_period + 1)
+  a = 1 - K
+  if len(prices) == 0 or a <= 0:
+    return prices.copy()
+  block = max(1, min(256, int(math.log(1e4) / -math.log(a))))
+  nb_blocks = -(-len(prices) // block)
+  padded = np.zeros(nb_blocks * block)
+  padded[:len(prices)] = prices
+  exponents = np.arange(block)
+  partial = np.cumsum(padded.reshape(nb_blocks, block) * a ** -exponents, axis=1)
+  partial *= K * a ** exponents
+  decay = a ** (exponents + 1)
+  values = np.empty_like(partial)
+  last = prices[0] # so that the first value is the first price
+  for b in range(nb_blocks):
+    np.add(partial[b], decay * last, out=values[b])
+    last = values[b, -1]
+  return values.ravel()[:len(prices)]
+
+
+def apo(prices, time_period_fast=10, time_period_slow=40):
+  return ema(prices, time_period_fast) - ema(prices, time_period_slow)
+
+
+def macd(prices, time_period_fast=10, time_period_slow=40, time_period_macd=20):
+  macd_values = apo(prices, time_period_fast, time_period_slow)
+  signal = ema(macd_values, time_period_macd)
+  return macd_values, signal, macd_values - signal
+
+
+def rsi(prices, time_period=20):
+  prices = np.asarray(prices, dtype=np.float64)
+  changes = np.diff(prices, prepend=prices[:1])
+  avg_gain = sma(np.maximum(changes, 0), time_period)
+  avg_loss = sma(np.maximum(-changes, 0), time_period)
+  rs = np.divide(avg_gain, avg_loss, out=np.zeros_like(avg_gain), where=avg_loss > 0)
+  return avg_gain, avg_loss, 100 - (100 / (1 + rs))
+
+
+def momentum(prices, time_period=20):
+  prices = np.asarray(prices, dtype=np.float64)
+  if time_period < 1:
+    raise ValueError('time period must be at least 1, got %r' % (time_period,))
+  oldest = np.maximum(np.arange(len(prices)) - time_period + 1, 0)
+  return prices - prices[oldest]
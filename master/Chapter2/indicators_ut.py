@@ -0,0 +1,92 @@
+import math
+import statistics as stats
+import unittest
+
+import numpy as np
+
+from chapter2 import indicators
+
+
+def random_walk(nb_prices, seed=0):
+  rng = np.random.default_rng(seed)
+  return (500 * np.exp(np.cumsum(rng.normal(0, 0.01, nb_prices)))).round(2)
+
+
+def stream(indicator, prices):
+  return np.array([indicator.update(price) for price in prices.tolist()]).T
+
+
+class TestIndicators(unittest.TestCase):
+
+  def setUp(self):
+    self.prices = random_walk(5000)
+
+  def assertClose(self, actual, expected):
+    np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=1e-9)
+
+  def test_sma_and_stddev_same_as_scripts(self):
+    sma = indicators.SMA(20)
+    stddev = indicators.StdDev(20)
+    history = []
+    for price in self.prices[:1000].tolist():
+      history.append(price)
+      if len(history) > 20:
+        del (history[0])
+      mean = stats.mean(history)
+      self.assertAlmostEqual(sma.update(price), mean, places=9)
+      stdev = math.sqrt(sum((p - mean) ** 2 for p in history) / len(history))
+      self.assertAlmostEqual(stddev.update(price), stdev, places=9)
+
+  def test_ema_same_as_scripts(self):
+    ema = indicators.EMA(20)
+    K = 2 / 21
+    expected = 0
+    for price in self.prices.tolist():
+      if expected == 0:
+        expected = price
+      else:
+        expected = (price - expected) * K + expected
+      self.assertEqual(ema.update(price), expected)
+
+  def test_streaming_same_as_batch(self):
+    cases = [
+      (indicators.SMA(20), indicators.sma(self.prices, 20)),
+      (indicators.StdDev(20), indicators.stddev(self.prices, 20)),
+      (indicators.EMA(20), indicators.ema(self.prices, 20)),
+      (indicators.EMA(2), indicators.ema(self.prices, 2)),
+      (indicators.APO(10, 40), indicators.apo(self.prices, 10, 40)),
+      (indicators.Momentum(20), indicators.momentum(self.prices, 20)),
+      (indicators.BollingerBands(20, 2), indicators.bollinger_bands(self.prices, 20, 2)),
+      (indicators.MACD(10, 40, 20), indicators.macd(self.prices, 10, 40, 20)),
+      (indicators.RSI(20), indicators.rsi(self.prices, 20)),
+    ]
+    for indicator, expected in cases:
+      with self.subTest(indicator=type(indicator).__name__):
+        self.assertClose(stream(indicator, self.prices), expected)
+
+  def test_short_series(self):
+    prices = self.prices[:5]
+    self.assertClose(stream(indicators.SMA(20), prices), indicators.sma(prices, 20))
+    self.assertClose(stream(indicators.StdDev(20), prices), indicators.stddev(prices, 20))
+    self.assertEqual(len(indicators.ema(prices[:0], 20)), 0)
+
+  def test_rsi_without_losses(self):
+    # The average loss is exactly 0 once the last loss has left the window
+    prices = np.concatenate([self.prices[:50], self.prices[49] + np.arange(1, 41)])
+    _, avg_loss, rsi = stream(indicators.RSI(20), prices)
+    self.assertEqual(avg_loss[-1], 0)
+    self.assertEqual(rsi[-1], 0)
+
+  def test_momentum(self):
+    momentum = indicators.Momentum(3)
+    self.assertEqual([momentum.update(p) for p in [1, 2, 4, 7, 11]], [0, 1, 3, 5, 7])
+
+  def test_invalid_time_period(self):
+    with self.assertRaises(ValueError):
+      indicators.SMA(0)
+    with self.assertRaises(ValueError):
+      indicators.sma(self.prices, 0)
+
+
+if __name__ == '__main__':
+  unittest.main()
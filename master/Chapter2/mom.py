@@ -1,16 +1,12 @@
 import pandas as pd
 
-from pandas_datareader import data
+from chapter9.marketdatastore import load_financial_data
 
 start_date = '2014-01-01'
 end_date = '2018-01-01'
 SRC_DATA_FILENAME = 'goog_data.pkl'
 
-try:
-  goog_data2 = pd.read_pickle(SRC_DATA_FILENAME)
-except FileNotFoundError:
-  goog_data2 = data.DataReader('GOOG', 'yahoo', start_date, end_date)
-  goog_data2.to_pickle(SRC_DATA_FILENAME)
+goog_data2 = load_financial_data(start_date, end_date, SRC_DATA_FILENAME)
 
 goog_data = goog_data2.tail(620)
 
@@ -25,17 +21,14 @@ The Momentum (MOM) indicator compares the
 
  MOM =  Price - Price of n periods ago
  '''
+from chapter2.indicators import Momentum
+
 time_period = 20 # how far to look back to find reference price to compute momentum
-history = [] # history of observed prices to use in momentum calculation
+mom = Momentum(time_period) # ring buffer of the last 'time_period' observed prices
 mom_values = [] # track momentum values for visualization purposes
 
 for close_price in close:
-  history.append(close_price)
-  if len(history) > time_period: # history is at most 'time_period' number of observations
-    del (history[0])
-
-  mom = close_price - history[0]
-  mom_values.append(mom)
+  mom_values.append(mom.update(close_price))
 
 goog_data = goog_data.assign(ClosePrice=pd.Series(close, index=goog_data.index))
 goog_data = goog_data.assign(MomentumFromPrice20DaysAgo=pd.Series(mom_values, index=goog_data.index))
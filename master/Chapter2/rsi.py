@@ -1,16 +1,12 @@
 import pandas as pd
 
-from pandas_datareader import data
+from chapter9.marketdatastore import load_financial_data
 
 start_date = '2014-01-01'
 end_date = '2018-01-01'
 SRC_DATA_FILENAME = 'goog_data.pkl'
 
-try:
-  goog_data2 = pd.read_pickle(SRC_DATA_FILENAME)
-except FileNotFoundError:
-  goog_data2 = data.DataReader('GOOG', 'yahoo', start_date, end_date)
-  goog_data2.to_pickle(SRC_DATA_FILENAME)
+goog_data2 = load_financial_data(start_date, end_date, SRC_DATA_FILENAME)
 
 goog_data = goog_data2.tail(620)
 
@@ -30,40 +26,19 @@ Where:
  RS = ratio of smoothed average of n-period gains divided by the
  absolute value of the smoothed average of n-period losses.
  '''
-import statistics as stats
+from chapter2.indicators import RSI
 
 time_period = 20 # look back period to compute gains & losses
-gain_history = [] # history of gains over look back period (0 if no gain, magnitude of gain if gain)
-loss_history = [] # history of losses over look back period (0 if no loss, magnitude of loss if loss)
+rsi = RSI(time_period) # running sums of the gains and losses over the look back period
 avg_gain_values = [] # track avg gains for visualization purposes
 avg_loss_values = [] # track avg losses for visualization purposes
 rsi_values = [] # track computed RSI values
-last_price = 0 # current_price - last_price > 0 => gain. current_price - last_price < 0 => loss.
 
 for close_price in close:
-  if last_price == 0:
-    last_price = close_price
-
-  gain_history.append(max(0, close_price - last_price))
-  loss_history.append(max(0, last_price - close_price))
-  last_price = close_price
-
-  if len(gain_history) > time_period: # maximum observations is equal to lookback period
-    del (gain_history[0])
-    del (loss_history[0])
-
-  avg_gain = stats.mean(gain_history) # average gain over lookback period
-  avg_loss = stats.mean(loss_history) # average loss over lookback period
-
+  avg_gain, avg_loss, rsi_value = rsi.update(close_price)
   avg_gain_values.append(avg_gain)
   avg_loss_values.append(avg_loss)
-
-  rs = 0
-  if avg_loss > 0: # to avoid division by 0, which is undefined
-    rs = avg_gain / avg_loss
-
-  rsi = 100 - (100 / (1 + rs))
-  rsi_values.append(rsi)
+  rsi_values.append(rsi_value)
 
 goog_data = goog_data.assign(ClosePrice=pd.Series(close, index=goog_data.index))
 goog_data = goog_data.assign(RelativeStrengthAvgGainOver20Days=pd.Series(avg_gain_values, index=goog_data.index))
@@ -1,16 +1,12 @@
 import pandas as pd
 
-from pandas_datareader import data
+from chapter9.marketdatastore import load_financial_data
 
 start_date = '2014-01-01'
 end_date = '2018-01-01'
 SRC_DATA_FILENAME = 'goog_data.pkl'
 
-try:
-  goog_data2 = pd.read_pickle(SRC_DATA_FILENAME)
-except FileNotFoundError:
-  goog_data2 = data.DataReader('GOOG', 'yahoo', start_date, end_date)
-  goog_data2.to_pickle(SRC_DATA_FILENAME)
+goog_data2 = load_financial_data(start_date, end_date, SRC_DATA_FILENAME)
 
 goog_data = goog_data2.tail(620)
 
@@ -29,17 +25,13 @@ SMA = ( Sum ( Price, n ) ) / n
 
 Where: n = Time Period
 '''
-import statistics as stats
+from chapter2.indicators import SMA
 
 time_period = 20 # number of days over which to average
-history = [] # to track a history of prices
+sma = SMA(time_period) # keeps a running sum of the last 'time_period' prices
 sma_values = [] # to track simple moving average values
 for close_price in close:
-  history.append(close_price)
-  if len(history) > time_period: # we remove oldest price because we only average over last 'time_period' prices
-    del (history[0])
-
-  sma_values.append(stats.mean(history))
+  sma_values.append(sma.update(close_price))
 
 goog_data = goog_data.assign(ClosePrice=pd.Series(close, index=goog_data.index))
 goog_data = goog_data.assign(Simple20DayMovingAverage=pd.Series(sma_values, index=goog_data.index))
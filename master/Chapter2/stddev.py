@@ -1,16 +1,12 @@
 import pandas as pd
 
-from pandas_datareader import data
+from chapter9.marketdatastore import load_financial_data
 
 start_date = '2014-01-01'
 end_date = '2018-01-01'
 SRC_DATA_FILENAME = 'goog_data.pkl'
 
-try:
-  goog_data2 = pd.read_pickle(SRC_DATA_FILENAME)
-except FileNotFoundError:
-  goog_data2 = data.DataReader('GOOG', 'yahoo', start_date, end_date)
-  goog_data2.to_pickle(SRC_DATA_FILENAME)
+goog_data2 = load_financial_data(start_date, end_date, SRC_DATA_FILENAME)
 
 goog_data = goog_data2.tail(620)
 
@@ -38,28 +34,16 @@ Take the square root of d. This gives you the standard deviation.
 stddev = sqrt(d)
 
  '''
-import statistics as stats
-import math as math
+from chapter2.indicators import StdDev
 
 time_period = 20 # look back period
-history = [] # history of prices
+stddev = StdDev(time_period) # running mean and variance of the last 'time_period' prices
 sma_values = [] # to track moving average values for visualization purposes
 stddev_values = [] # history of computed stdev values
 
 for close_price in close:
-  history.append(close_price)
-  if len(history) > time_period: # we track at most 'time_period' number of prices
-    del (history[0])
-
-  sma = stats.mean(history)
-  sma_values.append(sma)
-  variance = 0 # variance is square of standard deviation
-  for hist_price in history:
-    variance = variance + ((hist_price - sma) ** 2)
-
-  stdev = math.sqrt(variance / len(history))
-
-  stddev_values.append(stdev)
+  stddev_values.append(stddev.update(close_price))
+  sma_values.append(stddev.mean)
 
 goog_data = goog_data.assign(ClosePrice=pd.Series(close, index=goog_data.index))
 goog_data = goog_data.assign(StandardDeviationOver20Days=pd.Series(stddev_values, index=goog_data.index))
@@ -2,18 +2,8 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from sklearn.model_selection import train_test_split
+from chapter9.marketdatastore import load_financial_data
 
-from pandas_datareader import data
-
-def load_financial_data(start_date, end_date, output_file):
-    try:
-        df = pd.read_pickle(output_file)
-        print('File data found...reading GOOG data')
-    except FileNotFoundError:
-        print('File not found...downloading the GOOG data')
-        df = data.DataReader('GOOG', 'yahoo', start_date, end_date)
-        df.to_pickle(output_file)
-    return df
 
 def create_classification_trading_condition(df):
     df['Open-Close'] = df.Open - df.Close
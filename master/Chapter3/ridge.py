@@ -6,17 +6,11 @@ import matplotlib.pyplot as plt
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
 from sklearn import linear_model
+from chapter9.marketdatastore import load_financial_data
 
 
-def load_financial_data(start_date, end_date, output_file):
-    try:
-        df = pd.read_pickle(output_file)
-        print("File data found...reading GOOG data")
-    except FileNotFoundError:
-        print("File not found...downloading the GOOG data")
-        df = yf.download("GOOG", start=start_date, end=end_date)
-        df.to_pickle(output_file)
-    return df
+def download(symbol, start_date, end_date):
+    return yf.download(symbol, start=start_date, end=end_date)
 
 
 def create_classification_trading_condition(df):
@@ -44,7 +38,7 @@ def create_train_split_group(X, Y, split_ratio=0.8):
 
 if __name__ == "__main__":
     src_data = "../data/goog_data.pkl"
-    goog_data = load_financial_data("2001-01-01", "2021-01-01", src_data)
+    goog_data = load_financial_data("2001-01-01", "2021-01-01", src_data, download=download)
 
     goog_data, X, Y = create_regression_trading_condition(goog_data)
     X_train, X_test, Y_train, Y_test = create_train_split_group(X, Y, split_ratio=0.8)
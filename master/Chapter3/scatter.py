@@ -1,17 +1,7 @@
 import pandas as pd
 import matplotlib.pyplot as plt
+from chapter9.marketdatastore import load_financial_data
 
-from pandas_datareader import data
-
-def load_financial_data(start_date, end_date, output_file):
-    try:
-        df = pd.read_pickle(output_file)
-        print('File data found...reading GOOG data')
-    except FileNotFoundError:
-        print('File not found...downloading the GOOG data')
-        df = data.DataReader('GOOG', 'yahoo', start_date, end_date)
-        df.to_pickle(output_file)
-    return df
 
 def create_regression_trading_condition(df):
     df['Open-Close'] = df.Open - df.Close
@@ -6,25 +6,13 @@ import numpy as np
 import matplotlib.pyplot as plt
 from statsmodels.tsa.stattools import coint
 import seaborn
-
-
-from pandas_datareader import data
+from chapter9.marketdatastore import load_financial_data
 
 symbolsIds = ['SPY','AAPL','ADBE','LUV','MSFT',\
               'SKYW','QCOM',
                  'HPQ','JNPR','AMD','IBM']
 
-def load_financial_data(symbols, start_date, end_date,output_file):
-    try:
-        df = pd.read_pickle(output_file)
-        print('File data found...reading symbols data')
-    except FileNotFoundError:
-        print('File not found...downloading the symbols data')
-        df = data.DataReader(symbols, 'yahoo', start_date, end_date)
-        df.to_pickle(output_file)
-    return df
-
-data=load_financial_data(symbolsIds,start_date='2001-01-01',
+data=load_financial_data(symbols=symbolsIds,start_date='2001-01-01',
                     end_date = '2018-01-01',
                     output_file='multi_data_large.pkl')
 
@@ -1,18 +1,8 @@
 #!/bin/python3
 import pandas as pd
 import numpy as np
-from pandas_datareader import data
 import matplotlib.pyplot as plt
-
-def load_financial_data(start_date, end_date,output_file):
-    try:
-        df = pd.read_pickle(output_file)
-        print('File data found...reading GOOG data')
-    except FileNotFoundError:
-        print('File not found...downloading the GOOG data')
-        df = data.DataReader('GOOG', 'yahoo', start_date, end_date)
-        df.to_pickle(output_file)
-    return df
+from chapter9.marketdatastore import load_financial_data
 
 goog_data=load_financial_data(start_date='2001-01-01',
                     end_date = '2018-01-01',
@@ -1,5 +1,5 @@
 import pandas as pd
-from pandas_datareader import data
+from chapter9.marketdatastore import load_financial_data
 
 # Fetch daily data for 4 years
 SYMBOL='GOOG'
@@ -7,11 +7,7 @@ start_date = '2014-01-01'
 end_date = '2018-01-01'
 SRC_DATA_FILENAME=SYMBOL + '_data.pkl'
 
-try:
-  data = pd.read_pickle(SRC_DATA_FILENAME)
-except FileNotFoundError:
-  data = data.DataReader(SYMBOL, 'yahoo', start_date, end_date)
-  data.to_pickle(SRC_DATA_FILENAME)
+data = load_financial_data(start_date, end_date, SRC_DATA_FILENAME, symbols=SYMBOL)
 
 # Variables/constants for EMA Calculation:
 NUM_PERIODS_FAST = 10 # Static time period parameter for the fast EMA
@@ -0,0 +1,203 @@
+import argparse
+import ast
+import importlib
+import itertools
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from time import perf_counter
+
+import numpy as np
+
+# Strategy name -> module exposing DEFAULT_PARAMS and run_strategy(close, params)
+STRATEGIES = {
+  'basic_mean_reversion': 'chapter5.basic_mean_reversion',
+  'volatility_mean_reversion': 'chapter5.volatility_mean_reversion',
+  'volatility_mean_reversion_with_dynamic_risk_allocation':
+    'chapter6.volatility_mean_reversion_with_dynamic_risk_allocation',
+  'stat_arb': 'chapter5.stat_arb',
+}
+
+# Strategies taking a dict of close prices per symbol instead of one series
+MULTI_SYMBOL_STRATEGIES = ('stat_arb',)
+
+
+def grid(param_values):
+  # Every combination of the values listed for each parameter
+  names = sorted(param_values)
+  return [dict(zip(names, values))
+          for values in itertools.product(*(param_values[name] for name in names))]
+
+
+def random_sample(param_values, nb_samples, seed=0):
+  # A value list is sampled from, a (low, high) tuple is drawn uniformly,
+  # as integers when both bounds are integers
+  rng = random.Random(seed)
+  param_sets = []
+  for _ in range(nb_samples):
+    params = {}
+    for name in sorted(param_values):
+      values = param_values[name]
+      if isinstance(values, tuple):
+        low, high = values
+        if isinstance(low, int) and isinstance(high, int):
+          params[name] = rng.randint(low, high)
+        else:
+          params[name] = rng.uniform(low, high)
+      else:
+        params[name] = rng.choice(values)
+    param_sets.append(params)
+  return param_sets
+
+
+def performance(pnls, trades):
+  # Same measures as risk_measures.py: max drawdown from the running max of
+  # the PnL (starting at 0), Sharpe ratio of the PnL changes every 5 days
+  pnls = np.asarray(pnls, dtype=np.float64)
+  drawdown = np.maximum.accumulate(np.maximum(pnls, 0)) - pnls
+  weekly_pnls = np.diff(pnls[::5])
+  std = weekly_pnls.std(ddof=1) if len(weekly_pnls) > 1 else 0.0
+  return {
+    'pnl': float(pnls[-1]) if len(pnls) else 0.0,
+    'max_drawdown': float(drawdown.max()) if len(pnls) else 0.0,
+    'sharpe': float(weekly_pnls.mean() / std) if std > 0 else 0.0,
+    'trades': int(np.count_nonzero(trades)),
+  }
+
+
+class SharedPrices:
+  # Close prices of one or more symbols, one row per symbol, copied once in
+  # a shared memory block that the workers map instead of receiving a copy
+  # with every task
+  def __init__(self, symbols, prices):
+    prices = np.ascontiguousarray(prices, dtype=np.float64)
+    self.symbols = list(symbols)
+    self.shape = prices.shape
+    self.shm = shared_memory.SharedMemory(create=True, size=max(prices.nbytes, 1))
+    np.ndarray(self.shape, dtype=np.float64, buffer=self.shm.buf)[:] = prices
+
+  def close(self):
+    self.shm.close()
+    self.shm.unlink()
+
+
+_worker = {}
+
+
+def _init_worker(strategy, shm_name, shape, symbols):
+  # The workers share the resource tracker of the parent, which unlinks the
+  # block once the sweep is done
+  shm = shared_memory.SharedMemory(name=shm_name)
+  prices = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+  if strategy in MULTI_SYMBOL_STRATEGIES:
+    close = dict((symbol, prices[i].tolist()) for i, symbol in enumerate(symbols))
+  else:
+    close = prices[0].tolist()
+  _worker['shm'] = shm
+  _worker['close'] = close
+  _worker['run_strategy'] = importlib.import_module(STRATEGIES[strategy]).run_strategy
+
+
+def _run_one(params):
+  results = _worker['run_strategy'](_worker['close'], params)
+  row = dict(params)
+  row.update(performance(results['Pnl'], results['Trades']))
+  return row
+
+
+def sweep(strategy, symbols, prices, param_sets, max_workers=None, chunksize=None):
+  # Runs the strategy once per parameter set across a process pool and
+  # returns one row per set: its parameters, pnl, max_drawdown, sharpe
+  # and number of trades, in the order of param_sets
+  if max_workers is None:
+    max_workers = os.cpu_count() or 1
+  if chunksize is None:
+    # A few chunks per worker keeps them busy until the end of the sweep
+    chunksize = max(1, len(param_sets) // (max_workers * 4))
+  shared = SharedPrices(symbols, np.atleast_2d(prices))
+  try:
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(strategy, shared.shm.name, shared.shape,
+                                       shared.symbols)) as executor:
+      return list(executor.map(_run_one, param_sets, chunksize=chunksize))
+  finally:
+    shared.close()
+
+
+def print_table(rows, sort_by='sharpe', top=20):
+  if not rows:
+    return
+  rows = sorted(rows, key=lambda row: row[sort_by], reverse=sort_by != 'max_drawdown')
+  columns = list(rows[0])
+  cells = [[('%.4g' % row[c]) if isinstance(row[c], float) else str(row[c])
+            for c in columns] for row in rows[:top]]
+  widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+  print('  '.join(c.rjust(w) for c, w in zip(columns, widths)))
+  for r in cells:
+    print('  '.join(v.rjust(w) for v, w in zip(r, widths)))
+
+
+def parse_param(text):
+  # NAME=v1,v2,v3 lists values, NAME=low:high gives a range for --random
+  name, _, values = text.partition('=')
+  if ':' in values:
+    low, high = values.split(':')
+    return name, (ast.literal_eval(low), ast.literal_eval(high))
+  return name, [ast.literal_eval(v) for v in values.split(',')]
+
+
+def load_prices(strategy, bars, seed):
+  if bars:
+    # Synthetic random walks, enough to measure the sweep without data files
+    rng = np.random.default_rng(seed)
+    nb_symbols = 4 if strategy in MULTI_SYMBOL_STRATEGIES else 1
+    prices = 500 * np.exp(np.cumsum(rng.normal(0, 0.01, (nb_symbols, bars)), axis=1))
+    if strategy in MULTI_SYMBOL_STRATEGIES:
+      symbols = ['AUDUSD=X', 'GBPUSD=X', 'CADUSD=X', 'CHFUSD=X']
+      return symbols, prices / 500
+    return ['GOOG'], prices
+  from chapter9.marketdatastore import load_financial_data
+  if strategy in MULTI_SYMBOL_STRATEGIES:
+    symbols = ['AUDUSD=X', 'GBPUSD=X', 'CADUSD=X', 'CHFUSD=X', 'EURUSD=X', 'JPYUSD=X', 'NZDUSD=X']
+  else:
+    symbols = ['GOOG']
+  # Same dates and data files as the strategy scripts
+  prices = [load_financial_data('2014-01-01', '2018-01-01', symbol + '_data.pkl', symbols=symbol,
+                                columns=['Close'])['Close'].to_numpy()
+            for symbol in symbols]
+  return symbols, np.vstack(prices)
+
+
+def main():
+  parser = argparse.ArgumentParser(
+    description='Backtest a strategy over a grid or a random sample of parameters')
+  parser.add_argument('--strategy', choices=sorted(STRATEGIES), default='basic_mean_reversion')
+  parser.add_argument('--param', action='append', default=[], type=parse_param,
+                      help='NAME=v1,v2,... or NAME=low:high, repeatable')
+  parser.add_argument('--random', type=int, default=0,
+                      help='number of random parameter sets instead of the full grid')
+  parser.add_argument('--workers', type=int, default=None)
+  parser.add_argument('--synthetic', type=int, default=0,
+                      help='number of synthetic bars instead of the <SYMBOL>_data.pkl files')
+  parser.add_argument('--seed', type=int, default=0)
+  parser.add_argument('--sort', choices=('sharpe', 'pnl', 'max_drawdown'), default='sharpe')
+  parser.add_argument('--top', type=int, default=20)
+  args = parser.parse_args()
+
+  param_values = dict(args.param)
+  if args.random:
+    param_sets = random_sample(param_values, args.random, args.seed)
+  else:
+    param_sets = grid(param_values)
+  symbols, prices = load_prices(args.strategy, args.synthetic, args.seed)
+
+  start = perf_counter()
+  rows = sweep(args.strategy, symbols, prices, param_sets, args.workers)
+  elapsed = perf_counter() - start
+  print('%d backtests of %d bars in %.2fs, %.1f backtests/s'
+        % (len(rows), prices.shape[1], elapsed, len(rows) / elapsed))
+  print_table(rows, args.sort, args.top)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,62 @@
+import csv
+import os
+import unittest
+
+from chapter5 import basic_mean_reversion
+from chapter6.parameter_sweep import grid, random_sample, performance, sweep
+
+
+def read_csv(name):
+  path = os.path.join(os.path.dirname(basic_mean_reversion.__file__), name)
+  with open(path) as f:
+    return list(csv.DictReader(f))
+
+
+class TestParameterSweep(unittest.TestCase):
+
+  def setUp(self):
+    self.rows = read_csv('basic_mean_reversion.csv')
+    self.close = [float(row['Close']) for row in self.rows]
+
+  def test_run_strategy_matches_script_output(self):
+    results = basic_mean_reversion.run_strategy(self.close)
+    self.assertEqual(results['Pnl'], [float(row['Pnl']) for row in self.rows])
+    self.assertEqual(results['Position'], [int(row['Position']) for row in self.rows])
+
+  def test_unknown_parameter(self):
+    with self.assertRaises(ValueError):
+      basic_mean_reversion.run_strategy(self.close, {'NUM_PERIODS': 3})
+
+  def test_grid(self):
+    param_sets = grid({'NUM_PERIODS_FAST': [5, 10], 'APO_VALUE_FOR_BUY_ENTRY': [-5, -10, -20]})
+    self.assertEqual(len(param_sets), 6)
+    self.assertIn({'NUM_PERIODS_FAST': 10, 'APO_VALUE_FOR_BUY_ENTRY': -20}, param_sets)
+
+  def test_random_sample(self):
+    param_sets = random_sample({'NUM_PERIODS_FAST': (5, 15), 'MIN_PROFIT_TO_CLOSE': [50, 100]}, 20)
+    self.assertEqual(len(param_sets), 20)
+    for params in param_sets:
+      self.assertTrue(5 <= params['NUM_PERIODS_FAST'] <= 15)
+      self.assertIsInstance(params['NUM_PERIODS_FAST'], int)
+      self.assertIn(params['MIN_PROFIT_TO_CLOSE'], (50, 100))
+    self.assertEqual(param_sets, random_sample({'NUM_PERIODS_FAST': (5, 15), 'MIN_PROFIT_TO_CLOSE': [50, 100]}, 20))
+
+  def test_performance(self):
+    result = performance([0, 10, 5, 20, 15, 30, 25, 10, 40, 35, 50], [0, 1, 0, 1, 1, 0, 0, 1, 0, 0, 1])
+    self.assertEqual(result['pnl'], 50)
+    self.assertEqual(result['max_drawdown'], 20)
+    self.assertEqual(result['trades'], 5)
+    self.assertGreater(result['sharpe'], 0)
+
+  def test_sweep_same_as_direct_runs(self):
+    param_sets = grid({'NUM_PERIODS_FAST': [5, 10], 'MIN_PROFIT_TO_CLOSE': [50, 100]})
+    rows = sweep('basic_mean_reversion', ['GOOG'], self.close, param_sets, max_workers=2)
+    self.assertEqual(len(rows), 4)
+    for params, row in zip(param_sets, rows):
+      results = basic_mean_reversion.run_strategy(self.close, params)
+      self.assertEqual(row['pnl'], results['Pnl'][-1])
+      self.assertEqual(row['NUM_PERIODS_FAST'], params['NUM_PERIODS_FAST'])
+
+
+if __name__ == '__main__':
+  unittest.main()
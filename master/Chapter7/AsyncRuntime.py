@@ -0,0 +1,211 @@
+import asyncio
+from collections import deque
+from time import monotonic_ns
+from chapter7.EventDispatcher import format_percentiles
+from chapter7.FeedServer import read_feed
+from chapter7.LatencyHistogram import LatencyHistogram
+from chapter7.MarketSimulator import MarketSimulator
+from chapter7.OrderBook import OrderBook
+from chapter7.OrderManager import OrderManager
+from chapter7.TradingStrategy import TradingStrategy
+
+POLICIES = ('block', 'drop_oldest', 'conflate')
+
+
+class AsyncEventQueue:
+    # A queue between asyncio tasks holding at most maxsize events (no
+    # limit for 0). What put() does when it is full depends on policy:
+    #   block       waits until the consumer makes room
+    #   drop_oldest drops the oldest event to make room, counted in dropped
+    #   conflate    waits like block, but an event whose key(event) is
+    #               already queued replaces it in place whether the queue
+    #               is full or not, counted in conflated: the consumer only
+    #               sees the latest event of every key, in the order the
+    #               keys were first queued
+    def __init__(self, maxsize=0, policy='block', key=None):
+        if policy not in POLICIES:
+            raise ValueError('policy must be one of %s, got %r'
+                             % (', '.join(POLICIES), policy))
+        self.maxsize = maxsize
+        self.policy = policy
+        self.key = key if key is not None else lambda event: event.symbol
+        self.items = deque()
+        # conflate only: items holds the keys and latest their event
+        self.latest = {}
+        self.dropped = 0
+        self.conflated = 0
+        self.not_empty = asyncio.Event()
+        self.not_full = asyncio.Event()
+
+    def __len__(self):
+        return len(self.items)
+
+    def full(self):
+        return 0 < self.maxsize <= len(self.items)
+
+    async def put(self, event):
+        conflate = self.policy == 'conflate'
+        if conflate:
+            key = self.key(event)
+            if key in self.latest:
+                self.latest[key] = event
+                self.conflated += 1
+                return
+        while self.full():
+            if self.policy == 'drop_oldest':
+                self.items.popleft()
+                self.dropped += 1
+                break
+            self.not_full.clear()
+            await self.not_full.wait()
+        if conflate:
+            if key in self.latest:
+                # queued by another producer while this one waited
+                self.latest[key] = event
+                self.conflated += 1
+                return
+            self.latest[key] = event
+            self.items.append(key)
+        else:
+            self.items.append(event)
+        self.not_empty.set()
+
+    async def get(self):
+        while not self.items:
+            self.not_empty.clear()
+            await self.not_empty.wait()
+        event = self.items.popleft()
+        if self.policy == 'conflate':
+            event = self.latest.pop(event)
+        self.not_full.set()
+        return event
+
+
+class AsyncTradingRuntime:
+    # Runs the chapter 7 components as asyncio tasks, one per input queue,
+    # connected by bounded AsyncEventQueues. The components are unchanged:
+    # they still append their output to plain deques, which the task that
+    # called them empties into the AsyncEventQueues of the next hops.
+    #
+    # Events travel as (stamp, event) pairs, stamp being the
+    # time.monotonic_ns() at which the feed message causing them was sent,
+    # so latency[hop] is the time from the feed to the handling of the hop.
+    #
+    # book_policy is the policy of the book events queue, ob_2_ts: under
+    # overload they are conflated per symbol by default. The other queues
+    # always block. For the feed this pushes back on the feed connection,
+    # as a book missing orders would be wrong from then on, and order
+    # traffic is never dropped: ts_2_om, om_2_gw and gw_2_om block, and
+    # om_2_ts has no limit, as bounding every queue of the strategy, order
+    # manager and market simulator cycle could deadlock it.
+    def __init__(self, maxsize=1024, book_policy='conflate',
+                 book_factory=OrderBook, strategy_factory=TradingStrategy):
+        self.ob_2_ts = deque()
+        self.ts_2_om = deque()
+        self.om_2_ts = deque()
+        self.om_2_gw = deque()
+        self.gw_2_om = deque()
+
+        self.ob = book_factory(None, self.ob_2_ts)
+        self.ts = strategy_factory(None, self.ts_2_om, None)
+        self.om = OrderManager(None, self.om_2_ts, self.om_2_gw, None)
+        self.ms = MarketSimulator(None, self.gw_2_om)
+
+        self.queues = {
+            'lp_2_gateway': AsyncEventQueue(maxsize),
+            'ob_2_ts': AsyncEventQueue(maxsize, book_policy,
+                                       key=lambda item: item[1].symbol),
+            'ts_2_om': AsyncEventQueue(maxsize),
+            'om_2_gw': AsyncEventQueue(maxsize),
+            'gw_2_om': AsyncEventQueue(maxsize),
+            'om_2_ts': AsyncEventQueue(),
+        }
+        # input queue, handler, (output deque, output queue) of every task
+        self.hops = [
+            ('lp_2_gateway', self.ob.handle_order,
+             [(self.ob_2_ts, 'ob_2_ts')]),
+            ('ob_2_ts', self.ts.handle_book_event,
+             [(self.ts_2_om, 'ts_2_om')]),
+            ('ts_2_om', self.om.handle_order_from_trading_strategy,
+             [(self.om_2_gw, 'om_2_gw')]),
+            ('om_2_gw', self.ms.handle_order,
+             [(self.gw_2_om, 'gw_2_om')]),
+            ('gw_2_om', self.om.handle_order_from_gateway,
+             [(self.om_2_ts, 'om_2_ts')]),
+            ('om_2_ts', self.ts.handle_market_response,
+             [(self.ts_2_om, 'ts_2_om')]),
+        ]
+        self.latency = dict((name, LatencyHistogram()) for name in self.queues)
+        self.busy = 0
+        self.nb_messages = 0
+
+    async def pump(self, name, handler, outputs):
+        get = self.queues[name].get
+        record = self.latency[name].record
+        outputs = [(output, self.queues[output_name].put)
+                   for output, output_name in outputs]
+        while True:
+            stamp, event = await get()
+            self.busy += 1
+            record(monotonic_ns() - stamp)
+            handler(event)
+            for output, put in outputs:
+                while output:
+                    await put((stamp, output.popleft()))
+            self.busy -= 1
+
+    async def consume_feed(self, feed):
+        put = self.queues['lp_2_gateway'].put
+        async for stamp, order in feed:
+            await put((stamp, order))
+            self.nb_messages += 1
+
+    def idle(self):
+        return not self.busy and not any(self.queues.values())
+
+    async def run(self, feed):
+        # Handles the (stamp, order) of the async iterable feed and returns
+        # once they are all processed. An exception in a component stops
+        # the runtime and is raised here.
+        tasks = [asyncio.create_task(self.pump(name, handler, outputs))
+                 for name, handler, outputs in self.hops]
+        feed_task = asyncio.create_task(self.consume_feed(feed))
+        try:
+            done, _ = await asyncio.wait(tasks + [feed_task],
+                                         return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+            while not self.idle():
+                await asyncio.sleep(0)
+                for task in tasks:
+                    if task.done():
+                        task.result()
+        finally:
+            for task in tasks + [feed_task]:
+                task.cancel()
+            await asyncio.gather(*tasks, feed_task, return_exceptions=True)
+        return self.nb_messages
+
+    async def run_from(self, host, port):
+        # run() on the feed of the FeedServer at host:port
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            return await self.run(read_feed(reader))
+        finally:
+            writer.close()
+
+    def report(self, percentiles=(50, 99, 99.9)):
+        # Events handled, dropped and conflated by hop, and the percentiles
+        # in microseconds of the time from the feed to the hop
+        columns = ' '.join('%8s' % ('p%g' % p).replace('.', '')
+                           for p in percentiles)
+        lines = ['%-14s %-11s %9s %9s %9s %s'
+                 % ('hop', 'policy', 'events', 'dropped', 'conflated',
+                    columns)]
+        for name, queue in self.queues.items():
+            latency = self.latency[name]
+            lines.append('%-14s %-11s %9d %9d %9d %s'
+                         % (name, queue.policy, latency.count, queue.dropped,
+                            queue.conflated,
+                            format_percentiles(latency, percentiles)))
+        return '\n'.join(lines)
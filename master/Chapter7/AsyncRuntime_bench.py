@@ -0,0 +1,45 @@
+import argparse
+import asyncio
+import contextlib
+import os
+from time import perf_counter
+
+from chapter7.AsyncRuntime import POLICIES, AsyncTradingRuntime
+from chapter7.FeedServer import FeedServer, generate_feed
+
+
+async def run(orders, rate, maxsize, book_policy):
+    async with FeedServer(orders, rate) as server:
+        runtime = AsyncTradingRuntime(maxsize, book_policy)
+        start = perf_counter()
+        await runtime.run_from(server.host, server.port)
+        return perf_counter() - start, runtime
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Throughput and latency of the asyncio runtime fed by a local feed server')
+    parser.add_argument('--messages', type=int, default=100000)
+    parser.add_argument('--symbols', type=int, default=10)
+    parser.add_argument('--rates', type=float, nargs='+', default=[5000, 20000],
+                        help='paced feed rates in messages/s, the feed is '
+                             'also sent unpaced')
+    parser.add_argument('--maxsize', type=int, default=256)
+    args = parser.parse_args()
+
+    orders = generate_feed(args.messages, args.symbols)
+    for rate in args.rates + [None]:
+        for book_policy in POLICIES:
+            # the components print on some rejected orders
+            with open(os.devnull, 'w') as devnull, \
+                    contextlib.redirect_stdout(devnull):
+                elapsed, runtime = asyncio.run(
+                    run(orders, rate, args.maxsize, book_policy))
+            print('rate %s, book events %s: %.0f msg/s'
+                  % ('unpaced' if rate is None else '%.0f' % rate,
+                     book_policy, runtime.nb_messages / elapsed))
+            print(runtime.report())
+            print()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+import asyncio
+import unittest
+from chapter7.AsyncRuntime import AsyncEventQueue, AsyncTradingRuntime
+from chapter7.FeedServer import FeedServer, decode_order, encode_order, \
+    generate_feed
+from chapter7.Messages import BookEvent, Order
+from chapter7.OrderBook import OrderBook
+
+
+class TestAsyncEventQueue(unittest.TestCase):
+
+    def test_block(self):
+        async def scenario():
+            queue = AsyncEventQueue(2)
+            await queue.put(1)
+            await queue.put(2)
+            put = asyncio.create_task(queue.put(3))
+            await asyncio.sleep(0)
+            self.assertFalse(put.done())
+            self.assertEqual(await queue.get(), 1)
+            await put
+            return [await queue.get(), await queue.get()]
+        self.assertEqual(asyncio.run(scenario()), [2, 3])
+
+    def test_drop_oldest(self):
+        async def scenario():
+            queue = AsyncEventQueue(2, 'drop_oldest')
+            for event in range(5):
+                await queue.put(event)
+            return queue.dropped, [await queue.get(), await queue.get()]
+        self.assertEqual(asyncio.run(scenario()), (3, [3, 4]))
+
+    def test_conflate(self):
+        async def scenario():
+            queue = AsyncEventQueue(2, 'conflate')
+            events = [BookEvent(10, 1, 11, 1, 'A'),
+                      BookEvent(20, 1, 21, 1, 'B'),
+                      BookEvent(12, 1, 13, 1, 'A'),
+                      BookEvent(14, 1, 15, 1, 'A')]
+            for event in events:
+                await queue.put(event)
+            return queue.conflated, [await queue.get(), await queue.get()]
+        conflated, events = asyncio.run(scenario())
+        self.assertEqual(conflated, 2)
+        self.assertEqual([(be.symbol, be.bid_price) for be in events],
+                         [('A', 14), ('B', 20)])
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            AsyncEventQueue(2, 'drop_newest')
+
+
+class TestAsyncTradingRuntime(unittest.TestCase):
+
+    def test_encoding(self):
+        order = Order(3, 10.5, 200, 'bid', 'new', symbol='GOOG')
+        stamp, decoded = decode_order(encode_order(42, order))
+        self.assertEqual(stamp, 42)
+        self.assertEqual(decoded, order)
+        self.assertIsNone(decode_order(
+            encode_order(42, Order(3, 10.0, 200, 'bid', 'new')))[1].symbol)
+
+    def test_feed_server(self):
+        orders = generate_feed(3000)
+
+        async def scenario():
+            async with FeedServer(orders) as server:
+                runtime = AsyncTradingRuntime(maxsize=16)
+                nb_messages = await runtime.run_from(server.host, server.port)
+            return nb_messages, runtime
+
+        nb_messages, runtime = asyncio.run(scenario())
+        self.assertEqual(nb_messages, len(orders))
+        self.assertEqual(runtime.latency['lp_2_gateway'].count, len(orders))
+
+        # the feed is never dropped: the book is the one of a synchronous run
+        book = OrderBook()
+        for o in generate_feed(3000):
+            book.handle_order(o)
+        self.assertEqual(runtime.ob.list_bids, book.list_bids)
+        self.assertEqual(runtime.ob.list_asks, book.list_asks)
+
+        # every order sent by the strategy went through the order manager
+        # and the market simulator and came back
+        self.assertGreater(runtime.latency['ts_2_om'].count, 0)
+        self.assertEqual(runtime.latency['ts_2_om'].count,
+                         runtime.latency['om_2_gw'].count)
+        self.assertEqual(runtime.latency['gw_2_om'].count,
+                         runtime.latency['om_2_ts'].count)
+        for name in ('ts_2_om', 'om_2_gw', 'gw_2_om', 'om_2_ts'):
+            self.assertEqual(runtime.queues[name].dropped, 0)
+        self.assertEqual(len(runtime.report().splitlines()), 7)
+
+    def test_handler_error_raised(self):
+        async def feed():
+            yield 0, Order(1, 10.0, 100, 'bid', 'new')
+
+        runtime = AsyncTradingRuntime()
+
+        def fail(order):
+            raise RuntimeError('book failure')
+        runtime.hops[0] = ('lp_2_gateway', fail, [])
+        with self.assertRaises(RuntimeError):
+            asyncio.run(runtime.run(feed()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+from chapter7.Messages import DepthEvent
+
+
+class DepthBook:
+    # Top levels of a book rebuilt from its DepthEvents, on the trading
+    # strategy side. A snapshot replaces the levels, the other events only
+    # carry the levels changed by a message.
+    def __init__(self, symbol=None):
+        self.symbol = symbol
+        self.bids = {}
+        self.asks = {}
+
+    def apply(self, event):
+        if type(event) is not DepthEvent:
+            event = DepthEvent.from_dict(event)
+        if event.snapshot:
+            self.bids.clear()
+            self.asks.clear()
+        for levels, changes in ((self.bids, event.bids),
+                                (self.asks, event.asks)):
+            for price, quantity in changes:
+                if quantity:
+                    levels[price] = quantity
+                else:
+                    levels.pop(price, None)
+
+    def bid_levels(self):
+        return sorted(self.bids.items(), reverse=True)
+
+    def ask_levels(self):
+        return sorted(self.asks.items())
+
+    def best_bid(self):
+        return max(self.bids) if self.bids else None
+
+    def best_ask(self):
+        return min(self.asks) if self.asks else None
+
+    def imbalance(self):
+        # Bid minus ask quantity over the quantity shown on both sides,
+        # from -1 with asks only to 1 with bids only
+        bid_quantity = sum(self.bids.values())
+        ask_quantity = sum(self.asks.values())
+        total = bid_quantity + ask_quantity
+        if not total:
+            return 0.0
+        return (bid_quantity - ask_quantity) / total
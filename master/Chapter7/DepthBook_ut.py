@@ -0,0 +1,34 @@
+import unittest
+from chapter7.DepthBook import DepthBook
+from chapter7.Messages import DepthEvent
+
+
+class TestDepthBook(unittest.TestCase):
+
+    def setUp(self):
+        self.depth_book = DepthBook()
+        self.depth_book.apply(DepthEvent([(219, 10), (218, 5)],
+                                         [(221, 10), (222, 20)], True))
+
+    def test_snapshot(self):
+        self.assertEqual(self.depth_book.bid_levels(), [(219, 10), (218, 5)])
+        self.assertEqual(self.depth_book.ask_levels(), [(221, 10), (222, 20)])
+        self.depth_book.apply(DepthEvent([(217, 1)], [], True))
+        self.assertEqual(self.depth_book.bid_levels(), [(217, 1)])
+        self.assertEqual(self.depth_book.ask_levels(), [])
+
+    def test_changes(self):
+        self.depth_book.apply({
+            'bids': [(220, 7), (218, 0)],
+            'asks': [(221, 4)],
+            'snapshot': False
+        })
+        self.assertEqual(self.depth_book.bid_levels(), [(220, 7), (219, 10)])
+        self.assertEqual(self.depth_book.ask_levels(), [(221, 4), (222, 20)])
+        self.assertEqual(self.depth_book.best_bid(), 220)
+        self.assertEqual(self.depth_book.best_ask(), 221)
+        self.assertAlmostEqual(self.depth_book.imbalance(), (17 - 24) / 41)
+
+
+if __name__ == '__main__':
+    unittest.main()
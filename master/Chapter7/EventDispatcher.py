@@ -0,0 +1,214 @@
+from collections import deque
+from time import monotonic_ns
+from chapter7.LatencyHistogram import LatencyHistogram
+
+
+class EventQueue(deque):
+    # A deque that tells its dispatcher when it receives an event, so that
+    # only the queues holding events are visited. Components keep using it
+    # as a plain deque.
+    def __init__(self, iterable=(), maxlen=None):
+        super().__init__(iterable, maxlen)
+        self.ready = None
+        self.index = None
+
+    def append(self, event):
+        deque.append(self, event)
+        if self.ready is not None:
+            self.ready.add(self.index)
+
+    def extend(self, events):
+        deque.extend(self, events)
+        if self.ready is not None and len(self) > 0:
+            self.ready.add(self.index)
+
+
+class TimedEventQueue(EventQueue):
+    # An EventQueue recording how long its events wait. Every event queued
+    # is stamped with time.monotonic_ns() in stamps, kept in step with the
+    # events, and popleft() records the time since the stamp in residence.
+    # Only used when latency is measured, so the plain EventQueue pays
+    # nothing for it.
+    def __init__(self, iterable=(), maxlen=None, name=None):
+        super().__init__(iterable, maxlen)
+        self.name = name
+        now = monotonic_ns()
+        self.stamps = deque((now for _ in range(len(self))), maxlen)
+        self.residence = LatencyHistogram()
+
+    def append(self, event):
+        self.stamps.append(monotonic_ns())
+        EventQueue.append(self, event)
+
+    def extend(self, events):
+        events = list(events)
+        self.stamps.extend([monotonic_ns()] * len(events))
+        EventQueue.extend(self, events)
+
+    def popleft(self):
+        event = deque.popleft(self)
+        self.residence.record(monotonic_ns() - self.stamps.popleft())
+        return event
+
+    def clear(self):
+        deque.clear(self)
+        self.stamps.clear()
+
+
+class EventDispatcher:
+    # Each queue is subscribed by exactly one handler taking one event.
+    # run() sweeps the queues holding events in subscription order, draining
+    # up to batch_size events per visit (everything queued by default), until
+    # every queue is empty. Subscribing the queues in pipeline order gives
+    # the same processing order on every run.
+    #
+    # With timed, the time spent in each handler is recorded in a
+    # LatencyHistogram per subscription, and latency_report() gives it
+    # next to the queue residence of the TimedEventQueues.
+    #
+    # journal, a chapter9.journal.JournalWriter, keeps every event with the
+    # index of its subscription just before its handler gets it, and its
+    # full chunks are written out between batches.
+    def __init__(self, batch_size=None, timed=False, journal=None):
+        if timed and journal is not None:
+            raise ValueError('a dispatcher is either timed or journaled')
+        self.batch_size = batch_size
+        self.timed = timed
+        self.journal = journal
+        self.subscriptions = []
+        self.names = []
+        self.handler_times = []
+        # by subscription, the class of its last journaled event, its key
+        # and what the journal keeps of it
+        self.journal_kinds = []
+        self.ready = set()
+
+    def subscribe(self, queue, handler, name=None):
+        if not isinstance(queue, EventQueue):
+            raise TypeError('only EventQueue can be subscribed')
+        if queue.ready is not None:
+            raise ValueError('queue already has a subscriber')
+        queue.index = len(self.subscriptions)
+        queue.ready = self.ready
+        self.subscriptions.append((queue, handler))
+        if name is None:
+            name = getattr(queue, 'name', None) or handler.__qualname__
+        self.names.append(name)
+        self.handler_times.append(LatencyHistogram())
+        self.journal_kinds.append((None, 0, None, None))
+        if len(queue) > 0:
+            self.ready.add(queue.index)
+
+    def run(self):
+        if self.timed:
+            return self.run_timed()
+        if self.journal is not None:
+            return self.run_journaled()
+        ready = self.ready
+        subscriptions = self.subscriptions
+        batch_size = self.batch_size
+        nb_events = 0
+        while ready:
+            for index in sorted(ready):
+                ready.discard(index)
+                queue, handler = subscriptions[index]
+                nb = len(queue)
+                if batch_size is not None and nb > batch_size:
+                    nb = batch_size
+                popleft = queue.popleft
+                for _ in range(nb):
+                    handler(popleft())
+                nb_events += nb
+                if len(queue) > 0:
+                    ready.add(index)
+        return nb_events
+
+    def run_timed(self):
+        # run() recording the time spent in every handler call
+        ready = self.ready
+        subscriptions = self.subscriptions
+        handler_times = self.handler_times
+        batch_size = self.batch_size
+        nb_events = 0
+        while ready:
+            for index in sorted(ready):
+                ready.discard(index)
+                queue, handler = subscriptions[index]
+                record = handler_times[index].record
+                nb = len(queue)
+                if batch_size is not None and nb > batch_size:
+                    nb = batch_size
+                popleft = queue.popleft
+                for _ in range(nb):
+                    event = popleft()
+                    start = monotonic_ns()
+                    handler(event)
+                    record(monotonic_ns() - start)
+                nb_events += nb
+                if len(queue) > 0:
+                    ready.add(index)
+        return nb_events
+
+    def run_journaled(self):
+        # run() writing every event to the journal before handling it
+        journal = self.journal
+        if journal.names is None:
+            journal.start(self.names)
+        kind = journal.kind
+        keys = journal.keys
+        append_key = keys.append
+        chunk_size = journal.chunk_size
+        flush = journal.flush
+        kinds = self.journal_kinds
+        ready = self.ready
+        subscriptions = self.subscriptions
+        batch_size = self.batch_size
+        nb_events = 0
+        while ready:
+            for index in sorted(ready):
+                ready.discard(index)
+                queue, handler = subscriptions[index]
+                nb = len(queue)
+                if batch_size is not None and nb > batch_size:
+                    nb = batch_size
+                popleft = queue.popleft
+                cls, key, get, add = kinds[index]
+                for _ in range(nb):
+                    event = popleft()
+                    if type(event) is not cls:
+                        cls = type(event)
+                        key, get, add = kind(index, cls)
+                        kinds[index] = cls, key, get, add
+                    append_key(key)
+                    add(get(event))
+                    handler(event)
+                if len(keys) >= chunk_size:
+                    flush()
+                nb_events += nb
+                if len(queue) > 0:
+                    ready.add(index)
+        return nb_events
+
+    def latency_report(self, percentiles=(50, 99, 99.9)):
+        # One line per subscription with the number of events and the
+        # percentiles in microseconds of the time spent in the queue (for
+        # a TimedEventQueue) and in the handler
+        columns = ' '.join('%8s' % ('p%g' % p).replace('.', '')
+                           for p in percentiles)
+        lines = ['%-40s %9s  us    %s          %s'
+                 % ('hop', 'events', columns, columns)]
+        for (queue, handler), name, handler_time in \
+                zip(self.subscriptions, self.names, self.handler_times):
+            residence = getattr(queue, 'residence', None)
+            lines.append('%-40s %9d  queue %s  handler %s'
+                         % (name, handler_time.count,
+                            format_percentiles(residence, percentiles),
+                            format_percentiles(handler_time, percentiles)))
+        return '\n'.join(lines)
+
+
+def format_percentiles(histogram, percentiles):
+    if histogram is None or not histogram.count:
+        return ' '.join('%8s' % '-' for _ in percentiles)
+    return ' '.join('%8.2f' % (histogram.percentile(p) / 1e3)
+                    for p in percentiles)
@@ -0,0 +1,100 @@
+import unittest
+from chapter7.EventDispatcher import EventDispatcher, EventQueue, \
+    TimedEventQueue
+
+
+class TestEventDispatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.first = EventQueue()
+        self.second = EventQueue()
+        self.dispatcher = EventDispatcher()
+        self.dispatcher.subscribe(self.first, self.handle_first)
+        self.dispatcher.subscribe(self.second, self.handle_second)
+
+    def handle_first(self, event):
+        self.calls.append(('first', event))
+        self.second.append(event * 10)
+
+    def handle_second(self, event):
+        self.calls.append(('second', event))
+
+    def test_idle_queues_not_visited(self):
+        self.assertEqual(self.dispatcher.run(), 0)
+        self.second.append(1)
+        self.assertEqual(self.dispatcher.run(), 1)
+        self.assertEqual(self.calls, [('second', 1)])
+
+    def test_batch_drained_in_subscription_order(self):
+        self.first.extend([1, 2])
+        self.assertEqual(self.dispatcher.run(), 4)
+        self.assertEqual(self.calls, [('first', 1), ('first', 2),
+                                      ('second', 10), ('second', 20)])
+        self.assertEqual(len(self.first), 0)
+        self.assertEqual(len(self.second), 0)
+
+    def test_batch_size(self):
+        self.dispatcher.batch_size = 1
+        self.first.extend([1, 2])
+        self.dispatcher.run()
+        self.assertEqual(self.calls, [('first', 1), ('first', 2),
+                                      ('second', 10), ('second', 20)])
+        self.calls = []
+        self.second.append(3)
+        self.first.append(4)
+        self.dispatcher.run()
+        self.assertEqual(self.calls, [('first', 4), ('second', 3),
+                                      ('second', 40)])
+
+    def test_single_subscriber(self):
+        with self.assertRaises(ValueError):
+            self.dispatcher.subscribe(self.first, self.handle_second)
+
+
+class TestTimedEventDispatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.first = TimedEventQueue(name='first')
+        self.second = TimedEventQueue(name='second')
+        self.dispatcher = EventDispatcher(timed=True)
+        self.dispatcher.subscribe(self.first, self.handle_first)
+        self.dispatcher.subscribe(self.second, lambda event: None)
+
+    def handle_first(self, event):
+        self.second.append(event * 10)
+
+    def test_stamps_follow_events(self):
+        self.first.extend([1, 2])
+        self.first.append(3)
+        self.assertEqual(len(self.first.stamps), 3)
+        self.assertEqual(self.first.popleft(), 1)
+        self.assertEqual(len(self.first.stamps), 2)
+        self.assertEqual(self.first.residence.count, 1)
+        self.first.clear()
+        self.assertEqual(len(self.first.stamps), 0)
+
+    def test_hops_recorded(self):
+        self.first.extend([1, 2, 3])
+        self.assertEqual(self.dispatcher.run(), 6)
+        self.assertEqual([h.count for h in self.dispatcher.handler_times],
+                         [3, 3])
+        self.assertEqual(self.first.residence.count, 3)
+        self.assertEqual(self.second.residence.count, 3)
+        report = self.dispatcher.latency_report().splitlines()
+        self.assertEqual(len(report), 3)
+        self.assertTrue(report[1].startswith('first '))
+        self.assertIn('p999', report[0])
+
+    def test_untimed_queue(self):
+        queue = EventQueue()
+        self.dispatcher.subscribe(queue, self.handle_first, name='plain')
+        queue.append(1)
+        self.dispatcher.run()
+        self.assertEqual(self.dispatcher.handler_times[2].count, 1)
+        self.assertTrue(self.dispatcher.latency_report().splitlines()[3]
+                        .startswith('plain '))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import asyncio
+from random import Random
+from time import monotonic_ns
+from chapter7.Messages import Order
+
+# One order per line: stamp,id,price,quantity,side,action,symbol where
+# stamp is the time.monotonic_ns() at which the server sent the line and
+# an empty symbol means None
+
+
+def encode_order(stamp, order):
+    return ('%d,%d,%r,%d,%s,%s,%s\n'
+            % (stamp, order.id, order.price, order.quantity, order.side,
+               order.action, order.symbol or '')).encode()
+
+
+def decode_order(line):
+    stamp, order_id, price, quantity, side, action, symbol = \
+        line.decode().rstrip('\n').split(',')
+    return int(stamp), Order(int(order_id), float(price), int(quantity),
+                             side, action, symbol=symbol or None)
+
+
+async def read_feed(reader):
+    # Yields the (stamp, order) sent by a FeedServer until it closes the
+    # connection
+    while True:
+        line = await reader.readline()
+        if not line:
+            return
+        yield decode_order(line)
+
+
+def generate_feed(nb_messages, nb_symbols=1, seed=0):
+    # Liquidity provider like flow: new orders priced from 8 to 11 on both
+    # sides, so that books often cross and the strategy trades, mixed with
+    # deletes of live orders once 100 of them rest
+    rng = Random(seed)
+    symbols = [None] if nb_symbols == 1 else \
+        ['S%d' % i for i in range(nb_symbols)]
+    live = []
+    orders = []
+    for order_id in range(nb_messages):
+        if len(live) > 100 and rng.random() < 0.5:
+            o = live.pop(rng.randrange(len(live)))
+            orders.append(Order(o.id, o.price, o.quantity, o.side, 'delete',
+                                symbol=o.symbol))
+        else:
+            o = Order(order_id, float(rng.randrange(8, 12)),
+                      rng.randrange(1, 10) * 100,
+                      'bid' if rng.random() < 0.5 else 'ask', 'new',
+                      symbol=symbols[order_id % len(symbols)])
+            live.append(o)
+            orders.append(o.copy())
+    return orders
+
+
+class FeedServer:
+    # A stand-in for a market data feed on a local TCP port. Every client
+    # connecting gets the orders, at rate messages per second or as fast
+    # as the connection takes them, and the connection is then closed.
+    def __init__(self, orders, rate=None, host='127.0.0.1', port=0):
+        self.orders = orders
+        self.rate = rate
+        self.host = host
+        self.port = port
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_client,
+                                                 self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.host, self.port
+
+    async def handle_client(self, reader, writer):
+        rate = self.rate
+        start = monotonic_ns()
+        try:
+            for count, order in enumerate(self.orders):
+                if rate is not None:
+                    ahead = start + count * 1e9 / rate - monotonic_ns()
+                    if ahead > 1e6:
+                        await writer.drain()
+                        await asyncio.sleep(ahead / 1e9)
+                writer.write(encode_order(monotonic_ns(), order))
+                if count % 64 == 63:
+                    await writer.drain()
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
@@ -0,0 +1,89 @@
+from math import ceil
+
+
+class LatencyHistogram:
+    # Counts of integer nanosecond latencies in log-linear buckets, in the
+    # way of HDR histograms: values below 2**precision_bits have a bucket
+    # each, above that every power of two is split in 2**(precision_bits-1)
+    # buckets. With the default 7 bits a recorded value is known within
+    # 1/64 of itself from 1 ns to hours, and recording is a few integer
+    # operations whatever the number of values.
+    def __init__(self, precision_bits=7):
+        self.precision_bits = precision_bits
+        self.half = 1 << (precision_bits - 1)
+        self.counts = [0] * (1 << precision_bits)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def bucket(self, value):
+        shift = value.bit_length() - self.precision_bits
+        if shift <= 0:
+            return value
+        return shift * self.half + (value >> shift)
+
+    def bucket_value(self, index):
+        # Middle of the range of values counted in bucket index
+        if index < 2 * self.half:
+            return index
+        shift = index // self.half - 1
+        return ((index - shift * self.half) << shift) + (1 << (shift - 1))
+
+    def record(self, value):
+        if value < 0:
+            value = 0
+        index = self.bucket(value)
+        counts = self.counts
+        if index >= len(counts):
+            counts.extend([0] * (index + 1 - len(counts)))
+        counts[index] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        if other.precision_bits != self.precision_bits:
+            raise ValueError('cannot merge histograms of %d and %d bits'
+                             % (self.precision_bits, other.precision_bits))
+        counts = self.counts
+        if len(other.counts) > len(counts):
+            counts.extend([0] * (len(other.counts) - len(counts)))
+        for index, count in enumerate(other.counts):
+            counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def percentile(self, percent):
+        # Value below which percent % of the recorded values are, None
+        # when nothing was recorded
+        if not self.count:
+            return None
+        if not 0 <= percent <= 100:
+            raise ValueError('percentile must be between 0 and 100, got %s'
+                             % percent)
+        # rank of the value, rounded so that 99.9 % of 1000 values is 999
+        rank = max(1, ceil(self.count * percent / 100 - 1e-9))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(max(self.bucket_value(index), self.min), self.max)
+        return self.max
+
+    def reset(self):
+        self.counts = [0] * (1 << self.precision_bits)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
@@ -0,0 +1,62 @@
+import random
+from math import ceil
+import unittest
+from chapter7.LatencyHistogram import LatencyHistogram
+
+
+class TestLatencyHistogram(unittest.TestCase):
+
+    def setUp(self):
+        self.histogram = LatencyHistogram()
+
+    def test_empty(self):
+        self.assertEqual(self.histogram.count, 0)
+        self.assertIsNone(self.histogram.percentile(50))
+        self.assertIsNone(self.histogram.mean())
+
+    def test_small_values_exact(self):
+        for value in range(1, 101):
+            self.histogram.record(value)
+        self.assertEqual(self.histogram.percentile(50), 50)
+        self.assertEqual(self.histogram.percentile(99), 99)
+        self.assertEqual(self.histogram.percentile(100), 100)
+        self.assertEqual(self.histogram.percentile(0), 1)
+        self.assertEqual(self.histogram.mean(), 50.5)
+
+    def test_relative_precision(self):
+        rng = random.Random(0)
+        values = sorted(int(rng.lognormvariate(10, 2)) for _ in range(10000))
+        for value in values:
+            self.histogram.record(value)
+        for percent in (50, 90, 99, 99.9):
+            expected = values[ceil(len(values) * percent / 100 - 1e-9) - 1]
+            self.assertLessEqual(
+                abs(self.histogram.percentile(percent) - expected),
+                expected / 64 + 1)
+        self.assertEqual(self.histogram.max, values[-1])
+        self.assertEqual(self.histogram.percentile(100), values[-1])
+
+    def test_bucket_covers_value(self):
+        for value in (127, 128, 129, 1000, 123456789, 2 ** 40 + 12345):
+            index = self.histogram.bucket(value)
+            middle = self.histogram.bucket_value(index)
+            self.assertLessEqual(abs(middle - value), value / 128 + 1)
+
+    def test_merge(self):
+        other = LatencyHistogram()
+        self.histogram.record(10)
+        other.record(1000000)
+        other.record(5)
+        self.histogram.merge(other)
+        self.assertEqual(self.histogram.count, 3)
+        self.assertEqual(self.histogram.min, 5)
+        self.assertEqual(self.histogram.max, 1000000)
+        self.assertEqual(self.histogram.percentile(50), 10)
+        with self.assertRaises(ValueError):
+            self.histogram.merge(LatencyHistogram(precision_bits=5))
+        with self.assertRaises(ValueError):
+            self.histogram.percentile(101)
+
+
+if __name__ == '__main__':
+    unittest.main()
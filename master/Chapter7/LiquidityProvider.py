@@ -1,30 +1,45 @@
+from itertools import islice
 from random import randrange
 from random import sample,seed
+from chapter7.Messages import Order
+from chapter7.OrderStore import OrderStore
 
 class LiquidityProvider:
-    def __init__(self, lp_2_gateway=None):
-        self.orders = []
+    # data_source is an iterable of orders, such as
+    # OrderFlowGenerator.stream(), which read_tick_data_from_data_source()
+    # sends to the gateway batch_size orders at a time
+    def __init__(self, lp_2_gateway=None, data_source=None, batch_size=1):
+        self.orders = OrderStore()
         self.order_id = 0
         seed(0)
         self.lp_2_gateway = lp_2_gateway
+        self.data_source = iter(data_source) if data_source is not None \
+            else None
+        self.batch_size = batch_size
 
     def lookup_orders(self,id):
-        count=0
-        for o in self.orders:
-            if o['id'] ==  id:
-                return o, count
-            count+=1
-        return None, None
+        return self.orders.get(id)
 
     def insert_manual_order(self,order):
+        if type(order) is not Order:
+            order = Order.from_dict(order)
         if self.lp_2_gateway is None:
             print('simulation mode')
             return order
-        self.lp_2_gateway.append(order.copy())
+        # The order is handed over to the gateway, no copy is kept
+        self.lp_2_gateway.append(order)
 
 
     def read_tick_data_from_data_source(self):
-        pass
+        # Returns the number of orders sent, 0 once the source is exhausted
+        if self.data_source is None:
+            return 0
+        orders = list(islice(self.data_source, self.batch_size))
+        if self.lp_2_gateway is None:
+            print('simulation mode')
+            return len(orders)
+        self.lp_2_gateway.extend(orders)
+        return len(orders)
 
 
     def generate_random_order(self):
@@ -34,27 +49,22 @@ class LiquidityProvider:
         order_id=randrange(0,self.order_id+1)
         o=self.lookup_orders(order_id)
 
-        new_order=False
         if o is None:
-            action='new'
-            new_order=True
+            ord = Order(self.order_id, price, quantity, side, 'new')
+            self.order_id+=1
+            # The gateway gets its own copy of the order
+            self.orders.add(ord.copy())
         else:
             action=sample(['modify','delete'],1)[0]
+            if action=='modify' and o.quantity>100:
+                # a modify can only reduce the quantity
+                o.quantity=randrange(1,o.quantity//100)*100
+            else:
+                action='delete'
+                self.orders.remove(o)
+            ord = Order(o.id, o.price, o.quantity, o.side, action)
 
-        ord = {
-            'id': self.order_id,
-            'price': price,
-            'quantity': quantity,
-            'side': side,
-            'action': action
-        }
-
-        if not new_order:
-            self.order_id+=1
-            self.orders.append(ord)
-
-        if not self.lp_2_gateway:
+        if self.lp_2_gateway is None:
             print('simulation mode')
             return ord
-        self.lp_2_gateway.append(ord.copy())
-
+        self.lp_2_gateway.append(ord)
@@ -13,3 +13,22 @@ class TestMarketSimulator(unittest.TestCase):
         self.assertEqual(self.liquidity_provider.orders[0]['quantity'], 700)
         self.assertEqual(self.liquidity_provider.orders[0]['price'], 11)
 
+
+    def test_random_orders_track_live_ids(self):
+        gateway = []
+        self.liquidity_provider.lp_2_gateway = gateway
+        for _ in range(1000):
+            self.liquidity_provider.generate_random_order()
+        live = {}
+        for order in gateway:
+            if order.action == 'new':
+                self.assertNotIn(order.id, live)
+                live[order.id] = order.quantity
+            elif order.action == 'modify':
+                self.assertLess(order.quantity, live[order.id])
+                live[order.id] = order.quantity
+            else:
+                del live[order.id]
+        self.assertEqual(sorted(live),
+                         sorted(o.id for o in self.liquidity_provider.orders))
+        self.assertIn('delete', set(o.action for o in gateway))
@@ -1,17 +1,14 @@
 from random import randrange
+from chapter7.Messages import Order, ExecutionReport
+from chapter7.OrderStore import OrderStore
 
 class MarketSimulator:
     def __init__(self, om_2_gw=None,gw_2_om=None):
-        self.orders = []
+        self.orders = OrderStore()
         self.om_2_gw = om_2_gw
         self.gw_2_om = gw_2_om
     def lookup_orders(self,order):
-        count=0
-        for o in self.orders:
-            if o['id'] ==  order['id']:
-                return o, count
-            count+=1
-        return None, None
+        return self.orders.get(order.id)
 
 
     def handle_order_from_gw(self):
@@ -22,55 +19,55 @@ class MarketSimulator:
             print('simulation mode')
 
     def fill_all_orders(self,ratio = 100):
-        orders_to_be_removed = []
-        for index, order in enumerate(self.orders):
+        for order in self.orders:
             if randrange(100)<=ratio:
-                order['status'] = 'filled'
+                order.status = 'filled'
             else:
-                order['status'] = 'cancelled'
-            orders_to_be_removed.append(index)
+                order.status = 'cancelled'
             if self.gw_2_om is not None:
-                self.gw_2_om.append(order.copy())
+                self.gw_2_om.append(ExecutionReport.from_order(order))
             else:
                 print('simulation mode')
-        for i in sorted(orders_to_be_removed,reverse=True):
-            del(self.orders[i])
+        self.orders.clear()
 
     def handle_order(self, order):
-        o,offset=self.lookup_orders(order)
+        if type(order) is not Order:
+            order = Order.from_dict(order)
+        o=self.lookup_orders(order)
         if o is None:
-            if order['action'] == 'New':
-                order['status'] = 'accepted'
-                self.orders.append(order)
+            if order.action == 'New':
+                order.status = 'accepted'
+                self.orders.add(order)
                 if self.gw_2_om is not None:
-                    self.gw_2_om.append(order.copy())
+                    self.gw_2_om.append(ExecutionReport.from_order(order))
                     self.fill_all_orders(100)
                 else:
                     print('simulation mode')
                 return
-            elif order['action'] == 'Cancel' or order['action'] == 'Amend':
+            elif order.action == 'Cancel' or order.action == 'Amend':
                 print('Order id - not found - Rejection')
                 if self.gw_2_om is not None:
-                    self.gw_2_om.append(order.copy())
+                    self.gw_2_om.append(
+                        ExecutionReport.from_order(order, 'rejected'))
                 else:
                     print('simulation mode')
                 return
         elif o is not None:
-            if order['action'] == 'New':
+            if order.action == 'New':
                 print('Duplicate order id - Rejection')
                 return
-            elif order['action'] == 'Cancel':
-                o['status']='cancelled'
+            elif order.action == 'Cancel':
+                self.orders.set_status(o, 'cancelled')
                 if self.gw_2_om is not None:
-                    self.gw_2_om.append(o.copy())
+                    self.gw_2_om.append(ExecutionReport.from_order(o))
                 else:
                     print('simulation mode')
-                del (self.orders[offset])
+                self.orders.remove(o)
                 print('Order cancelled')
-            elif order['action'] == 'Amend':
-               o['status'] = 'accepted'
+            elif order.action == 'Amend':
+               self.orders.set_status(o, 'accepted')
                if self.gw_2_om is not None:
-                   self.gw_2_om.append(o.copy())
+                   self.gw_2_om.append(ExecutionReport.from_order(o))
                else:
                    print('simulation mode')
                print('Order amended')
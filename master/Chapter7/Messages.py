@@ -0,0 +1,189 @@
+from array import array
+
+
+class Record:
+    # Fixed layout message records. Fields are stored in __slots__ instead of
+    # a per-message dict. Components use attribute access on the hot path;
+    # o['field'] and o['field'] = value are kept for code and tests written
+    # against dict messages, and from_dict() converts a dict message once
+    # when it enters a component.
+    __slots__ = ()
+
+    __getitem__ = object.__getattribute__
+    __setitem__ = object.__setattr__
+
+    def __contains__(self, key):
+        return getattr(self, key, None) is not None
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None)
+        return default if value is None else value
+
+    @classmethod
+    def from_dict(cls, message):
+        record = object.__new__(cls)
+        for key in cls.__slots__:
+            setattr(record, key, message.get(key))
+        return record
+
+    def to_dict(self):
+        result = {}
+        for key in self.__slots__:
+            value = getattr(self, key, None)
+            if value is not None:
+                result[key] = value
+        return result
+
+    def copy(self):
+        new_record = object.__new__(type(self))
+        for key in self.__slots__:
+            setattr(new_record, key, getattr(self, key, None))
+        return new_record
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if isinstance(other, Record):
+            other = other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+
+class Order(Record):
+    __slots__ = ('id', 'price', 'quantity', 'side', 'action', 'status',
+                 'symbol')
+
+    def __init__(self, id, price=None, quantity=None, side=None,
+                 action=None, status=None, symbol=None):
+        self.id = id
+        self.price = price
+        self.quantity = quantity
+        self.side = side
+        self.action = action
+        self.status = status
+        self.symbol = symbol
+
+
+class BookEvent(Record):
+    __slots__ = ('bid_price', 'bid_quantity', 'offer_price', 'offer_quantity',
+                 'symbol')
+
+    def __init__(self, bid_price, bid_quantity, offer_price, offer_quantity,
+                 symbol=None):
+        self.bid_price = bid_price
+        self.bid_quantity = bid_quantity
+        self.offer_price = offer_price
+        self.offer_quantity = offer_quantity
+        self.symbol = symbol
+
+
+class DepthEvent(Record):
+    # Top levels of a book as (price, quantity) tuples, best price first in a
+    # snapshot. Otherwise only the levels changed by a message, a quantity of
+    # 0 removing the level, so applying the events in order keeps the top
+    # levels of the book.
+    __slots__ = ('bids', 'asks', 'snapshot', 'symbol')
+
+    def __init__(self, bids, asks, snapshot=False, symbol=None):
+        self.bids = bids
+        self.asks = asks
+        self.snapshot = snapshot
+        self.symbol = symbol
+
+
+class ExecutionReport(Record):
+    __slots__ = ('id', 'price', 'quantity', 'side', 'status', 'symbol')
+
+    def __init__(self, id, price=None, quantity=None, side=None, status=None,
+                 symbol=None):
+        self.id = id
+        self.price = price
+        self.quantity = quantity
+        self.side = side
+        self.status = status
+        self.symbol = symbol
+
+    @classmethod
+    def from_order(cls, order, status=None):
+        return cls(order.id, order.price, order.quantity, order.side,
+                   order.status if status is None else status, order.symbol)
+
+
+class Fill(Record):
+    __slots__ = ('action', 'price', 'quantity',
+                 'aggressor_id', 'aggressor_side', 'aggressor_leaves',
+                 'aggressor_status',
+                 'resting_id', 'resting_leaves', 'resting_status')
+
+    def __init__(self, price, quantity, aggressor_id, aggressor_side,
+                 aggressor_leaves, aggressor_status,
+                 resting_id, resting_leaves, resting_status):
+        self.action = 'fill'
+        self.price = price
+        self.quantity = quantity
+        self.aggressor_id = aggressor_id
+        self.aggressor_side = aggressor_side
+        self.aggressor_leaves = aggressor_leaves
+        self.aggressor_status = aggressor_status
+        self.resting_id = resting_id
+        self.resting_leaves = resting_leaves
+        self.resting_status = resting_status
+
+
+SIDES = ('bid', 'ask', 'buy', 'sell')
+ACTIONS = ('new', 'modify', 'delete')
+SIDE_CODES = {side: code for code, side in enumerate(SIDES)}
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+
+
+class OrderBatch:
+    # Struct-of-arrays form of a sequence of book orders: one typed array per
+    # field, about 26 bytes per order instead of one object per order.
+    # Side and action are stored as small integer codes.
+    def __init__(self):
+        self.ids = array('q')
+        self.prices = array('d')
+        self.quantities = array('q')
+        self.sides = array('b')
+        self.actions = array('b')
+
+    @classmethod
+    def from_orders(cls, orders):
+        batch = cls()
+        for o in orders:
+            batch.append(o)
+        return batch
+
+    def append(self, o):
+        self.ids.append(o['id'])
+        self.prices.append(o.get('price', 0))
+        self.quantities.append(o.get('quantity', 0))
+        side = o.get('side')
+        self.sides.append(SIDE_CODES[side] if side is not None else -1)
+        self.actions.append(ACTION_CODES[o['action']])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        side = self.sides[index]
+        return Order(self.ids[index], self.prices[index],
+                     self.quantities[index],
+                     SIDES[side] if side >= 0 else None,
+                     ACTIONS[self.actions[index]])
+
+    def __iter__(self):
+        for index in range(len(self.ids)):
+            yield self[index]
+
+    @property
+    def nbytes(self):
+        return sum(a.itemsize * len(a) for a in
+                   (self.ids, self.prices, self.quantities,
+                    self.sides, self.actions))
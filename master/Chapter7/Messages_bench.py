@@ -0,0 +1,84 @@
+import argparse
+import tracemalloc
+from collections import deque
+from time import perf_counter
+
+from chapter7.Messages import Order, OrderBatch
+
+
+def make_dict_orders(n):
+    return [{'id': i, 'price': 10 + i % 7, 'quantity': 100, 'side': 'bid',
+             'action': 'new'} for i in range(n)]
+
+
+def make_record_orders(n):
+    return [Order(i, 10 + i % 7, 100, 'bid', 'new') for i in range(n)]
+
+
+def make_order_batch(n):
+    batch = OrderBatch()
+    for i in range(n):
+        batch.ids.append(i)
+        batch.prices.append(10 + i % 7)
+        batch.quantities.append(100)
+        batch.sides.append(0)
+        batch.actions.append(0)
+    return batch
+
+
+def bytes_per_order(factory, n):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    orders = factory(n)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del orders
+    return (after - before) / n
+
+
+def dict_hops(n, nb_hops):
+    # Previous message passing: a fresh dict per message and a defensive
+    # .copy() on every hop
+    queues = [deque() for _ in range(nb_hops)]
+    start = perf_counter()
+    for i in range(n):
+        o = {'id': i, 'price': 10, 'quantity': 100, 'side': 'bid',
+             'action': 'new'}
+        for q in queues:
+            q.append(o.copy())
+            o = q.popleft()
+            o['status'] = 'new'
+    return n / (perf_counter() - start)
+
+
+def record_hops(n, nb_hops):
+    # Slotted records handed over from one component to the next
+    queues = [deque() for _ in range(nb_hops)]
+    start = perf_counter()
+    for i in range(n):
+        o = Order(i, 10, 100, 'bid', 'new')
+        for q in queues:
+            q.append(o)
+            o = q.popleft()
+            o.status = 'new'
+    return n / (perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Memory and throughput of dict vs slotted messages')
+    parser.add_argument('--orders', type=int, default=1000000)
+    parser.add_argument('--hops', type=int, default=3)
+    args = parser.parse_args()
+
+    print('bytes per order: dict=%.1f, Order=%.1f, OrderBatch=%.1f'
+          % (bytes_per_order(make_dict_orders, args.orders),
+             bytes_per_order(make_record_orders, args.orders),
+             bytes_per_order(make_order_batch, args.orders)))
+    print('messages per second over %d hops: dict+copy=%.0f, Order=%.0f'
+          % (args.hops, dict_hops(args.orders, args.hops),
+             record_hops(args.orders, args.hops)))
+
+
+if __name__ == '__main__':
+    main()
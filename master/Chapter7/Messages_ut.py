@@ -0,0 +1,59 @@
+import unittest
+from chapter7.Messages import Order, BookEvent, ExecutionReport, OrderBatch
+
+
+class TestMessages(unittest.TestCase):
+
+    def test_order_item_access(self):
+        order = Order(1, 219, 10, 'bid', 'new')
+        self.assertEqual(order['id'], 1)
+        self.assertEqual(order.price, 219)
+        order['quantity'] = 5
+        self.assertEqual(order.quantity, 5)
+        self.assertIn('side', order)
+        self.assertNotIn('status', order)
+        with self.assertRaises(AttributeError):
+            order['unknown_field'] = 1
+
+    def test_compare_with_dict(self):
+        book_event = BookEvent(219, 10, -1, -1)
+        self.assertEqual(book_event,
+                         {'bid_price': 219, 'bid_quantity': 10,
+                          'offer_price': -1, 'offer_quantity': -1})
+        self.assertNotEqual(book_event, BookEvent(219, 10, 220, 10))
+
+    def test_from_dict(self):
+        order = Order.from_dict({'id': 1, 'action': 'delete'})
+        self.assertEqual(order.id, 1)
+        self.assertIsNone(order.side)
+        self.assertEqual(order, {'id': 1, 'action': 'delete'})
+
+    def test_copy(self):
+        order = Order(1, 219, 10, 'bid', 'new')
+        order_copy = order.copy()
+        order_copy['status'] = 'filled'
+        self.assertIsNone(order.status)
+        self.assertEqual(order_copy.status, 'filled')
+
+    def test_execution_report_from_order(self):
+        order = Order(2, 219, 10, 'buy', 'New', 'accepted')
+        report = ExecutionReport.from_order(order)
+        self.assertEqual(report, {'id': 2, 'price': 219, 'quantity': 10,
+                                  'side': 'buy', 'status': 'accepted'})
+        report = ExecutionReport.from_order(Order(3), 'rejected')
+        self.assertEqual(report['status'], 'rejected')
+
+    def test_order_batch(self):
+        orders = [Order(1, 219, 10, 'bid', 'new'),
+                  Order(2, 220, 20, 'ask', 'new'),
+                  Order(1, action='delete')]
+        batch = OrderBatch.from_orders(orders)
+        self.assertEqual(len(batch), 3)
+        self.assertEqual(batch[1], orders[1])
+        self.assertEqual(batch[2]['action'], 'delete')
+        self.assertIsNone(batch[2]['side'])
+        self.assertEqual(batch.nbytes, 3 * 26)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,9 @@
+from chapter7.Messages import Order, BookEvent
+
+
 class OrderBook:
-    def __init__(self,gt_2_ob = None,ob_to_ts = None):
+    def __init__(self,gt_2_ob = None,ob_to_ts = None,symbol = None):
+        self.symbol = symbol
         self.list_asks = []
         self.list_bids = []
         self.gw_2_ob=gt_2_ob
@@ -8,12 +12,11 @@ class OrderBook:
         self.current_ask = None
 
     def create_book_event(self,bid,offer):
-        book_event = {
-            "bid_price": bid['price'] if bid else -1,
-            "bid_quantity": bid['quantity'] if bid else -1,
-            "offer_price": offer['price'] if offer else -1,
-            "offer_quantity": offer['quantity'] if offer else -1
-        }
+        book_event = BookEvent(bid.price if bid else -1,
+                               bid.quantity if bid else -1,
+                               offer.price if offer else -1,
+                               offer.quantity if offer else -1,
+                               self.symbol)
         return book_event
 
     def check_generate_top_of_book_event(self):
@@ -25,7 +28,7 @@ class OrderBook:
                 tob_changed=True
                 self.current_bid = None
         else:
-            if self.current_bid!=current_list[0]:
+            if self.current_bid is not current_list[0]:
                 tob_changed=True
                 self.current_bid=current_list[0]
 
@@ -35,7 +38,7 @@ class OrderBook:
                 tob_changed=True
                 self.current_ask = None
         else:
-            if self.current_ask!=current_list[0]:
+            if self.current_ask is not current_list[0]:
                 tob_changed=True
                 self.current_ask=current_list[0]
 
@@ -59,11 +62,13 @@ class OrderBook:
 
 
     def handle_order(self,o):
-        if o['action']=='new':
+        if type(o) is not Order:
+            o = Order.from_dict(o)
+        if o.action=='new':
             self.handle_new(o)
-        elif o['action']=='modify':
+        elif o.action=='modify':
             self.handle_modify(o)
-        elif o['action']=='delete':
+        elif o.action=='delete':
             self.handle_delete(o)
         else:
             print('Error-Cannot handle this action')
@@ -71,18 +76,18 @@ class OrderBook:
         return self.check_generate_top_of_book_event()
 
     def handle_new(self,o):
-        if o['side']=='bid':
+        if o.side=='bid':
             self.list_bids.append(o)
-            self.list_bids.sort(key=lambda x: x['price'],reverse=True)
-        elif o['side']=='ask':
+            self.list_bids.sort(key=lambda x: x.price,reverse=True)
+        elif o.side=='ask':
             self.list_asks.append(o)
-            self.list_asks.sort(key=lambda x: x['price'])
+            self.list_asks.sort(key=lambda x: x.price)
 
     def get_list(self,o):
-        if 'side' in o:
-            if o['side']=='bid':
+        if o.side is not None:
+            if o.side=='bid':
                 lookup_list = self.list_bids
-            elif o['side'] == 'ask':
+            elif o.side == 'ask':
                 lookup_list = self.list_asks
             else:
                 print('incorrect side')
@@ -90,10 +95,10 @@ class OrderBook:
             return lookup_list
         else:
             for order in self.list_bids:
-                if order['id']==o['id']:
+                if order.id==o.id:
                     return self.list_bids
             for order in self.list_asks:
-                if order['id'] == o['id']:
+                if order.id == o.id:
                     return self.list_asks
             return None
 
@@ -103,15 +108,15 @@ class OrderBook:
             lookup_list = self.get_list(o)
         if lookup_list is not None:
             for order in lookup_list:
-                if order['id'] == o['id']:
+                if order.id == o.id:
                     return order
-            print('order not found id=%d' % (o['id']))
+            print('order not found id=%d' % (o.id))
         return None
 
     def handle_modify(self,o):
         order=self.find_order_in_a_list(o)
-        if order['quantity'] > o['quantity']:
-            order['quantity'] = o['quantity']
+        if order.quantity > o.quantity:
+            order.quantity = o.quantity
         else:
             print('incorrect size')
         return None
@@ -120,17 +125,23 @@ class OrderBook:
         lookup_list = self.get_list(o)
         order = self.find_order_in_a_list(o,lookup_list)
         if order is not None:
-            lookup_list.remove(order)
+            for index in range(len(lookup_list)):
+                if lookup_list[index] is order:
+                    del lookup_list[index]
+                    break
         return None
 
 
+    def is_empty(self):
+        return not self.list_bids and not self.list_asks
+
     def display_content(self):
         print('BIDS')
         for o in self.list_bids:
-            print("%d %d %d" % (o['id'],o['price'],o['quantity']))
+            print("%d %d %d" % (o.id,o.price,o.quantity))
         print('OFFERS')
         for o in self.list_asks:
-            print("%d %d %d" % (o['id'],o['price'],o['quantity']))
+            print("%d %d %d" % (o.id,o.price,o.quantity))
 
 
 
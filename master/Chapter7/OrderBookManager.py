@@ -0,0 +1,57 @@
+from chapter7.Messages import Order
+from chapter7.PriceLevelOrderBook import PriceLevelOrderBook
+
+
+class OrderBookManager:
+    # Routes the gateway messages of many instruments to one book per
+    # symbol. The books publish their top of book events, tagged with
+    # their symbol, to the shared ob_to_ts queue.
+    #
+    # A book is only created by the first message of its symbol and is
+    # dropped again once its last order is gone, so memory grows with the
+    # symbols that have orders, not with the universe. Messages without a
+    # symbol go to the book of symbol None, which makes the manager a drop
+    # in replacement for a single book.
+    def __init__(self, gt_2_ob=None, ob_to_ts=None,
+                 book_factory=PriceLevelOrderBook, **book_options):
+        self.gw_2_ob = gt_2_ob
+        self.ob_to_ts = ob_to_ts
+        self.book_factory = book_factory
+        self.book_options = book_options
+        self.books = {}
+
+    def __len__(self):
+        return len(self.books)
+
+    def __contains__(self, symbol):
+        return symbol in self.books
+
+    def symbols(self):
+        return list(self.books)
+
+    def get_book(self, symbol):
+        # The book of symbol, None when it has no orders
+        return self.books.get(symbol)
+
+    def create_book(self, symbol):
+        return self.book_factory(None, self.ob_to_ts, symbol=symbol,
+                                 **self.book_options)
+
+    def handle_order_from_gateway(self, order=None):
+        if self.gw_2_ob is None:
+            print('simulation mode')
+            self.handle_order(order)
+        elif len(self.gw_2_ob) > 0:
+            self.handle_order(self.gw_2_ob.popleft())
+
+    def handle_order(self, o):
+        if type(o) is not Order:
+            o = Order.from_dict(o)
+        symbol = o.symbol
+        book = self.books.get(symbol)
+        if book is None:
+            book = self.books[symbol] = self.create_book(symbol)
+        book_event = book.handle_order(o)
+        if book.is_empty():
+            del self.books[symbol]
+        return book_event
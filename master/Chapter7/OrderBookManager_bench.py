@@ -0,0 +1,75 @@
+import argparse
+import tracemalloc
+from time import perf_counter
+
+from chapter7.Messages import Order
+from chapter7.OrderBookManager import OrderBookManager
+from chapter7.PriceLevelOrderBook import PriceLevelOrderBook
+from chapter7.PriceLevelOrderBook_bench import generate_synthetic_stream
+
+
+def to_orders(stream, nb_symbols):
+    # Every order id belongs to one symbol, so modify and delete messages
+    # go to the book holding the order
+    symbols = ['S%d' % i for i in range(nb_symbols)]
+    return [Order(order_id, price, quantity, side, action,
+                  symbol=symbols[order_id % nb_symbols])
+            for action, order_id, side, price, quantity in stream]
+
+
+def run(orders):
+    manager = OrderBookManager()
+    events = 0
+    start = perf_counter()
+    for o in orders:
+        if manager.handle_order(o) is not None:
+            events += 1
+    return perf_counter() - start, manager, events
+
+
+def run_direct(orders, nb_symbols):
+    # The same books created upfront and fed without routing, the cost of
+    # the book work itself
+    books = dict(('S%d' % i, PriceLevelOrderBook(symbol='S%d' % i))
+                 for i in range(nb_symbols))
+    start = perf_counter()
+    for o in orders:
+        books[o.symbol].handle_order(o)
+    return perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='OrderBookManager throughput and memory by number of symbols')
+    parser.add_argument('--messages', type=int, default=500000)
+    parser.add_argument('--depth', type=int, default=10000,
+                        help='resting orders across all the symbols')
+    parser.add_argument('--symbols', type=int, nargs='+',
+                        default=[1, 10, 100, 1000, 10000])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    stream = generate_synthetic_stream(args.messages, args.depth, args.seed)
+    for nb_symbols in args.symbols:
+        # The books modify the orders they hold, each run gets its own.
+        # Best of two runs, the direct one the same books without routing.
+        elapsed, manager, events = min((run(to_orders(stream, nb_symbols))
+                                        for _ in range(2)),
+                                       key=lambda result: result[0])
+        direct_elapsed = min(run_direct(to_orders(stream, nb_symbols), nb_symbols)
+                             for _ in range(2))
+
+        # Memory of the books, the orders are allocated before tracing
+        orders = to_orders(stream, nb_symbols)
+        tracemalloc.start()
+        _, manager, _ = run(orders)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print('%6d symbols: %.0f msg/s, routing overhead %+.0f%%, '
+              '%d book events, %d books live, %.1f MB of books'
+              % (nb_symbols, len(orders) / elapsed,
+                 100 * (elapsed / direct_elapsed - 1), events, len(manager),
+                 memory / 1e6))
+
+if __name__ == '__main__':
+    main()
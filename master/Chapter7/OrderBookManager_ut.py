@@ -0,0 +1,84 @@
+import unittest
+from collections import deque
+from chapter7.Messages import Order
+from chapter7.OrderBook import OrderBook
+from chapter7.OrderBookManager import OrderBookManager
+from chapter7.PriceLevelOrderBook import PriceLevelOrderBook
+
+
+class TestOrderBookManager(unittest.TestCase):
+
+    def setUp(self):
+        self.ob_to_ts = deque()
+        self.manager = OrderBookManager(None, self.ob_to_ts)
+
+    def test_routes_by_symbol(self):
+        self.manager.handle_order(Order(1, 219, 10, 'bid', 'new', symbol='AAPL'))
+        self.manager.handle_order(Order(2, 1200, 5, 'bid', 'new', symbol='GOOG'))
+        self.manager.handle_order(Order(3, 221, 10, 'ask', 'new', symbol='AAPL'))
+        self.assertEqual(sorted(self.manager.symbols()), ['AAPL', 'GOOG'])
+        aapl = self.manager.get_book('AAPL')
+        self.assertEqual(set(aapl.orders), {1, 3})
+        self.assertEqual(set(self.manager.get_book('GOOG').orders), {2})
+
+        # top of book events of every book go to the shared queue
+        self.assertEqual([(be.symbol, be.bid_price, be.offer_price)
+                          for be in self.ob_to_ts],
+                         [('AAPL', 219, -1), ('GOOG', 1200, -1), ('AAPL', 219, 221)])
+
+    def test_dict_messages(self):
+        # without a queue the book event is returned
+        manager = OrderBookManager()
+        book_event = manager.handle_order({
+            'id': 1,
+            'price': 219,
+            'quantity': 10,
+            'side': 'bid',
+            'action': 'new',
+            'symbol': 'AAPL'
+        })
+        self.assertEqual(book_event.symbol, 'AAPL')
+        self.assertIn('AAPL', manager)
+
+    def test_books_dropped_when_empty(self):
+        self.manager.handle_order(Order(1, 219, 10, 'bid', 'new', symbol='AAPL'))
+        self.manager.handle_order(Order(2, 1200, 5, 'bid', 'new', symbol='GOOG'))
+        self.manager.handle_order(Order(1, 219, 10, 'bid', 'delete', symbol='AAPL'))
+        self.assertNotIn('AAPL', self.manager)
+        self.assertIsNone(self.manager.get_book('AAPL'))
+        self.assertEqual(len(self.manager), 1)
+        self.assertEqual(self.ob_to_ts[-1].symbol, 'AAPL')
+        self.assertEqual(self.ob_to_ts[-1].bid_price, -1)
+
+        # a new order creates the book again
+        self.manager.handle_order(Order(3, 218, 10, 'bid', 'new', symbol='AAPL'))
+        self.assertEqual(set(self.manager.get_book('AAPL').orders), {3})
+
+    def test_no_symbol_same_as_one_book(self):
+        ob_to_ts = deque()
+        book = PriceLevelOrderBook(None, ob_to_ts)
+        orders = [(1, 219, 10, 'bid', 'new'),
+                  (2, 220, 10, 'bid', 'new'),
+                  (3, 222, 10, 'ask', 'new'),
+                  (2, 220, 4, 'bid', 'modify'),
+                  (1, 219, 10, 'bid', 'delete')]
+        for order in orders:
+            book.handle_order(Order(*order))
+            self.manager.handle_order(Order(*order))
+        self.assertEqual(self.manager.symbols(), [None])
+        self.assertEqual([be.to_dict() for be in self.ob_to_ts],
+                         [be.to_dict() for be in ob_to_ts])
+
+    def test_book_factory(self):
+        manager = OrderBookManager(None, self.ob_to_ts, book_factory=OrderBook)
+        manager.handle_order(Order(1, 219, 10, 'bid', 'new', symbol='AAPL'))
+        book = manager.get_book('AAPL')
+        self.assertIsInstance(book, OrderBook)
+        self.assertEqual(book.symbol, 'AAPL')
+        self.assertEqual(self.ob_to_ts[-1].symbol, 'AAPL')
+        manager.handle_order(Order(1, 219, 10, 'bid', 'delete', symbol='AAPL'))
+        self.assertEqual(len(manager), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
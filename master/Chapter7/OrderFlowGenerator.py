@@ -0,0 +1,249 @@
+import numpy as np
+from chapter7.Messages import Order, SIDES, ACTIONS
+
+# Synthetic liquidity provider order flow, generated a batch at a time with
+# numpy. A batch is a structured array of ORDER_FLOW_DTYPE, the layout of
+# the chapter 9 tick files, so it can be written with TickWriter as is;
+# to_orders() turns it into Order messages.
+ORDER_FLOW_DTYPE = np.dtype([('timestamp', '<i8'),
+                             ('id', '<i8'),
+                             ('price', '<f8'),
+                             ('quantity', '<i8'),
+                             ('side', 'i1'),
+                             ('action', 'i1')])
+
+BID = SIDES.index('bid')
+ASK = SIDES.index('ask')
+NEW = ACTIONS.index('new')
+MODIFY = ACTIONS.index('modify')
+DELETE = ACTIONS.index('delete')
+
+BATCH_SIZE = 65536
+MIN_CHUNK = 1024
+
+
+def random_walk(rng, count, mid, volatility, reversion, mean):
+    # Gaussian steps of volatility ticks per message
+    return mid + np.cumsum(rng.normal(0, volatility, count))
+
+
+def mean_reverting(rng, count, mid, volatility, reversion, mean):
+    # Discrete Ornstein-Uhlenbeck: every message moves the mid a fraction
+    # reversion back to mean, plus a gaussian step. Computed as
+    #   x[t] - mean = phi**t * (x[0] - mean + cumsum(phi**-k * step[k]))
+    # over chunks short enough for phi**-k to stay finite.
+    phi = 1.0 - reversion
+    if not 0.0 < phi < 1.0:
+        raise ValueError('reversion must be in (0, 1), got %r' % reversion)
+    chunk = max(1, int(300 / -np.log(phi)))
+    mids = np.empty(count)
+    deviation = mid - mean
+    for start in range(0, count, chunk):
+        steps = rng.normal(0, volatility, min(chunk, count - start))
+        powers = phi ** np.arange(1, len(steps) + 1)
+        deviations = powers * (deviation + np.cumsum(steps / powers))
+        mids[start:start + len(steps)] = deviations
+        deviation = deviations[-1]
+    return mean + mids
+
+
+def uniform_lots(rng, count, lots):
+    # 1 to lots lots, as LiquidityProvider.generate_random_order
+    return rng.integers(1, lots + 1, count)
+
+
+def geometric_lots(rng, count, lots):
+    # lots on average, mostly small orders
+    return rng.geometric(1.0 / lots, count)
+
+
+def lognormal_lots(rng, count, lots):
+    # median of lots, with a heavy tail of large orders
+    return np.maximum(1, np.rint(rng.lognormal(np.log(lots), 1.0, count))) \
+        .astype(np.int64)
+
+
+PRICE_PROCESSES = {'random_walk': random_walk,
+                   'mean_reverting': mean_reverting}
+SIZE_DISTRIBUTIONS = {'uniform': uniform_lots,
+                      'geometric': geometric_lots,
+                      'lognormal': lognormal_lots}
+
+
+def to_orders(flow, symbol=None):
+    return [Order(id, price, quantity, SIDES[side], ACTIONS[action],
+                  symbol=symbol)
+            for id, price, quantity, side, action in
+            zip(flow['id'].tolist(), flow['price'].tolist(),
+                flow['quantity'].tolist(), flow['side'].tolist(),
+                flow['action'].tolist())]
+
+
+class OrderFlowGenerator:
+    # Reproducible new, modify and delete messages of one symbol: the same
+    # seed, parameters and batch sizes give the same messages.
+    #
+    # The mid price, in ticks, follows price_process, a name of
+    # PRICE_PROCESSES or a function(rng, count, mid, volatility, reversion,
+    # mean) returning the next count mids. New orders are bids and asks
+    # spread ticks and a geometric number of ticks of mean depth away from
+    # the mid, except aggressive_ratio of them placed across the mid, so
+    # that books cross and strategies trade. Their sizes are lot_size times
+    # a number of lots from size, a name of SIZE_DISTRIBUTIONS or a
+    # function(rng, count, lots).
+    #
+    # modify_ratio of the messages reduce the quantity of a live order,
+    # and there are cancel_ratio deletes for every new order. Modifies and
+    # deletes only target orders live at the start of the batch, each at
+    # most once a batch; while there are too few, or when max_live orders
+    # are live, messages turn into new orders, or new orders into deletes.
+    # Deletes and modifies carry the price and side of their order.
+    # Timestamps are integer nanoseconds from start, interval apart on
+    # average.
+    def __init__(self, seed=0, price=10.0, tick_size=0.01,
+                 price_process='random_walk', volatility=0.5, reversion=0.01,
+                 spread=1, depth=3.0, aggressive_ratio=0.05,
+                 size='uniform', lots=9, lot_size=100,
+                 modify_ratio=0.1, cancel_ratio=0.9, max_live=10000,
+                 interval=1000, start=0, first_id=0):
+        if not callable(price_process):
+            if price_process not in PRICE_PROCESSES:
+                raise ValueError('price_process must be one of %s, got %r'
+                                 % (', '.join(PRICE_PROCESSES), price_process))
+            price_process = PRICE_PROCESSES[price_process]
+        if not callable(size):
+            if size not in SIZE_DISTRIBUTIONS:
+                raise ValueError('size must be one of %s, got %r'
+                                 % (', '.join(SIZE_DISTRIBUTIONS), size))
+            size = SIZE_DISTRIBUTIONS[size]
+        if not 0 <= modify_ratio < 1:
+            raise ValueError('modify_ratio must be in [0, 1), got %r'
+                             % modify_ratio)
+        if cancel_ratio < 0:
+            raise ValueError('cancel_ratio must be positive, got %r'
+                             % cancel_ratio)
+        self.rng = np.random.default_rng(seed)
+        self.tick_size = tick_size
+        self.mid = price / tick_size
+        self.mean = self.mid
+        self.price_process = price_process
+        self.volatility = volatility
+        self.reversion = reversion
+        self.spread = spread
+        self.depth = depth
+        self.aggressive_ratio = aggressive_ratio
+        self.size = size
+        self.lots = lots
+        self.lot_size = lot_size
+        # probabilities of a modify and of a delete for every message
+        self.p_modify = modify_ratio
+        self.p_delete = (1 - modify_ratio) * cancel_ratio / (1 + cancel_ratio)
+        self.max_live = max_live
+        self.interval = interval
+        self.timestamp = start
+        self.next_id = first_id
+        # the live orders
+        self.live_id = np.zeros(0, dtype=np.int64)
+        self.live_price = np.zeros(0)
+        self.live_quantity = np.zeros(0, dtype=np.int64)
+        self.live_side = np.zeros(0, dtype=np.int8)
+
+    def __len__(self):
+        # the number of live orders
+        return len(self.live_id)
+
+    def generate(self, count=BATCH_SIZE):
+        # The next count messages. They are made in chunks of at most as
+        # many messages as there are live orders, but MIN_CHUNK, so that
+        # the first messages, all new orders, do not go far past max_live.
+        chunks = []
+        while count > 0:
+            chunk = min(count, max(MIN_CHUNK, len(self.live_id)))
+            chunks.append(self.generate_chunk(chunk))
+            count -= chunk
+        return chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+
+    def generate_chunk(self, count):
+        rng = self.rng
+        live = len(self.live_id)
+        draws = rng.random(count)
+        action = np.full(count, NEW, dtype=np.int8)
+        action[draws < self.p_modify + self.p_delete] = DELETE
+        action[draws < self.p_modify] = MODIFY
+
+        targets = np.flatnonzero(action != NEW)
+        if len(targets) > live:
+            action[rng.choice(targets, len(targets) - live, replace=False)] = NEW
+        nb_new = count - np.count_nonzero(action != NEW)
+        if self.max_live is not None:
+            # a new order turned into a delete makes one live order less
+            # and one more target
+            excess = live + nb_new - np.count_nonzero(action == DELETE) \
+                - self.max_live
+            free = live - np.count_nonzero(action != NEW)
+            convert = min((excess + 1) // 2, nb_new, free)
+            if convert > 0:
+                news = np.flatnonzero(action == NEW)
+                action[rng.choice(news, convert, replace=False)] = DELETE
+                nb_new -= convert
+
+        flow = np.zeros(count, dtype=ORDER_FLOW_DTYPE)
+        flow['action'] = action
+        flow['timestamp'] = self.timestamp + np.cumsum(
+            rng.exponential(self.interval, count)).astype(np.int64)
+        self.timestamp = int(flow['timestamp'][-1])
+
+        # modifies and deletes of distinct live orders
+        targets = np.flatnonzero(action != NEW)
+        chosen = rng.choice(live, len(targets), replace=False)
+        quantity = self.live_quantity[chosen]
+        modify = action[targets] == MODIFY
+        lots = quantity // self.lot_size
+        reduced = rng.integers(1, np.maximum(lots, 2)) * self.lot_size
+        # an order of one lot cannot be reduced, it is deleted
+        modify &= reduced < quantity
+        action[targets[~modify & (action[targets] == MODIFY)]] = DELETE
+        flow['action'][targets] = action[targets]
+        flow['id'][targets] = self.live_id[chosen]
+        flow['price'][targets] = self.live_price[chosen]
+        flow['side'][targets] = self.live_side[chosen]
+        flow['quantity'][targets] = np.where(modify, reduced, quantity)
+
+        news = np.flatnonzero(action == NEW)
+        mids = self.price_process(rng, count, self.mid, self.volatility,
+                                  self.reversion, self.mean)
+        self.mid = mids[-1]
+        side = rng.integers(BID, ASK + 1, nb_new).astype(np.int8)
+        offset = self.spread + rng.geometric(1.0 / self.depth, nb_new) - 1
+        aggressive = rng.random(nb_new) < self.aggressive_ratio
+        offset[aggressive] = -rng.geometric(1.0 / self.depth,
+                                            np.count_nonzero(aggressive))
+        ticks = np.rint(mids[news]) + np.where(side == BID, -offset, offset)
+        price = np.round(np.maximum(ticks, 1) * self.tick_size, 8)
+        ids = np.arange(self.next_id, self.next_id + nb_new, dtype=np.int64)
+        self.next_id += nb_new
+        flow['id'][news] = ids
+        flow['price'][news] = price
+        flow['side'][news] = side
+        flow['quantity'][news] = self.size(rng, nb_new, self.lots) \
+            * self.lot_size
+
+        kept = np.ones(live, dtype=bool)
+        kept[chosen[~modify]] = False
+        self.live_quantity[chosen[modify]] = reduced[modify]
+        self.live_id = np.concatenate((self.live_id[kept], ids))
+        self.live_price = np.concatenate((self.live_price[kept], price))
+        self.live_quantity = np.concatenate(
+            (self.live_quantity[kept], flow['quantity'][news]))
+        self.live_side = np.concatenate((self.live_side[kept], side))
+        return flow
+
+    def orders(self, count=BATCH_SIZE, symbol=None):
+        return to_orders(self.generate(count), symbol)
+
+    def stream(self, nb_messages, batch_size=BATCH_SIZE, symbol=None):
+        # Yields nb_messages Order messages, generated batch_size at a time
+        while nb_messages > 0:
+            count = min(batch_size, nb_messages)
+            yield from self.orders(count, symbol)
+            nb_messages -= count
@@ -0,0 +1,54 @@
+import argparse
+import contextlib
+import io
+from collections import deque
+from time import perf_counter
+
+from chapter7.LiquidityProvider import LiquidityProvider
+from chapter7.OrderFlowGenerator import OrderFlowGenerator, to_orders
+from chapter7.TradingSimulation import main as run_simulation
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Order flow from generate_random_order against OrderFlowGenerator batches')
+    parser.add_argument('--messages', type=int, default=10000000)
+    parser.add_argument('--random-orders', type=int, default=200000,
+                        help='orders from LiquidityProvider.generate_random_order')
+    parser.add_argument('--batch-size', type=int, default=65536)
+    parser.add_argument('--simulation-messages', type=int, default=100000,
+                        help='messages through the TradingSimulation book and strategy')
+    args = parser.parse_args()
+
+    lp = LiquidityProvider(deque())
+    start = perf_counter()
+    for _ in range(args.random_orders):
+        lp.generate_random_order()
+    random_orders = perf_counter() - start
+    print('generate_random_order   : %8.0f msg/s' % (args.random_orders / random_orders))
+
+    generator = OrderFlowGenerator()
+    start = perf_counter()
+    done = 0
+    while done < args.messages:
+        done += len(generator.generate(min(args.batch_size, args.messages - done)))
+    arrays = perf_counter() - start
+    print('OrderFlowGenerator      : %8.0f msg/s, %.0fx, %d live orders'
+          % (done / arrays, random_orders / args.random_orders * done / arrays,
+             len(generator)))
+
+    flow = OrderFlowGenerator().generate(args.batch_size)
+    start = perf_counter()
+    orders = to_orders(flow)
+    conversion = perf_counter() - start
+    print('  as Order messages     : %8.0f msg/s' % (len(orders) / conversion))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = perf_counter()
+        pnl = run_simulation(args.simulation_messages, 256)
+        simulation = perf_counter() - start
+    print('TradingSimulation       : %8.0f msg/s through book and strategy, pnl %.2f'
+          % (args.simulation_messages / simulation, pnl))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+import contextlib
+import io
+import unittest
+
+import numpy as np
+
+from chapter7.LiquidityProvider import LiquidityProvider
+from chapter7.OrderBook import OrderBook
+from chapter7.OrderFlowGenerator import OrderFlowGenerator, to_orders, \
+    NEW, MODIFY, DELETE
+
+
+class TestOrderFlowGenerator(unittest.TestCase):
+
+    def check_live_ids(self, generator, flow):
+        # new ids are unused, modifies and deletes target live orders
+        live = {}
+        for id, price, quantity, side, action in zip(
+                flow['id'].tolist(), flow['price'].tolist(),
+                flow['quantity'].tolist(), flow['side'].tolist(),
+                flow['action'].tolist()):
+            if action == NEW:
+                self.assertNotIn(id, live)
+                live[id] = (price, quantity, side)
+            else:
+                self.assertIn(id, live)
+                live_price, live_quantity, live_side = live[id]
+                self.assertEqual((price, side), (live_price, live_side))
+                if action == MODIFY:
+                    self.assertLess(quantity, live_quantity)
+                    live[id] = (price, quantity, side)
+                else:
+                    self.assertEqual(quantity, live_quantity)
+                    del live[id]
+        self.assertEqual(sorted(live), sorted(generator.live_id.tolist()))
+        return live
+
+    def test_reproducible(self):
+        first = OrderFlowGenerator(seed=7)
+        second = OrderFlowGenerator(seed=7)
+        for count in (10, 5000, 20000):
+            self.assertTrue(np.array_equal(first.generate(count),
+                                           second.generate(count)))
+        self.assertFalse(np.array_equal(OrderFlowGenerator(seed=8).generate(100),
+                                        OrderFlowGenerator(seed=7).generate(100)))
+
+    def test_live_ids(self):
+        generator = OrderFlowGenerator(max_live=None)
+        flow = np.concatenate([generator.generate(count)
+                               for count in (1, 3000, 50000, 20000)])
+        self.check_live_ids(generator, flow)
+        self.assertTrue((np.diff(flow['timestamp']) >= 0).all())
+        self.assertTrue((flow['quantity'] % 100 == 0).all())
+        self.assertTrue((flow['quantity'] > 0).all())
+
+    def test_ratios_and_max_live(self):
+        generator = OrderFlowGenerator(modify_ratio=0.2, cancel_ratio=0.5,
+                                       max_live=1000)
+        flow = generator.generate(200000)
+        self.check_live_ids(generator, flow)
+        self.assertLessEqual(len(generator), 1100)
+        actions = np.bincount(flow['action'], minlength=3) / len(flow)
+        # one lot orders are deleted instead of modified
+        self.assertAlmostEqual(actions[MODIFY], 0.2, delta=0.05)
+        self.assertAlmostEqual(actions[NEW], actions[DELETE], delta=0.02)
+
+    def test_price_processes_and_sizes(self):
+        for price_process in ('random_walk', 'mean_reverting'):
+            for size in ('uniform', 'geometric', 'lognormal'):
+                generator = OrderFlowGenerator(price_process=price_process,
+                                               size=size, reversion=0.001)
+                flow = generator.generate(30000)
+                self.check_live_ids(generator, flow)
+                self.assertTrue((flow['price'] > 0).all())
+        generator = OrderFlowGenerator(
+            price_process=lambda rng, count, mid, *args: np.full(count, 500.0),
+            size=lambda rng, count, lots: np.full(count, 2), spread=2,
+            depth=1.0, aggressive_ratio=0)
+        flow = generator.generate(1000)
+        news = flow[flow['action'] == NEW]
+        self.assertEqual(set(news['price'].tolist()), {4.98, 5.02})
+        self.assertEqual(set(news['quantity'].tolist()), {200})
+
+    def test_bad_parameters(self):
+        self.assertRaises(ValueError, OrderFlowGenerator, price_process='gbm')
+        self.assertRaises(ValueError, OrderFlowGenerator, size='pareto')
+        self.assertRaises(ValueError, OrderFlowGenerator, modify_ratio=1)
+        generator = OrderFlowGenerator(price_process='mean_reverting',
+                                       reversion=0)
+        self.assertRaises(ValueError, generator.generate, 10)
+
+    def test_book_replay(self):
+        # every modify and delete finds its order in the book
+        generator = OrderFlowGenerator(seed=3)
+        book = OrderBook()
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            for order in generator.stream(5000, 1000):
+                book.handle_order(order)
+        self.assertEqual(out.getvalue(), '')
+        self.assertEqual(len(book.list_bids) + len(book.list_asks),
+                         len(generator))
+
+    def test_to_orders(self):
+        flow = OrderFlowGenerator().generate(100)
+        orders = to_orders(flow, 'S0')
+        self.assertEqual([o.id for o in orders], flow['id'].tolist())
+        self.assertEqual(orders[0].action, 'new')
+        self.assertIn(orders[0].side, ('bid', 'ask'))
+        self.assertEqual(orders[0].symbol, 'S0')
+
+    def test_liquidity_provider_source(self):
+        gateway = []
+        lp = LiquidityProvider(gateway, OrderFlowGenerator().stream(25), 10)
+        self.assertEqual(lp.read_tick_data_from_data_source(), 10)
+        self.assertEqual(lp.read_tick_data_from_data_source(), 10)
+        self.assertEqual(lp.read_tick_data_from_data_source(), 5)
+        self.assertEqual(lp.read_tick_data_from_data_source(), 0)
+        self.assertEqual(len(gateway), 25)
+        self.assertEqual(LiquidityProvider(gateway)
+                         .read_tick_data_from_data_source(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
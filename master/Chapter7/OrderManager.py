@@ -1,7 +1,11 @@
+from chapter7.Messages import Order, ExecutionReport
+from chapter7.OrderStore import OrderStore
+
+
 class OrderManager:
     def __init__(self,ts_2_om = None, om_2_ts = None,
                  om_2_gw=None,gw_2_om=None):
-        self.orders=[]
+        self.orders=OrderStore()
         self.order_id=0
         self.ts_2_om = ts_2_om
         self.om_2_gw = om_2_gw
@@ -9,22 +13,16 @@ class OrderManager:
         self.om_2_ts = om_2_ts
 
     def check_order_valid(self,order):
-        if order['quantity'] < 0:
+        if order.quantity < 0:
             return False
-        if order['price'] < 0:
+        if order.price < 0:
             return False
         return True
 
     def create_new_order(self,order):
         self.order_id += 1
-        neworder = {
-            'id': self.order_id,
-            'price': order['price'],
-            'quantity': order['quantity'],
-            'side': order['side'],
-            'status': 'new',
-            'action': 'New'
-        }
+        neworder = Order(self.order_id, order.price, order.quantity,
+                         order.side, 'New', 'new', order.symbol)
         return neworder
 
     def handle_input_from_ts(self):
@@ -35,28 +33,22 @@ class OrderManager:
             print('simulation mode')
 
     def handle_order_from_trading_strategy(self,order):
+        if type(order) is not Order:
+            order = Order.from_dict(order)
         if self.check_order_valid(order):
-            order=self.create_new_order(order).copy()
-            self.orders.append(order)
+            order=self.create_new_order(order)
+            self.orders.add(order)
             if self.om_2_gw is None:
                 print('simulation mode')
             else:
+                # The venue keeps and updates its own record of the order
                 self.om_2_gw.append(order.copy())
 
     def lookup_order_by_id(self,id):
-        for i in range(len(self.orders)):
-            if self.orders[i]['id']==id:
-                return self.orders[i]
-        return None
+        return self.orders.get(id)
 
     def clean_traded_orders(self):
-        order_offsets=[]
-        for k in range(len(self.orders)):
-            if self.orders[k]['status'] == 'filled':
-                order_offsets.append(k)
-        if len(order_offsets):
-            for k in sorted(order_offsets,reverse=True):
-                del (self.orders[k])
+        self.orders.pop_status('filled')
 
     def handle_input_from_market(self):
         if self.gw_2_om is not None:
@@ -66,15 +58,15 @@ class OrderManager:
             print('simulation mode')
 
     def handle_order_from_gateway(self,order_update):
-        order=self.lookup_order_by_id(order_update['id'])
+        if type(order_update) is not ExecutionReport:
+            order_update = ExecutionReport.from_dict(order_update)
+        order=self.lookup_order_by_id(order_update.id)
         if order is not None:
-            order['status']=order_update['status']
+            self.orders.set_status(order, order_update.status)
             if self.om_2_ts is not None:
-                self.om_2_ts.append(order.copy())
+                self.om_2_ts.append(ExecutionReport.from_order(order))
             else:
                 print('simulation mode')
             self.clean_traded_orders()
         else:
             print('order not found')
-
-
@@ -0,0 +1,82 @@
+from itertools import islice
+
+TERMINAL_STATUSES = ('filled', 'cancelled', 'rejected')
+
+
+class OrderStore:
+    # Orders indexed by id, and bucketed by status so that all the orders
+    # in one status (to be sent, open, filled, cancelled...) can be visited
+    # or dropped without scanning the others. Every operation on a single
+    # order is O(1); iteration follows insertion order.
+    def __init__(self):
+        self.orders = {}
+        self.by_status = {}
+
+    def add(self, order):
+        if order.id in self.orders:
+            print('duplicate order id=%d' % (order.id))
+            return False
+        self.orders[order.id] = order
+        bucket = self.by_status.get(order.status)
+        if bucket is None:
+            bucket = self.by_status[order.status] = {}
+        bucket[order.id] = order
+        return True
+
+    def get(self, id):
+        return self.orders.get(id)
+
+    def set_status(self, order, status):
+        if order.status == status:
+            return
+        del self.by_status[order.status][order.id]
+        order.status = status
+        bucket = self.by_status.get(status)
+        if bucket is None:
+            bucket = self.by_status[status] = {}
+        bucket[order.id] = order
+
+    def remove(self, order):
+        del self.orders[order.id]
+        del self.by_status[order.status][order.id]
+
+    def with_status(self, status):
+        bucket = self.by_status.get(status)
+        if not bucket:
+            return ()
+        # Copy so that callers can change the status of what they visit
+        return list(bucket.values())
+
+    def count(self, status):
+        bucket = self.by_status.get(status)
+        return len(bucket) if bucket else 0
+
+    def pop_status(self, status):
+        bucket = self.by_status.pop(status, None)
+        if not bucket:
+            return ()
+        orders = self.orders
+        for id in bucket:
+            del orders[id]
+        return list(bucket.values())
+
+    def clear(self):
+        self.orders.clear()
+        self.by_status.clear()
+
+    def __len__(self):
+        return len(self.orders)
+
+    def __contains__(self, id):
+        return id in self.orders
+
+    def __iter__(self):
+        return iter(list(self.orders.values()))
+
+    def __getitem__(self, position):
+        # Positional access, O(position): kept for inspection and tests
+        if position < 0:
+            position += len(self.orders)
+        if not 0 <= position < len(self.orders):
+            raise IndexError('order position out of range')
+        return next(islice(self.orders.values(), position, None))
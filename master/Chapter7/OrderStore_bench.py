@@ -0,0 +1,75 @@
+import argparse
+from random import Random
+from time import perf_counter
+
+from chapter7.Messages import Order
+from chapter7.OrderStore import OrderStore
+
+
+def list_lookup(orders, id):
+    for i in range(len(orders)):
+        if orders[i].id == id:
+            return orders[i]
+    return None
+
+
+def list_clean(orders):
+    order_offsets = []
+    for k in range(len(orders)):
+        if orders[k].status == 'filled':
+            order_offsets.append(k)
+    for k in sorted(order_offsets, reverse=True):
+        del orders[k]
+
+
+def bench(nb_orders, nb_lookups, fill_ratio, rng):
+    orders = [Order(i, 10, 100, 'buy', 'New', 'new') for i in range(nb_orders)]
+    store = OrderStore()
+    for o in orders:
+        store.add(o.copy())
+    ids = [rng.randrange(nb_orders) for _ in range(nb_lookups)]
+    filled = rng.sample(range(nb_orders), int(nb_orders * fill_ratio))
+
+    start = perf_counter()
+    for id in ids:
+        list_lookup(orders, id)
+    list_lookup_time = (perf_counter() - start) / nb_lookups
+
+    start = perf_counter()
+    for id in ids:
+        store.get(id)
+    store_lookup_time = (perf_counter() - start) / nb_lookups
+
+    for id in filled:
+        orders[id].status = 'filled'
+    start = perf_counter()
+    list_clean(orders)
+    list_clean_time = perf_counter() - start
+
+    for id in filled:
+        store.set_status(store.get(id), 'filled')
+    start = perf_counter()
+    store.pop_status('filled')
+    store_clean_time = perf_counter() - start
+
+    print('%8d live orders | lookup: list %10.2fus, store %6.3fus | '
+          'drop %d filled: list %8.2fms, store %6.2fms'
+          % (nb_orders, list_lookup_time * 1e6, store_lookup_time * 1e6,
+             len(filled), list_clean_time * 1e3, store_clean_time * 1e3))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Order lookup and cleanup: list scan vs OrderStore')
+    parser.add_argument('--lookups', type=int, default=100)
+    parser.add_argument('--fill-ratio', type=float, default=0.01)
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+    rng = Random(0)
+    for nb_orders in args.sizes:
+        bench(nb_orders, args.lookups, args.fill_ratio, rng)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+import unittest
+from chapter7.Messages import Order
+from chapter7.OrderStore import OrderStore
+
+
+class TestOrderStore(unittest.TestCase):
+
+    def setUp(self):
+        self.order_store = OrderStore()
+        for order_id in range(1, 5):
+            self.order_store.add(Order(order_id, 10, 100, 'buy', 'New', 'new'))
+
+    def test_lookup(self):
+        self.assertEqual(len(self.order_store), 4)
+        self.assertEqual(self.order_store.get(3).id, 3)
+        self.assertIsNone(self.order_store.get(42))
+        self.assertIn(2, self.order_store)
+        self.assertEqual(self.order_store[0].id, 1)
+        self.assertEqual(self.order_store[-1].id, 4)
+
+    def test_duplicate(self):
+        self.assertFalse(self.order_store.add(Order(1, 11, 100, 'buy', 'New')))
+        self.assertEqual(self.order_store.get(1).price, 10)
+
+    def test_status_buckets(self):
+        self.order_store.set_status(self.order_store.get(2), 'filled')
+        self.order_store.set_status(self.order_store.get(4), 'filled')
+        self.order_store.set_status(self.order_store.get(3), 'cancelled')
+        self.assertEqual(self.order_store.count('new'), 1)
+        self.assertEqual([o.id for o in self.order_store.with_status('filled')],
+                         [2, 4])
+        filled = self.order_store.pop_status('filled')
+        self.assertEqual([o.id for o in filled], [2, 4])
+        self.assertEqual(len(self.order_store), 2)
+        self.assertEqual(self.order_store.pop_status('filled'), ())
+        self.assertEqual(self.order_store.get(3).status, 'cancelled')
+
+    def test_remove(self):
+        self.order_store.remove(self.order_store.get(1))
+        self.assertEqual(len(self.order_store), 3)
+        self.assertEqual(self.order_store.count('new'), 3)
+        self.assertEqual([o.id for o in self.order_store], [2, 3, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,377 @@
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from itertools import islice
+from chapter7.Messages import Order, BookEvent, DepthEvent, Fill
+
+
+class PriceLevel:
+    __slots__ = ('price', 'quantity', 'orders')
+
+    def __init__(self, price):
+        self.price = price
+        self.quantity = 0
+        # FIFO queue keyed by order id: O(1) append, O(1) removal of any order
+        self.orders = OrderedDict()
+
+    def head(self):
+        for order in self.orders.values():
+            return order
+        return None
+
+
+class BookSide:
+    # Prices are kept in a sorted list of keys where the best price is always
+    # the last element: the key is the price for bids and -price for asks.
+    # Locating a level is a dict lookup and consuming the best level is a
+    # pop(). Opening or removing any other level is a binary search plus a
+    # list insert or delete, which moves the keys after it: O(L) for L
+    # levels, not O(log L). It is a memmove of pointers, cheaper than a
+    # tree or a skip list in Python for the depths of a book.
+    #
+    # With a depth, the changes of the `depth` best levels are collected in
+    # changes, price to new quantity. A level is in the top levels when its
+    # key is at least keys[-depth], so this is a comparison per change.
+    __slots__ = ('sign', 'keys', 'levels', 'depth', 'changes')
+
+    def __init__(self, sign, depth=0):
+        self.sign = sign
+        self.keys = []
+        self.levels = {}
+        self.depth = depth
+        self.changes = {}
+
+    def best(self):
+        if self.keys:
+            return self.levels[self.keys[-1]]
+        return None
+
+    def get_or_create_level(self, price):
+        key = price * self.sign
+        level = self.levels.get(key)
+        if level is None:
+            level = PriceLevel(price)
+            self.levels[key] = level
+            keys = self.keys
+            if not keys or key > keys[-1]:
+                keys.append(key)
+            else:
+                keys.insert(bisect_left(keys, key), key)
+            depth = self.depth
+            if depth and len(keys) > depth and key >= keys[-depth]:
+                # the level opened in the top levels pushes one out
+                self.changes[self.levels[keys[-depth - 1]].price] = 0
+        return level
+
+    def update_level(self, level):
+        # Records the new quantity of level if it is in the top levels
+        depth = self.depth
+        if depth:
+            keys = self.keys
+            if len(keys) <= depth or level.price * self.sign >= keys[-depth]:
+                self.changes[level.price] = level.quantity
+
+    def remove_level(self, level):
+        key = level.price * self.sign
+        keys = self.keys
+        depth = self.depth
+        if depth and (len(keys) <= depth or key >= keys[-depth]):
+            self.changes[level.price] = 0
+            if len(keys) > depth:
+                # the next level moves into the top levels
+                entering = self.levels[keys[-depth - 1]]
+                self.changes[entering.price] = entering.quantity
+        del self.levels[key]
+        if keys[-1] == key:
+            keys.pop()
+        else:
+            del keys[bisect_left(keys, key)]
+
+    def top(self, depth):
+        # (price, quantity) of the depth best levels, all levels if depth
+        # is 0
+        levels = iter(self)
+        if depth:
+            levels = islice(levels, depth)
+        return [(level.price, level.quantity) for level in levels]
+
+    def __len__(self):
+        return len(self.levels)
+
+    def __iter__(self):
+        # Iterate levels from the best price to the worst price
+        levels = self.levels
+        for key in reversed(self.keys):
+            yield levels[key]
+
+
+class PriceLevelOrderBook:
+    def __init__(self, gt_2_ob=None, ob_to_ts=None,
+                 matching=False, ob_2_fills=None, symbol=None,
+                 depth=0, ob_2_depth=None):
+        # symbol tags the book events, None for a single instrument book
+        self.symbol = symbol
+        # With a depth, a DepthEvent with the changes of the `depth` best
+        # levels of each side is appended to ob_2_depth after every message
+        # changing them, and depth_snapshot() gives the full top levels.
+        self.depth = depth
+        self.ob_2_depth = deque() if depth and ob_2_depth is None \
+            else ob_2_depth
+        self.bids = BookSide(1, depth)
+        self.asks = BookSide(-1, depth)
+        self.orders = {}
+        self.gw_2_ob = gt_2_ob
+        self.ob_to_ts = ob_to_ts
+        # In matching mode a new order crossing the opposite side trades
+        # against it in price-time priority and fill events are appended to
+        # ob_2_fills, so the book can never be left crossed.
+        self.matching = matching
+        self.ob_2_fills = ob_2_fills
+        self.current_bid = None
+        self.current_ask = None
+        self.current_bid_quantity = None
+        self.current_ask_quantity = None
+
+    @property
+    def list_bids(self):
+        return [o for level in self.bids for o in level.orders.values()]
+
+    @property
+    def list_asks(self):
+        return [o for level in self.asks for o in level.orders.values()]
+
+    def create_book_event(self, bid, offer):
+        book_event = BookEvent(bid.price if bid else -1,
+                               bid.quantity if bid else -1,
+                               offer.price if offer else -1,
+                               offer.quantity if offer else -1,
+                               self.symbol)
+        return book_event
+
+    def check_generate_top_of_book_event(self):
+        # The head order of each best level is compared by identity and
+        # quantity, so partial fills of the head order are published too.
+        tob_changed = False
+
+        side = self.bids
+        bid = next(iter(side.levels[side.keys[-1]].orders.values())) \
+            if side.keys else None
+        bid_quantity = bid.quantity if bid is not None else None
+        if bid is not self.current_bid or \
+                bid_quantity != self.current_bid_quantity:
+            tob_changed = True
+            self.current_bid = bid
+            self.current_bid_quantity = bid_quantity
+
+        side = self.asks
+        ask = next(iter(side.levels[side.keys[-1]].orders.values())) \
+            if side.keys else None
+        ask_quantity = ask.quantity if ask is not None else None
+        if ask is not self.current_ask or \
+                ask_quantity != self.current_ask_quantity:
+            tob_changed = True
+            self.current_ask = ask
+            self.current_ask_quantity = ask_quantity
+
+        if tob_changed:
+            be = self.create_book_event(self.current_bid,
+                                        self.current_ask)
+            if self.ob_to_ts is not None:
+                self.ob_to_ts.append(be)
+            else:
+                return be
+
+    def publish_depth_changes(self):
+        bid_changes = self.bids.changes
+        ask_changes = self.asks.changes
+        self.ob_2_depth.append(DepthEvent(list(bid_changes.items()),
+                                          list(ask_changes.items()),
+                                          False, self.symbol))
+        bid_changes.clear()
+        ask_changes.clear()
+
+    def depth_snapshot(self, depth=None):
+        # The `depth` best levels of each side, the depth of the book by
+        # default and every level if it has none
+        if depth is None:
+            depth = self.depth
+        return DepthEvent(self.bids.top(depth), self.asks.top(depth),
+                          True, self.symbol)
+
+    def handle_order_from_gateway(self, order=None):
+        if self.gw_2_ob is None:
+            print('simulation mode')
+            self.handle_order(order)
+        elif len(self.gw_2_ob) > 0:
+            order_from_gw = self.gw_2_ob.popleft()
+            self.handle_order(order_from_gw)
+
+    def handle_order(self, o):
+        if type(o) is not Order:
+            o = Order.from_dict(o)
+        action = o.action
+        if action == 'new':
+            if not self.handle_new(o):
+                # the top of book is as it was
+                if self.depth and (self.bids.changes or self.asks.changes):
+                    self.publish_depth_changes()
+                return None
+        elif action == 'modify':
+            self.handle_modify(o)
+        elif action == 'delete':
+            self.handle_delete(o)
+        else:
+            print('Error-Cannot handle this action')
+
+        if self.depth and (self.bids.changes or self.asks.changes):
+            self.publish_depth_changes()
+        return self.check_generate_top_of_book_event()
+
+    def get_side(self, o):
+        side = o.side
+        if side == 'bid':
+            return self.bids
+        elif side == 'ask':
+            return self.asks
+        print('incorrect side')
+        return None
+
+    def handle_new(self, o):
+        # Returns whether the top of book may have changed: the order
+        # traded or opened the best level of its side
+        side = o.side
+        if side == 'bid':
+            book_side = self.bids
+        elif side == 'ask':
+            book_side = self.asks
+        else:
+            print('incorrect side')
+            return False
+        order_id = o.id
+        if order_id in self.orders:
+            print('duplicate order id=%d' % (order_id))
+            return False
+        traded = False
+        if self.matching:
+            traded = self.match(o)
+            if o.quantity <= 0:
+                return traded
+        level = book_side.get_or_create_level(o.price)
+        orders = level.orders
+        orders[order_id] = o
+        level.quantity += o.quantity
+        self.orders[order_id] = o
+        if self.depth:
+            book_side.update_level(level)
+        return traded or (len(orders) == 1 and
+                          book_side.keys[-1] == o.price * book_side.sign)
+
+    def create_fill_event(self, aggressor, resting, price, quantity):
+        fill_event = Fill(price, quantity,
+                          aggressor.id, aggressor.side,
+                          aggressor.quantity,
+                          'filled' if aggressor.quantity == 0
+                          else 'partially_filled',
+                          resting.id, resting.quantity,
+                          'filled' if resting.quantity == 0
+                          else 'partially_filled')
+        return fill_event
+
+    def match(self, o):
+        # Walks the opposite side from the best level while the new order
+        # crosses it. Only the levels actually traded are touched, so the
+        # cost is proportional to the number of fills. Returns whether the
+        # order traded.
+        if o.side == 'bid':
+            opposite = self.asks
+            limit = -o.price
+        else:
+            opposite = self.bids
+            limit = o.price
+        keys = opposite.keys
+        levels = opposite.levels
+        orders = self.orders
+        fills = self.ob_2_fills
+        remaining = o.quantity
+        if remaining <= 0 or not keys or keys[-1] < limit:
+            return False
+        order_id = o.id
+        side = o.side
+        while remaining > 0 and keys and keys[-1] >= limit:
+            key = keys[-1]
+            level = levels[key]
+            level_orders = level.orders
+            price = level.price
+            while remaining > 0 and level_orders:
+                resting = next(iter(level_orders.values()))
+                traded = resting.quantity
+                if traded > remaining:
+                    traded = remaining
+                remaining -= traded
+                resting_leaves = resting.quantity - traded
+                resting.quantity = resting_leaves
+                level.quantity -= traded
+                if resting_leaves == 0:
+                    level_orders.popitem(last=False)
+                    del orders[resting.id]
+                if fills is not None:
+                    # create_fill_event() inlined
+                    fills.append(Fill(price, traded, order_id, side,
+                                      remaining,
+                                      'filled' if remaining == 0
+                                      else 'partially_filled',
+                                      resting.id, resting_leaves,
+                                      'filled' if resting_leaves == 0
+                                      else 'partially_filled'))
+            if not level_orders:
+                opposite.remove_level(level)
+            elif self.depth:
+                opposite.update_level(level)
+        o.quantity = remaining
+        return True
+
+    def find_order(self, o):
+        order = self.orders.get(o.id)
+        if order is None:
+            print('order not found id=%d' % (o.id))
+        return order
+
+    def handle_modify(self, o):
+        order = self.find_order(o)
+        if order is None:
+            return None
+        if order.quantity > o.quantity:
+            book_side = self.get_side(order)
+            level = book_side.levels[order.price * book_side.sign]
+            level.quantity -= order.quantity - o.quantity
+            order.quantity = o.quantity
+            if self.depth:
+                book_side.update_level(level)
+        else:
+            print('incorrect size')
+        return None
+
+    def handle_delete(self, o):
+        order = self.find_order(o)
+        if order is None:
+            return None
+        del self.orders[order.id]
+        book_side = self.get_side(order)
+        level = book_side.levels[order.price * book_side.sign]
+        del level.orders[order.id]
+        level.quantity -= order.quantity
+        if not level.orders:
+            book_side.remove_level(level)
+        elif self.depth:
+            book_side.update_level(level)
+        return None
+
+    def is_empty(self):
+        return not self.orders
+
+    def display_content(self):
+        print('BIDS')
+        for o in self.list_bids:
+            print("%d %d %d" % (o.id, o.price, o.quantity))
+        print('OFFERS')
+        for o in self.list_asks:
+            print("%d %d %d" % (o.id, o.price, o.quantity))
@@ -0,0 +1,174 @@
+import argparse
+from collections import deque
+from random import Random
+from time import perf_counter
+
+from chapter7.Messages import Order
+from chapter7.OrderBook import OrderBook
+from chapter7.PriceLevelOrderBook import PriceLevelOrderBook
+
+# messages per second the matching mode has to sustain on crossing flow
+MATCHING_TARGET = 500000
+
+
+def generate_synthetic_stream(nb_messages, depth, seed=0, mid_price=10000,
+                              nb_levels=500):
+    # Returns (action, id, side, price, quantity) tuples. New orders are
+    # favoured until roughly `depth` orders rest in the book, after which the
+    # stream is an even mix of new orders and modify/delete of live orders.
+    rng = Random(seed)
+    live = []
+    live_quantity = {}
+    next_id = 0
+    stream = []
+    for _ in range(nb_messages):
+        if not live or (len(live) < depth and rng.random() < 0.9) \
+                or rng.random() < 0.5:
+            side = 'bid' if rng.random() < 0.5 else 'ask'
+            offset = rng.randrange(1, nb_levels)
+            price = mid_price - offset if side == 'bid' else mid_price + offset
+            quantity = rng.randrange(1, 10) * 100
+            stream.append(('new', next_id, side, price, quantity))
+            live.append(next_id)
+            live_quantity[next_id] = quantity
+            next_id += 1
+        else:
+            index = rng.randrange(len(live))
+            order_id = live[index]
+            if rng.random() < 0.2 and live_quantity[order_id] > 100:
+                quantity = live_quantity[order_id] - 100
+                live_quantity[order_id] = quantity
+                stream.append(('modify', order_id, None, None, quantity))
+            else:
+                live[index] = live[-1]
+                live.pop()
+                del live_quantity[order_id]
+                stream.append(('delete', order_id, None, None, None))
+    return stream
+
+
+def generate_crossing_stream(nb_messages, seed=0, mid_price=10000,
+                             nb_levels=20, aggressive_ratio=0.3):
+    # New orders only, a share of them priced through the opposite side so
+    # that the matching engine has to trade them.
+    rng = Random(seed)
+    stream = []
+    for order_id in range(nb_messages):
+        side = 'bid' if rng.random() < 0.5 else 'ask'
+        offset = rng.randrange(1, nb_levels)
+        if rng.random() < aggressive_ratio:
+            offset = -offset
+        price = mid_price - offset if side == 'bid' else mid_price + offset
+        stream.append(('new', order_id, side, price,
+                       rng.randrange(1, 10) * 100))
+    return stream
+
+
+def to_orders(stream):
+    orders = []
+    for action, order_id, side, price, quantity in stream:
+        orders.append(Order(order_id, price, quantity, side, action))
+    return orders
+
+
+def run_book(book, orders):
+    events = []
+    start = perf_counter()
+    for o in orders:
+        be = book.handle_order(o)
+        if be is not None:
+            events.append(be)
+    elapsed = perf_counter() - start
+    return elapsed, events
+
+
+def run_depth_feeds(stream, depths, repeat=5):
+    # Best time of repeat runs for each number of depth levels, 0 for no
+    # depth feed, and the number of depth events published. The runs are
+    # interleaved so that all depths see the same machine load.
+    best = dict.fromkeys(depths)
+    events = dict.fromkeys(depths, 0)
+    for _ in range(repeat):
+        for depth in depths:
+            book = PriceLevelOrderBook(depth=depth)
+            elapsed, _ = run_book(book, to_orders(stream))
+            if best[depth] is None or elapsed < best[depth]:
+                best[depth] = elapsed
+            if depth:
+                events[depth] = len(book.ob_2_depth)
+    return best, events
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare the list based OrderBook with PriceLevelOrderBook')
+    parser.add_argument('--messages', type=int, default=1000000)
+    parser.add_argument('--depth', type=int, default=10000,
+                        help='number of resting orders to build up')
+    parser.add_argument('--list-messages', type=int, default=None,
+                        help='messages replayed into the list based book '
+                             '(defaults to --messages)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--matching', action='store_true',
+                        help='measure the matching mode on crossing flow')
+    parser.add_argument('--depth-feed', type=int, nargs='*',
+                        help='measure the cost of publishing depth events '
+                             'for these numbers of levels (1 5 20 by default)')
+    args = parser.parse_args()
+
+    if args.depth_feed is not None:
+        stream = generate_synthetic_stream(args.messages, args.depth,
+                                           args.seed)
+        depths = [0] + (args.depth_feed or [1, 5, 20])
+        best, events = run_depth_feeds(stream, depths)
+        base = best[0]
+        print('no depth feed : %.0f ns/msg' % (1e9 * base / len(stream)))
+        for depth in depths[1:]:
+            print('depth %2d      : %.0f ns/msg, %+.0f ns/msg to publish, '
+                  '%.3f events/msg'
+                  % (depth, 1e9 * best[depth] / len(stream),
+                     1e9 * (best[depth] - base) / len(stream),
+                     events[depth] / len(stream)))
+        return
+
+    if args.matching:
+        # best of 3 runs, the target being MATCHING_TARGET msg/s
+        stream = generate_crossing_stream(args.messages, args.seed)
+        elapsed = None
+        for _ in range(3):
+            ob_2_fills = deque()
+            book = PriceLevelOrderBook(matching=True, ob_2_fills=ob_2_fills)
+            run_elapsed, _ = run_book(book, to_orders(stream))
+            if elapsed is None or run_elapsed < elapsed:
+                elapsed = run_elapsed
+        print('PriceLevelOrderBook (matching): %d messages in %.2fs, '
+              '%.0f msg/s (target %d), %d fills'
+              % (len(stream), elapsed, len(stream) / elapsed,
+                 MATCHING_TARGET, len(ob_2_fills)))
+        return
+
+    stream = generate_synthetic_stream(args.messages, args.depth, args.seed)
+    nb_list_messages = args.messages if args.list_messages is None \
+        else min(args.list_messages, args.messages)
+
+    elapsed, _ = run_book(PriceLevelOrderBook(), to_orders(stream))
+    print('PriceLevelOrderBook: %d messages in %.2fs, %.0f msg/s'
+          % (len(stream), elapsed, len(stream) / elapsed))
+
+    if nb_list_messages:
+        list_stream = stream[:nb_list_messages]
+        list_book = OrderBook()
+        list_elapsed, _ = run_book(list_book, to_orders(list_stream))
+        print('OrderBook (list)   : %d messages in %.2fs, %.0f msg/s'
+              % (len(list_stream), list_elapsed,
+                 len(list_stream) / list_elapsed))
+        fast_book = PriceLevelOrderBook()
+        fast_elapsed, _ = run_book(fast_book, to_orders(list_stream))
+        print('speedup on the common stream: %.1fx'
+              % (list_elapsed / fast_elapsed))
+        print('resting orders identical: %s'
+              % (fast_book.list_bids == list_book.list_bids and
+                 fast_book.list_asks == list_book.list_asks))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,312 @@
+import unittest
+from collections import deque
+from chapter7.DepthBook import DepthBook
+from chapter7.Messages import Order
+from chapter7.PriceLevelOrderBook import PriceLevelOrderBook
+from chapter7.PriceLevelOrderBook_bench import generate_crossing_stream, \
+    generate_synthetic_stream
+
+
+class TestPriceLevelOrderBook(unittest.TestCase):
+
+    def setUp(self):
+        self.reforderbook = PriceLevelOrderBook()
+
+    def test_handlenew(self):
+        order1 = {
+            'id': 1,
+            'price': 219,
+            'quantity': 10,
+            'side': 'bid',
+            'action': 'new'
+        }
+
+        ob_for_aapl = self.reforderbook
+        ob_for_aapl.handle_order(order1)
+        order2 = order1.copy()
+        order2['id'] = 2
+        order2['price'] = 220
+        ob_for_aapl.handle_order(order2)
+        order3 = order1.copy()
+        order3['price'] = 223
+        order3['id'] = 3
+        ob_for_aapl.handle_order(order3)
+        order4 = order1.copy()
+        order4['side'] = 'ask'
+        order4['price'] = 220
+        order4['id'] = 4
+        ob_for_aapl.handle_order(order4)
+        order5 = order4.copy()
+        order5['price'] = 223
+        order5['id'] = 5
+        ob_for_aapl.handle_order(order5)
+        order6 = order4.copy()
+        order6['price'] = 221
+        order6['id'] = 6
+        ob_for_aapl.handle_order(order6)
+
+        self.assertEqual(ob_for_aapl.list_bids[0]['id'], 3)
+        self.assertEqual(ob_for_aapl.list_bids[1]['id'], 2)
+        self.assertEqual(ob_for_aapl.list_bids[2]['id'], 1)
+        self.assertEqual(ob_for_aapl.list_asks[0]['id'], 4)
+        self.assertEqual(ob_for_aapl.list_asks[1]['id'], 6)
+        self.assertEqual(ob_for_aapl.list_asks[2]['id'], 5)
+
+    def test_fifo_within_level(self):
+        self.test_handlenew()
+        order7 = {
+            'id': 7,
+            'price': 223,
+            'quantity': 30,
+            'side': 'bid',
+            'action': 'new'
+        }
+        self.reforderbook.handle_order(order7)
+        self.assertEqual(self.reforderbook.list_bids[0]['id'], 3)
+        self.assertEqual(self.reforderbook.list_bids[1]['id'], 7)
+        self.assertEqual(self.reforderbook.bids.best().quantity, 40)
+
+    def test_handleamend(self):
+        self.test_handlenew()
+        order1 = {
+            'id': 1,
+            'quantity': 5,
+            'action': 'modify'
+        }
+        self.reforderbook.handle_order(order1)
+
+        self.assertEqual(self.reforderbook.list_bids[2]['id'], 1)
+        self.assertEqual(self.reforderbook.list_bids[2]['quantity'], 5)
+        self.assertEqual(self.reforderbook.bids.levels[219].quantity, 5)
+
+    def test_handledelete(self):
+        self.test_handlenew()
+        order1 = {
+            'id': 1,
+            'action': 'delete'
+        }
+        self.assertEqual(len(self.reforderbook.list_bids), 3)
+        self.reforderbook.handle_order(order1)
+        self.assertEqual(len(self.reforderbook.list_bids), 2)
+        self.assertEqual(len(self.reforderbook.bids), 2)
+        self.assertNotIn(1, self.reforderbook.orders)
+
+    def test_delete_unknown_order(self):
+        self.test_handlenew()
+        order1 = {
+            'id': 42,
+            'action': 'delete'
+        }
+        self.assertIsNone(self.reforderbook.handle_order(order1))
+        self.assertEqual(len(self.reforderbook.orders), 6)
+
+    def test_generate_book_event(self):
+        order1 = {
+            'id': 1,
+            'price': 219,
+            'quantity': 10,
+            'side': 'bid',
+            'action': 'new'
+        }
+
+        ob_for_aapl = self.reforderbook
+        self.assertEqual(ob_for_aapl.handle_order(order1),
+                         {'bid_price': 219, 'bid_quantity': 10,
+                          'offer_price': -1, 'offer_quantity': -1})
+        order2 = order1.copy()
+        order2['id'] = 2
+        order2['price'] = 220
+        order2['side'] = 'ask'
+        self.assertEqual(ob_for_aapl.handle_order(order2),
+                         {'bid_price': 219, 'bid_quantity': 10,
+                          'offer_price': 220, 'offer_quantity': 10})
+        order3 = {
+            'id': 2,
+            'action': 'delete'
+        }
+        self.assertEqual(ob_for_aapl.handle_order(order3),
+                         {'bid_price': 219, 'bid_quantity': 10,
+                          'offer_price': -1, 'offer_quantity': -1})
+
+
+class TestPriceLevelOrderBookMatching(unittest.TestCase):
+
+    def setUp(self):
+        self.ob_2_fills = deque()
+        self.reforderbook = PriceLevelOrderBook(matching=True,
+                                                ob_2_fills=self.ob_2_fills)
+        for order_id, price, quantity in [(1, 220, 10), (2, 220, 20),
+                                          (3, 221, 30)]:
+            self.reforderbook.handle_order({
+                'id': order_id,
+                'price': price,
+                'quantity': quantity,
+                'side': 'ask',
+                'action': 'new'
+            })
+
+    def test_passive_order_rests(self):
+        order = {
+            'id': 4,
+            'price': 219,
+            'quantity': 10,
+            'side': 'bid',
+            'action': 'new'
+        }
+        self.reforderbook.handle_order(order)
+        self.assertEqual(len(self.ob_2_fills), 0)
+        self.assertEqual(self.reforderbook.list_bids[0]['id'], 4)
+
+    def test_partial_fill_in_time_priority(self):
+        order = {
+            'id': 4,
+            'price': 220,
+            'quantity': 15,
+            'side': 'bid',
+            'action': 'new'
+        }
+        be = self.reforderbook.handle_order(order)
+        self.assertEqual(len(self.ob_2_fills), 2)
+        fill = self.ob_2_fills.popleft()
+        self.assertEqual(fill['resting_id'], 1)
+        self.assertEqual(fill['quantity'], 10)
+        self.assertEqual(fill['resting_status'], 'filled')
+        self.assertEqual(fill['aggressor_status'], 'partially_filled')
+        fill = self.ob_2_fills.popleft()
+        self.assertEqual(fill['resting_id'], 2)
+        self.assertEqual(fill['quantity'], 5)
+        self.assertEqual(fill['resting_leaves'], 15)
+        self.assertEqual(fill['aggressor_status'], 'filled')
+        self.assertEqual(be, {'bid_price': -1, 'bid_quantity': -1,
+                              'offer_price': 220, 'offer_quantity': 15})
+        self.assertNotIn(4, self.reforderbook.orders)
+
+    def test_sweep_levels_and_rest_remainder(self):
+        order = {
+            'id': 4,
+            'price': 222,
+            'quantity': 100,
+            'side': 'bid',
+            'action': 'new'
+        }
+        be = self.reforderbook.handle_order(order)
+        self.assertEqual([f['price'] for f in self.ob_2_fills],
+                         [220, 220, 221])
+        self.assertEqual(len(self.reforderbook.asks), 0)
+        self.assertEqual(self.reforderbook.list_bids[0]['quantity'], 40)
+        self.assertEqual(be, {'bid_price': 222, 'bid_quantity': 40,
+                              'offer_price': -1, 'offer_quantity': -1})
+
+    def test_no_top_of_book_change_missed(self):
+        # handle_order() skips the top of book check after new orders that
+        # did not trade nor open a best level: checking again after any
+        # message finds nothing new
+        for stream in (generate_crossing_stream(2000, seed=3),
+                       generate_synthetic_stream(2000, 200, seed=3)):
+            book = PriceLevelOrderBook(matching=True, ob_2_fills=deque())
+            for action, order_id, side, price, quantity in stream:
+                book.handle_order(Order(order_id, price, quantity, side,
+                                        action))
+                self.assertIsNone(book.check_generate_top_of_book_event())
+
+    def test_book_never_crossed(self):
+        order = {
+            'id': 4,
+            'price': 225,
+            'quantity': 25,
+            'side': 'bid',
+            'action': 'new'
+        }
+        self.reforderbook.handle_order(order)
+        best_bid = self.reforderbook.bids.best()
+        best_ask = self.reforderbook.asks.best()
+        self.assertTrue(best_bid is None or best_ask is None
+                        or best_bid.price < best_ask.price)
+
+
+class TestDepthEvents(unittest.TestCase):
+
+    def setUp(self):
+        self.ob_2_depth = deque()
+        self.reforderbook = PriceLevelOrderBook(depth=2,
+                                                ob_2_depth=self.ob_2_depth)
+
+    def handle(self, order_id, price, quantity, side, action):
+        self.reforderbook.handle_order(
+            Order(order_id, price, quantity, side, action))
+        if self.ob_2_depth:
+            event = self.ob_2_depth.popleft()
+            self.assertEqual(len(self.ob_2_depth), 0)
+            return event.bids, event.asks
+        return None
+
+    def test_level_changes(self):
+        self.assertEqual(self.handle(1, 219, 10, 'bid', 'new'),
+                         ([(219, 10)], []))
+        self.assertEqual(self.handle(2, 219, 5, 'bid', 'new'),
+                         ([(219, 15)], []))
+        self.assertEqual(self.handle(3, 221, 10, 'ask', 'new'),
+                         ([], [(221, 10)]))
+        self.assertEqual(self.handle(2, 219, 3, 'bid', 'modify'),
+                         ([(219, 13)], []))
+        self.assertEqual(self.handle(1, 219, 10, 'bid', 'delete'),
+                         ([(219, 3)], []))
+        self.assertEqual(self.handle(2, 219, 3, 'bid', 'delete'),
+                         ([(219, 0)], []))
+
+    def test_levels_outside_depth(self):
+        self.handle(1, 219, 10, 'bid', 'new')
+        self.handle(2, 218, 10, 'bid', 'new')
+        # a third level is not published, nor its changes
+        self.assertIsNone(self.handle(3, 217, 10, 'bid', 'new'))
+        self.assertIsNone(self.handle(4, 217, 10, 'bid', 'new'))
+        # a better level pushes 218 out
+        self.assertEqual(self.handle(5, 220, 10, 'bid', 'new'),
+                         ([(218, 0), (220, 10)], []))
+        # removing a top level brings 218 back
+        self.assertEqual(self.handle(1, 219, 10, 'bid', 'delete'),
+                         ([(219, 0), (218, 10)], []))
+        self.assertEqual(self.reforderbook.depth_snapshot().bids,
+                         [(220, 10), (218, 10)])
+        self.assertEqual(self.reforderbook.depth_snapshot(0).bids,
+                         [(220, 10), (218, 10), (217, 20)])
+
+    def test_matching_changes(self):
+        book = PriceLevelOrderBook(matching=True, ob_2_fills=deque(),
+                                   depth=2, ob_2_depth=self.ob_2_depth)
+        for order_id, price in enumerate([220, 221, 222]):
+            book.handle_order(Order(order_id, price, 10, 'ask', 'new'))
+        self.ob_2_depth.clear()
+        book.handle_order(Order(10, 221, 15, 'bid', 'new'))
+        event = self.ob_2_depth.popleft()
+        self.assertEqual(dict(event.asks), {220: 0, 221: 5, 222: 10})
+        self.assertEqual(event.bids, [])
+
+    def check_stream(self, book, stream):
+        ob_2_depth = book.ob_2_depth
+        depth_book = DepthBook()
+        depth_book.apply(book.depth_snapshot())
+        for action, order_id, side, price, quantity in stream:
+            book.handle_order(Order(order_id, price, quantity, side, action))
+            while ob_2_depth:
+                depth_book.apply(ob_2_depth.popleft())
+            snapshot = book.depth_snapshot()
+            self.assertEqual(depth_book.bid_levels(), snapshot.bids)
+            self.assertEqual(depth_book.ask_levels(), snapshot.asks)
+
+    def test_deltas_rebuild_top_levels(self):
+        stream = generate_synthetic_stream(3000, 200, nb_levels=20)
+        for depth in (1, 5, 20):
+            with self.subTest(depth=depth):
+                self.check_stream(PriceLevelOrderBook(depth=depth), stream)
+
+    def test_deltas_rebuild_top_levels_matching(self):
+        stream = generate_crossing_stream(3000)
+        for depth in (1, 5):
+            with self.subTest(depth=depth):
+                self.check_stream(PriceLevelOrderBook(matching=True,
+                                                      depth=depth), stream)
+
+
+if __name__ == '__main__':
+    unittest.main()
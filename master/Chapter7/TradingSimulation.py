@@ -3,34 +3,41 @@ from chapter7.TradingStrategy import TradingStrategy
 from chapter7.MarketSimulator import MarketSimulator
 from chapter7.OrderManager import OrderManager
 from chapter7.OrderBook import OrderBook
-from collections import deque
+from chapter7.EventDispatcher import EventDispatcher, EventQueue
+from chapter7.OrderFlowGenerator import OrderFlowGenerator
 
-def main():
-    lp_2_gateway = deque()
-    ob_2_ts = deque()
-    ts_2_om = deque()
-    ms_2_om = deque()
-    om_2_ts = deque()
-    gw_2_om = deque()
-    om_2_gw = deque()
+def main(nb_messages=100000, batch_size=1, seed=0):
+    lp_2_gateway = EventQueue()
+    ob_2_ts = EventQueue()
+    ts_2_om = EventQueue()
+    ms_2_om = EventQueue()
+    om_2_ts = EventQueue()
+    gw_2_om = EventQueue()
+    om_2_gw = EventQueue()
 
-    lp = LiquidityProvider(lp_2_gateway)
+    lp = LiquidityProvider(lp_2_gateway,
+                           OrderFlowGenerator(seed).stream(nb_messages),
+                           batch_size)
     ob = OrderBook(lp_2_gateway, ob_2_ts)
     ts = TradingStrategy(ob_2_ts, ts_2_om, om_2_ts)
     ms = MarketSimulator(om_2_gw, gw_2_om)
     om = OrderManager(ts_2_om, om_2_ts, om_2_gw, gw_2_om)
 
+    # Subscribed in pipeline order, so every run processes events in the
+    # same order
+    dispatcher = EventDispatcher()
+    dispatcher.subscribe(lp_2_gateway, ob.handle_order)
+    dispatcher.subscribe(ob_2_ts, ts.handle_book_event)
+    dispatcher.subscribe(ts_2_om, om.handle_order_from_trading_strategy)
+    dispatcher.subscribe(om_2_gw, ms.handle_order)
+    dispatcher.subscribe(gw_2_om, om.handle_order_from_gateway)
+    dispatcher.subscribe(om_2_ts, ts.handle_market_response)
+
     lp.read_tick_data_from_data_source()
     while len(lp_2_gateway)>0:
-        ob.handle_order_from_gateway()
-        ts.handle_input_from_bb()
-        om.handle_input_from_ts()
-        ms.handle_order_from_gw()
-        om.handle_input_from_market()
-        ts.handle_response_from_om()
+        dispatcher.run()
         lp.read_tick_data_from_data_source()
-
-
+    return ts.get_pnl()
 
 
 if __name__ == '__main__':
@@ -1,6 +1,10 @@
+from chapter7.Messages import Order, BookEvent, ExecutionReport
+from chapter7.OrderStore import OrderStore
+
+
 class TradingStrategy:
     def __init__(self, ob_2_ts, ts_2_om, om_2_ts):
-        self.orders = []
+        self.orders = OrderStore()
         self.order_id = 0
         self.position = 0
         self.pnl = 0
@@ -13,33 +17,21 @@ class TradingStrategy:
 
     def create_orders(self,book_event,quantity):
         self.order_id+=1
-        ord = {
-            'id': self.order_id,
-            'price': book_event['bid_price'],
-            'quantity': quantity,
-            'side': 'sell',
-            'action': 'to_be_sent'
-        }
-        self.orders.append(ord.copy())
+        ord = Order(self.order_id, book_event.bid_price, quantity,
+                    'sell', 'to_be_sent', symbol=book_event.symbol)
+        self.orders.add(ord)
 
-        price=book_event['offer_price']
-        side='buy'
         self.order_id+=1
-        ord = {
-            'id': self.order_id,
-            'price': book_event['offer_price'],
-            'quantity': quantity,
-            'side': 'buy',
-            'action': 'to_be_sent'
-        }
-        self.orders.append(ord.copy())
+        ord = Order(self.order_id, book_event.offer_price, quantity,
+                    'buy', 'to_be_sent', symbol=book_event.symbol)
+        self.orders.add(ord)
 
     def signal(self, book_event):
         if book_event is not None:
-            if book_event["bid_price"]>\
-                book_event["offer_price"]:
-                if book_event["bid_price"]>0 and\
-                        book_event["offer_price"]>0:
+            if book_event.bid_price>\
+                book_event.offer_price:
+                if book_event.bid_price>0 and\
+                        book_event.offer_price>0:
                     return True
                 else:
                     return False
@@ -47,26 +39,23 @@ class TradingStrategy:
             return False
 
     def execution(self):
-        orders_to_be_removed=[]
-        for index, order in enumerate(self.orders):
-            if order['action'] == 'to_be_sent':
+        # Orders waiting to be sent have no status yet
+        for order in self.orders.with_status(None):
+            if order.action == 'to_be_sent':
                 # Send order
-                order['status'] = 'new'
-                order['action'] = 'no_action'
+                self.orders.set_status(order, 'new')
+                order.action = 'no_action'
                 if self.ts_2_om is None:
                     print('Simulation mode')
                 else:
-                    self.ts_2_om.append(order.copy())
-            if order['status'] == 'rejected':
-                orders_to_be_removed.append(index)
-            if order['status'] == 'filled':
-                orders_to_be_removed.append(index)
-                pos = order['quantity'] if order['side'] == 'buy' else -order['quantity']
-                self.position+=pos
-                self.pnl-=pos * order['price']
-                self.cash -= pos * order['price']
-        for order_index in sorted(orders_to_be_removed,reverse=True):
-            del (self.orders[order_index])
+                    # The order manager only reads the order to create its own
+                    self.ts_2_om.append(order)
+        self.orders.pop_status('rejected')
+        for order in self.orders.pop_status('filled'):
+            pos = order.quantity if order.side == 'buy' else -order.quantity
+            self.position+=pos
+            self.pnl-=pos * order.price
+            self.cash -= pos * order.price
 
 
     def handle_input_from_bb(self,book_event=None):
@@ -80,35 +69,35 @@ class TradingStrategy:
 
     def handle_book_event(self,book_event):
         if book_event is not None:
-            self.current_bid = book_event['bid_price']
-            self.current_offer = book_event['offer_price']
+            if type(book_event) is not BookEvent:
+                book_event = BookEvent.from_dict(book_event)
+            self.current_bid = book_event.bid_price
+            self.current_offer = book_event.offer_price
 
         if self.signal(book_event):
             self.create_orders(book_event
-                               ,min(book_event['bid_quantity'],
-                                    book_event['offer_quantity']))
+                               ,min(book_event.bid_quantity,
+                                    book_event.offer_quantity))
         self.execution()
 
     def lookup_orders(self,id):
-        count=0
-        for o in self.orders:
-            if o['id'] ==  id:
-                return o, count
-            count+=1
-        return None, None
+        return self.orders.get(id)
 
     def handle_response_from_om(self):
         if self.om_2_ts is not None:
-            self.handle_market_response(self.om_2_ts.popleft())
+            if len(self.om_2_ts)>0:
+                self.handle_market_response(self.om_2_ts.popleft())
         else:
             print('simulation mode')
 
     def handle_market_response(self, order_execution):
-        order,_=self.lookup_orders(order_execution['id'])
+        if type(order_execution) is not ExecutionReport:
+            order_execution = ExecutionReport.from_dict(order_execution)
+        order=self.lookup_orders(order_execution.id)
         if order is None:
             print('error not found')
             return
-        order['status']=order_execution['status']
+        self.orders.set_status(order, order_execution.status)
         self.execution()
 
     def get_pnl(self):
@@ -0,0 +1,55 @@
+import sys
+import argparse
+
+from fixsim.capture import CaptureReader, INCOMING, OUTGOING, message_type, format_record
+
+
+def parse_options(arguments):
+    parser = argparse.ArgumentParser(description='Print the FIX messages of a fixsim capture, one per line')
+
+    parser.add_argument('path', type=str, help='Path to the capture file')
+    parser.add_argument('-s', '--session', type=str, default=None
+                        , help='Only the messages of sessions whose name contains this')
+    parser.add_argument('-t', '--type', type=str, nargs='+', default=None
+                        , help='Only the messages of these MsgTypes, W or 8 for instance')
+    parser.add_argument('-d', '--direction', choices=['in', 'out'], default=None
+                        , help='Only the messages received or sent')
+    parser.add_argument('--count', action='store_true'
+                        , help='Print the number of messages of each session and MsgType instead')
+
+    result = parser.parse_args(arguments)
+    return result
+
+
+def main(params):
+    options = parse_options(params)
+    direction = {'in': INCOMING, 'out': OUTGOING, None: None}[options.direction]
+    types = set(options.type) if options.type else None
+
+    counts = {}
+    with CaptureReader(options.path) as reader:
+        for nanoseconds, kind, session, data in reader.records():
+            if options.session is not None and options.session not in session:
+                continue
+            if direction is not None and kind != direction:
+                continue
+            msgType = message_type(data)
+            if types is not None and msgType not in types:
+                continue
+            if options.count:
+                key = (session, kind, msgType)
+                counts[key] = counts.get(key, 0) + 1
+            else:
+                print(format_record(nanoseconds, kind, session, data))
+
+    if options.count:
+        for (session, kind, msgType), count in sorted(counts.items()):
+            print("%-40s %-3s %-2s %8d" % (session, 'IN' if kind == INCOMING else 'OUT', msgType, count))
+
+
+if __name__ == "__main__":
+    args = []
+    if len(sys.argv) > 1:
+        args = sys.argv[1:]
+
+    main(args)
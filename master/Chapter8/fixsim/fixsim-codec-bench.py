@@ -0,0 +1,193 @@
+import sys
+import time
+import argparse
+
+from fixsim.codec import Header, frame, parse, sendingTime
+from fixsim.lite import MD_ENTRIES, SNAPSHOT, NEW_ORDER_SINGLE, EXECUTION_REPORT
+
+
+def parse_options(arguments):
+    parser = argparse.ArgumentParser(description='Measure the messages parsed and built per second by the FIX codec '
+                                                 'and by quickfix field objects')
+
+    parser.add_argument('-l', '--levels', type=int, default=5
+                        , help='Levels of each side of the snapshots')
+    parser.add_argument('-n', '--number', type=int, default=20000
+                        , help='Messages parsed or built for each measure')
+    parser.add_argument('-r', '--repeat', type=int, default=5
+                        , help='Measures, the best one is kept')
+    parser.add_argument('-d', '--data_dictionary', type=str, default='FIX44.simulator.xml'
+                        , help='Path to the quickfix data dictionary')
+
+    result = parser.parse_args(arguments)
+    return result
+
+
+def measure(fn, number, repeat):
+    # Messages per second of fn, the best of repeat runs
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(number)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return number / best
+
+
+def snapshot_entries(levels):
+    entries = []
+    for i in range(levels):
+        entries.append(('0', 1.1 - i * 0.001, 5000 + i * 1000, 'q%d' % (2 * i), 'EUR', 'A'))
+        entries.append(('1', 1.2 + i * 0.001, 5000 + i * 1000, 'q%d' % (2 * i + 1), 'EUR', 'A'))
+    return entries
+
+
+ORDER = ('1', '2', 'FOR', 'D', 'q1', 'SPOT', 'EUR/USD', 'EUR', '1', '5000', 'SP', '1.2', '20151022-10:00:00.000', '3')
+
+
+def codec_benchmarks(levels):
+    header = Header('FIXSIM-SERVER', 'FIXSIM-CLIENT')
+    entries = snapshot_entries(levels)
+    snapshot = frame(header.encode('W', 1, sendingTime()), SNAPSHOT.body('1', 'EUR/USD', entries))
+    order = frame(header.encode('D', 1, sendingTime()), NEW_ORDER_SINGLE.body(*ORDER))
+
+    def parse_snapshot(number):
+        # every field of every entry, as Client.onMarketDataSnapshotFullRefresh
+        for i in range(number):
+            message = parse(snapshot)
+            message.get(55)
+            for entry in message.groups(MD_ENTRIES):
+                entry.get(299)
+                entry.get(15)
+                entry.getFloat(270)
+                entry.getFloat(271)
+                entry.get(269)
+
+    def parse_order(number):
+        # the fields Server.onNewOrderSingle reads
+        for i in range(number):
+            message = parse(order)
+            message.get(40)
+            message.get(55)
+            message.get(54)
+            message.getFloat(38)
+            message.getFloat(44)
+            message.get(11)
+            message.get(117)
+            message.get(15)
+
+    def build_snapshot(number):
+        for i in range(number):
+            frame(header.encode('W', i, sendingTime()), SNAPSHOT.body(str(i), 'EUR/USD', entries))
+
+    def build_report(number):
+        for i in range(number):
+            body = EXECUTION_REPORT.body(str(i), str(i), '20151023', 'EUR', '2', 'EUR/USD', '1', '1',
+                                         1.2, 1.2, 1.2, 5000, 5000, 5000, 'F', 0)
+            frame(header.encode('8', i, sendingTime()), body)
+
+    return [parse_snapshot, parse_order, build_snapshot, build_report], [snapshot, order]
+
+
+def quickfix_benchmarks(levels, dataDictionary, messages):
+    # The same work through quickfix field objects, as client.py and
+    # server.py do it
+    import quickfix
+    import quickfix44
+
+    dictionary = quickfix.DataDictionary(dataDictionary)
+    entries = snapshot_entries(levels)
+    snapshot, order = [message.decode('latin-1') for message in messages]
+
+    def parse_snapshot(number):
+        for i in range(number):
+            message = quickfix.Message(snapshot, dictionary, False)
+            message.getField(quickfix.Symbol())
+            group = quickfix44.MarketDataSnapshotFullRefresh.NoMDEntries()
+            fix_no_entries = quickfix.NoMDEntries()
+            message.getField(fix_no_entries)
+            for j in range(1, fix_no_entries.getValue() + 1):
+                message.getGroup(j, group)
+                group.getField(quickfix.QuoteEntryID())
+                group.getField(quickfix.Currency())
+                group.getField(quickfix.MDEntryPx())
+                group.getField(quickfix.MDEntrySize())
+                group.getField(quickfix.MDEntryType())
+
+    def parse_order(number):
+        for i in range(number):
+            message = quickfix.Message(order, dictionary, False)
+            for field in (quickfix.OrdType(), quickfix.Symbol(), quickfix.Side(), quickfix.OrderQty(),
+                          quickfix.Price(), quickfix.ClOrdID(), quickfix.QuoteID(), quickfix.Currency()):
+                message.getField(field)
+
+    def build_snapshot(number):
+        for i in range(number):
+            message = quickfix44.MarketDataSnapshotFullRefresh()
+            message.setField(quickfix.Symbol('EUR/USD'))
+            message.setField(quickfix.MDReqID(str(i)))
+            group = quickfix44.MarketDataSnapshotFullRefresh.NoMDEntries()
+            for side, price, size, quoteID, currency, condition in entries:
+                group.setField(quickfix.MDEntryType(side))
+                group.setField(quickfix.MDEntryPx(price))
+                group.setField(quickfix.MDEntrySize(size))
+                group.setField(quickfix.QuoteEntryID(quoteID))
+                group.setField(quickfix.Currency(currency))
+                group.setField(quickfix.QuoteCondition(condition))
+                message.addGroup(group)
+            message.toString()
+
+    def build_report(number):
+        for i in range(number):
+            message = quickfix.Message()
+            message.getHeader().setField(quickfix.BeginString('FIX.4.4'))
+            message.getHeader().setField(quickfix.MsgType(quickfix.MsgType_ExecutionReport))
+            message.setField(quickfix.OrderID(str(i)))
+            message.setField(quickfix.ExecID(str(i)))
+            message.setField(quickfix.SettlDate('20151023'))
+            message.setField(quickfix.Currency('EUR'))
+            message.setField(quickfix.OrdStatus(quickfix.OrdStatus_FILLED))
+            message.setField(quickfix.Symbol('EUR/USD'))
+            message.setField(quickfix.Side('1'))
+            message.setField(quickfix.ClOrdID('1'))
+            message.setField(quickfix.Price(1.2))
+            message.setField(quickfix.AvgPx(1.2))
+            message.setField(quickfix.LastPx(1.2))
+            message.setField(quickfix.LastShares(5000))
+            message.setField(quickfix.CumQty(5000))
+            message.setField(quickfix.OrderQty(5000))
+            message.setField(quickfix.ExecType(quickfix.ExecType_FILL))
+            message.setField(quickfix.LeavesQty(0))
+            message.toString()
+
+    return [parse_snapshot, parse_order, build_snapshot, build_report]
+
+
+def main(params):
+    options = parse_options(params)
+
+    names = ['parse snapshot', 'parse order', 'build snapshot', 'build report']
+    codec, messages = codec_benchmarks(options.levels)
+    try:
+        fields = quickfix_benchmarks(options.levels, options.data_dictionary, messages)
+    except ImportError:
+        print("quickfix is not installed, field objects not measured")
+        fields = [None] * len(names)
+
+    print("%-16s %14s %14s" % ("msg/s", "codec", "field objects"))
+    for name, codec_fn, fields_fn in zip(names, codec, fields):
+        codec_rate = measure(codec_fn, options.number, options.repeat)
+        if fields_fn is None:
+            print("%-16s %14.0f %14s" % (name, codec_rate, "-"))
+        else:
+            fields_rate = measure(fields_fn, options.number, options.repeat)
+            print("%-16s %14.0f %14.0f" % (name, codec_rate, fields_rate))
+
+
+if __name__ == "__main__":
+    args = []
+    if len(sys.argv) > 1:
+        args = sys.argv[1:]
+
+    main(args)
@@ -0,0 +1,57 @@
+import sys
+import asyncio
+import argparse
+
+from fixsim.lite import create_server, create_client, create_logger, load_yaml
+
+
+def parse_options(arguments):
+    parser = argparse.ArgumentParser(description='Run FIX server or client simulator without quickfix')
+
+    parser.add_argument('mode', choices=['server', 'client'])
+    parser.add_argument('-c', '--config', type=str, required=True
+                        , help='Path to FIX server or client yaml config file')
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=1844)
+    parser.add_argument('--sender', type=str, default=None
+                        , help='SenderCompID, FIXSIM-SERVER or FIXSIM-CLIENT by default')
+    parser.add_argument('--target', type=str, default='FIXSIM-SERVER'
+                        , help='TargetCompID of the client')
+    parser.add_argument('--heartbeat', type=int, default=30
+                        , help='HeartBtInt of the client in seconds')
+    parser.add_argument('--capture', type=str, default=None
+                        , help='Path of a capture of the messages sent and received, instead of capture '
+                               'in the config file. Read it with fixsim-capture-decode.py')
+    parser.add_argument('--log_level', type=str, default='info', choices=['debug', 'info', 'warning', 'error']
+                        , help='Log level, debug logging every message')
+
+    result = parser.parse_args(arguments)
+    return result
+
+
+def main(params):
+    options = parse_options(params)
+    config = load_yaml(options.config)
+    if options.capture:
+        config['capture'] = options.capture
+
+    if options.mode == 'server':
+        server = create_server(config, create_logger('FixServer', options.log_level))
+        coroutine = server.run(options.host, options.port, options.sender or 'FIXSIM-SERVER')
+    else:
+        client = create_client(config, create_logger('FixClient', options.log_level))
+        coroutine = client.run(options.host, options.port, options.sender or 'FIXSIM-CLIENT',
+                               options.target, options.heartbeat)
+
+    try:
+        asyncio.run(coroutine)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    args = []
+    if len(sys.argv) > 1:
+        args = sys.argv[1:]
+
+    main(args)
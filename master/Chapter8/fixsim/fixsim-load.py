@@ -0,0 +1,119 @@
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+import yaml
+
+from fixsim.lite import load_yaml
+from fixsim.load import runLoad
+
+PERCENTILES = [50, 90, 99, 99.9]
+
+
+def parse_options(arguments):
+    parser = argparse.ArgumentParser(description='Measure the NewOrderSingle to ExecutionReport latency and the '
+                                                 'throughput of a FIX server simulator as client sessions are added')
+
+    parser.add_argument('-c', '--config', type=str, required=True
+                        , help='Path to FIX server yaml config file, for the symbols and the server started')
+    parser.add_argument('-n', '--sessions', type=int, nargs='+', default=[1, 2, 5, 10, 20]
+                        , help='Numbers of concurrent client sessions, one run each')
+    parser.add_argument('-r', '--rate', type=float, default=0
+                        , help='Orders per second over all sessions, 0 for each session sending its next order '
+                               'as soon as the previous one is answered')
+    parser.add_argument('-d', '--duration', type=float, default=5
+                        , help='Seconds of orders for each run')
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=18440)
+    parser.add_argument('--connect', action='store_true'
+                        , help='Use the server already listening on host and port instead of starting '
+                               'fixsim-lite.py server')
+    parser.add_argument('--publish_interval', type=float, default=1
+                        , help='publish_interval of the server started')
+    parser.add_argument('--sender', type=str, default='LOAD'
+                        , help='SenderCompID prefix, sessions being LOAD-0000, LOAD-0001...')
+    parser.add_argument('--target', type=str, default='FIXSIM-SERVER')
+    parser.add_argument('--per_session', action='store_true'
+                        , help='Print the latencies of each session too')
+    parser.add_argument('--capture', type=str, default=None
+                        , help='Path of a capture of the messages of the server started')
+    parser.add_argument('--log_level', type=str, default='info'
+                        , help='Log level of the server started')
+
+    result = parser.parse_args(arguments)
+    return result
+
+
+def start_server(options, config):
+    # fixsim-lite.py server in its own process, so that the load and the
+    # server do not share an event loop
+    config = dict(config, publish_interval=options.publish_interval)
+    if options.capture:
+        config['capture'] = options.capture
+    fd, path = tempfile.mkstemp(suffix='.yaml')
+    with os.fdopen(fd, 'w') as stream:
+        yaml.safe_dump(config, stream)
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixsim-lite.py')
+    process = subprocess.Popen([sys.executable, script, 'server', '--config', path, '--host', options.host,
+                                '--port', str(options.port), '--sender', options.target,
+                                '--log_level', options.log_level],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 10
+    while True:
+        try:
+            socket.create_connection((options.host, options.port), 0.1).close()
+            break
+        except OSError:
+            if process.poll() is not None or time.time() > deadline:
+                process.kill()
+                os.unlink(path)
+                raise RuntimeError("fixsim-lite.py server did not start")
+            time.sleep(0.05)
+    return process, path
+
+
+def print_result(result, per_session):
+    row = [result.nbSessions, result.sent, result.fills, result.rejects, result.throughput()]
+    print("%8d %8d %8d %8d %10.0f" % tuple(row)
+          + "".join(" %8.3f" % value for value in result.percentiles(PERCENTILES)))
+    if per_session:
+        for i, load in enumerate(result.loads):
+            latencies = sorted(load.latencies)
+            print("%8s %8d %8d %8d %10s" % ('#%d' % i, load.nbSent, load.fills, load.rejects, '')
+                  + "".join(" %8.3f" % value for value in result.percentiles(PERCENTILES, latencies)))
+
+
+def main(params):
+    options = parse_options(params)
+    config = load_yaml(options.config)
+    symbols = [instrument['symbol'] for instrument in config['instruments']]
+
+    server = None
+    if not options.connect:
+        server = start_server(options, config)
+    try:
+        print("%8s %8s %8s %8s %10s" % ("sessions", "sent", "fills", "rejects", "answers/s")
+              + "".join(" %8s" % ("p%s ms" % p) for p in PERCENTILES))
+        for nbSessions in options.sessions:
+            result = asyncio.run(runLoad(options.host, options.port, nbSessions, options.rate, options.duration,
+                                         symbols, options.sender, options.target))
+            print_result(result, options.per_session)
+    finally:
+        if server is not None:
+            process, path = server
+            process.terminate()
+            process.wait()
+            os.unlink(path)
+
+
+if __name__ == "__main__":
+    args = []
+    if len(sys.argv) > 1:
+        args = sys.argv[1:]
+
+    main(args)
@@ -0,0 +1,125 @@
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+
+from fixsim.asynclog import make_async, skip_record_details
+from fixsim.capture import MessageCapture, CaptureReader
+from fixsim.codec import Header, frame, sendingTime
+from fixsim.lite import SNAPSHOT
+
+
+def parse_options(arguments):
+    parser = argparse.ArgumentParser(description='Measure the time logging or capturing a message takes the '
+                                                 'thread doing it, with logging written in place or by a '
+                                                 'background thread')
+
+    parser.add_argument('-n', '--number', type=int, default=50000
+                        , help='Messages logged or captured for each measure')
+    parser.add_argument('-l', '--levels', type=int, default=5
+                        , help='Levels of each side of the snapshots')
+
+    result = parser.parse_args(arguments)
+    return result
+
+
+def snapshot(levels, i):
+    entries = []
+    for j in range(levels):
+        entries.append(('0', 1.1 - j * 0.001, 5000 + j * 1000, 'q%d' % (2 * j), 'EUR', 'A'))
+        entries.append(('1', 1.2 + j * 0.001, 5000 + j * 1000, 'q%d' % (2 * j + 1), 'EUR', 'A'))
+    header = Header('FIXSIM-SERVER', 'FIXSIM-CLIENT')
+    return frame(header.encode('W', i, sendingTime()), SNAPSHOT.body(str(i), 'EUR/USD', entries))
+
+
+def file_logger(name, path):
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+    logger.addHandler(handler)
+    return logger
+
+
+def measure_logging(logger, message, number):
+    # Microseconds per call
+    start = time.perf_counter()
+    for i in range(number):
+        logger.info("FixServer:SEND TO SESSION %d %s", i, message)
+    elapsed = time.perf_counter() - start
+    return elapsed / number * 1e6
+
+
+def measure_capture(capture, message, number):
+    start = time.perf_counter()
+    for i in range(number):
+        capture.outgoing('FIX.4.4:FIXSIM-SERVER->FIXSIM-CLIENT', message)
+    elapsed = time.perf_counter() - start
+    return elapsed / number * 1e6
+
+
+def main(params):
+    options = parse_options(params)
+    message = snapshot(options.levels, 1)
+    text = message.decode('latin-1')
+    directory = tempfile.mkdtemp()
+
+    print("%-24s %10s %10s %12s" % ("", "us/msg", "written s", "file bytes"))
+
+    path = os.path.join(directory, 'sync.log')
+    logger = file_logger('bench.sync', path)
+    perMessage = measure_logging(logger, text, options.number)
+    print("%-24s %10.2f %10s %12d" % ("log in place", perMessage, "-", os.path.getsize(path)))
+
+    # from here on as create_logger does
+    skip_record_details()
+    path = os.path.join(directory, 'lean.log')
+    logger = file_logger('bench.lean', path)
+    perMessage = measure_logging(logger, text, options.number)
+    print("%-24s %10.2f %10s %12d" % ("log in place, lean", perMessage, "-", os.path.getsize(path)))
+
+    path = os.path.join(directory, 'async.log')
+    logger = file_logger('bench.async', path)
+    writer = make_async(logger)
+    start = time.perf_counter()
+    perMessage = measure_logging(logger, text, options.number)
+    writer.stop()
+    written = time.perf_counter() - start
+    print("%-24s %10.2f %10.2f %12d" % ("log by writer thread", perMessage, written, os.path.getsize(path)))
+
+    # the messages themselves, logged at debug level
+    logger.setLevel(logging.INFO)
+    start = time.perf_counter()
+    for i in range(options.number):
+        logger.debug("FixServer:SEND TO SESSION %d %s", i, text)
+    perMessage = (time.perf_counter() - start) / options.number * 1e6
+    print("%-24s %10.2f %10s %12s" % ("log below level", perMessage, "-", "-"))
+
+    path = os.path.join(directory, 'bench.cap')
+    capture = MessageCapture(path)
+    start = time.perf_counter()
+    perMessage = measure_capture(capture, message, options.number)
+    capture.close()
+    written = time.perf_counter() - start
+    print("%-24s %10.2f %10.2f %12d" % ("capture", perMessage, written, os.path.getsize(path)))
+
+    with CaptureReader(path) as reader:
+        start = time.perf_counter()
+        count = sum(1 for record in reader.records())
+        elapsed = time.perf_counter() - start
+    print("%-24s %10.2f %10s %12s" % ("capture read back", elapsed / count * 1e6, "-", count))
+
+    for name in os.listdir(directory):
+        os.unlink(os.path.join(directory, name))
+    os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    args = []
+    if len(sys.argv) > 1:
+        args = sys.argv[1:]
+
+    main(args)
@@ -0,0 +1,133 @@
+import sys
+import time
+import logging
+import argparse
+
+from fixsim.book import Quote, SnapshotGenerator, Subscription
+
+# A full refresh publish of TARGET_SYMBOLS symbols to one session each,
+# building their order books and their snapshots and framing them, should
+# take less than TARGET_MS. An incremental refresh also compares each order
+# book with the previous one, and each other session adds the framing of the
+# messages with its own header.
+TARGET_SYMBOLS = 500
+TARGET_MS = 10
+
+
+def create_generator(levels, changeProbability):
+    generator = SnapshotGenerator(0.1, 20, changeProbability)
+    for level in range(levels):
+        generator.addQuote(Quote(Quote.BID, 100.0 - level, 10000))
+        generator.addQuote(Quote(Quote.ASK, 101.0 + level, 10000))
+    return generator
+
+
+def create_server(nbSymbols, nbSessions, levels, changeProbability, incremental):
+    # The quickfix server, publishing without a loop or an acceptor and
+    # rendering each message once per session instead of sending it, which
+    # is what quickfix does before writing it to the socket
+    import quickfix
+    import quickfix44
+    from fixsim.server import Server, Subscriptions
+
+    class BenchServer(Server):
+        def _onInit(self):
+            pass
+
+        def sendToSessions(self, message, sessionIDs):
+            for sessionID in sessionIDs:
+                message.toString()
+            return []
+
+    subscriptions = Subscriptions()
+    for i in range(nbSymbols):
+        subscription = Subscription("S%03d/USD" % i, create_generator(levels, changeProbability))
+        for j in range(nbSessions):
+            subscription.addSession(quickfix.SessionID("FIX.4.4", "SERVER", "CLIENT%04d" % j), incremental)
+        subscriptions.add(subscription)
+
+    logger = logging.getLogger("fixsim-publish-bench")
+    logger.addHandler(logging.NullHandler())
+    return BenchServer(quickfix44, logger, 1, 0, subscriptions)
+
+
+def create_lite_server(nbSymbols, nbSessions, levels, changeProbability, incremental):
+    # The server of fixsim-lite.py, its sessions framing each message with
+    # their own header as they do before writing it to the socket
+    from fixsim.codec import Header, frame, sendingTime
+    from fixsim.lite import LiteServer
+
+    class BenchSession(object):
+        def __init__(self, targetCompID):
+            self.header = Header("SERVER", targetCompID)
+            self.outSeqNum = 1
+
+        def sendBody(self, msgType, body, bodySum=None):
+            frame(self.header.encode(msgType, self.outSeqNum, sendingTime()), body, bodySum)
+            self.outSeqNum += 1
+
+    sessions = [BenchSession("CLIENT%04d" % j) for j in range(nbSessions)]
+    subscriptions = {}
+    for i in range(nbSymbols):
+        subscription = Subscription("S%03d/USD" % i, create_generator(levels, changeProbability))
+        for session in sessions:
+            subscription.addSession(session, incremental)
+        subscriptions[subscription.symbol] = subscription
+
+    logger = logging.getLogger("fixsim-publish-bench")
+    logger.addHandler(logging.NullHandler())
+    return LiteServer(logger, 1, 0, subscriptions)
+
+
+def parse_options(arguments):
+    parser = argparse.ArgumentParser(description='Measure the time the FIX server simulator takes to publish market data')
+
+    parser.add_argument('-s', '--symbols', type=int, nargs='+', default=[1, 10, 50, TARGET_SYMBOLS]
+                        , help='Numbers of subscribed symbols')
+    parser.add_argument('-n', '--sessions', type=int, nargs='+', default=[1, 10, 100]
+                        , help='Numbers of sessions subscribed to every symbol')
+    parser.add_argument('-l', '--levels', type=int, default=5
+                        , help='Levels of each side of an order book')
+    parser.add_argument('-p', '--change_probability', type=float, default=0.2
+                        , help='Chance of a quote being priced again at each publish')
+    parser.add_argument('-r', '--repeat', type=int, default=20
+                        , help='Publishes measured for each case')
+    parser.add_argument('--lite', action='store_true'
+                        , help='Measure the server of fixsim-lite.py, which does not need quickfix')
+
+    result = parser.parse_args(arguments)
+    return result
+
+
+def measure(server, repeat):
+    # The first publish sends the snapshots every session starts from
+    server.publishMarketData()
+    start = time.time()
+    for i in range(repeat):
+        server.publishMarketData()
+    return (time.time() - start) / repeat
+
+
+def main(params):
+    options = parse_options(params)
+    create = create_lite_server if options.lite else create_server
+
+    print("%8s %8s %14s %14s" % ("symbols", "sessions", "full ms", "incremental ms"))
+    for nbSymbols in options.symbols:
+        for nbSessions in options.sessions:
+            elapsed = []
+            for incremental in (False, True):
+                server = create(nbSymbols, nbSessions, options.levels,
+                                options.change_probability, incremental)
+                elapsed.append(measure(server, options.repeat) * 1000)
+            print("%8d %8d %14.2f %14.2f" % (nbSymbols, nbSessions, elapsed[0], elapsed[1]))
+    print("target: full refresh of %d symbols to 1 session under %d ms, order books, messages and framing"
+          % (TARGET_SYMBOLS, TARGET_MS))
+
+
+if __name__ == "__main__":
+    args = []
+    if len(sys.argv) > 1:
+        args = sys.argv[1:]
+
+    main(args)
@@ -0,0 +1,128 @@
+import sys
+import atexit
+import logging
+import threading
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+# Logging through a queue: the thread logging only puts the record on the
+# queue and a writer thread formats it and hands it to the handlers, a batch
+# of records at a time. The message of a record is formatted by the writer,
+# except for arguments which may change in between, which are turned into
+# strings when logged: anything but strings, numbers, None and tuples of
+# them. Works with Python 2 for sim.py as with Python 3 for lite.py.
+
+# The C queue of Python 3 takes a fraction of the time queue.Queue does
+SimpleQueue = getattr(queue, 'SimpleQueue', queue.Queue)
+
+IMMUTABLE = (str, bytes, int, float, bool, type(None))
+if sys.version_info[0] < 3:
+    IMMUTABLE += (unicode, long)
+
+
+def _immutable(value):
+    if isinstance(value, tuple):
+        return all(_immutable(item) for item in value)
+    return isinstance(value, IMMUTABLE)
+
+
+class QueueHandler(logging.Handler):
+    def __init__(self, records):
+        logging.Handler.__init__(self)
+        self.records = records
+
+    def emit(self, record):
+        args = record.args
+        if args and not (type(args) is tuple and all(type(arg) in IMMUTABLE for arg in args)):
+            if isinstance(args, tuple):
+                record.args = tuple(arg if _immutable(arg) else str(arg) for arg in args)
+            else:
+                # a single mapping argument
+                record.msg = record.getMessage()
+                record.args = None
+        if record.exc_info:
+            # the traceback is formatted while its frames are there
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        self.records.put_nowait(record)
+
+
+class LogWriter(threading.Thread):
+    # Takes the records off the queue and writes them with handlers, each
+    # batch in one write and one flush to the handlers which are plain
+    # streams or files and record by record to the others
+    def __init__(self, records, handlers, batchSize=1024):
+        threading.Thread.__init__(self, name='fixsim-log-writer')
+        self.daemon = True
+        self.records = records
+        self.handlers = handlers
+        self.batchSize = batchSize
+
+    def run(self):
+        stop = False
+        while not stop:
+            batch = [self.records.get()]
+            try:
+                while len(batch) < self.batchSize:
+                    batch.append(self.records.get_nowait())
+            except queue.Empty:
+                pass
+            if batch[-1] is None:
+                batch.pop()
+                stop = True
+            for handler in self.handlers:
+                try:
+                    self.handleBatch(handler, batch)
+                except Exception:
+                    handler.handleError(batch[-1] if batch else None)
+
+    def handleBatch(self, handler, batch):
+        if type(handler) not in (logging.StreamHandler, logging.FileHandler):
+            for record in batch:
+                handler.handle(record)
+            return
+        terminator = getattr(handler, 'terminator', '\n')
+        lines = [handler.format(record) + terminator for record in batch
+                 if record.levelno >= handler.level and handler.filter(record)]
+        if not lines:
+            return
+        handler.acquire()
+        try:
+            if handler.stream is None:
+                handler.stream = handler._open()
+            handler.stream.write(''.join(lines))
+            handler.flush()
+        finally:
+            handler.release()
+
+    def stop(self):
+        # Writes the records logged so far and ends the thread
+        if self.is_alive():
+            self.records.put(None)
+            self.join()
+
+
+def skip_record_details():
+    # Records without the caller, thread and process, which the simulator
+    # does not log and which take longer to find than the rest of a record
+    logging._srcfile = None
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+
+def make_async(logger, batchSize=1024):
+    # Moves the handlers of logger behind a queue written by a LogWriter,
+    # which writes what is left when the program exits
+    records = SimpleQueue()
+    handlers = logger.handlers[:]
+    for handler in handlers:
+        logger.removeHandler(handler)
+    logger.addHandler(QueueHandler(records))
+    writer = LogWriter(records, handlers, batchSize)
+    writer.start()
+    atexit.register(writer.stop)
+    return writer
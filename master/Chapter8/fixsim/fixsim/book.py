@@ -0,0 +1,308 @@
+import random
+import itertools
+from operator import attrgetter
+
+# The order books the server publishes, its subscriptions and the order
+# books the client keeps, with no dependency on quickfix so that the
+# quickfix server and client and the asyncio ones in lite.py share them
+
+PRICE = attrgetter('price')
+QUOTE_IDS = itertools.count(1)
+
+# MDUpdateAction values
+UPDATE_NEW = '0'
+UPDATE_CHANGE = '1'
+UPDATE_DELETE = '2'
+# Side of the order taking a quote
+SIDE_BUY = '1'
+SIDE_SELL = '2'
+
+
+def float_range(first, last, step):
+    if last < 0:
+        raise ValueError("last float is negative")
+
+    result = []
+    while True:
+        if first >= last:
+            return result
+
+        result.append(first)
+        first += step
+
+
+class Quote(object):
+    BID = '0'
+    ASK = '1'
+
+    __slots__ = ('side', 'price', 'size', 'id')
+
+    def __init__(self, side, price, size, id=None):
+        self.side = side
+        self.price = price
+        self.size = size
+        self.id = id
+
+    def __repr__(self):
+        return "(%s %s, %s)" % (self.side, str(self.price), str(self.size))
+
+
+class OrderBook(object):
+    # The quotes of a publish, bids by price downwards then asks by price
+    # upwards. get() finds a quote by id in index, the quotes still alive
+    # whichever publish they were in, or in a dict of the book's own quotes
+    # when no index is given. A bid crossing the ask of its level is
+    # replaced by a quote at the ask price with an id taken from ids,
+    # replaced holding these quotes by the id of the bid, so that an id is
+    # only ever published at one price.
+    def __init__(self, quotes, index=None, ids=None):
+        bid = []
+        ask = []
+        for quote in quotes:
+            if quote.side == Quote.BID:
+                bid.append(quote)
+            else:
+                ask.append(quote)
+
+        if len(ask) != len(bid):
+            raise ValueError("len(ask) != len(bid)")
+
+        self.ids = QUOTE_IDS if ids is None else ids
+        self.replaced = {}
+        self._sort(bid, ask)
+        self._normalise(bid, ask, index)
+        bid.extend(ask)
+        self.quotes = bid
+        if index is None:
+            index = dict((quote.id, quote) for quote in self.quotes)
+        self.index = index
+
+    def _sort(self, bid, ask):
+        bid.sort(key=PRICE, reverse=True)
+        ask.sort(key=PRICE)
+
+    def _normalise(self, bid, ask, index):
+        # Crossed levels are only possible when the best ones are crossed.
+        # The quotes may be in other books, so they are left as they are.
+        if not bid or bid[0].price <= ask[0].price:
+            return
+        for i, (b, a) in enumerate(zip(bid, ask)):
+            if b.price > a.price:
+                quote = Quote(b.side, a.price, b.size, str(next(self.ids)))
+                bid[i] = quote
+                self.replaced[b.id] = quote
+                if index is not None:
+                    index.pop(b.id, None)
+                    index[quote.id] = quote
+
+    def __iter__(self):
+        return self.quotes.__iter__()
+
+    def get(self, quoteID):
+        return self.index.get(quoteID)
+
+
+class SnapshotGenerator(object):
+    # Every publish, each quote is priced again with probability
+    # changeProbability, and otherwise left as it was last published.
+    # index holds the quotes of the last publish by id, a quote priced
+    # again leaving it, and the ids are taken from ids, a counter shared by
+    # all the generators so that they are unique in the server.
+    def __init__(self, step, limit, changeProbability=1, ids=None):
+        self.sources = []
+        self.last = []
+        self.deltas = float_range(0, limit, step)
+        if len(self.deltas) == 0:
+            self.deltas = [0]
+        self.changeProbability = changeProbability
+        self.ids = QUOTE_IDS if ids is None else ids
+        self.index = {}
+
+        self.orderBook = None
+
+    def addQuote(self, quote):
+        self.sources.append(quote)
+        self.last.append(None)
+
+    def generate(self):
+        last = self.last
+        index = self.index
+        ids = self.ids
+        deltas = self.deltas
+        nbDeltas = len(deltas)
+        changeProbability = self.changeProbability
+        rand = random.random
+        quotes = list(last)
+        for i, source in enumerate(self.sources):
+            quote = last[i]
+            if quote is None or changeProbability >= 1 or rand() < changeProbability:
+                if quote is not None:
+                    del index[quote.id]
+                delta = deltas[int(rand() * nbDeltas)]
+                quote = Quote(source.side, source.price + delta, source.size, str(next(ids)))
+                last[i] = quote
+                quotes[i] = quote
+                index[quote.id] = quote
+        return quotes
+
+    def createOrderBook(self):
+        # The quotes replaced by the book are published again as replaced
+        orderBook = OrderBook(self.generate(), self.index, self.ids)
+        replaced = orderBook.replaced
+        if replaced:
+            last = self.last
+            for i, quote in enumerate(last):
+                if quote.id in replaced:
+                    last[i] = replaced[quote.id]
+        return orderBook
+
+
+class Subscription(object):
+    def __init__(self, symbol, generator):
+        super(Subscription, self).__init__()
+        self.symbol = symbol
+        self.currency = self.symbol.split("/")[0]
+        self.sessions = set()
+        # Sessions which asked for MarketDataIncrementalRefresh, and those of
+        # them still waiting for the snapshot the updates apply to
+        self.incrementalSessions = set()
+        self.snapshotSessions = set()
+        self.generator = generator
+        self.orderbook = None
+        # (side, position) -> quote id of the levels last published, a quote
+        # keeping its price and size as long as its id
+        self.levels = {}
+
+    def createOrderBook(self):
+        self.orderbook = self.generator.createOrderBook()
+
+    def updateOrderBook(self):
+        # Creates the next order book and returns its changes since the
+        # previous one as (update action, side, position, quote) tuples,
+        # position counting the levels of a side from 1 and quote being
+        # None for a deleted level
+        self.createOrderBook()
+        changes = []
+        levels = {}
+        previousLevels = self.levels
+        quotes = self.orderbook.quotes
+        # the bids then as many asks
+        half = len(quotes) // 2
+        for side, sideQuotes in ((Quote.BID, quotes[:half]), (Quote.ASK, quotes[half:])):
+            for position, quote in enumerate(sideQuotes, 1):
+                key = (side, position)
+                levels[key] = quote.id
+                previous = previousLevels.get(key)
+                if previous != quote.id:
+                    changes.append((UPDATE_NEW if previous is None else UPDATE_CHANGE,
+                                    side, position, quote))
+        # the last levels first, so that the positions of the others hold
+        if len(previousLevels) > len(levels):
+            for key in sorted(previousLevels, reverse=True):
+                if key not in levels:
+                    changes.append((UPDATE_DELETE, key[0], key[1], None))
+        self.levels = levels
+        return changes
+
+    def publishOrderBook(self):
+        # Creates the next order book and returns its changes as
+        # updateOrderBook() does when a session is subscribed to them, and no
+        # changes otherwise: a session subscribing to them is sent a snapshot
+        # of the order book of the first publish after, and the changes from
+        # that one
+        if not self.incrementalSessions:
+            self.createOrderBook()
+            return []
+        return self.updateOrderBook()
+
+    def getFirstCurrency(self):
+        return self.currency
+
+    def hasSessions(self):
+        return len(self.sessions) > 0
+
+    def removeSession(self, sessionID):
+        self.sessions.remove(sessionID)
+        self.incrementalSessions.discard(sessionID)
+        self.snapshotSessions.discard(sessionID)
+
+    def discardSession(self, sessionID):
+        if sessionID in self.sessions:
+            self.removeSession(sessionID)
+
+    def addSession(self, sessionID, incremental=False):
+        self.sessions.add(sessionID)
+        if not incremental:
+            self.incrementalSessions.discard(sessionID)
+            self.snapshotSessions.discard(sessionID)
+        elif sessionID not in self.incrementalSessions:
+            self.incrementalSessions.add(sessionID)
+            self.snapshotSessions.add(sessionID)
+
+    def fullRefreshSessions(self):
+        # Sessions to send the whole order book to
+        return (self.sessions - self.incrementalSessions) | self.snapshotSessions
+
+    def incrementalRefreshSessions(self):
+        # Sessions to send the changes of the order book to
+        return self.incrementalSessions - self.snapshotSessions
+
+    def __iter__(self):
+        return self.sessions.__iter__()
+
+    def __repr__(self):
+        return "<Subscription %s>" % self.symbol
+
+    def __len__(self):
+        return self.sessions.__len__()
+
+
+class Snapshot(object):
+    # The order book of a symbol as a client sees it, the side of a quote
+    # being the side of an order taking it
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.bid = []
+        self.ask = []
+
+    def getRandomQuote(self):
+        is_bid = random.randrange(0, 2)
+        if is_bid:
+            quotes = self.bid
+        else:
+            quotes = self.ask
+
+        quote = random.choice(quotes)
+        return quote
+
+    def addBid(self, quote):
+        quote.side = SIDE_SELL
+        self.bid.append(quote)
+
+    def addAsk(self, quote):
+        quote.side = SIDE_BUY
+        self.ask.append(quote)
+
+    def update(self, action, entryType, position, quote):
+        # Applies one MarketDataIncrementalRefresh entry, position counting
+        # the levels of a side from 1
+        if entryType == Quote.BID:
+            quotes = self.bid
+            side = SIDE_SELL
+        elif entryType == Quote.ASK:
+            quotes = self.ask
+            side = SIDE_BUY
+        else:
+            raise RuntimeError("Unknown entry type %s" % str(entryType))
+
+        if action == UPDATE_DELETE:
+            del quotes[position - 1]
+            return
+        quote.side = side
+        if action == UPDATE_NEW:
+            quotes.insert(position - 1, quote)
+        else:
+            quotes[position - 1] = quote
+
+    def __repr__(self):
+        return "Snapshot %s\n    BID: %s\n    ASK: %s" % (self.symbol, self.bid, self.ask)
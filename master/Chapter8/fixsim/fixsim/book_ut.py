@@ -0,0 +1,197 @@
+import itertools
+import unittest
+
+from fixsim.book import Quote, OrderBook, SnapshotGenerator, Subscription, Snapshot, \
+    UPDATE_NEW, UPDATE_CHANGE, UPDATE_DELETE, SIDE_BUY, SIDE_SELL
+
+
+class TestOrderBook(unittest.TestCase):
+
+    def test_sorted(self):
+        book = OrderBook([Quote(Quote.BID, 99, 10, '1'), Quote(Quote.ASK, 102, 10, '2'),
+                          Quote(Quote.BID, 100, 10, '3'), Quote(Quote.ASK, 101, 10, '4')])
+        self.assertEqual([quote.id for quote in book], ['3', '1', '4', '2'])
+        self.assertEqual(book.get('4').price, 101)
+        self.assertEqual(book.replaced, {})
+
+    def test_crossed_bid_replaced(self):
+        crossed = Quote(Quote.BID, 103, 10, '1')
+        ask = Quote(Quote.ASK, 101, 10, '2')
+        index = {'1': crossed, '2': ask}
+        book = OrderBook([crossed, ask], index, itertools.count(10))
+        bid = book.quotes[0]
+        self.assertIsNot(bid, crossed)
+        self.assertEqual((bid.side, bid.price, bid.size, bid.id), (Quote.BID, 101, 10, '10'))
+        # the crossed quote may be published in other books
+        self.assertEqual(crossed.price, 103)
+        self.assertEqual(book.replaced, {'1': bid})
+        self.assertEqual(index, {'10': bid, '2': ask})
+        self.assertIs(book.get('10'), bid)
+        self.assertIsNone(book.get('1'))
+
+
+class TestSnapshotGenerator(unittest.TestCase):
+
+    def test_crossed_quote_published_at_one_price(self):
+        generator = SnapshotGenerator(0, 0, 0, itertools.count(1))
+        generator.addQuote(Quote(Quote.BID, 102, 10))
+        generator.addQuote(Quote(Quote.ASK, 101, 10))
+        first = generator.createOrderBook()
+        bid, ask = first.quotes
+        self.assertEqual(bid.price, ask.price)
+        self.assertEqual(generator.last, [bid, ask])
+        self.assertEqual(generator.index, {bid.id: bid, ask.id: ask})
+        # not priced again, the quotes are published again as they were
+        second = generator.createOrderBook()
+        self.assertEqual([(quote.id, quote.price) for quote in second],
+                         [(bid.id, bid.price), (ask.id, ask.price)])
+        self.assertEqual(second.replaced, {})
+
+    def test_ids_unique(self):
+        generator = SnapshotGenerator(0.1, 1, 1, itertools.count(1))
+        for level in range(5):
+            generator.addQuote(Quote(Quote.BID, 100.0 - level, 10))
+            generator.addQuote(Quote(Quote.ASK, 100.5 + level, 10))
+        prices = {}
+        for _ in range(50):
+            for quote in generator.createOrderBook():
+                self.assertEqual(prices.setdefault(quote.id, quote.price), quote.price)
+            self.assertEqual(len(generator.index), 10)
+
+
+class ListGenerator(object):
+    # Gives the order books of a list, one per publish
+    def __init__(self, books):
+        self.books = iter(books)
+
+    def createOrderBook(self):
+        return OrderBook(next(self.books))
+
+
+def create_generator():
+    generator = SnapshotGenerator(0.1, 2, 0.3, itertools.count(1))
+    for level in range(5):
+        generator.addQuote(Quote(Quote.BID, 100.0 - level, 10 + level))
+        generator.addQuote(Quote(Quote.ASK, 100.5 + level, 10 + level))
+    return generator
+
+
+def snapshot_of(subscription):
+    # The Snapshot a client makes of the order book of subscription
+    snapshot = Snapshot(subscription.symbol)
+    for quote in subscription.orderbook:
+        copy = Quote(None, quote.price, quote.size, quote.id)
+        if quote.side == Quote.BID:
+            snapshot.addBid(copy)
+        else:
+            snapshot.addAsk(copy)
+    return snapshot
+
+
+def apply_changes(snapshot, changes):
+    for action, side, position, quote in changes:
+        if quote is not None:
+            quote = Quote(None, quote.price, quote.size, quote.id)
+        snapshot.update(action, side, position, quote)
+
+
+def levels(quotes):
+    return [(quote.price, quote.size, quote.id) for quote in quotes]
+
+
+class TestSubscription(unittest.TestCase):
+
+    def test_update_order_book(self):
+        bid1 = Quote(Quote.BID, 100, 10, '1')
+        bid2 = Quote(Quote.BID, 99, 10, '2')
+        ask1 = Quote(Quote.ASK, 101, 10, '3')
+        ask2 = Quote(Quote.ASK, 102, 10, '4')
+        bid3 = Quote(Quote.BID, 100, 10, '5')
+        ask3 = Quote(Quote.ASK, 101.5, 10, '6')
+        subscription = Subscription('EUR/USD', ListGenerator([
+            [bid1, bid2, ask1, ask2],
+            [bid1, bid2, ask1, ask2],
+            [bid3, bid2, ask1, ask2],
+            [bid3, ask3],
+        ]))
+        self.assertEqual(subscription.updateOrderBook(),
+                         [(UPDATE_NEW, Quote.BID, 1, bid1), (UPDATE_NEW, Quote.BID, 2, bid2),
+                          (UPDATE_NEW, Quote.ASK, 1, ask1), (UPDATE_NEW, Quote.ASK, 2, ask2)])
+        self.assertEqual(subscription.updateOrderBook(), [])
+        # same price, new quote id
+        self.assertEqual(subscription.updateOrderBook(), [(UPDATE_CHANGE, Quote.BID, 1, bid3)])
+        # the last levels deleted first
+        self.assertEqual(subscription.updateOrderBook(),
+                         [(UPDATE_CHANGE, Quote.ASK, 1, ask3),
+                          (UPDATE_DELETE, Quote.ASK, 2, None), (UPDATE_DELETE, Quote.BID, 2, None)])
+        self.assertIs(subscription.orderbook.get('6'), ask3)
+
+    def test_changes_published_when_subscribed(self):
+        subscription = Subscription('EUR/USD', create_generator())
+        subscription.addSession('full')
+        for _ in range(5):
+            self.assertEqual(subscription.publishOrderBook(), [])
+        # the publish of the snapshot, then the changes from its book
+        subscription.addSession('incremental', True)
+        subscription.publishOrderBook()
+        snapshot = snapshot_of(subscription)
+        subscription.snapshotSessions.clear()
+        for _ in range(20):
+            apply_changes(snapshot, subscription.publishOrderBook())
+            self.assertEqual(levels(snapshot.bid + snapshot.ask), levels(subscription.orderbook))
+
+    def test_refresh_sessions(self):
+        subscription = Subscription('EUR/USD', None)
+        subscription.addSession('full')
+        subscription.addSession('incremental', True)
+        self.assertEqual(subscription.fullRefreshSessions(), set(['full', 'incremental']))
+        self.assertEqual(subscription.incrementalRefreshSessions(), set())
+        # once the snapshot is sent
+        subscription.snapshotSessions.clear()
+        self.assertEqual(subscription.fullRefreshSessions(), set(['full']))
+        self.assertEqual(subscription.incrementalRefreshSessions(), set(['incremental']))
+        # subscribing again does not ask for another snapshot
+        subscription.addSession('incremental', True)
+        self.assertEqual(subscription.incrementalRefreshSessions(), set(['incremental']))
+        subscription.addSession('incremental')
+        self.assertEqual(subscription.fullRefreshSessions(), set(['full', 'incremental']))
+        self.assertEqual(subscription.incrementalRefreshSessions(), set())
+        subscription.addSession('full', True)
+        subscription.discardSession('full')
+        subscription.discardSession('unknown')
+        self.assertEqual(subscription.sessions, set(['incremental']))
+        self.assertEqual(subscription.incrementalSessions, set())
+        self.assertEqual(subscription.snapshotSessions, set())
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def test_update(self):
+        snapshot = Snapshot('EUR/USD')
+        snapshot.addBid(Quote(None, 100, 10, '1'))
+        snapshot.addAsk(Quote(None, 101, 10, '2'))
+        self.assertEqual([quote.side for quote in snapshot.bid + snapshot.ask], [SIDE_SELL, SIDE_BUY])
+        snapshot.update(UPDATE_NEW, Quote.BID, 1, Quote(None, 100.5, 10, '3'))
+        snapshot.update(UPDATE_CHANGE, Quote.ASK, 1, Quote(None, 100.8, 10, '4'))
+        snapshot.update(UPDATE_NEW, Quote.ASK, 2, Quote(None, 102, 10, '5'))
+        self.assertEqual([quote.id for quote in snapshot.bid], ['3', '1'])
+        self.assertEqual([quote.id for quote in snapshot.ask], ['4', '5'])
+        self.assertEqual(snapshot.bid[0].side, SIDE_SELL)
+        self.assertEqual(snapshot.ask[1].side, SIDE_BUY)
+        snapshot.update(UPDATE_DELETE, Quote.BID, 2, None)
+        self.assertEqual([quote.id for quote in snapshot.bid], ['3'])
+        with self.assertRaises(RuntimeError):
+            snapshot.update(UPDATE_NEW, '2', 1, Quote(None, 100, 10, '6'))
+
+    def test_updates_follow_publishes(self):
+        # A snapshot then the changes of each publish give the book published
+        subscription = Subscription('EUR/USD', create_generator())
+        subscription.updateOrderBook()
+        snapshot = snapshot_of(subscription)
+        for _ in range(50):
+            apply_changes(snapshot, subscription.updateOrderBook())
+            self.assertEqual(levels(snapshot.bid + snapshot.ask), levels(subscription.orderbook))
+
+
+if __name__ == '__main__':
+    unittest.main()
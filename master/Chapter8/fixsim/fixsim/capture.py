@@ -0,0 +1,171 @@
+import time
+import atexit
+import zlib
+import struct
+import threading
+from collections import deque
+
+# A capture of the raw FIX messages sent and received by the simulator, for
+# reading offline. Capturing a message costs the session thread one tuple
+# put on a deque; a writer thread packs the messages into blocks which it
+# compresses and writes every flushInterval seconds. The file is
+#
+#   magic b'FIXCAPTR' | version (uint32) | blocks
+#
+# a block being its compressed size and its size (uint32 each) and the
+# zlib compressed records, each record
+#
+#   time in ns (int64) | kind (uint8) | session (uint16) | size (uint32) | data
+#
+# kind being INCOMING or OUTGOING and data the message, or SESSION and
+# data the name of the session numbered session in the records which
+# follow. A block cut short by a crash ends the capture. Works with
+# Python 2 for the quickfix applications as with Python 3 for lite.py.
+
+MAGIC = b'FIXCAPTR'
+VERSION = 1
+HEADER = struct.Struct('<8sI')
+BLOCK = struct.Struct('<II')
+RECORD = struct.Struct('<qBHI')
+
+INCOMING = 0
+OUTGOING = 1
+SESSION = 2
+DIRECTIONS = {INCOMING: 'IN', OUTGOING: 'OUT'}
+
+
+def _bytes(data):
+    if isinstance(data, bytes):
+        return data
+    return data.encode('latin-1')
+
+
+class MessageCapture(object):
+    def __init__(self, path, flushInterval=0.2, compression=1):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION))
+        self.flushInterval = flushInterval
+        self.compression = compression
+        self.pending = deque()
+        self.sessions = {}
+        self.count = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='fixsim-capture-writer')
+        self.thread.daemon = True
+        self.thread.start()
+        atexit.register(self.close)
+
+    def incoming(self, session, data):
+        # data is the raw message, bytes or str, session anything whose str
+        # names the session
+        self.pending.append((time.time(), INCOMING, session, data))
+
+    def outgoing(self, session, data):
+        self.pending.append((time.time(), OUTGOING, session, data))
+
+    def run(self):
+        while not self.stopped.wait(self.flushInterval):
+            self.write()
+        self.write()
+
+    def write(self):
+        pending = self.pending
+        parts = []
+        for i in range(len(pending)):
+            timestamp, kind, session, data = pending.popleft()
+            nanoseconds = int(timestamp * 1e9)
+            name = str(session)
+            number = self.sessions.get(name)
+            if number is None:
+                number = self.sessions[name] = len(self.sessions)
+                encoded = _bytes(name)
+                parts.append(RECORD.pack(nanoseconds, SESSION, number, len(encoded)))
+                parts.append(encoded)
+            data = _bytes(data)
+            parts.append(RECORD.pack(nanoseconds, kind, number, len(data)))
+            parts.append(data)
+            self.count += 1
+        if not parts:
+            return
+        block = b''.join(parts)
+        compressed = zlib.compress(block, self.compression)
+        self.file.write(BLOCK.pack(len(compressed), len(block)))
+        self.file.write(compressed)
+        self.file.flush()
+
+    def close(self):
+        # Writes the messages captured so far and closes the file
+        if self.file.closed:
+            return
+        self.stopped.set()
+        self.thread.join()
+        self.file.close()
+
+    def __len__(self):
+        return self.count + len(self.pending)
+
+
+class CaptureReader(object):
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        header = self.file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            self.file.close()
+            raise ValueError('%s is not a FIX capture' % path)
+        magic, version = HEADER.unpack(header)
+        if magic != MAGIC:
+            self.file.close()
+            raise ValueError('%s is not a FIX capture' % path)
+        if version != VERSION:
+            self.file.close()
+            raise ValueError('%s has version %d, expected %d' % (path, version, VERSION))
+
+    def records(self):
+        # (time in ns, INCOMING or OUTGOING, session name, message) of the
+        # captured messages, in the order they were captured
+        sessions = {}
+        self.file.seek(HEADER.size)
+        while True:
+            header = self.file.read(BLOCK.size)
+            if len(header) < BLOCK.size:
+                return
+            compressedSize, size = BLOCK.unpack(header)
+            compressed = self.file.read(compressedSize)
+            if len(compressed) < compressedSize:
+                return
+            block = zlib.decompress(compressed)
+            offset = 0
+            while offset < size:
+                nanoseconds, kind, number, length = RECORD.unpack_from(block, offset)
+                offset += RECORD.size
+                data = block[offset:offset + length]
+                offset += length
+                if kind == SESSION:
+                    sessions[number] = data.decode('latin-1')
+                else:
+                    yield nanoseconds, kind, sessions[number], data
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def message_type(data):
+    start = data.find(b'\x0135=')
+    if start < 0:
+        return None
+    start += 4
+    return data[start:data.find(b'\x01', start)].decode('latin-1')
+
+
+def format_record(nanoseconds, kind, session, data):
+    seconds, remainder = divmod(nanoseconds, 1000000000)
+    return '%s.%06d %-3s %s %s' % (time.strftime('%Y%m%d-%H:%M:%S', time.gmtime(seconds)), remainder // 1000,
+                                   DIRECTIONS[kind], session,
+                                   data.replace(b'\x01', b'|').decode('latin-1'))
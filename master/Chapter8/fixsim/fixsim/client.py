@@ -8,7 +8,8 @@ import datetime
 from twisted.internet import task
 
 from sim import (FixSimError, FixSimApplication, create_fix_version,
-                 instance_safe_call, create_logger, IncrementID, load_yaml)
+                 instance_safe_call, create_logger, create_capture, IncrementID, load_yaml)
+from book import Snapshot
 
 
 class Subscription(object):
@@ -88,41 +89,15 @@ def create_initiator(initiator_config, simulation_config):
     logger = create_logger(config)
     subscribe_interval = config.get('subscribe_interval', 1)
     skip_snapshot_chance = config.get('skip_snapshot_chance', 0)
-    application = Client(fix_version, logger, skip_snapshot_chance, subscribe_interval, subscriptions)
+    incremental = config.get('update_type', 'full') == 'incremental'
+    application = Client(fix_version, logger, skip_snapshot_chance, subscribe_interval, subscriptions,
+                         incremental, create_capture(config))
     storeFactory = quickfix.FileStoreFactory(settings)
     logFactory = quickfix.ScreenLogFactory(settings)
     initiator = quickfix.SocketInitiator(application, storeFactory, settings, logFactory)
     return initiator
 
 
-class Snapshot(object):
-    def __init__(self, symbol):
-        self.symbol = symbol
-        self.bid = []
-        self.ask = []
-
-    def getRandomQuote(self):
-        is_bid = random.randrange(0, 2)
-        if is_bid:
-            quotes = self.bid
-        else:
-            quotes = self.ask
-
-        quote = random.choice(quotes)
-        return quote
-
-    def addBid(self, quote):
-        quote.side = Quote.SELL
-        self.bid.append(quote)
-
-    def addAsk(self, quote):
-        quote.side = quote.BUY
-        self.ask.append(quote)
-
-    def __repr__(self):
-        return "Snapshot %s\n    BID: %s\n    ASK: %s" % (self.symbol, self.bid, self.ask)
-
-
 class Quote(object):
     SELL = '2'
     BUY = '1'
@@ -143,10 +118,15 @@ class Quote(object):
 class Client(FixSimApplication):
     MKD_TOKEN = "MKD"
 
-    def __init__(self, fixVersion, logger, skipSnapshotChance, subscribeInterval, subscriptions):
-        super(Client, self).__init__(fixVersion, logger)
+    def __init__(self, fixVersion, logger, skipSnapshotChance, subscribeInterval, subscriptions,
+                 incremental=False, capture=None):
+        super(Client, self).__init__(fixVersion, logger, capture)
 
         self.skipSnapshotChance = skipSnapshotChance
+        # With incremental, the server sends one snapshot per symbol and
+        # then only the levels which change, applied to self.snapshots
+        self.incremental = incremental
+        self.snapshots = {}
         self.subscribeInterval = subscribeInterval
         self.subscriptions = subscriptions
         self.orderSession = None
@@ -172,18 +152,6 @@ class Client(FixSimApplication):
         # print "ON LOGOUT"
         return
 
-    def toAdmin(self, sessionID, message):
-        # print "TO ADMIN", message
-        return
-
-    def fromAdmin(self, sessionID, message):
-        # print "FROM ADMIN"
-        return
-
-    def toApp(self, sessionID, message):
-        # print "TO APP"
-        return
-
     def subscribe(self):
         if self.marketSession is None:
             self.logger.info("FIXSIM-CLIENT Market session is none, skip subscribing")
@@ -193,7 +161,10 @@ class Client(FixSimApplication):
             message = self.fixVersion.MarketDataRequest()
             message.setField(quickfix.MDReqID(self.idGen.reqID()))
             message.setField(quickfix.SubscriptionRequestType(quickfix.SubscriptionRequestType_SNAPSHOT_PLUS_UPDATES))
-            message.setField(quickfix.MDUpdateType(quickfix.MDUpdateType_FULL_REFRESH))
+            if self.incremental:
+                message.setField(quickfix.MDUpdateType(quickfix.MDUpdateType_INCREMENTAL_REFRESH))
+            else:
+                message.setField(quickfix.MDUpdateType(quickfix.MDUpdateType_FULL_REFRESH))
             message.setField(quickfix.MarketDepth(0))
             message.setField(quickfix.MDReqID(self.idGen.reqID()))
 
@@ -211,10 +182,17 @@ class Client(FixSimApplication):
 
             self.sendToTarget(message, self.marketSession)
 
-    def onMarketDataSnapshotFullRefresh(self, message, sessionID):
+    def skipSnapshot(self):
         skip_chance = random.choice(range(1, 101))
         if self.skipSnapshotChance > skip_chance:
-            self.logger.info("FIXSIM-CLIENT onMarketDataSnapshotFullRefresh skip making trade with random choice %d", skip_chance)
+            self.logger.info("FIXSIM-CLIENT skip making trade with random choice %d", skip_chance)
+            return True
+        return False
+
+    def onMarketDataSnapshotFullRefresh(self, message, sessionID):
+        # An incremental subscription needs every snapshot to apply the
+        # updates to, so the skip chance is only drawn once it is read
+        if not self.incremental and self.skipSnapshot():
             return
 
         fix_symbol = quickfix.Symbol()
@@ -257,13 +235,65 @@ class Client(FixSimApplication):
             else:
                 raise RuntimeError("Unknown entry type %s" % str(entry_type))
 
+        self.snapshots[symbol] = snapshot
+        if self.incremental and self.skipSnapshot():
+            return
         self.makeOrder(snapshot)
 
+    def onMarketDataIncrementalRefresh(self, message, sessionID):
+        group = self.fixVersion.MarketDataIncrementalRefresh.NoMDEntries()
+        fix_no_entries = quickfix.NoMDEntries()
+        message.getField(fix_no_entries)
+        no_entries = fix_no_entries.getValue()
+
+        updated = []
+        for i in range(1, no_entries + 1):
+            message.getGroup(i, group)
+            fix_symbol = quickfix.Symbol()
+            action = quickfix.MDUpdateAction()
+            entry_type = quickfix.MDEntryType()
+            position = quickfix.MDEntryPositionNo()
+            group.getField(fix_symbol)
+            group.getField(action)
+            group.getField(entry_type)
+            group.getField(position)
+
+            symbol = fix_symbol.getValue()
+            snapshot = self.snapshots.get(symbol)
+            if snapshot is None:
+                self.logger.info("FIXSIM-CLIENT update for %s before its snapshot", symbol)
+                continue
+
+            quote = None
+            if action.getValue() != quickfix.MDUpdateAction_DELETE:
+                price = quickfix.MDEntryPx()
+                size = quickfix.MDEntrySize()
+                currency = quickfix.Currency()
+                quote_id = quickfix.QuoteEntryID()
+                group.getField(price)
+                group.getField(size)
+                group.getField(currency)
+                group.getField(quote_id)
+
+                quote = Quote()
+                quote.price = price.getValue()
+                quote.size = size.getValue()
+                quote.currency = currency.getValue()
+                quote.id = quote_id.getValue()
+
+            snapshot.update(action.getValue(), entry_type.getValue(), position.getValue(), quote)
+            if snapshot not in updated:
+                updated.append(snapshot)
+
+        for snapshot in updated:
+            if not self.skipSnapshot():
+                self.makeOrder(snapshot)
+
     def makeOrder(self, snapshot):
-        self.logger.info("FIXSIM-CLIENT Snapshot received %s", str(snapshot))
+        self.logger.debug("FIXSIM-CLIENT Snapshot received %s", snapshot)
         quote = snapshot.getRandomQuote()
 
-        self.logger.info("FIXSIM-CLIENT make order for quote %s", str(quote))
+        self.logger.info("FIXSIM-CLIENT make order for quote %s", quote)
         order = self.fixVersion.NewOrderSingle()
         order.setField(quickfix.HandlInst(quickfix.HandlInst_AUTOMATED_EXECUTION_ORDER_PUBLIC_BROKER_INTERVENTION_OK))
         order.setField(quickfix.SecurityType(quickfix.SecurityType_FOREIGN_EXCHANGE_CONTRACT))
@@ -286,11 +316,13 @@ class Client(FixSimApplication):
 
 
     def onExecutionReport(self, message, sessionID):
-        self.logger.info("FIXSIM-CLIENT EXECUTION REPORT  %s", str(message))
+        self.logger.info("FIXSIM-CLIENT EXECUTION REPORT  %s", message)
 
     def dispatchFromApp(self, msgType, message, beginString, sessionID):
         if msgType == '8':
             self.onExecutionReport(message, sessionID)
         elif msgType == 'W':
             self.onMarketDataSnapshotFullRefresh(message, sessionID)
+        elif msgType == 'X':
+            self.onMarketDataIncrementalRefresh(message, sessionID)
 
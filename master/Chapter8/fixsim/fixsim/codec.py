@@ -0,0 +1,366 @@
+import time
+
+# FIX 4.4 tag=value messages read and written as bytes, without quickfix and
+# its field objects. Python 3 only, like transport.py which uses it.
+#
+# parse() reads a message in one pass into the list of its tags and the
+# list of their raw values, with a dict from each tag to its first position
+# in them. Tags and values stay bytes, a tag asked for by its number being
+# looked up as bytes and a value converted only when asked for, so reading
+# a field costs two dict lookups and one conversion and the fields nobody
+# reads cost nothing more than the pass.
+#
+# A Template is compiled once per message type into a format of its body.
+# Encoding a message formats the values into it and frame() adds the
+# header of the session, BodyLength and CheckSum. Floats, prices and
+# quantities, are written with FLOAT_DIGITS decimals at most, never with an
+# exponent, which FIX does not allow.
+
+SOH = b'\x01'
+BEGIN_STRING = b'8=FIX.4.4\x01'
+
+BEGIN_STRING_TAG = 8
+BODY_LENGTH = 9
+CHECK_SUM = 10
+MSG_SEQ_NUM = 34
+MSG_TYPE = 35
+SENDER_COMP_ID = 49
+SENDING_TIME = 52
+TARGET_COMP_ID = 56
+
+# "10=" and three digits and SOH
+TRAILER_SIZE = 7
+FLOAT_DIGITS = 8
+
+
+class FixCodecError(ValueError):
+    pass
+
+
+def checksum(data):
+    return sum(data) % 256
+
+
+class _TagKeys(dict):
+    # b'55' for 55
+    def __missing__(self, tag):
+        key = b'%d' % tag
+        self[tag] = key
+        return key
+
+
+TAG_KEYS = _TagKeys()
+
+
+def formatFloat(value):
+    # value with FLOAT_DIGITS decimals at most and no trailing zeros,
+    # 1e-05 giving 0.00001 and 10000.0 giving 10000
+    text = ('%.*f' % (FLOAT_DIGITS, value)).rstrip('0').rstrip('.')
+    return text if text != '-0' else '0'
+
+
+def _fields(values):
+    if float not in map(type, values):
+        return values
+    return tuple([formatFloat(value) if type(value) is float else value for value in values])
+
+
+class FixMessage(object):
+    __slots__ = ('buffer', 'tags', 'values', 'index')
+
+    def __init__(self, buffer, tags, values):
+        self.buffer = buffer
+        self.tags = tags
+        self.values = values
+        # the first position of each tag, the later ones of a tag being in
+        # repeating groups
+        self.index = dict(zip(reversed(tags), range(len(tags) - 1, -1, -1)))
+
+    @property
+    def msgType(self):
+        return self.values[self.index[b'35']].decode('ascii')
+
+    def __contains__(self, tag):
+        return TAG_KEYS[tag] in self.index
+
+    def getBytes(self, tag, default=None):
+        position = self.index.get(TAG_KEYS[tag])
+        if position is None:
+            return default
+        return self.values[position]
+
+    def get(self, tag, default=None):
+        position = self.index.get(TAG_KEYS[tag])
+        if position is None:
+            return default
+        return self.values[position].decode('latin-1')
+
+    def getInt(self, tag, default=None):
+        position = self.index.get(TAG_KEYS[tag])
+        if position is None:
+            return default
+        return int(self.values[position])
+
+    def getFloat(self, tag, default=None):
+        position = self.index.get(TAG_KEYS[tag])
+        if position is None:
+            return default
+        return float(self.values[position])
+
+    def groups(self, group):
+        # The entries of a repeating Group, each one starting with the first
+        # tag of the group and the last one ending at the first tag which is
+        # not of the group
+        position = self.index.get(group.countKey)
+        if position is None:
+            return []
+        count = int(self.values[position])
+        tags = self.tags
+        delimiter = group.keys[0]
+        starts = []
+        start = position + 1
+        for i in range(count):
+            if start >= len(tags) or tags[start] != delimiter:
+                raise FixCodecError("group %d has %d entries, expected %d"
+                                    % (group.countTag, len(starts), count))
+            starts.append(start)
+            if i + 1 < count:
+                try:
+                    start = tags.index(delimiter, start + 1)
+                except ValueError:
+                    start = len(tags)
+        if starts:
+            end = starts[-1] + 1
+            while end < len(tags) and tags[end] in group.members and tags[end] != delimiter:
+                end += 1
+            starts.append(end)
+        return [FixGroup(self, starts[i], starts[i + 1]) for i in range(count)]
+
+    def __repr__(self):
+        return self.buffer.replace(SOH, b'|').decode('latin-1')
+
+
+class FixGroup(object):
+    # An entry of a repeating group, the positions start to end of the
+    # fields of its message
+    __slots__ = ('message', 'start', 'end')
+
+    def __init__(self, message, start, end):
+        self.message = message
+        self.start = start
+        self.end = end
+
+    def getBytes(self, tag, default=None):
+        try:
+            position = self.message.tags.index(TAG_KEYS[tag], self.start, self.end)
+        except ValueError:
+            return default
+        return self.message.values[position]
+
+    def get(self, tag, default=None):
+        value = self.getBytes(tag)
+        if value is None:
+            return default
+        return value.decode('latin-1')
+
+    def getInt(self, tag, default=None):
+        value = self.getBytes(tag)
+        if value is None:
+            return default
+        return int(value)
+
+    def getFloat(self, tag, default=None):
+        value = self.getBytes(tag)
+        if value is None:
+            return default
+        return float(value)
+
+
+def parse(buffer, check=True):
+    # The FixMessage of a whole message, checking with check that it is a
+    # FIX 4.4 message with the right BodyLength and CheckSum
+    buffer = bytes(buffer)
+    if not buffer.endswith(SOH):
+        raise FixCodecError("malformed message %r" % buffer[:64])
+    parts = buffer.replace(b'=', SOH).split(SOH)
+    if len(parts) == 2 * buffer.count(SOH) + 1:
+        tags = parts[0:-1:2]
+        values = parts[1::2]
+    else:
+        # a value with "="
+        tags = []
+        values = []
+        for field in buffer[:-1].split(SOH):
+            tag, equal, value = field.partition(b'=')
+            if not equal:
+                raise FixCodecError("malformed message %r" % buffer[:64])
+            tags.append(tag)
+            values.append(value)
+    if check:
+        if not buffer.startswith(BEGIN_STRING) or tags[1] != b'9' or tags[-1] != b'10':
+            raise FixCodecError("not a FIX 4.4 message %r" % buffer[:64])
+        bodyStart = len(BEGIN_STRING) + len(values[1]) + 3
+        bodyEnd = len(buffer) - TRAILER_SIZE
+        if int(values[1]) != bodyEnd - bodyStart:
+            raise FixCodecError("body length %s, expected %d"
+                                % (values[1].decode('ascii'), bodyEnd - bodyStart))
+        if int(values[-1]) != checksum(buffer[:bodyEnd]):
+            raise FixCodecError("checksum %s, expected %03d"
+                                % (values[-1].decode('ascii'), checksum(buffer[:bodyEnd])))
+    return FixMessage(buffer, tags, values)
+
+
+class FixStream(object):
+    # Splits the bytes read from a connection into whole messages, using
+    # their BodyLength
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        buffer = self.buffer
+        buffer += data
+        messages = []
+        start = 0
+        while True:
+            begin = buffer.find(b'8=', start)
+            if begin < 0:
+                # a last "8" may begin the next message
+                start = max(start, len(buffer) - 1)
+                break
+            lengthStart = buffer.find(b'\x019=', begin)
+            if lengthStart < 0:
+                start = begin
+                break
+            lengthEnd = buffer.find(SOH, lengthStart + 3)
+            if lengthEnd < 0:
+                start = begin
+                break
+            try:
+                bodyLength = int(buffer[lengthStart + 3:lengthEnd])
+            except ValueError:
+                raise FixCodecError("bad body length %r"
+                                    % bytes(buffer[lengthStart + 3:lengthEnd]))
+            end = lengthEnd + 1 + bodyLength + TRAILER_SIZE
+            if end > len(buffer):
+                start = begin
+                break
+            messages.append(bytes(buffer[begin:end]))
+            start = end
+        del buffer[:start]
+        return messages
+
+
+def _format(tags):
+    return ''.join('%d=%%s\x01' % tag for tag in tags)
+
+
+class Group(object):
+    # A repeating group, for a Template the values of its entries being
+    # given as a list of tuples in the order of tags
+    def __init__(self, countTag, tags):
+        self.countTag = countTag
+        self.tags = tuple(tags)
+        self.countKey = TAG_KEYS[countTag]
+        self.keys = tuple(TAG_KEYS[tag] for tag in tags)
+        self.members = frozenset(self.keys)
+
+
+class Fields(object):
+    # Consecutive fields of a group entry formatted on their own, for
+    # entries put together from parts formatted once and given to
+    # Template.body() as str, a None value leaving its field out
+    def __init__(self, tags):
+        self.tags = tuple(tags)
+        self.format = _format(self.tags)
+
+    def encode(self, values):
+        if None in values:
+            return ''.join(['%d=%s\x01' % field for field in zip(self.tags, _fields(values))
+                            if field[1] is not None])
+        return self.format % _fields(values)
+
+
+class Template(object):
+    # The body of a message type, the fields after the header: tags and
+    # groups, in their order in the message, the values being given in the
+    # same order as str or numbers, a None value of a group entry leaving
+    # its field out. An entry of a group may also be given already
+    # formatted, as a str, see Fields.
+    def __init__(self, msgType, fields):
+        self.msgType = msgType
+        self.segments = []
+        tags = []
+        for field in fields:
+            if isinstance(field, Group):
+                if tags:
+                    self.segments.append((_format(tags), len(tags), None))
+                    tags = []
+                self.segments.append(('%d=%%d\x01' % field.countTag, _format(field.tags), field.tags))
+            else:
+                tags.append(field)
+        if tags:
+            self.segments.append((_format(tags), len(tags), None))
+        self.nbValues = sum(1 if isinstance(count, str) else count
+                            for _, count, _ in self.segments)
+        # without groups, a body is one format
+        self.format = self.segments[0][0] if len(self.segments) == 1 \
+            and not isinstance(self.segments[0][1], str) else None
+
+    def body(self, *values):
+        if len(values) != self.nbValues:
+            raise FixCodecError("%d values for template %s, expected %d"
+                                % (len(values), self.msgType, self.nbValues))
+        if self.format is not None:
+            return (self.format % _fields(values)).encode('latin-1')
+        parts = []
+        i = 0
+        for head, entry, tags in self.segments:
+            if isinstance(entry, str):
+                entries = values[i]
+                parts.append(head % len(entries))
+                parts.extend([values if type(values) is str else
+                              entry % _fields(values) if None not in values else
+                              ''.join(['%d=%s\x01' % field for field in zip(tags, _fields(values))
+                                       if field[1] is not None])
+                              for values in entries])
+                i += 1
+            else:
+                parts.append(head % _fields(values[i:i + entry]))
+                i += entry
+        return ''.join(parts).encode('latin-1')
+
+
+class Header(object):
+    # The header of the messages a session sends
+    def __init__(self, senderCompID, targetCompID):
+        self.format = '35=%%s\x0149=%s\x0156=%s\x0134=%%d\x0152=%%s\x01' \
+                      % (senderCompID, targetCompID)
+
+    def encode(self, msgType, seqNum, sendingTime):
+        return (self.format % (msgType, seqNum, sendingTime)).encode('latin-1')
+
+
+def frame(header, body, bodySum=None):
+    # The message of header and body, with its BodyLength and CheckSum.
+    # bodySum, sum(body), is given by the callers framing one body for
+    # several sessions, which then only add up their header.
+    start = b'8=FIX.4.4\x019=%d\x01' % (len(header) + len(body))
+    if bodySum is None:
+        bodySum = sum(body)
+    total = sum(start) + sum(header) + bodySum
+    return b''.join((start, header, body, b'10=%03d\x01' % (total % 256)))
+
+
+_second = [None, None]
+
+
+def sendingTime(now=None):
+    # UTC time as YYYYMMDD-HH:MM:SS.sss, formatting the date and time once
+    # a second
+    if now is None:
+        now = time.time()
+    second = int(now)
+    if second != _second[0]:
+        _second[0] = second
+        _second[1] = time.strftime('%Y%m%d-%H:%M:%S', time.gmtime(second))
+    return '%s.%03d' % (_second[1], int((now - second) * 1000))
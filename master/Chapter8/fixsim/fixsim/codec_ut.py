@@ -0,0 +1,186 @@
+import unittest
+
+from fixsim.codec import Fields, FixCodecError, FixStream, Group, Header, Template, checksum, \
+    formatFloat, frame, parse
+
+HEADER = Header('SERVER', 'CLIENT')
+ENTRIES = Group(268, [269, 270, 271, 299])
+SNAPSHOT = Template('W', [262, 55, ENTRIES, 58])
+ORDER = Template('D', [11, 55, 54, 38, 44])
+
+
+def message(msgType, body, seqNum=1):
+    return frame(HEADER.encode(msgType, seqNum, '20151022-10:00:00.000'), body)
+
+
+class TestParse(unittest.TestCase):
+
+    def test_fields(self):
+        fix = parse(message('D', b'11=1\x0155=EUR/USD\x0138=5000\x0144=1.25\x01'))
+        self.assertEqual(fix.msgType, 'D')
+        self.assertEqual(fix.get(55), 'EUR/USD')
+        self.assertEqual(fix.getInt(38), 5000)
+        self.assertEqual(fix.getFloat(44), 1.25)
+        self.assertEqual(fix.getBytes(11), b'1')
+        self.assertIsNone(fix.get(117))
+        self.assertEqual(fix.getInt(265, 0), 0)
+        self.assertIn(55, fix)
+        self.assertNotIn(117, fix)
+
+    def test_body_length_and_checksum(self):
+        buffer = message('D', b'11=1\x0155=EUR/USD\x01')
+        start = buffer.index(b'\x0135=') + 1
+        end = buffer.index(b'10=')
+        self.assertEqual(parse(buffer).getInt(9), end - start)
+        self.assertEqual(parse(buffer).getInt(10), checksum(buffer[:end]))
+
+    def test_bad_checksum(self):
+        buffer = message('D', b'11=1\x0155=EUR/USD\x01')
+        bad = buffer[:-4] + b'%03d\x01' % ((int(buffer[-4:-1]) + 1) % 256)
+        with self.assertRaises(FixCodecError):
+            parse(bad)
+        self.assertEqual(parse(bad, check=False).get(55), 'EUR/USD')
+        # a changed value without its checksum
+        with self.assertRaises(FixCodecError):
+            parse(buffer.replace(b'EUR/USD', b'EUR/GBP'))
+
+    def test_bad_body_length(self):
+        buffer = message('D', b'11=1\x0155=EUR/USD\x01')
+        length = parse(buffer).get(9)
+        bad = buffer.replace(b'\x019=%s\x01' % length.encode(), b'\x019=%d\x01' % (int(length) + 1), 1)
+        with self.assertRaises(FixCodecError):
+            parse(bad)
+
+    def test_malformed(self):
+        with self.assertRaises(FixCodecError):
+            parse(b'8=FIX.4.4\x019=5\x0135=0\x0110=000')
+        with self.assertRaises(FixCodecError):
+            parse(b'8=FIX.4.2\x019=5\x0135=0\x0110=000\x01')
+        with self.assertRaises(FixCodecError):
+            parse(message('D', b'11=1\x01novalue\x01'))
+
+    def test_equal_sign_in_value(self):
+        fix = parse(message('j', b'45=3\x0158=a=b==c\x01372=D\x01'))
+        self.assertEqual(fix.get(58), 'a=b==c')
+        self.assertEqual(fix.get(45), '3')
+        self.assertEqual(fix.get(372), 'D')
+        self.assertEqual(fix.msgType, 'j')
+
+
+class TestGroups(unittest.TestCase):
+
+    def test_entry_boundaries(self):
+        # the second entry without 271, and a field of the message after
+        # the last one
+        fix = parse(message('W', b'262=1\x0155=EUR/USD\x01268=3\x01'
+                                 b'269=0\x01270=1.1\x01271=5000\x01299=q1\x01'
+                                 b'269=1\x01270=1.2\x01299=q2\x01'
+                                 b'269=1\x01270=1.3\x01271=7000\x01'
+                                 b'58=text\x01'))
+        entries = fix.groups(ENTRIES)
+        self.assertEqual([(entry.get(269), entry.get(270), entry.get(271), entry.get(299))
+                          for entry in entries],
+                         [('0', '1.1', '5000', 'q1'), ('1', '1.2', None, 'q2'), ('1', '1.3', '7000', None)])
+        self.assertIsNone(entries[-1].get(58))
+        self.assertEqual(fix.get(58), 'text')
+        self.assertEqual(entries[1].getFloat(270), 1.2)
+        self.assertEqual(entries[2].getInt(271), 7000)
+
+    def test_no_group(self):
+        self.assertEqual(parse(message('W', b'262=1\x0155=EUR/USD\x01')).groups(ENTRIES), [])
+        self.assertEqual(parse(message('W', b'262=1\x0155=EUR/USD\x01268=0\x01')).groups(ENTRIES), [])
+
+    def test_wrong_count(self):
+        fix = parse(message('W', b'262=1\x0155=EUR/USD\x01268=2\x01269=0\x01270=1.1\x01'))
+        with self.assertRaises(FixCodecError):
+            fix.groups(ENTRIES)
+
+
+class TestFixStream(unittest.TestCase):
+
+    def setUp(self):
+        self.messages = [message('D', b'11=%d\x0155=EUR/USD\x0158=8=FIX\x01' % i, i) for i in range(3)]
+
+    def test_one_message_per_read(self):
+        stream = FixStream()
+        for buffer in self.messages:
+            self.assertEqual(stream.feed(buffer), [buffer])
+
+    def test_messages_in_one_read(self):
+        stream = FixStream()
+        self.assertEqual(stream.feed(b''.join(self.messages)), self.messages)
+        self.assertEqual(stream.feed(b''), [])
+
+    def test_split_across_reads(self):
+        data = b''.join(self.messages)
+        for size in (1, 2, 5, 7, 13, len(self.messages[0]) + 3):
+            stream = FixStream()
+            received = []
+            for start in range(0, len(data), size):
+                received.extend(stream.feed(data[start:start + size]))
+            self.assertEqual(received, self.messages, size)
+            self.assertEqual(len(stream.buffer), 0)
+
+    def test_garbage_before_message(self):
+        stream = FixStream()
+        self.assertEqual(stream.feed(b'xx' + self.messages[0][:10]), [])
+        self.assertEqual(stream.feed(self.messages[0][10:]), [self.messages[0]])
+
+    def test_bad_body_length(self):
+        with self.assertRaises(FixCodecError):
+            FixStream().feed(b'8=FIX.4.4\x019=x\x0135=0\x01')
+
+
+class TestTemplate(unittest.TestCase):
+
+    def test_round_trip(self):
+        entries = [('0', 1.1, 5000, 'q1'), ('1', 1.2, 5000.0, 'q2')]
+        buffer = message('W', SNAPSHOT.body('7', 'EUR/USD', entries, 'text'), 12)
+        fix = parse(buffer)
+        self.assertEqual(fix.msgType, 'W')
+        self.assertEqual(fix.getInt(34), 12)
+        self.assertEqual(fix.get(49), 'SERVER')
+        self.assertEqual(fix.get(56), 'CLIENT')
+        self.assertEqual(fix.get(262), '7')
+        self.assertEqual(fix.get(58), 'text')
+        self.assertEqual([(entry.get(269), entry.getFloat(270), entry.get(271), entry.get(299))
+                          for entry in fix.groups(ENTRIES)],
+                         [('0', 1.1, '5000', 'q1'), ('1', 1.2, '5000', 'q2')])
+        stream = FixStream()
+        self.assertEqual(stream.feed(buffer[:20]) + stream.feed(buffer[20:]), [buffer])
+
+    def test_none_left_out_of_entry(self):
+        body = SNAPSHOT.body('1', 'EUR/USD', [('0', 1.1, 5000, 'q1'), ('1', None, None, None)], 'text')
+        self.assertEqual(body, b'262=1\x0155=EUR/USD\x01268=2\x01269=0\x01270=1.1\x01271=5000\x01299=q1\x01'
+                               b'269=1\x0158=text\x01')
+
+    def test_floats(self):
+        body = ORDER.body('1', 'EUR/USD', '1', 100000.0, 0.00001)
+        self.assertEqual(body, b'11=1\x0155=EUR/USD\x0154=1\x0138=100000\x0144=0.00001\x01')
+        fix = parse(message('D', ORDER.body('1', 'EUR/USD', '1', 1e-8, 59.84499999999998)))
+        self.assertEqual(fix.get(38), '0.00000001')
+        self.assertEqual(fix.get(44), '59.845')
+        self.assertEqual(formatFloat(-1e-12), '0')
+        self.assertEqual(formatFloat(-0.5), '-0.5')
+        self.assertEqual(formatFloat(1.23456789e12), '1234567890000')
+
+    def test_formatted_entries(self):
+        # entries put together from Fields give the body of their values
+        entries = [('0', 1.1, 5000, 'q1'), ('1', None, None, None)]
+        side = Fields([269])
+        quote = Fields([270, 271, 299])
+        formatted = [side.encode(entry[:1]) + quote.encode(entry[1:]) for entry in entries]
+        self.assertEqual(formatted[1], '269=1\x01')
+        body = SNAPSHOT.body('1', 'EUR/USD', formatted, 'text')
+        self.assertEqual(body, SNAPSHOT.body('1', 'EUR/USD', entries, 'text'))
+        # framed for several sessions, the sum of the body being given
+        header = HEADER.encode('W', 3, '20151022-10:00:00.000')
+        self.assertEqual(frame(header, body, sum(body)), frame(header, body))
+
+    def test_wrong_number_of_values(self):
+        with self.assertRaises(FixCodecError):
+            ORDER.body('1', 'EUR/USD')
+
+
+if __name__ == '__main__':
+    unittest.main()
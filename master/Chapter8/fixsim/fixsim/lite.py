@@ -0,0 +1,390 @@
+import asyncio
+import datetime
+import logging
+import random
+
+import yaml
+
+from fixsim.asynclog import make_async, skip_record_details
+from fixsim.book import Quote, SnapshotGenerator, Subscription, Snapshot, UPDATE_DELETE, SIDE_BUY, SIDE_SELL
+from fixsim.capture import MessageCapture
+from fixsim.codec import Fields, Group, Template, sendingTime
+from fixsim.transport import serve, connect
+
+# The server and the client of server.py and client.py on transport.py
+# rather than quickfix, for running the simulator where quickfix is not
+# installed. Python 3 only. The client sends its market data requests and
+# its orders on one session.
+
+MD_ENTRIES = Group(268, [269, 270, 271, 299, 15, 276])
+RELATED_SYM = Group(146, [55, 460, 167])
+MD_ENTRY_TYPES = Group(267, [269])
+MD_INCREMENTAL_ENTRIES = Group(268, [279, 269, 290, 55, 270, 271, 299, 15, 276])
+# The parts of the entries of MD_ENTRIES and MD_INCREMENTAL_ENTRIES, the
+# fields of a quote being the same in every entry it is in
+MD_ENTRY_TYPE = Fields([269])
+MD_INCREMENTAL_LEVEL = Fields([279, 269, 290, 55])
+MD_QUOTE = Fields([270, 271, 299, 15, 276])
+MD_ENTRY_TYPE_FIELDS = {Quote.BID: MD_ENTRY_TYPE.encode((Quote.BID,)),
+                        Quote.ASK: MD_ENTRY_TYPE.encode((Quote.ASK,))}
+
+MARKET_DATA_REQUEST = Template('V', [262, 263, 264, 265, MD_ENTRY_TYPES, RELATED_SYM])
+MARKET_DATA_REQUEST_REJECT = Template('Y', [262, 281, 58])
+SNAPSHOT = Template('W', [262, 55, MD_ENTRIES])
+INCREMENTAL_REFRESH = Template('X', [262, MD_INCREMENTAL_ENTRIES])
+NEW_ORDER_SINGLE = Template('D', [11, 21, 167, 40, 117, 107, 55, 15, 54, 38, 64, 44, 60, 59])
+EXECUTION_REPORT = Template('8', [37, 17, 64, 15, 39, 55, 54, 11, 44, 6, 31, 32, 14, 38, 150, 151])
+
+MD_UPDATE_TYPE_FULL_REFRESH = 0
+MD_UPDATE_TYPE_INCREMENTAL_REFRESH = 1
+ORD_TYPE_PREVIOUSLY_QUOTED = 'D'
+PRODUCT_CURRENCY = 4
+
+
+class LiteError(Exception):
+    pass
+
+
+class IDGenerator(object):
+    def __init__(self):
+        self.ids = {}
+
+    def generate(self, kind):
+        value = self.ids.get(kind, 0) + 1
+        self.ids[kind] = value
+        return str(value)
+
+
+class LiteServer(object):
+    def __init__(self, logger, interval, rejectRate, subscriptions, capture=None):
+        self.logger = logger
+        self.publishInterval = interval
+        self.rejectRate = rejectRate
+        self.subscriptions = subscriptions
+        self.capture = capture
+        self.idGen = IDGenerator()
+        # symbol -> quote id -> (MD_ENTRIES entry, MD_QUOTE fields) of the
+        # quotes published
+        self.quoteParts = {}
+        # (update action, side, position, symbol) -> MD_INCREMENTAL_LEVEL fields
+        self.levelFields = {}
+
+    async def run(self, host, port, senderCompID):
+        server = await serve(self, host, port, senderCompID, self.logger, self.capture)
+        async with server:
+            while True:
+                self.publishMarketData()
+                await asyncio.sleep(self.publishInterval)
+
+    def onLogon(self, session):
+        self.logger.info("LiteServer: logon %s", session)
+
+    def onLogout(self, session):
+        self.logger.info("LiteServer: logout %s", session)
+        for subscription in self.subscriptions.values():
+            subscription.discardSession(session)
+
+    def fromApp(self, message, session):
+        msgType = message.msgType
+        if msgType == 'D':
+            self.onNewOrderSingle(message, session)
+        elif msgType == 'V':
+            self.onMarketDataRequest(message, session)
+
+    def publishMarketData(self):
+        # As the quickfix server, each symbol's bodies are built once per
+        # publish whatever the number of sessions: a snapshot for the
+        # sessions on full refresh and the ones which just subscribed for
+        # updates, and the changed levels for the other incremental sessions.
+        # The sessions are given the sum of the body's bytes along with it,
+        # so that framing it only adds up their own header.
+        for subscription in self.subscriptions.values():
+            if not subscription.hasSessions():
+                continue
+            changes = subscription.publishOrderBook()
+            fullSessions = subscription.fullRefreshSessions()
+            if fullSessions:
+                body = self.createSnapshot(subscription)
+                bodySum = sum(body)
+                for session in fullSessions:
+                    session.sendBody(SNAPSHOT.msgType, body, bodySum)
+                subscription.snapshotSessions.clear()
+            incrementalSessions = subscription.incrementalRefreshSessions() - fullSessions
+            if changes and incrementalSessions:
+                body = self.createIncrementalRefresh(subscription, changes)
+                bodySum = sum(body)
+                for session in incrementalSessions:
+                    session.sendBody(INCREMENTAL_REFRESH.msgType, body, bodySum)
+
+    def publishedQuotes(self, subscription):
+        # The (MD_ENTRIES entry, MD_QUOTE fields) of the quotes published by
+        # quote id, see formatQuote(). The parts of the quotes no longer in
+        # the order book are dropped once they are many more than the others.
+        symbol = subscription.symbol
+        quoteParts = self.quoteParts.get(symbol)
+        if quoteParts is None:
+            quoteParts = self.quoteParts[symbol] = {}
+        elif len(quoteParts) > 4 * len(subscription.orderbook.quotes):
+            quoteParts = self.quoteParts[symbol] = dict((quote.id, quoteParts[quote.id])
+                                                        for quote in subscription.orderbook
+                                                        if quote.id in quoteParts)
+        return quoteParts
+
+    def formatQuote(self, quoteParts, quote, currency):
+        # A quote keeps its price and size as long as its id, so they are only
+        # formatted the first time it is published
+        fields = MD_QUOTE.encode((quote.price, quote.size, quote.id, currency, 'A'))
+        parts = quoteParts[quote.id] = (MD_ENTRY_TYPE_FIELDS[quote.side] + fields, fields)
+        return parts
+
+    def createSnapshot(self, subscription):
+        quoteParts = self.publishedQuotes(subscription)
+        currency = subscription.currency
+        entries = []
+        for quote in subscription.orderbook:
+            parts = quoteParts.get(quote.id)
+            if parts is None:
+                parts = self.formatQuote(quoteParts, quote, currency)
+            entries.append(parts[0])
+        return SNAPSHOT.body(self.idGen.generate('req'), subscription.symbol, entries)
+
+    def createIncrementalRefresh(self, subscription, changes):
+        # One entry per changed level, found by its side and position
+        quoteParts = self.publishedQuotes(subscription)
+        symbol = subscription.symbol
+        currency = subscription.currency
+        levelFields = self.levelFields
+        entries = []
+        for action, side, position, quote in changes:
+            if quote is None:
+                entries.append((action, side, position, symbol, None, None, None, None, None))
+                continue
+            level = (action, side, position, symbol)
+            fields = levelFields.get(level)
+            if fields is None:
+                fields = levelFields[level] = MD_INCREMENTAL_LEVEL.encode(level)
+            parts = quoteParts.get(quote.id)
+            if parts is None:
+                parts = self.formatQuote(quoteParts, quote, currency)
+            entries.append(fields + parts[1])
+        return INCREMENTAL_REFRESH.body(self.idGen.generate('req'), entries)
+
+    def onMarketDataRequest(self, message, session):
+        requestID = message.get(262)
+        relatedSym = message.groups(RELATED_SYM)
+        if not relatedSym:
+            self.sendMarketDataReject(requestID, "No symbol", session)
+            return
+        if relatedSym[0].getInt(460) != PRODUCT_CURRENCY:
+            self.sendMarketDataReject(requestID, "Product is not CURRENCY", session)
+            return
+        updateType = message.getInt(265, MD_UPDATE_TYPE_FULL_REFRESH)
+        if updateType not in (MD_UPDATE_TYPE_FULL_REFRESH, MD_UPDATE_TYPE_INCREMENTAL_REFRESH):
+            self.sendMarketDataReject(requestID, "Unknown MDUpdateType %d" % updateType, session)
+            return
+
+        symbol = relatedSym[0].get(55)
+        subscription = self.subscriptions.get(symbol)
+        if subscription is None:
+            self.sendMarketDataReject(requestID, "Unknown symbol: %s" % symbol, session)
+            return
+        subscription.addSession(session, updateType == MD_UPDATE_TYPE_INCREMENTAL_REFRESH)
+
+    def sendMarketDataReject(self, requestID, reason, session):
+        self.logger.error("LiteServer: reject %s", reason)
+        session.send(MARKET_DATA_REQUEST_REJECT, requestID, '0', reason)
+
+    def getSettlementDate(self):
+        tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+        return tomorrow.strftime('%Y%m%d')
+
+    def onNewOrderSingle(self, message, session):
+        if message.get(40) != ORD_TYPE_PREVIOUSLY_QUOTED:
+            raise LiteError("OrdType %s is not PREVIOUSLY_QUOTED" % message.get(40))
+
+        symbol = message.get(55)
+        side = message.get(54)
+        clOrdID = message.get(11)
+        orderID = self.idGen.generate('order')
+        execID = self.idGen.generate('exec')
+        try:
+            reject_chance = random.choice(range(1, 101))
+            if self.rejectRate > reject_chance:
+                raise LiteError("Rejected by cruel destiny %s" % str((reject_chance, self.rejectRate)))
+
+            subscription = self.subscriptions[symbol]
+            quote = subscription.orderbook.get(message.get(117))
+            if quote is None:
+                raise LiteError("Unknown or expired quote %s" % message.get(117))
+
+            execPrice = message.getFloat(44)
+            execSize = message.getFloat(38)
+            if execSize > quote.size:
+                raise LiteError("size to large for quote")
+
+            if abs(execPrice - quote.price) > 0.0000001:
+                raise LiteError("Trade price not equal to quote")
+
+            price, size = message.get(44), message.get(38)
+            session.send(EXECUTION_REPORT, orderID, execID, self.getSettlementDate(), subscription.currency,
+                         '2', symbol, side, clOrdID, price, price, price, size, size, size, 'F', 0)
+        except Exception as e:
+            self.logger.info("LiteServer: order %s rejected: %s", clOrdID, e)
+            session.send(EXECUTION_REPORT, orderID, execID, '', message.get(15),
+                         '8', symbol, side, clOrdID, 0, 0, 0, 0, 0, 0, '8', 0)
+
+
+class LiteClient(object):
+    def __init__(self, logger, skipSnapshotChance, subscribeInterval, symbols, capture=None,
+                 incremental=False):
+        self.logger = logger
+        self.skipSnapshotChance = skipSnapshotChance
+        self.subscribeInterval = subscribeInterval
+        self.symbols = symbols
+        self.capture = capture
+        # With incremental, the server sends one snapshot per symbol and
+        # then only the levels which change, applied to self.snapshots
+        self.incremental = incremental
+        self.snapshots = {}
+        self.session = None
+        self.idGen = IDGenerator()
+
+    async def run(self, host, port, senderCompID, targetCompID, heartBtInt=30):
+        self.session = await connect(self, host, port, senderCompID, targetCompID, heartBtInt, self.logger,
+                                     self.capture)
+        while self.session.isLoggedOn():
+            self.subscribe()
+            await asyncio.sleep(self.subscribeInterval)
+
+    def onLogon(self, session):
+        self.logger.info("LiteClient: logon %s", session)
+
+    def onLogout(self, session):
+        self.logger.info("LiteClient: logout %s", session)
+
+    def fromApp(self, message, session):
+        msgType = message.msgType
+        if msgType == 'W':
+            self.onMarketDataSnapshotFullRefresh(message, session)
+        elif msgType == 'X':
+            self.onMarketDataIncrementalRefresh(message, session)
+        elif msgType == '8':
+            self.logger.info("LiteClient: execution report %s", message)
+        elif msgType == 'Y':
+            self.logger.error("LiteClient: market data request rejected: %s", message.get(58))
+
+    def subscribe(self):
+        updateType = MD_UPDATE_TYPE_INCREMENTAL_REFRESH if self.incremental else MD_UPDATE_TYPE_FULL_REFRESH
+        for symbol in self.symbols:
+            self.session.send(MARKET_DATA_REQUEST, self.idGen.generate('req'), '1', 0,
+                              updateType, [('0',), ('1',)],
+                              [(symbol, PRODUCT_CURRENCY, 'FOR')])
+
+    def skipSnapshot(self):
+        skip_chance = random.choice(range(1, 101))
+        return self.skipSnapshotChance > skip_chance
+
+    def onMarketDataSnapshotFullRefresh(self, message, session):
+        if self.incremental:
+            self.onIncrementalSnapshot(message, session)
+            return
+        # Only the quote the order is made for is decoded
+        if self.skipSnapshot():
+            return
+
+        entries = message.groups(MD_ENTRIES)
+        if not entries:
+            return
+        entry = random.choice(entries)
+        side = SIDE_SELL if entry.get(269) == Quote.BID else SIDE_BUY
+        session.send(NEW_ORDER_SINGLE, self.idGen.generate('order'), '2', 'FOR',
+                     ORD_TYPE_PREVIOUSLY_QUOTED, entry.get(299), 'SPOT', message.get(55),
+                     entry.get(15), side, entry.get(271), 'SP', entry.get(270),
+                     sendingTime(), '3')
+
+    def onIncrementalSnapshot(self, message, session):
+        # The whole book is kept for the updates to apply to, the skip
+        # chance being drawn once it is
+        symbol = message.get(55)
+        snapshot = Snapshot(symbol)
+        for entry in message.groups(MD_ENTRIES):
+            quote = Quote(None, entry.get(270), entry.get(271), entry.get(299))
+            if entry.get(269) == Quote.BID:
+                snapshot.addBid(quote)
+            else:
+                snapshot.addAsk(quote)
+        self.snapshots[symbol] = snapshot
+        if not self.skipSnapshot():
+            self.makeOrder(snapshot, session)
+
+    def onMarketDataIncrementalRefresh(self, message, session):
+        updated = []
+        for entry in message.groups(MD_INCREMENTAL_ENTRIES):
+            symbol = entry.get(55)
+            snapshot = self.snapshots.get(symbol)
+            if snapshot is None:
+                self.logger.info("LiteClient: update for %s before its snapshot", symbol)
+                continue
+            action = entry.get(279)
+            quote = None
+            if action != UPDATE_DELETE:
+                quote = Quote(None, entry.get(270), entry.get(271), entry.get(299))
+            snapshot.update(action, entry.get(269), entry.getInt(290), quote)
+            if snapshot not in updated:
+                updated.append(snapshot)
+
+        for snapshot in updated:
+            if not self.skipSnapshot():
+                self.makeOrder(snapshot, session)
+
+    def makeOrder(self, snapshot, session):
+        # prices and sizes are sent back as they were received
+        quote = snapshot.getRandomQuote()
+        session.send(NEW_ORDER_SINGLE, self.idGen.generate('order'), '2', 'FOR',
+                     ORD_TYPE_PREVIOUSLY_QUOTED, quote.id, 'SPOT', snapshot.symbol,
+                     snapshot.symbol.split("/")[0], quote.side, quote.size, 'SP', quote.price,
+                     sendingTime(), '3')
+
+
+def load_yaml(path):
+    with open(path, 'r') as stream:
+        return yaml.safe_load(stream)
+
+
+def create_server(config, logger):
+    subscriptions = {}
+    for source in config['instruments']:
+        variation = source.get('variation', None) or {}
+        generator = SnapshotGenerator(variation.get('step', 0), variation.get('limit', 0),
+                                      variation.get('change_probability', 1))
+        for quote in source['bid']:
+            generator.addQuote(Quote(Quote.BID, quote['price'], quote['size']))
+        for quote in source['ask']:
+            generator.addQuote(Quote(Quote.ASK, quote['price'], quote['size']))
+        subscriptions[source['symbol']] = Subscription(source['symbol'], generator)
+
+    return LiteServer(logger, config.get('publish_interval', 1), config.get('reject_rate', 0),
+                      subscriptions, create_capture(config))
+
+
+def create_client(config, logger):
+    symbols = [instrument['symbol'] for instrument in config['instruments']]
+    return LiteClient(logger, config.get('skip_snapshot_chance', 0), config.get('subscribe_interval', 1),
+                      symbols, create_capture(config), config.get('update_type', 'full') == 'incremental')
+
+
+def create_capture(config):
+    path = config.get('capture', None)
+    if not path:
+        return None
+    return MessageCapture(path)
+
+
+def create_logger(name, level='info'):
+    # Written by a background thread, see asynclog.py
+    logger = logging.getLogger(name)
+    logger.setLevel(getattr(logging, level.upper()))
+    logger.addHandler(logging.StreamHandler())
+    skip_record_details()
+    make_async(logger)
+    return logger
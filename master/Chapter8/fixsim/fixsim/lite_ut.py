@@ -0,0 +1,96 @@
+import itertools
+import logging
+import unittest
+
+from fixsim.book import Quote, SnapshotGenerator, Subscription
+from fixsim.codec import Header, frame, parse, sendingTime
+from fixsim.lite import LiteServer, LiteClient, MARKET_DATA_REQUEST, MD_UPDATE_TYPE_FULL_REFRESH, \
+    MD_UPDATE_TYPE_INCREMENTAL_REFRESH, PRODUCT_CURRENCY
+
+
+class FakeSession(object):
+    # Keeps the messages sent to it, parsed
+    def __init__(self):
+        self.header = Header('SERVER', 'CLIENT')
+        self.messages = []
+
+    def sendBody(self, msgType, body, bodySum=None):
+        self.messages.append(parse(frame(self.header.encode(msgType, 1, sendingTime()), body, bodySum)))
+
+    def send(self, template, *values):
+        self.sendBody(template.msgType, template.body(*values))
+
+
+def create_logger():
+    logger = logging.getLogger('lite_ut')
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    return logger
+
+
+def create_server():
+    generator = SnapshotGenerator(0.1, 2, 0.3, itertools.count(1))
+    for level in range(5):
+        generator.addQuote(Quote(Quote.BID, 100.0 - level, 10 + level))
+        generator.addQuote(Quote(Quote.ASK, 100.5 + level, 10 + level))
+    return LiteServer(create_logger(), 1, 0, {'EUR/USD': Subscription('EUR/USD', generator)})
+
+
+def request(updateType):
+    session = FakeSession()
+    session.send(MARKET_DATA_REQUEST, '1', '1', 0, updateType, [('0',), ('1',)],
+                 [('EUR/USD', PRODUCT_CURRENCY, 'FOR')])
+    return session.messages[0]
+
+
+class TestLiteServer(unittest.TestCase):
+
+    def test_incremental_refresh(self):
+        server = create_server()
+        full = FakeSession()
+        incremental = FakeSession()
+        server.onMarketDataRequest(request(MD_UPDATE_TYPE_FULL_REFRESH), full)
+        server.onMarketDataRequest(request(MD_UPDATE_TYPE_INCREMENTAL_REFRESH), incremental)
+        # skipping every update, the chance being drawn from 1 to 100, as the
+        # client has no session to send orders on
+        client = LiteClient(create_logger(), 101, 1, ['EUR/USD'], incremental=True)
+        subscription = server.subscriptions['EUR/USD']
+        for _ in range(30):
+            server.publishMarketData()
+            for message in incremental.messages:
+                client.fromApp(message, None)
+            del incremental.messages[:]
+            snapshot = client.snapshots['EUR/USD']
+            self.assertEqual([(float(quote.price), float(quote.size), quote.id)
+                              for quote in snapshot.bid + snapshot.ask],
+                             [(quote.price, quote.size, quote.id) for quote in subscription.orderbook])
+        self.assertEqual([message.msgType for message in full.messages], ['W'] * 30)
+
+    def test_order_on_updated_book(self):
+        server = create_server()
+        session = FakeSession()
+        server.onMarketDataRequest(request(MD_UPDATE_TYPE_INCREMENTAL_REFRESH), session)
+        client = LiteClient(create_logger(), 0, 1, ['EUR/USD'], incremental=True)
+        orders = FakeSession()
+        for _ in range(5):
+            server.publishMarketData()
+            for message in session.messages:
+                client.fromApp(message, orders)
+            del session.messages[:]
+        # one per publish changing the book
+        self.assertTrue(orders.messages)
+        order = orders.messages[-1]
+        quote = server.subscriptions['EUR/USD'].orderbook.get(order.get(117))
+        self.assertIsNotNone(quote)
+        self.assertEqual(order.getFloat(44), quote.price)
+
+    def test_unknown_update_type_rejected(self):
+        server = create_server()
+        session = FakeSession()
+        server.onMarketDataRequest(request(5), session)
+        self.assertEqual([message.msgType for message in session.messages], ['Y'])
+        self.assertFalse(server.subscriptions['EUR/USD'].hasSessions())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import asyncio
+import random
+import time
+
+from fixsim.book import Quote
+from fixsim.codec import sendingTime
+from fixsim.lite import (MARKET_DATA_REQUEST, NEW_ORDER_SINGLE, MD_ENTRIES, MD_UPDATE_TYPE_FULL_REFRESH,
+                         ORD_TYPE_PREVIOUSLY_QUOTED, PRODUCT_CURRENCY, SIDE_BUY, SIDE_SELL)
+from fixsim.transport import connect
+
+# Load for a fixsim acceptor: sessions which subscribe to every symbol and
+# then send orders for quotes of the last snapshots, at a given rate or each
+# as soon as the previous one is answered, recording the time from each
+# NewOrderSingle to its ExecutionReport. Python 3 only.
+
+
+def percentile(values, p):
+    # Nearest rank percentile of sorted values
+    if not values:
+        return float('nan')
+    rank = int(round(p / 100.0 * len(values) + 0.5)) - 1
+    return values[min(max(rank, 0), len(values) - 1)]
+
+
+class LoadSession(object):
+    def __init__(self, symbols):
+        self.symbols = symbols
+        self.session = None
+        self.snapshots = {}
+        self.ready = asyncio.Event()
+        self.answered = None
+        self.orderID = 0
+        # ClOrdID -> perf_counter() when sent
+        self.pending = {}
+        self.latencies = []
+        self.nbSent = 0
+        self.fills = 0
+        self.rejects = 0
+        self.lastAnswer = None
+
+    def onLogon(self, session):
+        pass
+
+    def onLogout(self, session):
+        self.ready.set()
+        if self.answered is not None and not self.answered.done():
+            self.answered.set_result(None)
+
+    def fromApp(self, message, session):
+        msgType = message.msgType
+        if msgType == '8':
+            now = time.perf_counter()
+            sent = self.pending.pop(message.get(11), None)
+            if sent is None:
+                return
+            self.latencies.append(now - sent)
+            self.lastAnswer = now
+            if message.get(39) == '2':
+                self.fills += 1
+            else:
+                self.rejects += 1
+            if self.answered is not None and not self.answered.done():
+                self.answered.set_result(None)
+        elif msgType == 'W':
+            self.snapshots[message.get(55)] = message
+            if len(self.snapshots) == len(self.symbols):
+                self.ready.set()
+        elif msgType == 'Y':
+            raise RuntimeError("market data request rejected: %s" % message.get(58))
+
+    def subscribe(self):
+        for symbol in self.symbols:
+            self.session.send(MARKET_DATA_REQUEST, symbol, '1', 0, MD_UPDATE_TYPE_FULL_REFRESH,
+                              [('0',), ('1',)], [(symbol, PRODUCT_CURRENCY, 'FOR')])
+
+    def sendOrder(self):
+        message = self.snapshots[random.choice(self.symbols)]
+        entry = random.choice(message.groups(MD_ENTRIES))
+        side = SIDE_SELL if entry.get(269) == Quote.BID else SIDE_BUY
+        self.orderID += 1
+        clOrdID = str(self.orderID)
+        self.pending[clOrdID] = time.perf_counter()
+        self.session.send(NEW_ORDER_SINGLE, clOrdID, '2', 'FOR', ORD_TYPE_PREVIOUSLY_QUOTED,
+                          entry.get(299), 'SPOT', message.get(55), entry.get(15), side,
+                          entry.get(271), 'SP', entry.get(270), sendingTime(), '3')
+        self.nbSent += 1
+
+    async def run(self, rate, end):
+        # Orders until end, every 1 / rate seconds whether answered or not,
+        # or with rate 0 one at a time
+        loop = asyncio.get_running_loop()
+        if rate > 0:
+            interval = 1.0 / rate
+            # sessions spread over the first interval
+            nextOrder = loop.time() + random.random() * interval
+            while nextOrder < end and self.session.isLoggedOn():
+                delay = nextOrder - loop.time()
+                await asyncio.sleep(max(delay, 0))
+                self.sendOrder()
+                nextOrder += interval
+        else:
+            while loop.time() < end and self.session.isLoggedOn():
+                self.answered = loop.create_future()
+                self.sendOrder()
+                await self.answered
+            self.answered = None
+
+
+class LoadResult(object):
+    def __init__(self, nbSessions, loads, elapsed):
+        self.nbSessions = nbSessions
+        self.loads = loads
+        self.elapsed = elapsed
+        self.sent = sum(load.nbSent for load in loads)
+        self.fills = sum(load.fills for load in loads)
+        self.rejects = sum(load.rejects for load in loads)
+        self.answered = self.fills + self.rejects
+        self.latencies = sorted(latency for load in loads for latency in load.latencies)
+
+    def throughput(self):
+        return self.answered / self.elapsed
+
+    def percentiles(self, ps, latencies=None):
+        # In milliseconds
+        if latencies is None:
+            latencies = self.latencies
+        return [percentile(latencies, p) * 1000 for p in ps]
+
+
+async def runLoad(host, port, nbSessions, rate, duration, symbols, senderPrefix, targetCompID,
+                  heartBtInt=30, timeout=30):
+    # Logs nbSessions sessions on, waits for their first snapshots and
+    # sends orders for duration seconds at rate orders per second in all,
+    # 0 for as fast as the acceptor answers. The answers still expected
+    # are waited for at most timeout seconds.
+    loop = asyncio.get_running_loop()
+    loads = [LoadSession(symbols) for i in range(nbSessions)]
+    sessions = await asyncio.gather(*[connect(load, host, port, '%s-%04d' % (senderPrefix, i), targetCompID,
+                                              heartBtInt)
+                                      for i, load in enumerate(loads)])
+    for load, session in zip(loads, sessions):
+        load.session = session
+        load.subscribe()
+    await asyncio.wait_for(asyncio.gather(*[load.ready.wait() for load in loads]), timeout)
+
+    start = time.perf_counter()
+    end = loop.time() + duration
+    await asyncio.gather(*[load.run(rate / nbSessions, end) for load in loads])
+    deadline = loop.time() + timeout
+    while any(load.pending for load in loads) and loop.time() < deadline \
+            and all(session.isLoggedOn() for session in sessions):
+        await asyncio.sleep(0.01)
+    answers = [load.lastAnswer for load in loads if load.lastAnswer is not None]
+    elapsed = (max(answers) if answers else time.perf_counter()) - start
+
+    for session in sessions:
+        session.logout()
+    return LoadResult(nbSessions, loads, elapsed)
@@ -1,61 +1,12 @@
 import quickfix
-import copy
-import uuid
 import random
 import datetime
 from twisted.internet import task
 
-from sim import (FixSimError, float_range,
+from sim import (FixSimError,
                  FixSimApplication, create_fix_version,
-                 instance_safe_call, create_logger, IncrementID, load_yaml)
-
-
-class Quote(object):
-    BID = '0'
-    ASK = '1'
-
-    def __init__(self, side, price, size):
-        super(Quote, self).__init__()
-        self.side = side
-        self.price = price
-        self.size = size
-        self.id = None
-
-    def __repr__(self):
-        return "(%s %s, %s)" % (self.side, str(self.price), str(self.size))
-
-
-class Subscription(object):
-    def __init__(self, symbol, generator):
-        super(Subscription, self).__init__()
-        self.symbol = symbol
-        self.currency = self.symbol.split("/")[0]
-        self.sessions = set()
-        self.generator = generator
-
-    def createOrderBook(self):
-        self.orderbook = OrderBook(self.generator.generate())
-
-    def getFirstCurrency(self):
-        return self.currency
-
-    def hasSessions(self):
-        return len(self.sessions) > 0
-
-    def removeSession(self, sessionID):
-        self.sessions.remove(sessionID)
-
-    def addSession(self, sessionID):
-        self.sessions.add(sessionID)
-
-    def __iter__(self):
-        return self.sessions.__iter__()
-
-    def __repr__(self):
-        return "<Subscription %s>" % self.symbol
-
-    def __len__(self):
-        return self.sessions.__len__()
+                 instance_safe_call, create_logger, create_capture, IncrementID, load_yaml)
+from book import Quote, OrderBook, SnapshotGenerator, Subscription
 
 
 class Subscriptions(object):
@@ -78,74 +29,6 @@ class Subscriptions(object):
         return self.subscriptions.__repr__()
 
 
-class OrderBook(object):
-    def __init__(self, quotes):
-        self.quotes = []
-
-        bid = []
-        ask = []
-        for quote in quotes:
-            if quote.side == Quote.BID:
-                bid.append(quote)
-            else:
-                ask.append(quote)
-
-        if len(ask) != len(bid):
-            raise FixSimError("len(ask) != len(bid)")
-
-        bid, ask = self._sort(bid, ask)
-        self._normalise(bid, ask)
-        # print "BID", bid
-        # print "ASK", ask
-        result = bid + ask
-        # print "result", result
-        self.quotes = result
-
-    def _sort(self, bid, ask):
-        bid_new = sorted(bid, key=lambda x: x.price, reverse=True)
-        ask_new = sorted(ask, key=lambda x: x.price)
-        return bid_new, ask_new
-
-    def _normalise(self, bid, ask):
-        for b, a in zip(bid, ask):
-            if b.price > a.price:
-                b.price = a.price
-
-    def __iter__(self):
-        return self.quotes.__iter__()
-
-    def get(self, quoteID):
-        for quote in self.quotes:
-            if quote.id == quoteID:
-                return quote
-
-        return None
-
-
-class SnapshotGenerator(object):
-    def __init__(self, step, limit):
-        self.sources = []
-        self.deltas = float_range(0, limit, step)
-        if len(self.deltas) == 0:
-            self.deltas = [0]
-
-        self.orderBook = None
-
-    def addQuote(self, quote):
-        self.sources.append(quote)
-
-    def modify(self, quote):
-        quote.id = str(uuid.uuid4())
-        delta = random.choice(self.deltas)
-        quote.price += delta
-
-    def generate(self):
-        for source in self.sources:
-            quote = copy.copy(source)
-            self.modify(quote)
-            yield quote
-
-
 class IDGenerator(object):
     def __init__(self):
         self._orderID = IncrementID()
@@ -169,10 +52,12 @@ def create_acceptor(acceptor_config, simulation_config):
             variation = source.get('variation', None)
             if variation:
                 step, limit = variation.get('step', 0), variation.get('limit', 0)
+                changeProbability = variation.get('change_probability', 1)
             else:
-                step, limit = 0, 0
+                step, limit, changeProbability = 0, 0, 1
 
-            subscription = Subscription(source['symbol'], SnapshotGenerator(step, limit))
+            subscription = Subscription(source['symbol'],
+                                        SnapshotGenerator(step, limit, changeProbability))
 
             for quote in source['bid']:
                 subscription.generator.addQuote(Quote(Quote.BID, quote['price'], quote['size']))
@@ -195,7 +80,8 @@ def create_acceptor(acceptor_config, simulation_config):
     logger = create_logger(config)
     rejectRate = config.get("reject_rate", 0)
 
-    application = Server(fix_version, logger, publish_interval, rejectRate, subscriptions)
+    application = Server(fix_version, logger, publish_interval, rejectRate, subscriptions,
+                         create_capture(config))
     storeFactory = quickfix.FileStoreFactory(settings)
     logFactory = quickfix.ScreenLogFactory(settings)
     acceptor = quickfix.SocketAcceptor(application, storeFactory, settings, logFactory)
@@ -203,8 +89,8 @@ def create_acceptor(acceptor_config, simulation_config):
 
 
 class Server(FixSimApplication):
-    def __init__(self, fixVersion, logger, interval, rejectRate, subscriptions):
-        super(Server, self).__init__(fixVersion, logger)
+    def __init__(self, fixVersion, logger, interval, rejectRate, subscriptions, capture=None):
+        super(Server, self).__init__(fixVersion, logger, capture)
         self.rejectRate = rejectRate
         self.idGen = IDGenerator()
         self.subscriptions = subscriptions
@@ -222,50 +108,88 @@ class Server(FixSimApplication):
         return
 
     def onLogout(self, sessionID):
-        return
-
-    def toAdmin(self, sessionID, message):
-        return
-
-    def fromAdmin(self, sessionID, message):
-        return
-
-    def toApp(self, sessionID, message):
-        return
+        # A session logging on again subscribes again
+        for subscription in self.subscriptions:
+            subscription.discardSession(sessionID)
 
     @instance_safe_call
     def sendToTarget(self, message, sessionID):
-        self.logger.info("FixServer:SEND TO SESSION %s", message)
+        self.logger.debug("FixServer:SEND TO SESSION %s", message)
         quickfix.Session.sendToTarget(message, sessionID)
 
-    @instance_safe_call
-    def publishMarketData(self):
-        self.logger.info("FixServer: publishMarketData %s", self.subscriptions)
-        for subscription in self.subscriptions:
-            if not subscription.hasSessions():
-                self.logger.info("FixServer:No session subscribed, skip publish symbol %s", subscription.symbol)
-                continue
-
-            message = self.fixVersion.MarketDataSnapshotFullRefresh()
-            message.setField(quickfix.Symbol(subscription.symbol))
-            message.setField(quickfix.MDReqID(self.idGen.reqID()))
-
-            group = self.fixVersion.MarketDataSnapshotFullRefresh().NoMDEntries()
-
-            subscription.createOrderBook()
-            for quote in subscription.orderbook:
-                self.logger.info('FixServer:add quote to fix message %s', str(quote))
-
-                group.setField(quickfix.MDEntryType(quote.side))
+    def sendToSessions(self, message, sessionIDs):
+        # The same message to every session, quickfix filling the header for
+        # each one. Returns the sessions which are gone.
+        self.logger.debug("FixServer:SEND TO %d SESSIONS %s", len(sessionIDs), message)
+        lost = []
+        for sessionID in sessionIDs:
+            try:
+                quickfix.Session.sendToTarget(message, sessionID)
+            except quickfix.SessionNotFound:
+                self.logger.error("FixServer:Session %s not found", sessionID)
+                lost.append(sessionID)
+        return lost
+
+    def createSnapshot(self, subscription):
+        message = self.fixVersion.MarketDataSnapshotFullRefresh()
+        message.setField(quickfix.Symbol(subscription.symbol))
+        message.setField(quickfix.MDReqID(self.idGen.reqID()))
+
+        group = self.fixVersion.MarketDataSnapshotFullRefresh().NoMDEntries()
+        for quote in subscription.orderbook:
+            group.setField(quickfix.MDEntryType(quote.side))
+            group.setField(quickfix.MDEntryPx(quote.price))
+            group.setField(quickfix.MDEntrySize(quote.size))
+            group.setField(quickfix.QuoteEntryID(quote.id))
+            group.setField(quickfix.Currency(subscription.currency))
+            group.setField(quickfix.QuoteCondition(quickfix.QuoteCondition_OPEN_ACTIVE))
+            message.addGroup(group)
+        return message
+
+    def createIncrementalRefresh(self, subscription, changes):
+        # One entry per changed level, found by its side and position
+        message = self.fixVersion.MarketDataIncrementalRefresh()
+        message.setField(quickfix.MDReqID(self.idGen.reqID()))
+
+        for action, side, position, quote in changes:
+            group = self.fixVersion.MarketDataIncrementalRefresh.NoMDEntries()
+            group.setField(quickfix.MDUpdateAction(action))
+            group.setField(quickfix.MDEntryType(side))
+            group.setField(quickfix.MDEntryPositionNo(position))
+            group.setField(quickfix.Symbol(subscription.symbol))
+            if quote is not None:
                 group.setField(quickfix.MDEntryPx(quote.price))
                 group.setField(quickfix.MDEntrySize(quote.size))
                 group.setField(quickfix.QuoteEntryID(quote.id))
                 group.setField(quickfix.Currency(subscription.currency))
                 group.setField(quickfix.QuoteCondition(quickfix.QuoteCondition_OPEN_ACTIVE))
-                message.addGroup(group)
+            message.addGroup(group)
+        return message
 
-            for sessionID in subscription:
-                self.sendToTarget(message, sessionID)
+    @instance_safe_call
+    def publishMarketData(self):
+        # Each symbol's messages are built once per publish whatever the
+        # number of sessions: a snapshot for the sessions on full refresh
+        # and the ones which just subscribed for updates, and the changed
+        # levels for the other incremental sessions
+        self.logger.debug("FixServer: publishMarketData %s", self.subscriptions)
+        for subscription in self.subscriptions:
+            if not subscription.hasSessions():
+                self.logger.debug("FixServer:No session subscribed, skip publish symbol %s", subscription.symbol)
+                continue
+
+            changes = subscription.publishOrderBook()
+            lost = []
+            fullSessions = subscription.fullRefreshSessions()
+            if fullSessions:
+                lost += self.sendToSessions(self.createSnapshot(subscription), fullSessions)
+                subscription.snapshotSessions.clear()
+            incrementalSessions = subscription.incrementalRefreshSessions() - fullSessions
+            if changes and incrementalSessions:
+                lost += self.sendToSessions(self.createIncrementalRefresh(subscription, changes),
+                                            incrementalSessions)
+            for sessionID in lost:
+                subscription.discardSession(sessionID)
 
     def onMarketDataRequest(self, message, sessionID):
         requestID = quickfix.MDReqID()
@@ -292,13 +216,19 @@ class Server(FixSimApplication):
             # ask
             message.getGroup(2, entryType)
 
+            updateType = quickfix.MDUpdateType()
+            incremental = False
+            if message.isSetField(updateType.getField()):
+                message.getField(updateType)
+                incremental = updateType.getValue() == quickfix.MDUpdateType_INCREMENTAL_REFRESH
+
             symbol = symbolFix.getValue()
             subscription = self.subscriptions.get(symbol)
             if subscription is None:
                 self.sendMarketDataReject(requestID, "Unknown symbol: %s" % str(symbol), sessionID)
                 return
 
-            subscription.addSession(sessionID)
+            subscription.addSession(sessionID, incremental)
         except Exception as e:
             print e,e.args
             self.sendMarketDataReject(requestID, str(e), sessionID)
@@ -352,6 +282,8 @@ class Server(FixSimApplication):
 
             subscription = self.subscriptions.get(symbol.getValue())
             quote = subscription.orderbook.get(quoteID.getValue())
+            if quote is None:
+                raise FixSimError("Unknown or expired quote %s" % quoteID.getValue())
 
             execPrice = price.getValue()
             execSize = orderQty.getValue()
@@ -6,6 +6,9 @@ import datetime
 import yaml
 from twisted.internet import task
 
+from asynclog import make_async, skip_record_details
+from capture import MessageCapture
+
 
 class MarketDataError(quickfix.Exception):
     pass
@@ -28,29 +31,45 @@ def instance_safe_call(fn):
 
 
 class FixSimApplication(quickfix.Application):
-    def __init__(self, fixVersion, logger):
+    # With a capture, every message sent or received is captured as quickfix
+    # writes or reads it, the log keeping them at debug level only
+    def __init__(self, fixVersion, logger, capture=None):
         super(FixSimApplication, self).__init__()
         self.fixVersion = fixVersion
         self.logger = logger
+        self.capture = capture
+
+    def toAdmin(self, message, sessionID):
+        if self.capture is not None:
+            self.capture.outgoing(sessionID, message.toString())
+
+    def fromAdmin(self, message, sessionID):
+        if self.capture is not None:
+            self.capture.incoming(sessionID, message.toString())
+
+    def toApp(self, message, sessionID):
+        if self.capture is not None:
+            self.capture.outgoing(sessionID, message.toString())
 
     @instance_safe_call
     def sendToTarget(self, message, sessionID):
         if sessionID is None:
             raise FixSimError("Invalid Fix Session")
 
-        self.logger.info("FixSimApplication:SEND TO TARGET %s", message)
+        self.logger.debug("FixSimApplication:SEND TO TARGET %s", message)
         quickfix.Session.sendToTarget(message, sessionID)
 
     @instance_safe_call
     def fromApp(self, message, sessionID):
-        print "FROM APP"
+        if self.capture is not None:
+            self.capture.incoming(sessionID, message.toString())
         fixMsgType = quickfix.MsgType()
         beginString = quickfix.BeginString()
         message.getHeader().getField(beginString)
         message.getHeader().getField(fixMsgType)
         msgType = fixMsgType.getValue()
 
-        self.logger.info("FixSimApplication.fromApp: Message type %s", str(msgType))
+        self.logger.debug("FixSimApplication.fromApp: Message type %s", msgType)
         self.dispatchFromApp(msgType, message, beginString, sessionID)
 
 
@@ -63,20 +82,10 @@ class IncrementID(object):
         return str(self.__value)
 
 
-def float_range(first, last, step):
-    if last < 0:
-        raise ValueError("last float is negative")
-
-    result = []
-    while True:
-        if first >= last:
-            return result
-
-        result.append(first)
-        first += step
-
-
 def create_logger(config):
+    # The handlers are written by a background thread, see asynclog.py, and
+    # level is info unless the logging config says otherwise, debug also
+    # logging the messages sent
     import logging
     import logging.handlers
 
@@ -95,8 +104,11 @@ def create_logger(config):
         return logger
 
     logcfg = config.get('logging', None)
-    if not logging:
-        return syslog_logger()
+    if not logcfg:
+        logger = syslog_logger()
+        skip_record_details()
+        make_async(logger)
+        return logger
 
     target = logcfg['target']
     if target == 'syslog':
@@ -108,9 +120,20 @@ def create_logger(config):
         raise FixSimError("invalid logger " + str(target))
 
     logger.addHandler(logging.StreamHandler())
+    logger.setLevel(getattr(logging, logcfg.get('level', 'info').upper()))
+    skip_record_details()
+    make_async(logger)
     return logger
 
 
+def create_capture(config):
+    # The MessageCapture of the file named capture in config, if any
+    path = config.get('capture', None)
+    if not path:
+        return None
+    return MessageCapture(path)
+
+
 def load_yaml(path):
     with open(path, 'r') as stream:
         cfg = yaml.load(stream)
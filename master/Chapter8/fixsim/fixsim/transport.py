@@ -0,0 +1,232 @@
+import asyncio
+import logging
+
+from fixsim.codec import (FixCodecError, FixStream, Header, Template, frame,
+                          parse, sendingTime, MSG_SEQ_NUM, SENDER_COMP_ID,
+                          TARGET_COMP_ID)
+
+# FIX 4.4 sessions over asyncio TCP connections, for running the simulator
+# without quickfix. Python 3 only.
+#
+# A session does what the simulator needs of quickfix: logon, heartbeats
+# and test requests, logout and sequence numbers. Like with ResetOnLogon=Y,
+# both sides start again from 1 at each logon, and as nothing is stored,
+# a resend request is answered by a sequence reset to the next sequence
+# number and a gap in the messages received is only logged.
+#
+# The application of a session has the methods
+#
+#   onLogon(session)
+#   onLogout(session)
+#   fromApp(message, session)
+#
+# message being a codec.FixMessage. With a capture.MessageCapture every
+# message sent or received by the session is captured.
+
+HEART_BT_INT = 108
+TEST_REQ_ID = 112
+TEXT = 58
+NEW_SEQ_NO = 36
+GAP_FILL_FLAG = 123
+POSS_DUP_FLAG = 43
+
+LOGON = Template('A', [98, HEART_BT_INT, 141])
+HEARTBEAT = Template('0', [])
+TEST_HEARTBEAT = Template('0', [TEST_REQ_ID])
+TEST_REQUEST = Template('1', [TEST_REQ_ID])
+LOGOUT = Template('5', [TEXT])
+SEQUENCE_RESET = Template('4', [GAP_FILL_FLAG, NEW_SEQ_NO])
+
+ADMIN_TYPES = frozenset(['A', '0', '1', '2', '3', '5'])
+
+
+class FixSession(asyncio.Protocol):
+    # The initiator side when targetCompID is given, sending the logon once
+    # connected, and the acceptor side otherwise, taking the targetCompID of
+    # the logon it receives if it is sent to senderCompID
+    def __init__(self, application, senderCompID, targetCompID=None, heartBtInt=30, logger=None,
+                 capture=None):
+        self.application = application
+        self.senderCompID = senderCompID
+        self.targetCompID = targetCompID
+        self.initiator = targetCompID is not None
+        self.heartBtInt = heartBtInt
+        self.logger = logger or logging.getLogger('fixsim.transport')
+        self.capture = capture
+
+        self.stream = FixStream()
+        self.header = None
+        self.transport = None
+        self.outSeqNum = 1
+        self.inSeqNum = 1
+        self.loggedOn = False
+        self.loggingOut = False
+        self.logon = None
+        self.timer = None
+        self.lastSent = 0
+        self.lastReceived = 0
+        self.testRequestSent = False
+
+    def __repr__(self):
+        return "FIX.4.4:%s->%s" % (self.senderCompID, self.targetCompID)
+
+    def isLoggedOn(self):
+        return self.loggedOn
+
+    async def waitLogon(self):
+        await self.logon
+
+    def connection_made(self, transport):
+        self.transport = transport
+        loop = asyncio.get_running_loop()
+        self.logon = loop.create_future()
+        self.lastSent = self.lastReceived = loop.time()
+        if self.initiator:
+            self.header = Header(self.senderCompID, self.targetCompID)
+            self.send(LOGON, 0, self.heartBtInt, 'Y')
+
+    def connection_lost(self, exc):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.logon.done():
+            self.logon.set_exception(ConnectionError("%s disconnected before logon" % self))
+        if self.loggedOn:
+            self.loggedOn = False
+            self.application.onLogout(self)
+
+    def data_received(self, data):
+        try:
+            messages = self.stream.feed(data)
+            for buffer in messages:
+                if self.capture is not None:
+                    self.capture.incoming(self, buffer)
+                self.onMessage(parse(buffer))
+        except FixCodecError as e:
+            self.logger.error("FixSession %s: %s", self, e)
+            self.disconnect(str(e))
+
+    def send(self, template, *values):
+        self.sendBody(template.msgType, template.body(*values))
+
+    def sendBody(self, msgType, body, bodySum=None):
+        # Sends a body built once for several sessions, the header being
+        # the session's own, bodySum being sum(body) if known
+        if self.transport is None or self.transport.is_closing():
+            return
+        header = self.header.encode(msgType, self.outSeqNum, sendingTime())
+        self.outSeqNum += 1
+        buffer = frame(header, body, bodySum)
+        if self.capture is not None:
+            self.capture.outgoing(self, buffer)
+        self.transport.write(buffer)
+        self.lastSent = asyncio.get_running_loop().time()
+
+    def logout(self, text=''):
+        if self.loggedOn and not self.loggingOut:
+            self.loggingOut = True
+            self.send(LOGOUT, text)
+        else:
+            self.transport.close()
+
+    def disconnect(self, text):
+        if self.loggedOn:
+            self.send(LOGOUT, text)
+        self.transport.close()
+
+    def onMessage(self, message):
+        self.lastReceived = asyncio.get_running_loop().time()
+        self.testRequestSent = False
+        msgType = message.msgType
+
+        if not self.loggedOn:
+            if msgType != 'A':
+                self.logger.error("FixSession %s: %s before logon", self, msgType)
+                self.transport.close()
+                return
+            self.onLogonMessage(message)
+            return
+
+        if msgType == '4':
+            self.inSeqNum = message.getInt(NEW_SEQ_NO)
+            return
+
+        seqNum = message.getInt(MSG_SEQ_NUM)
+        if seqNum < self.inSeqNum and message.get(POSS_DUP_FLAG) != 'Y':
+            self.disconnect("MsgSeqNum too low, expecting %d but received %d" % (self.inSeqNum, seqNum))
+            return
+        if seqNum > self.inSeqNum:
+            self.logger.warning("FixSession %s: messages %d to %d missed", self, self.inSeqNum, seqNum - 1)
+        self.inSeqNum = seqNum + 1
+
+        if msgType not in ADMIN_TYPES:
+            try:
+                self.application.fromApp(message, self)
+            except Exception as e:
+                self.logger.exception(str(e))
+        elif msgType == '0':
+            pass
+        elif msgType == '1':
+            self.send(TEST_HEARTBEAT, message.get(TEST_REQ_ID, ''))
+        elif msgType == '2':
+            self.send(SEQUENCE_RESET, 'N', self.outSeqNum + 1)
+        elif msgType == '5':
+            if not self.loggingOut:
+                self.loggingOut = True
+                self.send(LOGOUT, '')
+            self.transport.close()
+        elif msgType == '3':
+            self.logger.error("FixSession %s: reject %s", self, message.get(TEXT, ''))
+
+    def onLogonMessage(self, message):
+        if not self.initiator:
+            if message.get(TARGET_COMP_ID) != self.senderCompID:
+                self.logger.error("FixSession: logon to %s refused", message.get(TARGET_COMP_ID))
+                self.transport.close()
+                return
+            self.targetCompID = message.get(SENDER_COMP_ID)
+            self.header = Header(self.senderCompID, self.targetCompID)
+            self.heartBtInt = message.getInt(HEART_BT_INT, self.heartBtInt)
+            self.send(LOGON, 0, self.heartBtInt, 'Y')
+        self.inSeqNum = message.getInt(MSG_SEQ_NUM) + 1
+        self.loggedOn = True
+        self.schedule()
+        self.logon.set_result(self)
+        self.application.onLogon(self)
+
+    def schedule(self):
+        loop = asyncio.get_running_loop()
+        self.timer = loop.call_later(min(1, self.heartBtInt), self.checkHeartbeat)
+
+    def checkHeartbeat(self):
+        # A heartbeat after heartBtInt seconds without sending, a test
+        # request after heartBtInt seconds and a bit without receiving, and
+        # the connection closed if it went unanswered
+        now = asyncio.get_running_loop().time()
+        if now - self.lastReceived >= 2.4 * self.heartBtInt and self.testRequestSent:
+            self.logger.error("FixSession %s: no heartbeat, disconnecting", self)
+            self.transport.close()
+            return
+        if now - self.lastReceived >= 1.2 * self.heartBtInt and not self.testRequestSent:
+            self.testRequestSent = True
+            self.send(TEST_REQUEST, 'TEST')
+        elif now - self.lastSent >= self.heartBtInt:
+            self.send(HEARTBEAT)
+        self.schedule()
+
+
+async def serve(application, host, port, senderCompID, logger=None, capture=None):
+    # An asyncio server accepting sessions to senderCompID
+    loop = asyncio.get_running_loop()
+    return await loop.create_server(lambda: FixSession(application, senderCompID, logger=logger, capture=capture),
+                                    host, port)
+
+
+async def connect(application, host, port, senderCompID, targetCompID, heartBtInt=30, logger=None,
+                  capture=None):
+    # A session connected to host and port and logged on
+    loop = asyncio.get_running_loop()
+    _, session = await loop.create_connection(
+        lambda: FixSession(application, senderCompID, targetCompID, heartBtInt, logger, capture), host, port)
+    await session.waitLogon()
+    return session
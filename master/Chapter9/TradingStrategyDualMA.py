@@ -1,12 +1,24 @@
-# Python program to get average of a list
-from collections import deque
+import sys
+
+from chapter2.indicators import SMA
+from chapter7.Messages import Order, BookEvent, ExecutionReport
+from chapter7.OrderStore import OrderStore
+from chapter9.vectorizedbacktester import average
+
+EPSILON = sys.float_info.epsilon
+
+
+def window_average(window):
+    # average() of the prices of a RollingWindow from the oldest to the
+    # newest, the order the backtesters add them in
+    values = window.values
+    index = window.count % window.size if len(values) == window.size else 0
+    return average(values[index:] + values[:index])
 
-def average(lst):
-    return sum(lst) / len(lst)
 
 class TradingStrategyDualMA:
     def __init__(self, ob_2_ts, ts_2_om, om_2_ts):
-        self.orders = []
+        self.orders = OrderStore()
         self.order_id = 0
 
         self.position = 0
@@ -25,8 +37,8 @@ class TradingStrategyDualMA:
         self.long_signal=False
         self.total=0
         self.holdings=0
-        self.small_window=deque()
-        self.large_window=deque()
+        self.short_average=SMA(50)
+        self.long_average=SMA(100)
         self.list_position=[]
         self.list_cash=[]
         self.list_holdings = []
@@ -39,32 +51,35 @@ class TradingStrategyDualMA:
 
 
     def create_metrics_out_of_prices(self,price_update):
-        self.small_window.append(price_update)
-        self.large_window.append(price_update)
-        if len(self.small_window)>50:
-            self.small_window.popleft()
-        if len(self.large_window)>100:
-            self.large_window.popleft()
-        if len(self.small_window) == 50:
-            if average(self.small_window) >\
-                average(self.large_window):
-                self.long_signal=True
-            else:
-                self.long_signal = False
+        self.short_average.update(price_update)
+        self.long_average.update(price_update)
+        if len(self.short_average.window) == 50:
+            short_value = self.short_average.value
+            long_value = self.long_average.value
+            # The running sums of SMA are off the sums of their windows by
+            # a few roundings per price since they were last summed again,
+            # so averages closer than that are compared again with
+            # average() on the windows, as the vectorized backtester does.
+            # The bound takes the prices as positive, as book prices are.
+            if abs(short_value - long_value) <= \
+                    4 * EPSILON * (50 * abs(short_value) + 100 * abs(long_value)):
+                short_value = window_average(self.short_average.window)
+                long_value = window_average(self.long_average.window)
+            self.long_signal = short_value > long_value
             return True
         return False
 
     def buy_sell_or_hold_something(self, book_event):
         if self.long_signal and self.paper_position<=0:
-            self.create_order(book_event,book_event['bid_quantity'],'buy')
-            self.paper_position += book_event['bid_quantity']
-            self.paper_cash -= book_event['bid_quantity'] * book_event['bid_price']
+            self.create_order(book_event,book_event.bid_quantity,'buy')
+            self.paper_position += book_event.bid_quantity
+            self.paper_cash -= book_event.bid_quantity * book_event.bid_price
         elif self.paper_position>0 and not self.long_signal:
-            self.create_order(book_event,book_event['bid_quantity'],'sell')
-            self.paper_position -= book_event['bid_quantity']
-            self.paper_cash -= -book_event['bid_quantity'] * book_event['bid_price']
+            self.create_order(book_event,book_event.bid_quantity,'sell')
+            self.paper_position -= book_event.bid_quantity
+            self.paper_cash -= -book_event.bid_quantity * book_event.bid_price
 
-        self.paper_holdings = self.paper_position * book_event['bid_price']
+        self.paper_holdings = self.paper_position * book_event.bid_price
         self.paper_total = (self.paper_holdings + self.paper_cash)
         # print('total=%d, holding=%d, cash=%d' %
         #       (self.total, self.holdings, self.cash))
@@ -75,53 +90,44 @@ class TradingStrategyDualMA:
         self.list_paper_total.append(self.paper_holdings+self.paper_cash)
 
         self.list_position.append(self.position)
-        self.holdings=self.position*book_event['bid_price']
+        self.holdings=self.position*book_event.bid_price
         self.list_holdings.append(self.holdings)
         self.list_cash.append(self.cash)
         self.list_total.append(self.holdings+self.cash)
 
     def create_order(self,book_event,quantity,side):
         self.order_id+=1
-        ord = {
-            'id': self.order_id,
-            'price': book_event['bid_price'],
-            'quantity': quantity,
-            'side': side,
-            'action': 'to_be_sent'
-        }
-        self.orders.append(ord.copy())
+        ord = Order(self.order_id, book_event.bid_price, quantity,
+                    side, 'to_be_sent', symbol=book_event.symbol)
+        self.orders.add(ord)
 
 
     def signal(self, book_event):
-        if book_event['bid_quantity'] != -1 and \
-                book_event['offer_quantity'] != -1:
-            self.create_metrics_out_of_prices(book_event['bid_price'])
+        if book_event.bid_quantity != -1 and \
+                book_event.offer_quantity != -1:
+            self.create_metrics_out_of_prices(book_event.bid_price)
             self.buy_sell_or_hold_something(book_event)
 
 
     def execution(self):
-        orders_to_be_removed=[]
-        for index, order in enumerate(self.orders):
-            if order['action'] == 'to_be_sent':
+        # Orders waiting to be sent have no status yet
+        for order in self.orders.with_status(None):
+            if order.action == 'to_be_sent':
                 # Send order
-                order['status'] = 'new'
-                order['action'] = 'no_action'
+                self.orders.set_status(order, 'new')
+                order.action = 'no_action'
                 if self.ts_2_om is None:
                     print('Simulation mode')
                 else:
-                    self.ts_2_om.append(order.copy())
-            if order['status'] == 'rejected' or order['status']=='cancelled':
-                orders_to_be_removed.append(index)
-            if order['status'] == 'filled':
-                orders_to_be_removed.append(index)
-                pos = order['quantity'] if order['side'] == 'buy' else -order['quantity']
-                self.position+=pos
-                self.holdings = self.position * order['price']
-                self.pnl-=pos * order['price']
-                self.cash -= pos * order['price']
-
-        for order_index in sorted(orders_to_be_removed,reverse=True):
-            del (self.orders[order_index])
+                    self.ts_2_om.append(order)
+        self.orders.pop_status('rejected')
+        self.orders.pop_status('cancelled')
+        for order in self.orders.pop_status('filled'):
+            pos = order.quantity if order.side == 'buy' else -order.quantity
+            self.position+=pos
+            self.holdings = self.position * order.price
+            self.pnl-=pos * order.price
+            self.cash -= pos * order.price
 
 
     def handle_input_from_bb(self,book_event=None):
@@ -135,32 +141,32 @@ class TradingStrategyDualMA:
 
     def handle_book_event(self,book_event):
         if book_event is not None:
-            self.current_bid = book_event['bid_price']
-            self.current_offer = book_event['offer_price']
+            if type(book_event) is not BookEvent:
+                book_event = BookEvent.from_dict(book_event)
+            self.current_bid = book_event.bid_price
+            self.current_offer = book_event.offer_price
             self.signal(book_event)
             self.execution()
 
     def lookup_orders(self,id):
-        count=0
-        for o in self.orders:
-            if o['id'] ==  id:
-                return o, count
-            count+=1
-        return None, None
+        return self.orders.get(id)
 
     def handle_response_from_om(self):
         if self.om_2_ts is not None:
-            self.handle_market_response(self.om_2_ts.popleft())
+            if len(self.om_2_ts)>0:
+                self.handle_market_response(self.om_2_ts.popleft())
         else:
             print('simulation mode')
 
     def handle_market_response(self, order_execution):
+        if type(order_execution) is not ExecutionReport:
+            order_execution = ExecutionReport.from_dict(order_execution)
         print(order_execution)
-        order,_=self.lookup_orders(order_execution['id'])
+        order=self.lookup_orders(order_execution.id)
         if order is None:
             print('error not found')
             return
-        order['status']=order_execution['status']
+        self.orders.set_status(order, order_execution.status)
         self.execution()
 
     def get_pnl(self):
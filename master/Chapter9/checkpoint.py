@@ -0,0 +1,152 @@
+import io
+import os
+import pickle
+import random
+import struct
+import sys
+import traceback
+import zlib
+
+# A checkpoint is the whole state of an EventBasedBackTester between two
+# timestamps of its tick file: the components with their orders, books,
+# indicators and histories, the queues and the dispatcher, pickled together
+# so that what they share (a queue between two components, the handlers of
+# the dispatcher) is shared again once loaded, along with the state of the
+# random module the market simulator draws from. The file is
+#
+#   magic b'BTCHKPNT' | version (uint32) | position (uint64) | data
+#
+# position being the number of ticks of the tick file already processed
+# and data the pickle compressed with zlib, whose histories of prices and
+# positions compress about eight times at the fastest level.
+#
+# Python keeps the attributes of an object in a compact array until its
+# __dict__ is asked for, after which they are read from a dict, and the
+# components run about a third slower. Pickling asks for the __dict__ of
+# every component, so CheckpointWriter pickles in a forked child, leaving
+# the running backtest as it was, and loading sets the attributes one by
+# one rather than filling the __dict__.
+MAGIC = b'BTCHKPNT'
+VERSION = 1
+HEADER = struct.Struct('<8sIQ')
+PROTOCOL = pickle.HIGHEST_PROTOCOL
+COMPRESSION = 1
+
+
+def set_attributes(obj, state):
+    for name, value in state.items():
+        setattr(obj, name, value)
+
+
+class CheckpointPickler(pickle.Pickler):
+    # Pickles objects whose state is their __dict__ as usual, but for them
+    # to be rebuilt with set_attributes()
+    def reducer_override(self, obj):
+        if isinstance(obj, type) or not hasattr(obj, '__dict__'):
+            return NotImplemented
+        try:
+            reduced = obj.__reduce_ex__(PROTOCOL)
+        except TypeError:
+            return NotImplemented
+        if type(reduced) is not tuple or len(reduced) < 3 \
+                or type(reduced[2]) is not dict:
+            return NotImplemented
+        return reduced[:5] + (None,) * (5 - len(reduced)) + (set_attributes,)
+
+
+def save_checkpoint(backtester, path):
+    # Written to a temporary file first, so that path is either the
+    # previous checkpoint or the new one, never a partial one. Returns the
+    # size of the checkpoint.
+    if backtester.journal is not None:
+        raise ValueError('a journaled backtester cannot be checkpointed')
+    data = io.BytesIO()
+    CheckpointPickler(data, PROTOCOL).dump((backtester, random.getstate()))
+    data = zlib.compress(data.getbuffer(), COMPRESSION)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, backtester.position))
+        f.write(data)
+    os.replace(tmp_path, path)
+    return HEADER.size + len(data)
+
+
+class CheckpointWriter:
+    # Saves checkpoints of a running backtest in directory, each from a
+    # forked child working on its copy of the backtester, so the backtest
+    # carries on at once, one child at a time. Saves in the process where
+    # there is no fork. wait() returns once the last checkpoint is written
+    # and raises OSError if a child failed.
+    def __init__(self, directory):
+        self.directory = directory
+        self.pid = None
+        self.path = None
+        os.makedirs(directory, exist_ok=True)
+
+    def save(self, backtester, position):
+        self.wait()
+        path = checkpoint_path(self.directory, position)
+        if not hasattr(os, 'fork'):
+            save_checkpoint(backtester, path)
+            return
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                save_checkpoint(backtester, path)
+            except BaseException:
+                traceback.print_exc()
+                sys.stderr.flush()
+                status = 1
+            os._exit(status)
+        self.pid = pid
+        self.path = path
+
+    def wait(self):
+        if self.pid is None:
+            return
+        pid, self.pid = self.pid, None
+        _, status = os.waitpid(pid, 0)
+        if status != 0:
+            raise OSError('checkpoint %s could not be written' % self.path)
+
+
+def read_header(path):
+    # The position of the checkpoint at path
+    with open(path, 'rb') as f:
+        header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ValueError('%s is not a checkpoint' % path)
+    magic, version, position = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError('%s is not a checkpoint' % path)
+    if version != VERSION:
+        raise ValueError('%s has version %d, expected %d'
+                         % (path, version, VERSION))
+    return position
+
+
+def load_checkpoint(path):
+    # A new backtester in the state saved at path, the random module being
+    # put back in its state at that time too. Loading the same checkpoint
+    # twice gives two independent backtesters.
+    read_header(path)
+    with open(path, 'rb') as f:
+        f.seek(HEADER.size)
+        backtester, random_state = pickle.loads(zlib.decompress(f.read()))
+    random.setstate(random_state)
+    return backtester
+
+
+def checkpoint_path(directory, position):
+    return os.path.join(directory, 'checkpoint-%012d.ckpt' % position)
+
+
+def list_checkpoints(directory):
+    # (position, path) of the checkpoints in directory, by position
+    checkpoints = []
+    for name in os.listdir(directory):
+        if name.startswith('checkpoint-') and name.endswith('.ckpt'):
+            path = os.path.join(directory, name)
+            checkpoints.append((read_header(path), path))
+    return sorted(checkpoints)
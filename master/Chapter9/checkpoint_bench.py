@@ -0,0 +1,79 @@
+import argparse
+import contextlib
+import os
+import shutil
+import tempfile
+from time import perf_counter
+
+import numpy as np
+from chapter9.checkpoint import checkpoint_path, list_checkpoints, \
+    load_checkpoint, save_checkpoint
+from chapter9.eventbasedbacktester import EventBasedBackTester
+from chapter9.tickfile import ticks_from_closes, write_ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Measure the checkpoints of the event-based backtester and what resuming from one saves')
+    parser.add_argument('--bars', type=int, default=50000)
+    parser.add_argument('--checkpoint-every', type=int, default=40000,
+                        help='ticks between two checkpoints')
+    parser.add_argument('--branches', type=int, default=4,
+                        help='what-if branches resumed from the middle '
+                             'checkpoint')
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    try:
+        rng = np.random.default_rng(0)
+        prices = (100 * np.exp(np.cumsum(rng.normal(0, 0.001, args.bars)))).round(2)
+        ticks = os.path.join(root, 'bench.ticks')
+        write_ticks(ticks, ticks_from_closes(prices))
+        directory = os.path.join(root, 'checkpoints')
+
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = perf_counter()
+            expected = EventBasedBackTester()
+            expected.process_ticks(ticks)
+            plain_elapsed = perf_counter() - start
+
+            start = perf_counter()
+            backtester = EventBasedBackTester()
+            backtester.process_ticks(ticks, checkpoint_every=args.checkpoint_every,
+                                     checkpoint_dir=directory)
+            checkpoint_elapsed = perf_counter() - start
+        checkpoints = list_checkpoints(directory)
+        print('full run            : %d ticks in %.2fs'
+              % (4 * args.bars, plain_elapsed))
+        print('with %3d checkpoints: %.2fs, %+.1f%%'
+              % (len(checkpoints), checkpoint_elapsed,
+                 100 * (checkpoint_elapsed / plain_elapsed - 1)))
+
+        # the cost of one checkpoint of the final state, the largest
+        path = checkpoint_path(root, backtester.position)
+        start = perf_counter()
+        size = save_checkpoint(backtester, path)
+        save_elapsed = perf_counter() - start
+        start = perf_counter()
+        load_checkpoint(path)
+        load_elapsed = perf_counter() - start
+        print('last checkpoint     : %.2f MB, saved in %.1fms, loaded in %.1fms'
+              % (size / 1e6, save_elapsed * 1e3, load_elapsed * 1e3))
+
+        position, path = checkpoints[len(checkpoints) // 2]
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = perf_counter()
+            for _ in range(args.branches):
+                branch = load_checkpoint(path)
+                branch.process_ticks(ticks, start=branch.position)
+            branch_elapsed = perf_counter() - start
+        print('%d branches from tick %d: %.2fs, %.2fs from the first tick, '
+              'results identical: %s'
+              % (args.branches, position, branch_elapsed,
+                 args.branches * plain_elapsed,
+                 branch.ts.list_total == expected.ts.list_total))
+    finally:
+        shutil.rmtree(root)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+import contextlib
+import os
+import pickle
+import random
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from chapter7.Messages import Order
+from chapter9.checkpoint import load_checkpoint, save_checkpoint, \
+    list_checkpoints, checkpoint_path
+from chapter9.eventbasedbacktester import EventBasedBackTester
+from chapter9.tickfile import ticks_from_closes, write_ticks
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.ticks = os.path.join(self.dir, 'test.ticks')
+        self.checkpoints = os.path.join(self.dir, 'checkpoints')
+        rng = np.random.default_rng(0)
+        prices = (100 * np.exp(np.cumsum(rng.normal(0, 0.01, 500)))).round(2)
+        write_ticks(self.ticks, ticks_from_closes(prices))
+        self.expected = EventBasedBackTester()
+        self.expected.process_ticks(self.ticks)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def assertSameRun(self, backtester, expected):
+        ts, expected_ts = backtester.ts, expected.ts
+        self.assertEqual(ts.list_total, expected_ts.list_total)
+        self.assertEqual(ts.list_paper_total, expected_ts.list_paper_total)
+        self.assertEqual(ts.list_position, expected_ts.list_position)
+        self.assertEqual(ts.get_pnl(), expected_ts.get_pnl())
+        self.assertEqual(ts.order_id, expected_ts.order_id)
+        self.assertEqual(backtester.om.order_id, expected.om.order_id)
+
+    def test_checkpoints_taken(self):
+        backtester = EventBasedBackTester()
+        backtester.process_ticks(self.ticks, batch_size=300,
+                                 checkpoint_every=500,
+                                 checkpoint_dir=self.checkpoints)
+        self.assertSameRun(backtester, self.expected)
+        self.assertEqual(backtester.position, 2000)
+        checkpoints = list_checkpoints(self.checkpoints)
+        self.assertEqual([position for position, path in checkpoints],
+                         [500, 1000, 1500, 2000])
+        self.assertEqual(checkpoints[0][1],
+                         checkpoint_path(self.checkpoints, 500))
+
+    def test_resume_from_every_checkpoint(self):
+        EventBasedBackTester().process_ticks(self.ticks, checkpoint_every=400,
+                                             checkpoint_dir=self.checkpoints)
+        checkpoints = list_checkpoints(self.checkpoints)
+        self.assertEqual(len(checkpoints), 5)
+        for position, path in checkpoints:
+            backtester = load_checkpoint(path)
+            self.assertEqual(backtester.position, position)
+            self.assertEqual(len(backtester.ts.list_total), position // 4)
+            backtester.process_ticks(self.ticks, start=backtester.position)
+            self.assertSameRun(backtester, self.expected)
+
+    def test_branches_are_independent(self):
+        backtester = EventBasedBackTester()
+        backtester.process_ticks(self.ticks, checkpoint_every=1000,
+                                 checkpoint_dir=self.checkpoints)
+        path = checkpoint_path(self.checkpoints, 1000)
+        first = load_checkpoint(path)
+        second = load_checkpoint(path)
+        self.assertIsNot(first.ts, second.ts)
+        # the components share their queues and the dispatcher again
+        self.assertIs(first.ob.ob_to_ts, first.ts.ob_2_ts)
+        self.assertIs(first.dispatcher.subscriptions[0][1].__self__, first.ob)
+        self.assertIs(first.lp_2_gateway.ready, first.dispatcher.ready)
+        first.ts.cash = 0
+        first.process_ticks(self.ticks, start=first.position)
+        second.process_ticks(self.ticks, start=second.position)
+        self.assertSameRun(second, self.expected)
+        self.assertNotEqual(first.ts.list_total, self.expected.ts.list_total)
+
+    def test_queued_events_kept(self):
+        backtester = EventBasedBackTester()
+        backtester.lp_2_gateway.append(Order(1, 10.0, 100, 'bid', 'new'))
+        backtester.lp_2_gateway.append(Order(2, 10.5, 100, 'ask', 'new'))
+        path = os.path.join(self.dir, 'queued.ckpt')
+        self.assertGreater(save_checkpoint(backtester, path), 0)
+        loaded = load_checkpoint(path)
+        self.assertEqual([o.id for o in loaded.lp_2_gateway], [1, 2])
+        loaded.process_events()
+        self.assertEqual(len(loaded.lp_2_gateway), 0)
+        self.assertEqual(len(loaded.ob.list_bids), 1)
+        self.assertEqual(len(loaded.ob.list_asks), 1)
+
+    def test_random_state_restored(self):
+        backtester = EventBasedBackTester()
+        path = os.path.join(self.dir, 'random.ckpt')
+        random.seed(1)
+        save_checkpoint(backtester, path)
+        expected = [random.random() for _ in range(3)]
+        load_checkpoint(path)
+        self.assertEqual([random.random() for _ in range(3)], expected)
+
+    def test_latency_backtester(self):
+        backtester = EventBasedBackTester(latency=True)
+        backtester.process_ticks(self.ticks, checkpoint_every=1000,
+                                 checkpoint_dir=self.checkpoints)
+        loaded = load_checkpoint(checkpoint_path(self.checkpoints, 1000))
+        self.assertEqual(loaded.lp_2_gateway.name, 'lp_2_gateway')
+        self.assertEqual(loaded.dispatcher.handler_times[0].count, 1000)
+        loaded.process_ticks(self.ticks, start=loaded.position)
+        self.assertSameRun(loaded, self.expected)
+
+    def test_failed_checkpoint(self):
+        backtester = EventBasedBackTester()
+        # a lambda cannot be pickled
+        backtester.ts.sizing = lambda price: 1000
+        with open(os.devnull, 'w') as devnull, \
+                contextlib.redirect_stderr(devnull):
+            with self.assertRaises((OSError, pickle.PicklingError)):
+                backtester.process_ticks(self.ticks, checkpoint_every=1000,
+                                         checkpoint_dir=self.checkpoints)
+        self.assertEqual(list_checkpoints(self.checkpoints), [])
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            EventBasedBackTester().process_ticks(self.ticks, checkpoint_every=0,
+                                                 checkpoint_dir=self.checkpoints)
+        with self.assertRaises(ValueError):
+            EventBasedBackTester().process_ticks(self.ticks, checkpoint_every=10)
+        journaled = EventBasedBackTester(
+            journal=os.path.join(self.dir, 'test.journal'))
+        with self.assertRaises(ValueError):
+            journaled.process_ticks(self.ticks, checkpoint_every=10,
+                                    checkpoint_dir=self.checkpoints)
+        journaled.close()
+        path = os.path.join(self.dir, 'bad.ckpt')
+        with open(path, 'wb') as f:
+            f.write(b'x' * 64)
+        with self.assertRaises(ValueError):
+            load_checkpoint(path)
+        with self.assertRaises(ValueError):
+            EventBasedBackTester().process_ticks(self.ticks, start=3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,29 +1,40 @@
+from functools import partial
+
 from chapter7.LiquidityProvider import LiquidityProvider
 from chapter9.TradingStrategyDualMA import TradingStrategyDualMA
 from chapter7.MarketSimulator import MarketSimulator
 from chapter7.OrderManager import OrderManager
 from chapter7.OrderBook import OrderBook
-from collections import deque
-
-import pandas as pd
-from pandas_datareader import data
-import matplotlib.pyplot as plt
-
-
-def call_if_not_empty(deq, fun):
-    while (len(deq) > 0):
-        fun()
+from chapter7.Messages import Order
+from chapter7.EventDispatcher import EventDispatcher, EventQueue, \
+    TimedEventQueue
+from chapter9.checkpoint import CheckpointWriter
+from chapter9.journal import JournalWriter
+from chapter9.marketdatastore import load_financial_data
+from chapter9.tickfile import TickReader, replay, ticks_from_closes, write_ticks
 
 
 class EventBasedBackTester:
-    def __init__(self):
-        self.lp_2_gateway = deque()
-        self.ob_2_ts = deque()
-        self.ts_2_om = deque()
-        self.ms_2_om = deque()
-        self.om_2_ts = deque()
-        self.gw_2_om = deque()
-        self.om_2_gw = deque()
+    def __init__(self, latency=False, journal=None, journal_all=False):
+        # With latency, the queues stamp their events and the dispatcher
+        # times the handlers, see latency_report(). With journal, a path,
+        # the orders sent to lp_2_gateway and the runs of the dispatcher
+        # are written to a journal there, from which the other events
+        # follow, see chapter9.journalreplay. With journal_all, every event
+        # handed to a component is written instead, costing a few times
+        # as much.
+        self.latency = latency
+        if latency:
+            queue = TimedEventQueue
+        else:
+            queue = lambda name: EventQueue()
+        self.lp_2_gateway = queue(name='lp_2_gateway')
+        self.ob_2_ts = queue(name='ob_2_ts')
+        self.ts_2_om = queue(name='ts_2_om')
+        self.ms_2_om = queue(name='ms_2_om')
+        self.om_2_ts = queue(name='om_2_ts')
+        self.gw_2_om = queue(name='gw_2_om')
+        self.om_2_gw = queue(name='om_2_gw')
 
 
         self.lp = LiquidityProvider(self.lp_2_gateway)
@@ -34,77 +45,143 @@ class EventBasedBackTester:
         self.om = OrderManager(self.ts_2_om, self.om_2_ts,\
                                self.om_2_gw, self.gw_2_om)
 
+        self.journal = JournalWriter(journal) if journal is not None \
+            else None
+        # the journal of the inputs, None when there is none or the
+        # dispatcher journals every event
+        self.input_journal = self.journal if not journal_all else None
+        # number of ticks of the tick file processed
+        self.position = 0
+        self.dispatcher = EventDispatcher(
+            timed=latency, journal=self.journal if journal_all else None)
+        self.dispatcher.subscribe(self.lp_2_gateway, self.ob.handle_order,
+                                  'lp_2_gateway')
+        self.dispatcher.subscribe(self.ob_2_ts, self.ts.handle_book_event,
+                                  'ob_2_ts')
+        self.dispatcher.subscribe(self.ts_2_om,
+                                  self.om.handle_order_from_trading_strategy,
+                                  'ts_2_om')
+        self.dispatcher.subscribe(self.om_2_gw, self.ms.handle_order,
+                                  'om_2_gw')
+        self.dispatcher.subscribe(self.gw_2_om,
+                                  self.om.handle_order_from_gateway,
+                                  'gw_2_om')
+        self.dispatcher.subscribe(self.om_2_ts, self.ts.handle_market_response,
+                                  'om_2_ts')
+        if self.input_journal is not None:
+            self.input_journal.start(self.dispatcher.names,
+                                     [self.lp_2_gateway.index])
+
 
     def process_data_from_yahoo(self,price):
 
-        order_bid = {
-            'id': 1,
-            'price': price,
-            'quantity': 1000,
-            'side': 'bid',
-            'action': 'new'
-        }
-        order_ask = {
-            'id': 1,
-            'price': price,
-            'quantity': 1000,
-            'side': 'ask',
-            'action': 'new'
-        }
-        self.lp_2_gateway.append(order_ask)
-        self.lp_2_gateway.append(order_bid)
+        order_bid = Order(1, price, 1000, 'bid', 'new')
+        order_ask = Order(1, price, 1000, 'ask', 'new')
+        self.send_to_gateway([order_ask, order_bid])
         self.process_events()
-        order_ask['action']='delete'
-        order_bid['action'] = 'delete'
-        self.lp_2_gateway.append(order_ask)
-        self.lp_2_gateway.append(order_bid)
+        order_ask.action = 'delete'
+        order_bid.action = 'delete'
+        self.send_to_gateway([order_ask, order_bid])
 
-    def process_events(self):
-        while len(self.lp_2_gateway)>0:
-            call_if_not_empty(self.lp_2_gateway,\
-                                   self.ob.handle_order_from_gateway)
-            call_if_not_empty(self.ob_2_ts, \
-                                   self.ts.handle_input_from_bb)
-            call_if_not_empty(self.ts_2_om, \
-                                   self.om.handle_input_from_ts)
-            call_if_not_empty(self.om_2_gw, \
-                                   self.ms.handle_order_from_gw)
-            call_if_not_empty(self.gw_2_om, \
-                                   self.om.handle_input_from_market)
-            call_if_not_empty(self.om_2_ts, \
-                                   self.ts.handle_response_from_om)
-
-
-
-eb=EventBasedBackTester()
-
-
-def load_financial_data(start_date, end_date,output_file):
-    try:
-        df = pd.read_pickle(output_file)
-        print('File data found...reading GOOG data')
-    except FileNotFoundError:
-        print('File not found...downloading the GOOG data')
-        df = data.DataReader('GOOG', 'yahoo', start_date, end_date)
-        df.to_pickle(output_file)
-    return df
-
-goog_data=load_financial_data(start_date='2001-01-01',
-                    end_date = '2018-01-01',
-                    output_file='goog_data.pkl')
-
-
-for line in zip(goog_data.index,goog_data['Adj Close']):
-    date=line[0]
-    price=line[1]
-    price_information={'date' : date,
-                      'price' : float(price)}
-    eb.process_data_from_yahoo(price_information['price'])
-    eb.process_events()
-
-
-plt.plot(eb.ts.list_paper_total,label="Paper Trading using Event-Based BackTester")
-plt.plot(eb.ts.list_total,label="Trading using Event-Based BackTester")
-plt.legend()
-plt.show()
+    def send_to_gateway(self, orders):
+        if self.input_journal is not None:
+            for order in orders:
+                self.input_journal.write(self.lp_2_gateway.index, order)
+        self.lp_2_gateway.extend(orders)
 
+    def process_events(self):
+        if self.input_journal is not None:
+            self.input_journal.write_run()
+        self.dispatcher.run()
+
+    def process_ticks(self, path, batch_size=65536, start=0,
+                      checkpoint_every=None, checkpoint_dir=None):
+        # Replays a tick file from tick start through the gateway queue, and
+        # prints the latency of every hop at the end when it is measured.
+        # With checkpoint_every, the state of the backtest is saved in
+        # checkpoint_dir at the end of the first timestamp from every
+        # multiple of checkpoint_every ticks, see chapter9.checkpoint. A
+        # backtester loaded from a checkpoint carries on with
+        # process_ticks(path, start=backtester.position).
+        processed = None
+        writer = None
+        if checkpoint_every is not None:
+            if checkpoint_every < 1:
+                raise ValueError('checkpoint_every must be at least 1, got %r'
+                                 % (checkpoint_every,))
+            if checkpoint_dir is None:
+                raise ValueError('checkpoint_every needs a checkpoint_dir')
+            if self.journal is not None:
+                raise ValueError('a journaled backtester cannot be checkpointed')
+            writer = CheckpointWriter(checkpoint_dir)
+            next_checkpoint = (start // checkpoint_every + 1) * checkpoint_every
+
+            def processed(position):
+                nonlocal next_checkpoint
+                self.position = position
+                if position >= next_checkpoint:
+                    writer.save(self, position)
+                    next_checkpoint = (position // checkpoint_every + 1) \
+                        * checkpoint_every
+
+        # a batch of ticks is journaled as it is, with the runs of the
+        # dispatcher during the batch
+        process_events = self.process_events
+        sent = None
+        if self.input_journal is not None:
+            process_events = self.dispatcher.run
+            sent = partial(self.input_journal.write_ticks,
+                           self.lp_2_gateway.index)
+
+        self.position = start
+        try:
+            with TickReader(path) as reader:
+                nb_ticks = replay(reader, self.lp_2_gateway,
+                                  process_events, batch_size, start,
+                                  processed, sent)
+        finally:
+            if writer is not None:
+                writer.wait()
+        if self.input_journal is not None and nb_ticks:
+            # the run after the last batch
+            self.input_journal.write_run()
+        self.position = start + nb_ticks
+        if self.latency:
+            print(self.latency_report())
+        if self.journal is not None:
+            self.journal.flush()
+        return nb_ticks
+
+    def latency_report(self):
+        return self.dispatcher.latency_report()
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
+
+
+if __name__ == '__main__':
+    import sys
+    import matplotlib.pyplot as plt
+
+    eb=EventBasedBackTester(latency='--latency' in sys.argv,
+                            journal='goog_data.journal'
+                            if '--journal' in sys.argv else None)
+
+    goog_data=load_financial_data(start_date='2001-01-01',
+                        end_date = '2018-01-01',
+                        output_file='goog_data.pkl')
+
+    # The orders process_data_from_yahoo sends for every adjusted close,
+    # written once to a tick file and replayed from there
+    write_ticks('goog_data.ticks',
+                ticks_from_closes(goog_data['Adj Close'].to_numpy(),
+                                  goog_data.index.values.astype('datetime64[ns]')))
+    eb.process_ticks('goog_data.ticks')
+    eb.close()
+
+
+    plt.plot(eb.ts.list_paper_total,label="Paper Trading using Event-Based BackTester")
+    plt.plot(eb.ts.list_total,label="Trading using Event-Based BackTester")
+    plt.legend()
+    plt.show()
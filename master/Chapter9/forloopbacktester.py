@@ -1,39 +1,15 @@
 #!/bin/python3
-import pandas as pd
-import numpy as np
-from pandas_datareader import data
-import matplotlib.pyplot as plt
-import h5py
 from collections import deque
+from chapter9.marketdatastore import load_financial_data
 
 
-def load_financial_data(start_date, end_date,output_file):
-    try:
-        df = pd.read_pickle(output_file)
-        print('File data found...reading GOOG data')
-    except FileNotFoundError:
-        print('File not found...downloading the GOOG data')
-        df = data.DataReader('GOOG', 'yahoo', start_date, end_date)
-        df.to_pickle(output_file)
-    return df
-
-goog_data=load_financial_data(start_date='2001-01-01',
-                    end_date = '2018-01-01',
-                    output_file='goog_data.pkl')
-
-# print(goog_data.index)
-# for i in goog_data:
-#     print(i)
-#
-# import sys
-# sys.exit(0)
-
 # Python program to get average of a list
 def average(lst):
     return sum(lst) / len(lst)
 
 class ForLoopBackTester:
-    def __init__(self):
+    def __init__(self, verbose=True):
+        self.verbose=verbose
         self.small_window=deque()
         self.large_window=deque()
         self.list_position=[]
@@ -65,20 +41,23 @@ class ForLoopBackTester:
 
     def buy_sell_or_hold_something(self,price_update):
         if self.long_signal and self.position<=0:
-            print(str(price_update['date']) +
-                  " send buy order for 10 shares price=" + str(price_update['price']))
+            if self.verbose:
+                print(str(price_update['date']) +
+                      " send buy order for 10 shares price=" + str(price_update['price']))
             self.position += 10
             self.cash -= 10 * price_update['price']
         elif self.position>0 and not self.long_signal:
-            print(str(price_update['date'])+
-                  " send sell order for 10 shares price=" + str(price_update['price']))
+            if self.verbose:
+                print(str(price_update['date'])+
+                      " send sell order for 10 shares price=" + str(price_update['price']))
             self.position -= 10
             self.cash -= -10 * price_update['price']
 
         self.holdings = self.position * price_update['price']
         self.total = (self.holdings + self.cash)
-        print('%s total=%d, holding=%d, cash=%d' %
-              (str(price_update['date']),self.total, self.holdings, self.cash))
+        if self.verbose:
+            print('%s total=%d, holding=%d, cash=%d' %
+                  (str(price_update['date']),self.total, self.holdings, self.cash))
 
         self.list_position.append(self.position)
         self.list_cash.append(self.cash)
@@ -86,19 +65,25 @@ class ForLoopBackTester:
         self.list_total.append(self.holdings+self.cash)
 
 
-naive_backtester=ForLoopBackTester()
-for line in zip(goog_data.index,goog_data['Adj Close']):
-    date=line[0]
-    price=line[1]
-    price_information={'date' : date,
-                      'price' : float(price)}
-    is_tradable = naive_backtester.create_metrics_out_of_prices(price_information)
-    if is_tradable:
-        naive_backtester.buy_sell_or_hold_something(price_information)
+if __name__ == '__main__':
+    goog_data=load_financial_data(start_date='2001-01-01',
+                        end_date = '2018-01-01',
+                        output_file='goog_data.pkl')
+
+    naive_backtester=ForLoopBackTester()
+    for line in zip(goog_data.index,goog_data['Adj Close']):
+        date=line[0]
+        price=line[1]
+        price_information={'date' : date,
+                          'price' : float(price)}
+        is_tradable = naive_backtester.create_metrics_out_of_prices(price_information)
+        if is_tradable:
+            naive_backtester.buy_sell_or_hold_something(price_information)
 
 
 
-plt.plot(naive_backtester.list_total,\
-         label="Holdings+Cash using Naive BackTester")
-plt.legend()
-plt.show()
+    import matplotlib.pyplot as plt
+    plt.plot(naive_backtester.list_total,\
+             label="Holdings+Cash using Naive BackTester")
+    plt.legend()
+    plt.show()
@@ -0,0 +1,273 @@
+import marshal
+import mmap
+import os
+import struct
+from array import array
+from operator import attrgetter
+
+import numpy as np
+
+from chapter7.Messages import Order, BookEvent, DepthEvent, ExecutionReport, \
+    Fill
+from chapter9.tickfile import TICK_DTYPE
+
+# A journal is every event an EventDispatcher hands to a handler, in the
+# order it hands them over, or only the events entering the pipeline and
+# the runs of the dispatcher, from which the others follow. It starts with
+# a header naming the subscriptions:
+#
+#   magic b'EVJOURNL' | version (uint32) | names size (uint32) | names
+#
+# names being the marshalled pair of the list of the subscription names
+# and the list of the input subscriptions, None when every event is
+# journaled. The events follow in chunks, written once CHUNK_SIZE events
+# are buffered:
+#
+#   first sequence number (uint64) | count (uint32) | size (uint32) | data
+#
+# the sequence numbers of the records of a chunk following the first one.
+# data is the marshalled tuple of the keys of the events, an array of
+# uint16 in native byte order holding subscription << 8 | type, and a list
+# per type of the fields of its events, type being the index of the message
+# class in MESSAGE_TYPES. The fields of a class are its __slots__ values,
+# one event after the other in its list, and a dict message is a copy of
+# the dict. So every value reads back with its type: an int price stays an
+# int and None stays None, and two events are the same when encode() gives
+# the same bytes. In a journal of inputs, a call of EventDispatcher.run()
+# is a record of its own, with the key RUN and no fields, and a batch of
+# ticks replayed from a tick file is one record of type TICKS holding the
+# tick records as they are in the file.
+# encode() uses marshal version 2, whose output only depends on the
+# values, when later versions refer back to objects they already wrote
+# depending on their reference counts.
+#
+# The fields of an event are taken as it is handed to the handler, or as
+# it is queued for an input, so the journal holds what the handler saw
+# even when the event is changed later, while encoding waits for the chunk
+# to be full: the dispatcher only pays for extending a list with the
+# fields of each event, which leaves no new object behind for the garbage
+# collector, and checks for a full chunk between batches. A batch of
+# ticks costs a copy of its records.
+MAGIC = b'EVJOURNL'
+VERSION = 3
+HEADER = struct.Struct('<8sII')
+CHUNK = struct.Struct('<QII')
+CHUNK_SIZE = 65536
+MARSHAL_VERSION = 4
+# the key of a run record
+RUN = 0xffff
+
+MESSAGE_TYPES = (dict, Order, BookEvent, DepthEvent, ExecutionReport, Fill)
+# the type of a batch of ticks, after the message types: its fields are the
+# bytes of the tick records and of the runs, an array of uint32
+TICKS = len(MESSAGE_TYPES)
+
+# (type, fields of an event) by message class
+ENCODERS = dict((cls, (code, attrgetter(*cls.__slots__)))
+                for code, cls in enumerate(MESSAGE_TYPES) if cls is not dict)
+ENCODERS[dict] = (0, dict.copy)
+# by type, the number of values of an event in the list of its type, None
+# for a single dict
+WIDTHS = tuple(None if cls is dict else len(cls.__slots__)
+               for cls in MESSAGE_TYPES) + (2,)
+
+
+def fields(event):
+    # The type and fields of event
+    try:
+        code, get_fields = ENCODERS[type(event)]
+    except KeyError:
+        raise TypeError('cannot journal %s messages'
+                        % type(event).__name__) from None
+    return code, get_fields(event)
+
+
+def encode(code, values):
+    # The type and fields of an event as bytes, equal for equal events
+    return marshal.dumps((code, values), 2)
+
+
+def _make_decoder(cls):
+    # A function making a cls event from its fields without calling
+    # __init__, assigning all the slots in one statement
+    if not cls.__slots__:
+        return lambda values: object.__new__(cls)
+    source = ('def decode(values):\n'
+              '    event = new(cls)\n'
+              '    %s, = values\n'
+              '    return event\n'
+              % ', '.join('event.' + name for name in cls.__slots__))
+    namespace = {'new': object.__new__, 'cls': cls}
+    exec(source, namespace)
+    return namespace['decode']
+
+
+def _decode_ticks(values):
+    # The tick records of a batch of ticks and its runs
+    ticks, runs = values
+    return np.frombuffer(ticks, dtype=TICK_DTYPE), array('I', runs).tolist()
+
+
+# the decoder of each type
+DECODERS = tuple(dict if cls is dict else _make_decoder(cls)
+                 for cls in MESSAGE_TYPES) + (_decode_ticks,)
+
+
+def decode(code, values):
+    return DECODERS[code](values)
+
+
+class JournalWriter:
+    # Set as the journal of an EventDispatcher, which calls start() with
+    # its subscription names before the first event. The dispatcher keeps
+    # an event by appending its key to keys and calling add(get(event))
+    # with the (key, get, add) kind() gives for its subscription and class;
+    # write() does it for one event. A journal of inputs is started with
+    # the input subscriptions and written with write(), write_ticks() and
+    # write_run() instead, see EventBasedBackTester.
+    def __init__(self, path, chunk_size=CHUNK_SIZE):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.chunk_size = chunk_size
+        self.names = None
+        self.inputs = None
+        # sequence number of the first event of the chunk being filled
+        self.seq = 1
+        # both kept in place, the dispatcher holding on to their methods
+        self.keys = array('H')
+        self.values = [[] for _ in WIDTHS]
+
+    def start(self, names, inputs=None):
+        self.names = list(names)
+        self.inputs = list(inputs) if inputs is not None else None
+        data = marshal.dumps((self.names, self.inputs), MARSHAL_VERSION)
+        self.file.write(HEADER.pack(MAGIC, VERSION, len(data)) + data)
+
+    def kind(self, subscription, cls):
+        # The key of the cls events of subscription, what to keep of them
+        # and where
+        try:
+            code, get_fields = ENCODERS[cls]
+        except KeyError:
+            raise TypeError('cannot journal %s messages'
+                            % cls.__name__) from None
+        values = self.values[code]
+        add = values.append if WIDTHS[code] is None else values.extend
+        return subscription << 8 | code, get_fields, add
+
+    def write(self, subscription, event):
+        key, get, add = self.kind(subscription, type(event))
+        self.keys.append(key)
+        add(get(event))
+
+    def write_ticks(self, subscription, ticks, runs):
+        # Keeps a batch of records of a tick file sent to subscription as
+        # orders, see tickfile.replay(), and the number of them queued at
+        # each run of the dispatcher during the batch, as one record
+        self.keys.append(subscription << 8 | TICKS)
+        self.values[TICKS].extend((ticks.tobytes(), array('I', runs).tobytes()))
+        self.flush()
+
+    def write_run(self):
+        self.keys.append(RUN)
+
+    def flush_full(self):
+        if len(self.keys) >= self.chunk_size:
+            self.flush()
+
+    def __len__(self):
+        # the number of records written
+        return self.seq - 1 + len(self.keys)
+
+    def flush(self):
+        count = len(self.keys)
+        if count:
+            values = self.values
+            data = marshal.dumps((self.keys.tobytes(), values),
+                                 MARSHAL_VERSION)
+            self.file.write(CHUNK.pack(self.seq, count, len(data)) + data)
+            self.seq += count
+            del self.keys[:]
+            for type_values in values:
+                type_values.clear()
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class JournalReader:
+    # Memory maps a journal. records() yields its raw records, events() the
+    # decoded events.
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) \
+            if size else b''
+        if size < HEADER.size:
+            self.close()
+            raise ValueError('%s is not a journal' % path)
+        magic, version, names_size = HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError('%s is not a journal' % path)
+        if version != VERSION:
+            self.close()
+            raise ValueError('%s has version %d, expected %d'
+                             % (path, version, VERSION))
+        # inputs, the input subscriptions, is None when every event is
+        # journaled
+        self.names, self.inputs = marshal.loads(
+            self.data[HEADER.size:HEADER.size + names_size])
+        self.start = HEADER.size + names_size
+
+    def records(self):
+        # (sequence number, subscription, type, fields) of every record, up
+        # to a partly written last chunk; a run record is (sequence number,
+        # None, RUN, None)
+        data = self.data
+        size = len(data)
+        offset = self.start
+        while offset + CHUNK.size <= size:
+            seq, count, length = CHUNK.unpack_from(data, offset)
+            offset += CHUNK.size
+            if offset + length > size:
+                return
+            keys, values = marshal.loads(data[offset:offset + length])
+            offset += length
+            next_fields = [iter(type_values).__next__ if width is None
+                           else zip(*[iter(type_values)] * width).__next__
+                           for type_values, width in zip(values, WIDTHS)]
+            for seq, key in zip(range(seq, seq + count), array('H', keys)):
+                if key == RUN:
+                    yield seq, None, RUN, None
+                    continue
+                code = key & 0xff
+                yield seq, key >> 8, code, next_fields[code]()
+
+    def events(self):
+        # (sequence number, subscription name, event) of every event
+        names = self.names
+        for seq, subscription, code, values in self.records():
+            if code != RUN:
+                yield seq, names[subscription], decode(code, values)
+
+    def close(self):
+        if not isinstance(self.data, bytes):
+            self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
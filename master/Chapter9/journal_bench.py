@@ -0,0 +1,95 @@
+import argparse
+import contextlib
+import os
+import shutil
+import tempfile
+from time import perf_counter
+
+import numpy as np
+from chapter9.eventbasedbacktester import EventBasedBackTester
+from chapter9.journal import JournalReader
+from chapter9.journalreplay import COMPONENTS, events_journal, \
+    replay_component
+from chapter9.tickfile import ticks_from_closes, write_ticks
+
+
+def run(ticks, journal=None):
+    backtester = EventBasedBackTester(journal=journal)
+    start = perf_counter()
+    backtester.process_ticks(ticks)
+    backtester.close()
+    return perf_counter() - start, backtester
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Measure the cost of journaling the event-based backtester and the speed of the replays. '
+                    'The budget of the journal is 10%% of the time of the backtest.')
+    parser.add_argument('--bars', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='runs with and without the journal, the best '
+                             'of each is kept')
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    try:
+        rng = np.random.default_rng(0)
+        prices = (100 * np.exp(np.cumsum(rng.normal(0, 0.001, args.bars)))).round(2)
+        ticks = os.path.join(root, 'bench.ticks')
+        write_ticks(ticks, ticks_from_closes(prices))
+        journal = os.path.join(root, 'bench.journal')
+
+        plain = []
+        journaled = []
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            # interleaved, so that both see the same machine load
+            for _ in range(args.repeat):
+                plain.append(run(ticks))
+                journaled.append(run(ticks, journal))
+        plain_elapsed, expected = min(plain, key=lambda result: result[0])
+        journal_elapsed, backtester = min(journaled, key=lambda result: result[0])
+        nb_records = len(backtester.journal)
+        size = os.path.getsize(journal)
+        # the events of the pipeline, derived from the inputs journaled
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = perf_counter()
+            events = events_journal(journal)
+            expand_elapsed = perf_counter() - start
+        with JournalReader(events) as reader:
+            nb_events = sum(1 for _ in reader.records())
+        print('without journal: %d events in %.2fs, %.2fus/event'
+              % (nb_events, plain_elapsed, plain_elapsed / nb_events * 1e6))
+        print('with journal   : %d events in %.2fs, %.2fus/event, %+.1f%% (budget +10%%)'
+              % (nb_events, journal_elapsed, journal_elapsed / nb_events * 1e6,
+                 100 * (journal_elapsed / plain_elapsed - 1)))
+        print('journal size   : %.1f MB, %d input and run records, %.1f bytes/event'
+              % (size / 1e6, nb_records, size / nb_events))
+        print('results identical: %s'
+              % (backtester.ts.list_total == expected.ts.list_total))
+        print('journal expand : %.2fs, %.1f MB'
+              % (expand_elapsed, os.path.getsize(events) / 1e6))
+
+        start = perf_counter()
+        with JournalReader(events) as reader:
+            for _ in reader.records():
+                pass
+        elapsed = perf_counter() - start
+        print('journal read   : %.2fs, %.0f events/s'
+              % (elapsed, nb_events / elapsed))
+        # a replay reads the whole journal but runs the handlers of one
+        # component only: its time is compared to the one of the pipeline
+        for component in COMPONENTS:
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                start = perf_counter()
+                target, replayed, mismatches = replay_component(journal, component)
+                elapsed = perf_counter() - start
+            print('replay %-20s: %7d events in %.2fs, %8.0f events/s, '
+                  '%3.0f%% of the pipeline time, %d mismatches'
+                  % (type(target).__name__, replayed, elapsed,
+                     replayed / elapsed, 100 * elapsed / plain_elapsed,
+                     len(mismatches)))
+    finally:
+        shutil.rmtree(root)
+
+if __name__ == '__main__':
+    main()
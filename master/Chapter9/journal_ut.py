@@ -0,0 +1,232 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from chapter7.EventDispatcher import EventDispatcher, EventQueue
+from chapter7.Messages import Order, BookEvent
+from chapter9.eventbasedbacktester import EventBasedBackTester
+from chapter9.journal import JournalReader, JournalWriter, CHUNK, RUN, \
+    TICKS, decode, encode, fields
+from chapter9.journalreplay import events_journal, replay_component
+from chapter9.tickfile import ticks_from_closes, write_ticks, TICK_DTYPE
+
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'test.journal')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_write_and_read(self):
+        order = Order(1, 10, 100, 'bid', 'new')
+        with JournalWriter(self.path) as writer:
+            writer.start(['orders', 'book'])
+            writer.write(0, order)
+            writer.write(1, BookEvent(10.5, 100, None, -1, 'GOOG'))
+            writer.write(0, {'id': 2, 'price': 11.0})
+            self.assertEqual(len(writer), 3)
+        with JournalReader(self.path) as reader:
+            self.assertEqual(reader.names, ['orders', 'book'])
+            events = list(reader.events())
+        self.assertEqual([(seq, name) for seq, name, event in events],
+                         [(1, 'orders'), (2, 'book'), (3, 'orders')])
+        # values keep their types
+        self.assertIs(type(events[0][2].price), int)
+        self.assertEqual(events[0][2].to_dict(), order.to_dict())
+        self.assertEqual(events[1][2].bid_price, 10.5)
+        self.assertIsNone(events[1][2].offer_price)
+        self.assertEqual(events[2][2], {'id': 2, 'price': 11.0})
+
+    def test_fields_taken_at_write(self):
+        order = Order(1, 10.0, 100, 'bid', 'new')
+        with JournalWriter(self.path) as writer:
+            writer.start(['orders'])
+            writer.write(0, order)
+            order.quantity = 50
+            writer.write(0, order)
+        with JournalReader(self.path) as reader:
+            self.assertEqual([event.quantity for _, _, event in reader.events()],
+                             [100, 50])
+
+    def test_unsupported_message(self):
+        with JournalWriter(self.path) as writer:
+            writer.start(['orders'])
+            with self.assertRaises(TypeError):
+                writer.write(0, 'new')
+
+    def test_partial_chunk_ignored(self):
+        with JournalWriter(self.path) as writer:
+            writer.start(['orders'])
+            for i in range(3):
+                writer.write(0, Order(i, 10.0, 100, 'bid', 'new'))
+                if i == 1:
+                    writer.flush()
+        size = os.path.getsize(self.path)
+        with open(self.path, 'r+b') as f:
+            f.truncate(size - 1)
+        with JournalReader(self.path) as reader:
+            self.assertEqual([seq for seq, _, _ in reader.events()], [1, 2])
+        with open(self.path, 'r+b') as f:
+            f.truncate(size - CHUNK.size - 1)
+        with JournalReader(self.path) as reader:
+            self.assertEqual(len(list(reader.records())), 2)
+
+    def test_not_a_journal(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'x' * 64)
+        with self.assertRaises(ValueError):
+            JournalReader(self.path)
+        open(self.path, 'wb').close()
+        with self.assertRaises(ValueError):
+            JournalReader(self.path)
+
+    def test_dispatcher_journals_every_event(self):
+        orders = EventQueue()
+        book = EventQueue()
+        handled = []
+
+        def handle_order(order):
+            handled.append(order.id)
+            book.append(BookEvent(order.price, order.quantity, -1, -1))
+
+        with JournalWriter(self.path) as writer:
+            dispatcher = EventDispatcher(journal=writer)
+            dispatcher.subscribe(orders, handle_order, 'orders')
+            dispatcher.subscribe(book, lambda event: None, 'book')
+            orders.extend(Order(i, 10.0 + i, 100, 'bid', 'new')
+                          for i in range(3))
+            self.assertEqual(dispatcher.run(), 6)
+        with JournalReader(self.path) as reader:
+            events = list(reader.events())
+        self.assertEqual(handled, [0, 1, 2])
+        self.assertEqual([name for _, name, _ in events],
+                         ['orders'] * 3 + ['book'] * 3)
+        self.assertEqual([event.bid_price for _, _, event in events[3:]],
+                         [10.0, 11.0, 12.0])
+
+    def test_timed_dispatcher_not_journaled(self):
+        with JournalWriter(self.path) as writer:
+            with self.assertRaises(ValueError):
+                EventDispatcher(timed=True, journal=writer)
+
+
+class TestJournalReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'test.journal')
+        rng = np.random.default_rng(0)
+        prices = (100 * np.exp(np.cumsum(rng.normal(0, 0.01, 300)))).round(2)
+        self.prices = prices.tolist()
+        self.ticks = os.path.join(self.dir, 'test.ticks')
+        write_ticks(self.ticks, ticks_from_closes(prices))
+        self.backtester = EventBasedBackTester(journal=self.path)
+        self.backtester.process_ticks(self.ticks, batch_size=100)
+        self.backtester.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_inputs_only(self):
+        # 12 batches of ticks and the run after the last one
+        with JournalReader(self.path) as reader:
+            self.assertEqual(reader.inputs, [0])
+            records = list(reader.records())
+        self.assertEqual(len(records), 13)
+        seq, subscription, code, values = records[0]
+        self.assertEqual((seq, subscription, code), (1, 0, TICKS))
+        ticks, runs = decode(code, values)
+        self.assertEqual(ticks.dtype, TICK_DTYPE)
+        self.assertEqual(len(ticks), 100)
+        self.assertEqual(runs, list(range(2, 100, 2)))
+        self.assertEqual(records[1][2], TICKS)
+        self.assertEqual(decode(*records[1][2:])[1], list(range(0, 100, 2)))
+        self.assertEqual(records[-1], (13, None, RUN, None))
+
+    def test_expanded_journal(self):
+        events = events_journal(self.path)
+        self.assertEqual(events, self.path + '.events')
+        with JournalReader(events) as reader:
+            self.assertIsNone(reader.inputs)
+            names = [name for _, name, _ in reader.events()]
+        self.assertGreater(len(names), 2400)
+        self.assertEqual(names.count('lp_2_gateway'), 1200)
+        # expanded once
+        modified = os.path.getmtime(events)
+        self.assertEqual(events_journal(self.path), events)
+        self.assertEqual(os.path.getmtime(events), modified)
+        self.assertEqual(events_journal(events), events)
+        all_events = os.path.join(self.dir, 'all.journal')
+        backtester = EventBasedBackTester(journal=all_events,
+                                          journal_all=True)
+        backtester.process_ticks(self.ticks, batch_size=100)
+        backtester.close()
+        with JournalReader(events) as reader, \
+                JournalReader(all_events) as expected:
+            self.assertEqual(list(reader.records()),
+                             list(expected.records()))
+
+    def test_yahoo_prices_journaled(self):
+        path = os.path.join(self.dir, 'yahoo.journal')
+        backtester = EventBasedBackTester(journal=path)
+        for price in self.prices[:100]:
+            backtester.process_data_from_yahoo(price)
+        backtester.close()
+        with JournalReader(path) as reader:
+            codes = [code for _, _, code, _ in reader.records()]
+        self.assertEqual(codes[:3], [1, 1, RUN])
+        self.assertEqual(len(codes), 500)
+        target, _, mismatches = replay_component(path, 'ts')
+        self.assertEqual(mismatches, [])
+        self.assertEqual(target.list_total, backtester.ts.list_total)
+
+    def test_replay_each_component(self):
+        for component in ('ob', 'ts', 'om', 'ms'):
+            target, replayed, mismatches = replay_component(self.path,
+                                                            component)
+            self.assertGreater(replayed, 0)
+            self.assertEqual(mismatches, [])
+        self.assertEqual(replay_component(self.path, 'ob')[1], 1200)
+
+    def test_replayed_strategy_state(self):
+        target, _, _ = replay_component(self.path, 'ts')
+        self.assertEqual(target.list_total, self.backtester.ts.list_total)
+        self.assertEqual(target.list_paper_total,
+                         self.backtester.ts.list_paper_total)
+
+    def test_mismatch_reported(self):
+        # the book events of the journal no longer follow from its orders
+        tampered = os.path.join(self.dir, 'tampered.journal')
+        with JournalReader(events_journal(self.path)) as reader, \
+                JournalWriter(tampered) as writer:
+            writer.start(reader.names)
+            for seq, name, event in reader.events():
+                if seq == 2:
+                    continue
+                if name == 'ob_2_ts' and seq < 20:
+                    event.bid_price += 1
+                writer.write(reader.names.index(name), event)
+        _, _, mismatches = replay_component(tampered, 'ob')
+        self.assertTrue(mismatches)
+        self.assertTrue(all(name == 'ob_2_ts' for _, name, _, _ in mismatches))
+        seq, name, expected, replayed = mismatches[0]
+        self.assertNotEqual(encode(*fields(expected)),
+                            encode(*fields(replayed)))
+
+    def test_not_a_backtester_journal(self):
+        with JournalWriter(self.path) as writer:
+            writer.start(['orders'])
+        with self.assertRaises(ValueError):
+            replay_component(self.path, 'ob')
+        with self.assertRaises(ValueError):
+            replay_component(self.path, 'lp')
+
+
+if __name__ == '__main__':
+    unittest.main()
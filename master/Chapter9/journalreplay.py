@@ -0,0 +1,165 @@
+import argparse
+import os
+from collections import deque
+from time import perf_counter
+
+from chapter7.EventDispatcher import EventQueue
+from chapter9.eventbasedbacktester import EventBasedBackTester
+from chapter9.journal import JournalReader, DECODERS, ENCODERS, RUN, \
+    TICKS, encode, decode
+from chapter9.tickfile import orders_from_ticks
+
+COMPONENTS = ('ob', 'ts', 'om', 'ms')
+
+
+def check_names(reader, dispatcher):
+    if reader.names != dispatcher.names:
+        raise ValueError('%s was not written by EventBasedBackTester: '
+                         'subscriptions %s' % (reader.path, reader.names))
+
+
+def expand_journal(path, events_path):
+    # Writes to events_path the journal of every event handed to a
+    # component when an EventBasedBackTester is sent the inputs of the
+    # journal at path and run at its run records, the ticks of a batch as
+    # their orders. Returns the number of events.
+    backtester = EventBasedBackTester(journal=events_path, journal_all=True)
+    dispatcher = backtester.dispatcher
+    queues = [queue for queue, handler in dispatcher.subscriptions]
+    try:
+        with JournalReader(path) as reader:
+            check_names(reader, dispatcher)
+            if reader.inputs is None:
+                raise ValueError('%s already has every event' % path)
+            run = dispatcher.run
+            decoders = DECODERS
+            for seq, subscription, code, values in reader.records():
+                if code == RUN:
+                    run()
+                elif code == TICKS:
+                    ticks, runs = decoders[code](values)
+                    orders = orders_from_ticks(ticks)
+                    queue = queues[subscription]
+                    first = 0
+                    for end in runs:
+                        queue.extend(orders[first:end])
+                        run()
+                        first = end
+                    queue.extend(orders[first:])
+                else:
+                    queues[subscription].append(decoders[code](values))
+    finally:
+        backtester.close()
+    return len(backtester.journal)
+
+
+def events_journal(path):
+    # The journal of every event of the journal at path: the journal
+    # itself when it has them, else path + '.events', expanded from it
+    # unless it already was
+    with JournalReader(path) as reader:
+        if reader.inputs is None:
+            return path
+    events_path = path + '.events'
+    if not os.path.exists(events_path) or \
+            os.path.getmtime(events_path) < os.path.getmtime(path):
+        expand_journal(path, events_path)
+    return events_path
+
+
+def replay_component(path, component):
+    # Re-drives one component of an EventBasedBackTester, ob, ts, om or ms,
+    # with the events its handlers got in the journal at path, in the same
+    # order, the other components doing nothing. A journal of inputs is
+    # expanded first by events_journal(). Every event the component
+    # sends is checked against the journal record of its delivery: being
+    # one producer per queue, the n-th event sent on a queue is the n-th
+    # record of its subscription. Returns the component, the number of
+    # events replayed and the mismatches as (sequence number, subscription,
+    # journal event, replayed event) tuples, None for a missing event, the
+    # sequence number being None for an event sent but never delivered.
+    if component not in COMPONENTS:
+        raise ValueError('component must be one of %s, got %r'
+                         % (', '.join(COMPONENTS), component))
+    backtester = EventBasedBackTester()
+    path = events_journal(path)
+    target = getattr(backtester, component)
+    dispatcher = backtester.dispatcher
+    handlers = {}
+    for index, (queue, handler) in enumerate(dispatcher.subscriptions):
+        if getattr(handler, '__self__', None) is target:
+            handlers[index] = handler
+    inputs = set(id(dispatcher.subscriptions[index][0]) for index in handlers)
+    # the queues the component sends to, and what it sent on each
+    outputs = [queue for queue in vars(target).values()
+               if isinstance(queue, EventQueue) and id(queue) not in inputs]
+    sent = dict((queue.index, deque()) for queue in outputs)
+
+    mismatches = []
+    nb_events = 0
+    with JournalReader(path) as reader:
+        check_names(reader, dispatcher)
+        names = reader.names
+        # by subscription, the handler of the component or the events it
+        # sent, None for the others
+        handler_of = [handlers.get(index) for index in range(len(names))]
+        sent_of = [sent.get(index) for index in range(len(names))]
+        decoders = DECODERS
+        for seq, subscription, code, values in reader.records():
+            handler = handler_of[subscription]
+            if handler is not None:
+                handler(decoders[code](values))
+                nb_events += 1
+                for queue in outputs:
+                    if queue:
+                        sent_fields = sent_of[queue.index].append
+                        for event in queue:
+                            event_code, get_fields = ENCODERS[type(event)]
+                            sent_fields((event_code, get_fields(event)))
+                        queue.clear()
+                continue
+            expected = sent_of[subscription]
+            if expected is None:
+                continue
+            replayed = expected.popleft() if expected else None
+            # equal values of the same types, or for values not equal to
+            # themselves like nan, the same bytes
+            if replayed is not None and replayed[0] == code and \
+                    replayed[1] == values and \
+                    (code == 0 or
+                     tuple(map(type, replayed[1])) == tuple(map(type, values))):
+                continue
+            if replayed is None or encode(*replayed) != encode(code, values):
+                mismatches.append(
+                    (seq, names[subscription], decode(code, values),
+                     decode(*replayed) if replayed is not None else None))
+    for subscription, events in sent.items():
+        for replayed in events:
+            mismatches.append((None, names[subscription], None,
+                               decode(*replayed)))
+    return target, nb_events, mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Replay one EventBasedBackTester component from a journal')
+    parser.add_argument('journal')
+    parser.add_argument('component', choices=COMPONENTS)
+    args = parser.parse_args()
+
+    start = perf_counter()
+    target, nb_events, mismatches = replay_component(args.journal,
+                                                     args.component)
+    elapsed = perf_counter() - start
+    print('%s: %d events replayed in %.2fs, %.0f events/s'
+          % (type(target).__name__, nb_events, elapsed, nb_events / elapsed))
+    if not mismatches:
+        print('output identical to the journal')
+    for seq, name, expected, replayed in mismatches[:10]:
+        print('mismatch on %s at %s: journal %r, replay %r'
+              % (name, seq, expected, replayed))
+    if len(mismatches) > 10:
+        print('... %d mismatches' % len(mismatches))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+import argparse
+import os
+import pickle
+import shutil
+import tempfile
+from time import perf_counter
+
+import numpy as np
+from chapter9.marketdatastore import MarketDataStore, DATE
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+
+
+def generate_bars(nb_bars, seed=0):
+    # One bar per minute from 2001 on
+    rng = np.random.default_rng(seed)
+    dates = np.datetime64('2001-01-01', 'ns') + \
+        np.arange(nb_bars) * np.timedelta64(60, 's').astype('timedelta64[ns]')
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.0005, nb_bars)))
+    columns = {'Open': close * (1 + rng.normal(0, 0.0002, nb_bars)),
+               'High': close * 1.001,
+               'Low': close * 0.999,
+               'Close': close,
+               'Adj Close': close,
+               'Volume': rng.integers(100, 10000, nb_bars)}
+    return dates, columns
+
+
+def write_pickle(path, dates, columns):
+    # What the chapters cache: a pickled DataFrame when pandas is there,
+    # the same arrays in a dict otherwise
+    try:
+        import pandas as pd
+        payload = pd.DataFrame(columns, index=pd.DatetimeIndex(dates, name=DATE))
+        kind = 'DataFrame'
+    except ImportError:
+        payload = dict(columns, Date=dates)
+        kind = 'dict of arrays'
+    with open(path, 'wb') as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return kind
+
+
+def drop_cache(path):
+    # Evicts the files from the OS page cache so the next read is cold
+    paths = [path] if os.path.isfile(path) else \
+        [os.path.join(d, f) for d, _, files in os.walk(path) for f in files]
+    for p in paths:
+        fd = os.open(p, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def touch(arrays):
+    # Reads every value, memory-mapped columns are only read when used
+    for a in arrays:
+        a.view(np.int64).sum() if a.dtype.kind == 'M' else a.sum()
+
+
+def load_pickle(path, start, end, columns):
+    with open(path, 'rb') as f:
+        payload = pickle.load(f)
+    if isinstance(payload, dict):
+        dates = payload[DATE]
+        lo = np.searchsorted(dates, start, 'left')
+        hi = np.searchsorted(dates, end, 'right')
+        return [dates[lo:hi]] + [payload[c][lo:hi] for c in columns]
+    df = payload.loc[start:end, columns]
+    return [df.index.values] + [df[c].to_numpy() for c in columns]
+
+
+def load_store(store, start, end, columns):
+    return list(store.read('BENCH', start, end, columns).values())
+
+
+def timed(load, path, cold, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        if cold:
+            drop_cache(path)
+        start = perf_counter()
+        touch(load())
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare loading bars from a pickle and from the market data store')
+    parser.add_argument('--bars', type=int, default=2000000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--dir', default=None, help='where to write the data, a temporary directory by default')
+    args = parser.parse_args()
+
+    root = args.dir or tempfile.mkdtemp()
+    try:
+        dates, columns = generate_bars(args.bars)
+        pickle_path = os.path.join(root, 'bench_data.pkl')
+        kind = write_pickle(pickle_path, dates, columns)
+        store = MarketDataStore(os.path.join(root, 'store'))
+        start = perf_counter()
+        store.append('BENCH', dates, columns)
+        print('%d bars: pickle (%s) %.1f MB, store ingestion %.2fs'
+              % (args.bars, kind, os.path.getsize(pickle_path) / 1e6, perf_counter() - start))
+
+        month = dates[len(dates) // 2]
+        cases = [('all columns, all dates', None, None, COLUMNS),
+                 ('Close, one month', month, month + np.timedelta64(30, 'D'), ['Close'])]
+        for name, start_date, end_date, names in cases:
+            start_date = dates[0] if start_date is None else start_date
+            end_date = dates[-1] if end_date is None else end_date
+            for cold in (True, False):
+                pickle_time = timed(lambda: load_pickle(pickle_path, start_date, end_date, names),
+                                    pickle_path, cold, args.repeat)
+                store_time = timed(lambda: load_store(store, start_date, end_date, names),
+                                   store.root, cold, args.repeat)
+                print('%-24s %s  pickle %.4fs  store %.4fs  %.1fx'
+                      % (name, 'cold' if cold else 'warm', pickle_time, store_time,
+                         pickle_time / store_time))
+    finally:
+        if args.dir is None:
+            shutil.rmtree(root)
+
+if __name__ == '__main__':
+    main()
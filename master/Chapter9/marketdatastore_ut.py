@@ -0,0 +1,180 @@
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from chapter9.marketdatastore import MarketDataStore, load_financial_data
+
+
+def bars(start, nb_days):
+    dates = np.arange(np.datetime64(start), np.datetime64(start) + nb_days,
+                      dtype='datetime64[D]').astype('datetime64[ns]')
+    close = 100 + np.arange(nb_days, dtype=np.float64)
+    return dates, {'Close': close, 'Volume': np.arange(nb_days) * 10}
+
+
+class TestMarketDataStore(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = MarketDataStore(self.root)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_append_and_read(self):
+        dates, columns = bars('2016-12-01', 100)
+        self.store.append('GOOG', dates, columns)
+        self.assertIn('GOOG', self.store)
+        self.assertEqual(self.store.symbols(), ['GOOG'])
+        self.assertEqual(self.store.columns('GOOG'), ['Close', 'Volume'])
+        # chunked by year
+        self.assertEqual([c['name'] for c in self.store.index('GOOG')['chunks']],
+                         ['2016-0', '2017-0'])
+        result = self.store.read('GOOG')
+        self.assertTrue((result['Date'] == dates).all())
+        self.assertTrue((result['Close'] == columns['Close']).all())
+        self.assertEqual(result['Volume'].dtype, columns['Volume'].dtype)
+
+    def test_date_range_and_columns(self):
+        dates, columns = bars('2016-12-01', 100)
+        self.store.append('GOOG', dates, columns)
+        result = self.store.read('GOOG', '2016-12-30', '2017-01-02', ['Close'])
+        self.assertEqual(sorted(result), ['Close', 'Date'])
+        self.assertEqual(result['Close'].tolist(), [129.0, 130.0, 131.0, 132.0])
+        # a range inside one chunk is a view on the file
+        result = self.store.read('GOOG', '2017-01-10', '2017-01-11', ['Close'])
+        self.assertIsInstance(result['Close'], np.memmap)
+        self.assertEqual(result['Close'].tolist(), [140.0, 141.0])
+        result = self.store.read('GOOG', '2018-01-01', '2018-02-01')
+        self.assertEqual(len(result['Date']), 0)
+        self.assertEqual(len(result['Close']), 0)
+        with self.assertRaises(ValueError):
+            self.store.read('GOOG', columns=['Open'])
+        with self.assertRaises(KeyError):
+            self.store.read('MSFT')
+
+    def test_append_only(self):
+        dates, columns = bars('2017-01-01', 30)
+        self.store.append('GOOG', dates[:20], dict((k, v[:20]) for k, v in columns.items()))
+        self.store.append('GOOG', dates[20:], dict((k, v[20:]) for k, v in columns.items()),
+                          covered_until='2017-03-01')
+        self.assertEqual(len(self.store.index('GOOG')['chunks']), 2)
+        self.assertEqual(self.store.read('GOOG')['Close'].tolist(), columns['Close'].tolist())
+        self.assertEqual(self.store.covered_until('GOOG'), np.datetime64('2017-03-01', 'ns'))
+        with self.assertRaises(ValueError):
+            self.store.append('GOOG', dates[-1:], dict((k, v[-1:]) for k, v in columns.items()))
+        later, columns = bars('2017-03-01', 5)
+        with self.assertRaises(ValueError):
+            self.store.append('GOOG', later, {'Close': columns['Close']})
+        with self.assertRaises(ValueError):
+            self.store.append('MSFT', later[::-1], columns)
+
+    def test_reopen(self):
+        dates, columns = bars('2017-01-01', 10)
+        self.store.append('AUDUSD=X', dates, columns)
+        store = MarketDataStore(self.root)
+        self.assertEqual(store.date_range('AUDUSD=X'), (dates[0], dates[-1]))
+        self.assertEqual(store.read('AUDUSD=X')['Close'].tolist(), columns['Close'].tolist())
+
+    def test_prepend_and_coverage(self):
+        dates, columns = bars('2016-12-01', 100)
+        self.store.append('GOOG', dates[60:], dict((k, v[60:]) for k, v in columns.items()),
+                          covered_until='2017-03-31', covered_from='2017-01-29')
+        self.assertEqual(self.store.covered_from('GOOG'), np.datetime64('2017-01-29', 'ns'))
+        self.assertEqual(self.store.missing_ranges('GOOG', '2017-02-01', '2017-03-01'), [])
+        self.assertEqual(self.store.missing_ranges('GOOG', '2016-12-01', '2017-04-02'),
+                         [(np.datetime64('2016-12-01', 'ns'), np.datetime64('2017-01-28', 'ns')),
+                          (np.datetime64('2017-04-01', 'ns'), np.datetime64('2017-04-02', 'ns'))])
+        with self.assertRaises(ValueError):
+            self.store.prepend('GOOG', dates[50:61], dict((k, v[50:61]) for k, v in columns.items()))
+        self.store.prepend('GOOG', dates[:60], dict((k, v[:60]) for k, v in columns.items()),
+                           covered_from='2016-11-01')
+        self.assertEqual([c['name'] for c in self.store.index('GOOG')['chunks']],
+                         ['2016-0', '2017-1', '2017-0'])
+        self.assertEqual(self.store.covered_from('GOOG'), np.datetime64('2016-11-01', 'ns'))
+        self.assertEqual(self.store.read('GOOG')['Close'].tolist(), columns['Close'].tolist())
+        self.assertEqual(self.store.read('GOOG', '2016-12-30', '2017-01-31')['Date'].tolist(),
+                         dates[29:62].tolist())
+
+
+class TestLoadFinancialData(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = MarketDataStore(self.root)
+        self.downloads = []
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def download(self, symbol, start, end):
+        import pandas as pd
+        self.downloads.append((start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')))
+        dates, columns = bars('2016-01-01', 3 * 365)
+        df = pd.DataFrame(columns, index=pd.DatetimeIndex(dates, name='Date'))
+        return df[(df.index >= start) & (df.index <= end)]
+
+    def load(self, start, end, output_file=None):
+        return load_financial_data(start, end, output_file, store=self.store, download=self.download)
+
+    def test_shorter_then_wider(self):
+        shorter = self.load('2017-01-01', '2017-06-30')
+        self.assertEqual(self.downloads, [('2017-01-01', '2017-06-30')])
+        wider = self.load('2016-06-01', '2018-06-30')
+        self.assertEqual(self.downloads[1:], [('2016-06-01', '2016-12-31'), ('2017-07-01', '2018-06-30')])
+        self.assertEqual(str(wider.index[0].date()), '2016-06-01')
+        self.assertEqual(str(wider.index[-1].date()), '2018-06-30')
+        self.assertEqual(len(wider), 760)
+        self.assertTrue((wider.loc['2017-01-01':'2017-06-30'] == shorter).all().all())
+        self.assertEqual(len(self.load('2016-07-01', '2018-01-01')), 550)
+        self.assertEqual(len(self.downloads), 3)
+
+    def test_pickle_import(self):
+        import pandas as pd
+        dates, columns = bars('2017-01-01', 31)
+        output_file = self.root + '/goog.pkl'
+        pd.DataFrame(columns, index=pd.DatetimeIndex(dates, name='Date')).to_pickle(output_file)
+        self.load('2017-01-01', '2017-01-31', output_file)
+        self.assertEqual(self.downloads, [])
+        # the pickle ends before the requested end
+        self.load('2017-01-01', '2017-02-10', output_file)
+        self.assertEqual(self.downloads, [('2017-02-01', '2017-02-10')])
+        self.assertEqual(self.store.covered_until('GOOG'), np.datetime64('2017-02-10', 'ns'))
+
+    def test_pickle_covers_requested_dates(self):
+        # bars from 2017-01-02 only, saved for a request starting before
+        import pandas as pd
+        dates, columns = bars('2017-01-02', 30)
+        output_file = self.root + '/goog.pkl'
+        pd.DataFrame(columns, index=pd.DatetimeIndex(dates, name='Date')).to_pickle(output_file)
+        df = self.load('2016-06-01', '2017-02-15', output_file)
+        self.assertEqual(self.downloads, [])
+        self.assertEqual(len(df), 30)
+        self.load('2016-06-01', '2017-02-15', output_file)
+        self.assertEqual(self.downloads, [])
+
+    def test_weekend_not_downloaded(self):
+        # 2017-01-07 and 08 are a Saturday and a Sunday
+        self.load('2017-01-02', '2017-01-06')
+        self.load('2017-01-02', '2017-01-08')
+        self.assertEqual(self.downloads, [('2017-01-02', '2017-01-06')])
+        self.load('2017-01-02', '2017-01-09')
+        self.assertEqual(self.downloads[1:], [('2017-01-07', '2017-01-09')])
+
+    def test_pickle_then_earlier(self):
+        import pandas as pd
+        dates, columns = bars('2017-01-01', 31)
+        output_file = self.root + '/goog.pkl'
+        pd.DataFrame(columns, index=pd.DatetimeIndex(dates, name='Date')).to_pickle(output_file)
+        self.load('2017-01-10', '2017-01-20', output_file)
+        self.assertEqual(self.store.covered_from('GOOG'), np.datetime64('2017-01-01', 'ns'))
+        df = self.load('2016-12-01', '2017-01-31', output_file)
+        self.assertEqual(self.downloads, [('2016-12-01', '2016-12-31')])
+        self.assertEqual(len(df), 62)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
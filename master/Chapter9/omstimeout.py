@@ -1,37 +1,43 @@
+import itertools
+
 from chapter9.simulatedclock import SimulatedRealClock
-import threading
+from chapter9.timerwheel import TimerService
 from time import sleep
-from datetime import datetime, timedelta
 
-class TimeOut(threading.Thread):
-    def __init__(self,sim_real_clock,time_to_stop,fun):
-        super().__init__()
-        self.time_to_stop=time_to_stop
-        self.sim_real_clock=sim_real_clock
-        self.callback=fun
-        self.disabled=False
-    def run(self):
-        while not self.disabled and\
-                self.sim_real_clock.getTime() < self.time_to_stop:
-            sleep(1)
-        if not self.disabled:
-            self.callback()
+ORDER_TIME_OUT = 5 * 10 ** 9
 
 
 class OMS:
-    def __init__(self,sim_real_clock):
+    # Every order sent arms a five seconds time out on the timer service of
+    # the clock, cancelled by the market response. A simulated clock fires
+    # the time outs as its time goes by, a real one on the timer thread.
+    def __init__(self,sim_real_clock,timers=None):
         self.sim_real_clock = sim_real_clock
-        self.five_sec_order_time_out_management=\
-            TimeOut(sim_real_clock,
-                sim_real_clock.getTime()+timedelta(0,5),
-                    self.onTimeOut)
-    def send_order(self):
-        self.five_sec_order_time_out_management.disabled = False
-        self.five_sec_order_time_out_management.start()
+        if timers is None:
+            timers = TimerService(sim_real_clock)
+            if not sim_real_clock.simulated:
+                timers.start()
+        self.timers = timers
+        self.order_time_outs = {}
+        # ids of the orders sent without one
+        self.order_ids = itertools.count(1)
+    def send_order(self,order_id=None):
+        # Returns the id the response is expected for, a new one when no
+        # order_id is given so that every order has its own time out
+        if order_id is None:
+            order_id = next(self.order_ids)
+            while order_id in self.order_time_outs:
+                order_id = next(self.order_ids)
+        self.order_time_outs[order_id] = \
+            self.timers.schedule_in(ORDER_TIME_OUT, self.onTimeOut, order_id)
         print('send order')
-    def receive_market_reponse(self):
-        self.five_sec_order_time_out_management.disabled=True
-    def onTimeOut(self):
+        return order_id
+    def receive_market_reponse(self,order_id):
+        time_out = self.order_time_outs.pop(order_id, None)
+        if time_out is not None:
+            self.timers.cancel(time_out)
+    def onTimeOut(self,order_id=None):
+        self.order_time_outs.pop(order_id, None)
         print('Order Timeout Please Take Action')
 
 if __name__ == '__main__':
@@ -42,6 +48,7 @@ if __name__ == '__main__':
     for i in range(10):
         print('do something else: %d' % (i))
         sleep(1)
+    oms.timers.stop()
 
     print('case 2: simulated time')
     simulated_real_clock=SimulatedRealClock(simulated=True)
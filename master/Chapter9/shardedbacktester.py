@@ -0,0 +1,213 @@
+import multiprocessing
+import queue
+
+import numpy as np
+from chapter7.EventDispatcher import EventDispatcher, EventQueue
+from chapter7.MarketSimulator import MarketSimulator
+from chapter7.Messages import BookEvent, Order, ACTIONS
+from chapter7.OrderBook import OrderBook
+from chapter7.OrderManager import OrderManager
+from chapter9.TradingStrategyDualMA import TradingStrategyDualMA
+from chapter9.shmring import ShmRing, wait
+from chapter9.tickfile import TickReader, SIDE_NAMES
+
+# The event-based backtester split in two kinds of processes: book
+# processes replay the tick files of their symbols into one order book per
+# symbol, and strategy processes run the strategy, order manager and
+# market simulator of their symbols on the book events. The market
+# simulator fills every order without looking at the book, so nothing
+# flows back from the strategies to the books and the book events are
+# all the processes exchange, as BOOK_EVENT_DTYPE records over a ShmRing
+# from every book process to every strategy process.
+#
+# Symbol i of the sorted symbols goes to book process i % nb_books and
+# strategy process i % nb_strategies. Each symbol has its own book and
+# strategy and its book events stay in order in their ring, so the results
+# do not depend on how the processes are scheduled: they are the ones of
+# replaying every tick file with EventBasedBackTester.process_ticks.
+BOOK_EVENT_DTYPE = np.dtype([('timestamp', '<i8'),
+                             ('symbol', '<i4'),
+                             ('bid_price', '<f8'),
+                             ('bid_quantity', '<i8'),
+                             ('offer_price', '<f8'),
+                             ('offer_quantity', '<i8')])
+
+BATCH_SIZE = 65536
+RING_CAPACITY = 1 << 16
+
+
+def book_events(path, symbol, batch_size=BATCH_SIZE):
+    # Replays the tick file at path into an OrderBook and yields
+    # the book events of every batch of ticks as BOOK_EVENT_DTYPE records
+    book = OrderBook()
+    handle_order = book.handle_order
+    with TickReader(path) as reader:
+        for batch in reader.batches(batch_size):
+            events = []
+            for timestamp, id, price, quantity, side, action in zip(
+                    batch['timestamp'].tolist(), batch['id'].tolist(),
+                    batch['price'].tolist(), batch['quantity'].tolist(),
+                    batch['side'].tolist(), batch['action'].tolist()):
+                be = handle_order(Order(id, price, quantity,
+                                        SIDE_NAMES[side], ACTIONS[action]))
+                if be is not None:
+                    events.append((timestamp, symbol,
+                                   be.bid_price, be.bid_quantity,
+                                   be.offer_price, be.offer_quantity))
+            yield np.array(events, dtype=BOOK_EVENT_DTYPE)
+
+
+class StrategyPipeline:
+    # The strategy side of EventBasedBackTester for one symbol. The book
+    # events of a timestamp are queued together before the events are
+    # processed, as the backtester processes its events once all the
+    # ticks of a timestamp reached the book.
+    def __init__(self):
+        self.ob_2_ts = EventQueue()
+        self.ts_2_om = EventQueue()
+        self.om_2_ts = EventQueue()
+        self.gw_2_om = EventQueue()
+        self.om_2_gw = EventQueue()
+        self.ts = TradingStrategyDualMA(self.ob_2_ts, self.ts_2_om,
+                                        self.om_2_ts)
+        self.ms = MarketSimulator(self.om_2_gw, self.gw_2_om)
+        self.om = OrderManager(self.ts_2_om, self.om_2_ts,
+                               self.om_2_gw, self.gw_2_om)
+        self.dispatcher = EventDispatcher()
+        self.dispatcher.subscribe(self.ob_2_ts, self.ts.handle_book_event)
+        self.dispatcher.subscribe(self.ts_2_om,
+                                  self.om.handle_order_from_trading_strategy)
+        self.dispatcher.subscribe(self.om_2_gw, self.ms.handle_order)
+        self.dispatcher.subscribe(self.gw_2_om,
+                                  self.om.handle_order_from_gateway)
+        self.dispatcher.subscribe(self.om_2_ts, self.ts.handle_market_response)
+        self.timestamp = None
+
+    def handle_records(self, records):
+        append = self.ob_2_ts.append
+        timestamp = self.timestamp
+        for event_timestamp, _, bid_price, bid_quantity, offer_price, \
+                offer_quantity in records:
+            if event_timestamp != timestamp:
+                self.dispatcher.run()
+                timestamp = event_timestamp
+            append(BookEvent(bid_price, bid_quantity,
+                             offer_price, offer_quantity))
+        self.timestamp = timestamp
+
+    def finish(self):
+        self.dispatcher.run()
+        return self.ts.list_total, self.ts.list_paper_total
+
+
+def run_symbol(path, batch_size=BATCH_SIZE):
+    # One symbol in the current process, the reference of the sharded run
+    pipeline = StrategyPipeline()
+    for records in book_events(path, 0, batch_size):
+        pipeline.handle_records(records.tolist())
+    return pipeline.finish()
+
+
+def book_process(symbols, paths, ring_names, batch_size):
+    # symbols are (index, symbol) pairs, ring_names the rings to every
+    # strategy process
+    rings = [ShmRing(BOOK_EVENT_DTYPE, name=name) for name in ring_names]
+    try:
+        sources = [book_events(paths[symbol], index, batch_size)
+                   for index, symbol in symbols]
+        # One batch of every symbol in turn, so every strategy process
+        # gets work early
+        while sources:
+            for source in list(sources):
+                records = next(source, None)
+                if records is None:
+                    sources.remove(source)
+                    continue
+                targets = records['symbol'] % len(rings)
+                for target, ring in enumerate(rings):
+                    ring.push_all(records[targets == target])
+        for ring in rings:
+            ring.close_writer()
+    finally:
+        for ring in rings:
+            ring.close()
+
+
+def strategy_process(symbols, ring_names, results):
+    rings = [ShmRing(BOOK_EVENT_DTYPE, name=name) for name in ring_names]
+    try:
+        pipelines = dict((index, StrategyPipeline()) for index, _ in symbols)
+        active = list(rings)
+        spins = 0
+        while active:
+            progress = False
+            for ring in list(active):
+                records = ring.pop()
+                if len(records):
+                    progress = True
+                    for index in np.unique(records['symbol']).tolist():
+                        pipelines[index].handle_records(
+                            records[records['symbol'] == index].tolist())
+                elif ring.finished():
+                    active.remove(ring)
+            if progress:
+                spins = 0
+            else:
+                wait(spins)
+                spins += 1
+        results.put(dict((symbol, pipelines[index].finish())
+                         for index, symbol in symbols))
+    finally:
+        for ring in rings:
+            ring.close()
+
+
+def run_sharded(paths, nb_books=2, nb_strategies=2, batch_size=BATCH_SIZE,
+                ring_capacity=RING_CAPACITY):
+    # Runs the tick files of paths, a dict of symbol to path, in nb_books
+    # book processes and nb_strategies strategy processes. Returns a dict
+    # of symbol to the (list_total, list_paper_total) of its strategy.
+    symbols = list(enumerate(sorted(paths)))
+    context = multiprocessing.get_context()
+    rings = [[ShmRing(BOOK_EVENT_DTYPE, ring_capacity)
+              for _ in range(nb_strategies)] for _ in range(nb_books)]
+    results = context.Queue()
+    processes = []
+    try:
+        for book in range(nb_books):
+            processes.append(context.Process(
+                target=book_process,
+                args=(symbols[book::nb_books], paths,
+                      [ring.name for ring in rings[book]], batch_size)))
+        for strategy in range(nb_strategies):
+            processes.append(context.Process(
+                target=strategy_process,
+                args=(symbols[strategy::nb_strategies],
+                      [rings[book][strategy].name
+                       for book in range(nb_books)], results)))
+        for process in processes:
+            process.start()
+        totals = {}
+        received = 0
+        while received < nb_strategies:
+            try:
+                totals.update(results.get(timeout=1))
+                received += 1
+            except queue.Empty:
+                for process in processes:
+                    if process.exitcode:
+                        raise RuntimeError('%s exited with code %d'
+                                           % (process.name, process.exitcode))
+        for process in processes:
+            process.join()
+            if process.exitcode != 0:
+                raise RuntimeError('%s exited with code %d'
+                                   % (process.name, process.exitcode))
+        return totals
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for book_rings in rings:
+            for ring in book_rings:
+                ring.close()
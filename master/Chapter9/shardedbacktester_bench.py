@@ -0,0 +1,68 @@
+import argparse
+import contextlib
+import os
+import shutil
+import tempfile
+from time import perf_counter
+
+import numpy as np
+from chapter9.shardedbacktester import run_sharded, run_symbol
+from chapter9.tickfile import TickWriter, ticks_from_closes
+
+
+def write_symbols(root, nb_symbols, nb_messages, seed=0):
+    # One tick file per symbol with nb_messages ticks in all, 4 ticks a bar
+    paths = {}
+    nb_bars = nb_messages // (4 * nb_symbols)
+    for i in range(nb_symbols):
+        path = os.path.join(root, 'S%02d.ticks' % i)
+        rng = np.random.default_rng(seed + i)
+        with TickWriter(path) as writer:
+            for start in range(0, nb_bars, 1000000):
+                count = min(1000000, nb_bars - start)
+                prices = (100 * np.exp(np.cumsum(rng.normal(0, 0.001, count)))).round(2)
+                writer.write(ticks_from_closes(prices, 2 * np.arange(start, start + count)))
+        paths['S%02d' % i] = path
+    return paths, 4 * nb_bars * nb_symbols
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Replay symbols in one process, then sharded over book and strategy processes')
+    parser.add_argument('--messages', type=int, default=50000000)
+    parser.add_argument('--symbols', type=int, default=16)
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help='numbers of book processes, with as many strategy processes')
+    parser.add_argument('--batch-size', type=int, default=65536)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    try:
+        paths, nb_messages = write_symbols(root, args.symbols, args.messages)
+        print('%d symbols, %d messages, %d cpus'
+              % (args.symbols, nb_messages, os.cpu_count()))
+
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = perf_counter()
+            expected = dict((symbol, run_symbol(path, args.batch_size))
+                            for symbol, path in paths.items())
+            single = perf_counter() - start
+        print('one process       : %.1fs, %.2f Mmsg/s'
+              % (single, nb_messages / single / 1e6))
+
+        for nb_processes in args.processes:
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                start = perf_counter()
+                results = run_sharded(paths, nb_processes, nb_processes,
+                                      args.batch_size)
+                elapsed = perf_counter() - start
+            print('%2d books %2d strats : %.1fs, %.2f Mmsg/s, speedup %.2fx, '
+                  'results identical: %s'
+                  % (nb_processes, nb_processes, elapsed,
+                     nb_messages / elapsed / 1e6, single / elapsed,
+                     results == expected))
+    finally:
+        shutil.rmtree(root)
+
+if __name__ == '__main__':
+    main()
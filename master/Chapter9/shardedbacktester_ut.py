@@ -0,0 +1,52 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from chapter9.eventbasedbacktester import EventBasedBackTester
+from chapter9.shardedbacktester import run_sharded, run_symbol
+from chapter9.tickfile import ticks_from_closes, write_ticks
+
+
+class TestShardedBackTester(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.paths = {}
+        for i in range(5):
+            rng = np.random.default_rng(i)
+            prices = (100 * np.exp(np.cumsum(rng.normal(0, 0.01, 600)))).round(2)
+            self.paths['S%d' % i] = os.path.join(self.dir, 'S%d.ticks' % i)
+            write_ticks(self.paths['S%d' % i], ticks_from_closes(prices))
+        self.expected = {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            for symbol, path in self.paths.items():
+                backtester = EventBasedBackTester()
+                backtester.process_ticks(path)
+                self.expected[symbol] = (backtester.ts.list_total,
+                                         backtester.ts.list_paper_total)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_run_symbol(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            for symbol, path in self.paths.items():
+                self.assertEqual(run_symbol(path, batch_size=100),
+                                 self.expected[symbol])
+
+    def test_sharded_same_as_event_based(self):
+        # small batches and rings so that the processes wait on each other
+        for nb_books, nb_strategies in ((1, 1), (2, 3), (3, 2)):
+            with self.subTest(books=nb_books, strategies=nb_strategies):
+                results = run_sharded(self.paths, nb_books, nb_strategies,
+                                      batch_size=100, ring_capacity=64)
+                self.assertEqual(results, self.expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
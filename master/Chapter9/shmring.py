@@ -0,0 +1,151 @@
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# A single producer, single consumer ring of fixed size records in a
+# multiprocessing.shared_memory block:
+#
+#   head | tail | closed | capacity, record size | records
+#
+# head and tail are uint64 counts of the records written and read, each
+# on its own 64 byte cache line so the two processes do not share the
+# line they write. Only the producer writes head and closed, only the
+# consumer writes tail, which is why no lock is needed: the producer
+# copies records into the free slots before moving head past them, and
+# the consumer copies them out before moving tail. This relies on the
+# stores being seen in program order by the other core, which holds on
+# x86 (TSO) where numpy writes these aligned 8 byte words in one store.
+HEADER_SIZE = 256
+HEAD = 0
+TAIL = 8
+CLOSED = 16
+CAPACITY = 24
+RECORD_SIZE = 25
+
+
+def wait(spins):
+    # Back off from yielding to sleeping up to a millisecond while the
+    # other side makes progress
+    if spins < 16:
+        time.sleep(0)
+    else:
+        time.sleep(min(1e-3, 1e-6 * (1 << min(spins - 16, 10))))
+
+
+class ShmRing:
+    # Creates a ring of capacity records of dtype, capacity a power of two,
+    # or attaches to the ring called name created by another process.
+    def __init__(self, dtype, capacity=None, name=None):
+        self.dtype = np.dtype(dtype)
+        self.owner = capacity is not None
+        if self.owner:
+            if capacity <= 0 or capacity & (capacity - 1):
+                raise ValueError('capacity must be a power of two, got %d'
+                                 % capacity)
+            self.shm = shared_memory.SharedMemory(
+                name=name, create=True,
+                size=HEADER_SIZE + capacity * self.dtype.itemsize)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.header = np.ndarray(HEADER_SIZE // 8, dtype=np.uint64,
+                                 buffer=self.shm.buf)
+        if self.owner:
+            self.header[:] = 0
+            self.header[CAPACITY] = capacity
+            self.header[RECORD_SIZE] = self.dtype.itemsize
+        elif self.header[RECORD_SIZE] != self.dtype.itemsize:
+            record_size = int(self.header[RECORD_SIZE])
+            self.close()
+            raise ValueError('ring %s has %d byte records, expected %d'
+                             % (name, record_size, self.dtype.itemsize))
+        self.capacity = int(self.header[CAPACITY])
+        self.mask = self.capacity - 1
+        self.records = np.ndarray(self.capacity, dtype=self.dtype,
+                                  buffer=self.shm.buf, offset=HEADER_SIZE)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def __len__(self):
+        return int(self.header[HEAD]) - int(self.header[TAIL])
+
+    def push(self, records):
+        # Writes as many of records as there is room for, returns how many
+        header = self.header
+        head = int(header[HEAD])
+        count = min(len(records), self.capacity - (head - int(header[TAIL])))
+        if count > 0:
+            start = head & self.mask
+            first = min(count, self.capacity - start)
+            self.records[start:start + first] = records[:first]
+            if count > first:
+                self.records[:count - first] = records[first:count]
+            header[HEAD] = head + count
+        return count
+
+    def push_all(self, records):
+        # Writes all the records, waiting for the consumer when full
+        spins = 0
+        while len(records):
+            count = self.push(records)
+            if count:
+                records = records[count:]
+                spins = 0
+            else:
+                wait(spins)
+                spins += 1
+
+    def pop(self, max_count=None):
+        # A copy of up to max_count of the records written, empty if none
+        header = self.header
+        tail = int(header[TAIL])
+        count = int(header[HEAD]) - tail
+        if max_count is not None and count > max_count:
+            count = max_count
+        start = tail & self.mask
+        end = start + count
+        if end <= self.capacity:
+            records = self.records[start:end].copy()
+        else:
+            records = np.concatenate((self.records[start:],
+                                      self.records[:end - self.capacity]))
+        header[TAIL] = tail + count
+        return records
+
+    def close_writer(self):
+        # Tells the consumer no more records will be written
+        self.header[CLOSED] = 1
+
+    def finished(self):
+        # True once the producer closed the ring and every record was read
+        header = self.header
+        return bool(header[CLOSED]) and header[HEAD] == header[TAIL]
+
+    def iter_batches(self, max_count=None):
+        # Yields the records as they are written until the ring is finished
+        spins = 0
+        while True:
+            records = self.pop(max_count)
+            if len(records):
+                spins = 0
+                yield records
+            elif self.finished():
+                return
+            else:
+                wait(spins)
+                spins += 1
+
+    def close(self):
+        self.header = None
+        self.records = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
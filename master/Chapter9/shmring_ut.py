@@ -0,0 +1,77 @@
+import multiprocessing
+import unittest
+
+import numpy as np
+
+from chapter9.shmring import ShmRing
+
+DTYPE = np.dtype([('seq', '<i8'), ('value', '<f8')])
+
+
+def produce(name, count):
+    ring = ShmRing(DTYPE, name=name)
+    try:
+        records = np.zeros(count, dtype=DTYPE)
+        records['seq'] = np.arange(count)
+        records['value'] = np.arange(count) * 0.5
+        for start in range(0, count, 100):
+            ring.push_all(records[start:start + 100])
+        ring.close_writer()
+    finally:
+        ring.close()
+
+
+class TestShmRing(unittest.TestCase):
+
+    def setUp(self):
+        self.ring = ShmRing(DTYPE, 8)
+
+    def tearDown(self):
+        self.ring.close()
+
+    def records(self, start, count):
+        records = np.zeros(count, dtype=DTYPE)
+        records['seq'] = np.arange(start, start + count)
+        return records
+
+    def test_push_pop_wraps(self):
+        self.assertEqual(self.ring.push(self.records(0, 6)), 6)
+        self.assertEqual(self.ring.pop(4)['seq'].tolist(), [0, 1, 2, 3])
+        # only 6 free slots, the write wraps around the end of the ring
+        self.assertEqual(self.ring.push(self.records(6, 10)), 6)
+        self.assertEqual(len(self.ring), 8)
+        self.assertEqual(self.ring.pop()['seq'].tolist(), list(range(4, 12)))
+        self.assertEqual(len(self.ring.pop()), 0)
+
+    def test_finished(self):
+        self.ring.push(self.records(0, 2))
+        self.ring.close_writer()
+        self.assertFalse(self.ring.finished())
+        self.assertEqual(len(list(self.ring.iter_batches())), 1)
+        self.assertTrue(self.ring.finished())
+
+    def test_attach(self):
+        other = ShmRing(DTYPE, name=self.ring.name)
+        try:
+            other.push(self.records(0, 3))
+            self.assertEqual(self.ring.pop()['seq'].tolist(), [0, 1, 2])
+        finally:
+            other.close()
+        with self.assertRaises(ValueError):
+            ShmRing(np.dtype([('seq', '<i4')]), name=self.ring.name)
+        with self.assertRaises(ValueError):
+            ShmRing(DTYPE, 6)
+
+    def test_other_process(self):
+        process = multiprocessing.Process(target=produce,
+                                          args=(self.ring.name, 10000))
+        process.start()
+        records = np.concatenate(list(self.ring.iter_batches()))
+        process.join()
+        self.assertEqual(process.exitcode, 0)
+        self.assertEqual(records['seq'].tolist(), list(range(10000)))
+        self.assertEqual(records['value'][-1], 9999 * 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,20 +1,66 @@
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+# Times are integer nanoseconds since the epoch, as time.time_ns(). The
+# timestamps of the orders, 'YYYY-MM-DD HH:MM:SS.ffffff' strings, are taken
+# as UTC and converted once: a whole column at load time by
+# timestamps_to_ns, or one order at a time by parse_timestamp.
+
+
+def parse_timestamp(timestamp):
+    return (datetime.fromisoformat(timestamp) - EPOCH) // MICROSECOND * 1000
+
+
+def timestamps_to_ns(timestamps):
+    # An int64 array of the times of a column of timestamp strings,
+    # datetimes or datetime64
+    if isinstance(timestamps, np.ndarray) and timestamps.dtype.kind in 'OU':
+        # numpy parses a list of str several times faster than its own
+        # string arrays
+        timestamps = timestamps.tolist()
+    return np.array(timestamps, dtype='datetime64[ns]').view(np.int64)
+
+
+def to_datetime(ns):
+    return EPOCH + timedelta(microseconds=ns // 1000)
+
 
 class SimulatedRealClock:
     def __init__(self,simulated=False):
         self.simulated = simulated
-        self.simulated_time = None
+        # the time of the last order, 0 before the first one
+        self.simulated_time = 0
+        # called with the time when the simulated time moves
+        self.listeners = []
     def process_order(self,order):
-        self.simulated_time= \
-            datetime.strptime(order['timestamp'], '%Y-%m-%d %H:%M:%S.%f')
+        # the timestamp of order is a string or a time already converted
+        timestamp = order['timestamp']
+        if isinstance(timestamp, str):
+            timestamp = parse_timestamp(timestamp)
+        self.process_time(timestamp)
+    def process_time(self,ns):
+        self.simulated_time = int(ns)
+        for listener in self.listeners:
+            listener(self.simulated_time)
     def getTime(self):
         if not self.simulated:
-            return datetime.now()
+            return time.time_ns()
         else:
             return self.simulated_time
+    def getDatetime(self):
+        # getTime() as a UTC datetime, for display
+        return to_datetime(self.getTime())
+    def add_listener(self,listener):
+        self.listeners.append(listener)
 
-realtime=SimulatedRealClock()
-print(realtime.getTime())
-simulatedtime=SimulatedRealClock(simulated=True)
-simulatedtime.process_order({'id' : 1, 'timestamp' : '2018-06-29 08:15:27.243860'})
-print(simulatedtime.getTime())
+if __name__ == '__main__':
+    realtime=SimulatedRealClock()
+    print(realtime.getDatetime())
+    simulatedtime=SimulatedRealClock(simulated=True)
+    simulatedtime.process_order({'id' : 1, 'timestamp' : '2018-06-29 08:15:27.243860'})
+    print(simulatedtime.getTime(), simulatedtime.getDatetime())
@@ -0,0 +1,62 @@
+import argparse
+from datetime import datetime
+from time import perf_counter
+
+import numpy as np
+from chapter9.simulatedclock import SimulatedRealClock, timestamps_to_ns
+
+
+def make_timestamps(count, seed=0):
+    # count increasing timestamps from 2018-06-29 08:00 as order strings
+    rng = np.random.default_rng(seed)
+    steps = rng.integers(1, 100, count).astype('timedelta64[us]')
+    times = np.datetime64('2018-06-29T08:00', 'us') + np.cumsum(steps)
+    return [timestamp.replace('T', ' ')
+            for timestamp in np.datetime_as_string(times, unit='us').tolist()]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Clock the orders of a day: strptime per order against integer nanoseconds')
+    parser.add_argument('--timestamps', type=int, default=10000000)
+    args = parser.parse_args()
+
+    timestamps = make_timestamps(args.timestamps)
+    orders = [{'timestamp': timestamp} for timestamp in timestamps]
+    print('%d timestamps' % len(timestamps))
+
+    # the clock before, a datetime per order
+    start = perf_counter()
+    for order in orders:
+        simulated_time = datetime.strptime(order['timestamp'],
+                                           '%Y-%m-%d %H:%M:%S.%f')
+    strptime = perf_counter() - start
+    print('strptime per order      : %6.2fs, %6.0f ns/order'
+          % (strptime, strptime / len(orders) * 1e9))
+
+    clock = SimulatedRealClock(simulated=True)
+    process_order = clock.process_order
+    start = perf_counter()
+    for order in orders:
+        process_order(order)
+    parse = perf_counter() - start
+    print('process_order on strings: %6.2fs, %6.0f ns/order, %.1fx'
+          % (parse, parse / len(orders) * 1e9, strptime / parse))
+
+    start = perf_counter()
+    ns = timestamps_to_ns(timestamps)
+    convert = perf_counter() - start
+    for order, time in zip(orders, ns.tolist()):
+        order['timestamp'] = time
+    start = perf_counter()
+    for order in orders:
+        process_order(order)
+    ints = perf_counter() - start
+    print('timestamps_to_ns column : %6.2fs, %6.0f ns/timestamp'
+          % (convert, convert / len(orders) * 1e9))
+    print('process_order on ints   : %6.2fs, %6.0f ns/order, %.1fx with the column conversion'
+          % (ints, ints / len(orders) * 1e9, strptime / (convert + ints)))
+    print('same final time: %s' % (clock.getDatetime() == simulated_time))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import unittest
+from datetime import datetime
+
+import numpy as np
+
+from chapter9.simulatedclock import SimulatedRealClock, parse_timestamp, \
+    timestamps_to_ns, to_datetime
+
+TIMESTAMPS = ['2018-06-29 08:15:27.243860', '1970-01-01 00:00:00.000001',
+              '2024-02-29 23:59:59.999999']
+
+
+def strptime_ns(timestamp):
+    delta = datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S.%f') \
+        - datetime(1970, 1, 1)
+    return ((delta.days * 86400 + delta.seconds) * 10 ** 6
+            + delta.microseconds) * 1000
+
+
+class TestTimestamps(unittest.TestCase):
+
+    def test_parse_timestamp(self):
+        for timestamp in TIMESTAMPS:
+            self.assertEqual(parse_timestamp(timestamp), strptime_ns(timestamp))
+
+    def test_timestamps_to_ns(self):
+        expected = [strptime_ns(timestamp) for timestamp in TIMESTAMPS]
+        for column in (TIMESTAMPS, np.array(TIMESTAMPS),
+                       np.array(TIMESTAMPS, dtype=object),
+                       np.array(TIMESTAMPS, dtype='datetime64[us]')):
+            ns = timestamps_to_ns(column)
+            self.assertEqual(ns.dtype, np.int64)
+            self.assertEqual(ns.tolist(), expected)
+
+    def test_to_datetime(self):
+        for timestamp in TIMESTAMPS:
+            self.assertEqual(
+                to_datetime(parse_timestamp(timestamp)),
+                datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S.%f'))
+
+
+class TestSimulatedRealClock(unittest.TestCase):
+
+    def test_simulated(self):
+        clock = SimulatedRealClock(simulated=True)
+        times = []
+        clock.add_listener(times.append)
+        self.assertEqual(clock.getTime(), 0)
+        clock.process_order({'id': 1, 'timestamp': TIMESTAMPS[0]})
+        self.assertEqual(clock.getTime(), strptime_ns(TIMESTAMPS[0]))
+        self.assertEqual(clock.getDatetime(),
+                         datetime(2018, 6, 29, 8, 15, 27, 243860))
+        ns = timestamps_to_ns(TIMESTAMPS[2:])
+        clock.process_order({'id': 2, 'timestamp': ns[0]})
+        self.assertIs(type(clock.getTime()), int)
+        self.assertEqual(times, [strptime_ns(TIMESTAMPS[0]), ns[0]])
+
+    def test_real(self):
+        clock = SimulatedRealClock()
+        before = clock.getTime()
+        clock.process_order({'id': 1, 'timestamp': TIMESTAMPS[0]})
+        self.assertGreaterEqual(clock.getTime(), before)
+        self.assertGreater(clock.getDatetime().year, 2018)
+
+
+if __name__ == '__main__':
+    unittest.main()
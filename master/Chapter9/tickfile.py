@@ -0,0 +1,206 @@
+import mmap
+import os
+import struct
+
+import numpy as np
+from chapter7.Messages import Order, SIDES, ACTIONS
+
+# A tick file is a 16 byte header followed by fixed size records:
+#
+#   magic b'TICKFILE' | version (uint32) | record size (uint32)
+#
+# Side and action are the codes of chapter7.Messages (SIDE_CODES,
+# ACTION_CODES), a side of -1 means no side. The number of records is
+# given by the file size, so ticks can be appended to a file at any time
+# and a partly written last record is ignored.
+MAGIC = b'TICKFILE'
+VERSION = 1
+HEADER = struct.Struct('<8sII')
+TICK_DTYPE = np.dtype([('timestamp', '<i8'),
+                       ('id', '<i8'),
+                       ('price', '<f8'),
+                       ('quantity', '<i8'),
+                       ('side', 'i1'),
+                       ('action', 'i1')])
+
+BATCH_SIZE = 65536
+
+# Side names by code, SIDE_NAMES[-1] is None
+SIDE_NAMES = SIDES + (None,)
+
+
+def ticks_from_closes(prices, timestamps=None, quantity=1000, order_id=1):
+    # The orders EventBasedBackTester.process_data_from_yahoo sends for a
+    # series of prices: for bar t, a new ask and bid at the price of the
+    # bar at timestamps[t], then their deletes one nanosecond later. The
+    # timestamps are integer nanoseconds, 0, 2, 4... by default.
+    prices = np.asarray(prices, dtype=np.float64)
+    n = len(prices)
+    if timestamps is None:
+        timestamps = 2 * np.arange(n)
+    timestamps = np.asarray(timestamps).astype(np.int64)
+    ticks = np.zeros(4 * n, dtype=TICK_DTYPE)
+    ticks['id'] = order_id
+    ticks['quantity'] = quantity
+    ticks['price'] = np.repeat(prices, 4)
+    ticks['timestamp'] = np.repeat(timestamps, 4)
+    ticks['timestamp'][2::4] += 1
+    ticks['timestamp'][3::4] += 1
+    ticks['side'] = np.tile([SIDES.index('ask'), SIDES.index('bid')], 2 * n)
+    ticks['action'][0::4] = ACTIONS.index('new')
+    ticks['action'][1::4] = ACTIONS.index('new')
+    ticks['action'][2::4] = ACTIONS.index('delete')
+    ticks['action'][3::4] = ACTIONS.index('delete')
+    return ticks
+
+
+class TickWriter:
+    # Writes ticks to a tick file, appending to it when it exists and
+    # append is True
+    def __init__(self, path, append=False):
+        if append and os.path.exists(path) and os.path.getsize(path) >= HEADER.size:
+            read_header(path)
+            self.file = open(path, 'ab')
+        else:
+            self.file = open(path, 'wb')
+            self.file.write(HEADER.pack(MAGIC, VERSION, TICK_DTYPE.itemsize))
+
+    def write(self, ticks):
+        np.ascontiguousarray(ticks, dtype=TICK_DTYPE).tofile(self.file)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_ticks(path, ticks):
+    with TickWriter(path) as writer:
+        writer.write(ticks)
+
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        magic, version, record_size = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError('%s is not a tick file' % path)
+    if version != VERSION or record_size != TICK_DTYPE.itemsize:
+        raise ValueError('%s has version %d and %d byte records, expected %d and %d'
+                         % (path, version, record_size, VERSION, TICK_DTYPE.itemsize))
+
+
+class TickReader:
+    # Memory maps a tick file. ticks is a read-only structured array over
+    # the mapping and batches() yields slices of it, so no tick is copied
+    # until it is used, and only the pages being read need to be in
+    # memory: files larger than RAM are read through the OS page cache.
+    def __init__(self, path):
+        read_header(path)
+        self.path = path
+        self.file = open(path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        self.count = (size - HEADER.size) // TICK_DTYPE.itemsize
+        if self.count:
+            self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(self.mmap, 'madvise'):
+                self.mmap.madvise(mmap.MADV_SEQUENTIAL)
+            self.ticks = np.frombuffer(self.mmap, dtype=TICK_DTYPE,
+                                       count=self.count, offset=HEADER.size)
+        else:
+            self.mmap = None
+            self.ticks = np.zeros(0, dtype=TICK_DTYPE)
+
+    def __len__(self):
+        return self.count
+
+    def batches(self, batch_size=BATCH_SIZE, release=True, start=0):
+        # Yields the ticks from tick start batch_size at a time. With
+        # release, the pages of the batches already read are dropped from
+        # the mapping, which only means they are read from the file again
+        # if used again.
+        done = 0
+        for start in range(start, self.count, batch_size):
+            yield self.ticks[start:start + batch_size]
+            if release and hasattr(self.mmap, 'madvise'):
+                end = min(HEADER.size + (start + batch_size) * TICK_DTYPE.itemsize,
+                          len(self.mmap))
+                end -= end % mmap.PAGESIZE
+                if end > done:
+                    self.mmap.madvise(mmap.MADV_DONTNEED, done, end - done)
+                    done = end
+
+    def close(self):
+        self.ticks = None
+        if self.mmap is not None:
+            try:
+                self.mmap.close()
+            except BufferError:
+                # batches still in use keep the mapping until they are freed
+                pass
+            self.mmap = None
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def orders_from_ticks(ticks):
+    # The Order messages of tick records
+    return [Order(id, price, quantity, SIDE_NAMES[side], ACTIONS[action])
+            for id, price, quantity, side, action in
+            zip(ticks['id'].tolist(), ticks['price'].tolist(),
+                ticks['quantity'].tolist(), ticks['side'].tolist(),
+                ticks['action'].tolist())]
+
+
+def replay(reader, gateway, process_events, batch_size=BATCH_SIZE, start=0,
+           processed=None, sent=None):
+    # Sends the ticks of reader from tick start, the first tick of a
+    # timestamp, to the gateway queue as Order messages and calls
+    # process_events() once all the ticks of a timestamp are queued, then
+    # processed(), if given, with the number of ticks of reader processed
+    # so far. sent(ticks, runs), if given, gets each batch of ticks before
+    # its orders are queued, with the number of them queued at each call
+    # of process_events() until the next batch is queued, the call after
+    # the last batch left out. Returns the number of ticks sent.
+    if not 0 <= start <= len(reader):
+        raise ValueError('start must be between 0 and %d, got %r'
+                         % (len(reader), start))
+    if 0 < start < len(reader) and \
+            reader.ticks['timestamp'][start] == reader.ticks['timestamp'][start - 1]:
+        raise ValueError('tick %d is not the first of its timestamp' % start)
+    last_timestamp = None
+    offset = start
+    for batch in reader.batches(batch_size, start=start):
+        timestamps = batch['timestamp']
+        if last_timestamp is not None and timestamps[0] != last_timestamp:
+            process_events()
+            if processed is not None:
+                processed(offset)
+        orders = orders_from_ticks(batch)
+        ends = (np.flatnonzero(timestamps[1:] != timestamps[:-1]) + 1).tolist()
+        if sent is not None:
+            sent(batch, [0] + ends if last_timestamp is not None and
+                 timestamps[0] != last_timestamp else ends)
+        first = 0
+        for end in ends:
+            gateway.extend(orders[first:end])
+            process_events()
+            if processed is not None:
+                processed(offset + end)
+            first = end
+        gateway.extend(orders[first:])
+        last_timestamp = timestamps[-1]
+        offset += len(batch)
+    if last_timestamp is not None:
+        process_events()
+        if processed is not None:
+            processed(offset)
+    return len(reader) - start
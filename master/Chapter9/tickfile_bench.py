@@ -0,0 +1,93 @@
+import argparse
+import contextlib
+import os
+import shutil
+import tempfile
+from time import perf_counter
+
+import numpy as np
+from chapter9.eventbasedbacktester import EventBasedBackTester
+from chapter9.tickfile import TickReader, TickWriter, ticks_from_closes
+
+
+def generate_prices(nb_bars, seed=0):
+    rng = np.random.default_rng(seed)
+    return (100 * np.exp(np.cumsum(rng.normal(0, 0.001, nb_bars)))).round(2)
+
+
+def run_per_bar(prices):
+    backtester = EventBasedBackTester()
+    start = perf_counter()
+    for price in prices.tolist():
+        backtester.process_data_from_yahoo(price)
+        backtester.process_events()
+    return perf_counter() - start, backtester
+
+
+def run_replay(path, latency=False):
+    backtester = EventBasedBackTester(latency)
+    start = perf_counter()
+    backtester.process_ticks(path)
+    return perf_counter() - start, backtester
+
+
+def scan(path, batch_size):
+    # Reads every tick without building messages, the cost of the file
+    # format itself
+    start = perf_counter()
+    total = 0.0
+    with TickReader(path) as reader:
+        for batch in reader.batches(batch_size):
+            total += batch['price'].sum()
+    return perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare the per-bar event-based backtester loop with a tick file replay')
+    parser.add_argument('--bars', type=int, default=50000)
+    parser.add_argument('--scan-ticks', type=int, default=10000000,
+                        help='size of the tick file for the raw read test')
+    parser.add_argument('--batch-size', type=int, default=65536)
+    parser.add_argument('--latency', action='store_true',
+                        help='also replay with latency measured and print '
+                             'the latency of every hop')
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    try:
+        prices = generate_prices(args.bars)
+        path = os.path.join(root, 'bench.ticks')
+        with TickWriter(path) as writer:
+            writer.write(ticks_from_closes(prices))
+
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            loop_elapsed, expected = run_per_bar(prices)
+            replay_elapsed, backtester = run_replay(path)
+        print('per-bar loop: %d bars in %.2fs, %.0f bars/s'
+              % (args.bars, loop_elapsed, args.bars / loop_elapsed))
+        print('tick replay : %d ticks in %.2fs, %.0f ticks/s'
+              % (4 * args.bars, replay_elapsed, 4 * args.bars / replay_elapsed))
+        print('results identical: %s' % (backtester.ts.list_total == expected.ts.list_total))
+
+        if args.latency:
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                timed_elapsed, timed = run_replay(path, latency=True)
+            print('tick replay with latency: %.2fs, %+.0f%%'
+                  % (timed_elapsed, 100 * (timed_elapsed / replay_elapsed - 1)))
+            print(timed.latency_report())
+
+        scan_path = os.path.join(root, 'scan.ticks')
+        with TickWriter(scan_path) as writer:
+            for start in range(0, args.scan_ticks, 4000000):
+                nb_bars = min(1000000, (args.scan_ticks - start) // 4)
+                writer.write(ticks_from_closes(generate_prices(nb_bars, start)))
+        elapsed = scan(scan_path, args.batch_size)
+        size = os.path.getsize(scan_path)
+        print('raw scan    : %.0f MB in %.3fs, %.0f Mticks/s, %.0f MB/s'
+              % (size / 1e6, elapsed, args.scan_ticks / elapsed / 1e6, size / elapsed / 1e6))
+    finally:
+        shutil.rmtree(root)
+
+if __name__ == '__main__':
+    main()
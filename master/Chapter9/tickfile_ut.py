@@ -0,0 +1,111 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from chapter7.EventDispatcher import EventQueue
+from chapter9.eventbasedbacktester import EventBasedBackTester
+from chapter9.tickfile import TICK_DTYPE, TickReader, TickWriter, replay, \
+    ticks_from_closes, write_ticks
+
+
+class TestTickFile(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'test.ticks')
+        rng = np.random.default_rng(0)
+        self.prices = (100 * np.exp(np.cumsum(rng.normal(0, 0.01, 300)))).round(2)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_ticks_from_closes(self):
+        ticks = ticks_from_closes([10.0, 11.0])
+        self.assertEqual(ticks['timestamp'].tolist(), [0, 0, 1, 1, 2, 2, 3, 3])
+        self.assertEqual(ticks['price'].tolist(), [10.0] * 4 + [11.0] * 4)
+        self.assertEqual(ticks['side'].tolist(), [1, 0, 1, 0, 1, 0, 1, 0])
+        self.assertEqual(ticks['action'].tolist(), [0, 0, 2, 2, 0, 0, 2, 2])
+
+    def test_write_and_read(self):
+        ticks = ticks_from_closes(self.prices)
+        with TickWriter(self.path) as writer:
+            writer.write(ticks[:500])
+        with TickWriter(self.path, append=True) as writer:
+            writer.write(ticks[500:])
+        with TickReader(self.path) as reader:
+            self.assertEqual(len(reader), len(ticks))
+            batches = list(reader.batches(256))
+            self.assertEqual(len(batches), 5)
+            # batches are views on the mapped file
+            for batch in batches:
+                self.assertTrue(np.shares_memory(batch, reader.ticks))
+                self.assertFalse(batch.flags.writeable)
+            self.assertTrue((np.concatenate(batches) == ticks).all())
+
+    def test_partial_record_ignored(self):
+        write_ticks(self.path, ticks_from_closes(self.prices[:10]))
+        with open(self.path, 'ab') as f:
+            f.write(b'\x00' * (TICK_DTYPE.itemsize - 1))
+        with TickReader(self.path) as reader:
+            self.assertEqual(len(reader), 40)
+
+    def test_not_a_tick_file(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'x' * 64)
+        with self.assertRaises(ValueError):
+            TickReader(self.path)
+
+    def test_replay_groups_timestamps(self):
+        write_ticks(self.path, ticks_from_closes([10.0, 11.0, 12.0]))
+        gateway = EventQueue()
+        groups = []
+
+        def process_events():
+            groups.append([(o.price, o.side, o.action) for o in gateway])
+            gateway.clear()
+
+        with TickReader(self.path) as reader:
+            # batches of 3 split the groups of 2 orders
+            self.assertEqual(replay(reader, gateway, process_events, 3), 12)
+        self.assertEqual(len(groups), 6)
+        self.assertEqual(groups[0], [(10.0, 'ask', 'new'), (10.0, 'bid', 'new')])
+        self.assertEqual(groups[5], [(12.0, 'ask', 'delete'), (12.0, 'bid', 'delete')])
+
+    def test_replay_from_start(self):
+        write_ticks(self.path, ticks_from_closes([10.0, 11.0, 12.0]))
+        gateway = EventQueue()
+        groups = []
+        positions = []
+
+        def process_events():
+            groups.append([(o.price, o.action) for o in gateway])
+            gateway.clear()
+
+        with TickReader(self.path) as reader:
+            self.assertEqual(replay(reader, gateway, process_events, 3,
+                                    start=4, processed=positions.append), 8)
+            with self.assertRaises(ValueError):
+                replay(reader, gateway, process_events, start=5)
+            with self.assertRaises(ValueError):
+                replay(reader, gateway, process_events, start=13)
+        self.assertEqual(positions, [6, 8, 10, 12])
+        self.assertEqual(groups[0], [(11.0, 'new'), (11.0, 'new')])
+        self.assertEqual(groups[3], [(12.0, 'delete'), (12.0, 'delete')])
+
+    def test_replay_same_as_process_data_from_yahoo(self):
+        expected = EventBasedBackTester()
+        for price in self.prices.tolist():
+            expected.process_data_from_yahoo(price)
+            expected.process_events()
+        write_ticks(self.path, ticks_from_closes(self.prices))
+        backtester = EventBasedBackTester()
+        self.assertEqual(backtester.process_ticks(self.path, batch_size=100), 4 * len(self.prices))
+        self.assertEqual(backtester.ts.list_total, expected.ts.list_total)
+        self.assertEqual(backtester.ts.list_paper_total, expected.ts.list_paper_total)
+
+
+if __name__ == '__main__':
+    unittest.main()
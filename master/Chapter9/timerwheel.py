@@ -0,0 +1,272 @@
+import threading
+from operator import attrgetter
+
+# Hierarchical timer wheel. Times are integers in the unit of the clock
+# (nanoseconds for SimulatedRealClock.getTime) and the wheel moves by
+# ticks of resolution units. Level k has SLOTS slots of SLOTS**k ticks each:
+# a timer is kept at the lowest level whose slot covers its deadline, and
+# is moved one level down when the wheel reaches its slot, so arming and
+# cancelling a timer are O(1) whatever the number of timers, and advancing
+# costs one step per tick holding timers plus the timers moved. Levels
+# with no timers are jumped over.
+SLOT_BITS = 8
+SLOTS = 1 << SLOT_BITS
+MASK = SLOTS - 1
+LEVELS = 4
+
+by_deadline = attrgetter('deadline', 'seq')
+
+
+class Timer:
+    __slots__ = ('deadline', 'tick', 'seq', 'callback', 'args', 'slot',
+                 'level')
+
+    def __init__(self, deadline, tick, seq, callback, args):
+        self.deadline = deadline
+        self.tick = tick
+        self.seq = seq
+        self.callback = callback
+        self.args = args
+        # the dict holding the timer, None once fired or cancelled, and the
+        # level of that dict, None for the expired and overflow timers
+        self.slot = None
+        self.level = None
+
+    @property
+    def active(self):
+        return self.slot is not None
+
+
+class TimerWheel:
+    # schedule(deadline, callback, *args) arms a timer which fires, calling
+    # callback(*args), during the first advance(now) with now >= deadline,
+    # at most one resolution late. Timers firing in the same advance fire
+    # in the order of their deadlines, then of their scheduling.
+    def __init__(self, now=0, resolution=1):
+        if resolution <= 0:
+            raise ValueError('resolution must be positive, got %r'
+                             % resolution)
+        self.resolution = resolution
+        self.current = now // resolution
+        self.levels = [[{} for _ in range(SLOTS)] for _ in range(LEVELS)]
+        self.counts = [0] * LEVELS
+        # deadlines beyond the last level, and timers already due
+        self.overflow = {}
+        self.expired = {}
+        self.seq = 0
+        # next_tick() cached by advance, None when unknown: a new timer can
+        # only make it earlier, to the start of its slot, and a cancelled
+        # one leaves it a tick no timer fires before
+        self.due = None
+
+    def __len__(self):
+        return sum(self.counts) + len(self.overflow) + len(self.expired)
+
+    def schedule(self, deadline, callback, *args):
+        # deadline is rounded up to a tick so that no timer fires early
+        tick = -(-deadline // self.resolution)
+        self.seq += 1
+        timer = Timer(deadline, tick, self.seq, callback, args)
+        self.insert(timer)
+        return timer
+
+    def insert(self, timer):
+        tick = timer.tick
+        current = self.current
+        if tick <= current:
+            slot = self.expired
+            timer.level = None
+        else:
+            # the lowest level whose slots hold both tick and current
+            level = ((tick ^ current).bit_length() - 1) // SLOT_BITS
+            if level < LEVELS:
+                slot = self.levels[level][
+                    (tick >> (SLOT_BITS * level)) & MASK]
+                self.counts[level] += 1
+                timer.level = level
+            else:
+                level = LEVELS
+                slot = self.overflow
+                timer.level = None
+            # the wheel next stops at the start of the slot, where the
+            # timer fires or moves down: stopping at tick itself would
+            # skip the cascade of the slots of earlier timers
+            shift = SLOT_BITS * level
+            start = tick >> shift << shift
+            if self.due is not None and start < self.due:
+                self.due = start
+        slot[timer.seq] = timer
+        timer.slot = slot
+
+    def cancel(self, timer):
+        # Returns False when the timer already fired or was cancelled
+        slot = timer.slot
+        if slot is None:
+            return False
+        del slot[timer.seq]
+        timer.slot = None
+        if timer.level is not None:
+            self.counts[timer.level] -= 1
+        return True
+
+    def next_tick(self):
+        # A tick no timer fires before: the start of the next slot holding
+        # timers of the lowest level holding any, when level 0 timers fire
+        # or higher level timers move down. None when there are no timers.
+        if self.expired:
+            return self.current
+        current = self.current
+        for level in range(LEVELS):
+            if self.counts[level]:
+                # the timers of a level are in the slots after the one of
+                # current, up to the end of the slots of the level
+                shift = SLOT_BITS * level
+                slots = self.levels[level]
+                index = (current >> shift) & MASK
+                for index in range(index + 1, SLOTS):
+                    if slots[index]:
+                        break
+                base = current >> (shift + SLOT_BITS) << (shift + SLOT_BITS)
+                return base | (index << shift)
+        if self.overflow:
+            shift = SLOT_BITS * LEVELS
+            return ((current >> shift) + 1) << shift
+        return None
+
+    def advance(self, now):
+        # Fires the timers due at now, returns how many fired
+        target = now // self.resolution
+        fired = self.fire(self.expired) if self.expired else 0
+        while self.current < target:
+            tick = self.due
+            if tick is None:
+                tick = self.due = self.next_tick()
+            if tick is None or tick > target:
+                self.current = target
+                break
+            self.current = tick
+            self.due = None
+            self.cascade(tick)
+            slot = self.levels[0][tick & MASK]
+            if self.expired:
+                # timers moved down to the tick itself fire with the slot
+                for timer in self.expired.values():
+                    slot[timer.seq] = timer
+                    timer.slot = slot
+                    timer.level = 0
+                self.counts[0] += len(self.expired)
+                self.expired.clear()
+            fired += self.fire(slot)
+            fired += self.fire(self.expired)
+        return fired
+
+    def cascade(self, tick):
+        # Moves the timers of the slots starting at tick one level down,
+        # from the highest level, as a slot of level k starts every
+        # SLOTS**k ticks
+        if tick & MASK:
+            return
+        if not tick & ((1 << (SLOT_BITS * LEVELS)) - 1) and self.overflow:
+            timers = list(self.overflow.values())
+            self.overflow.clear()
+            for timer in timers:
+                self.insert(timer)
+        for level in range(LEVELS - 1, 0, -1):
+            shift = SLOT_BITS * level
+            if tick & ((1 << shift) - 1):
+                continue
+            slot = self.levels[level][(tick >> shift) & MASK]
+            if slot:
+                timers = list(slot.values())
+                slot.clear()
+                self.counts[level] -= len(timers)
+                for timer in timers:
+                    self.insert(timer)
+
+    def fire(self, slot):
+        # Fires the timers of slot, and those the callbacks arm already due
+        # when slot is expired. A callback can cancel a timer of the slot
+        # which has not fired yet.
+        fired = 0
+        while slot:
+            timers = sorted(slot.values(), key=by_deadline) \
+                if len(slot) > 1 else list(slot.values())
+            for timer in timers:
+                if timer.slot is not slot:
+                    continue
+                self.cancel(timer)
+                timer.callback(*timer.args)
+                fired += 1
+        return fired
+
+
+class TimerService:
+    # A TimerWheel on a SimulatedRealClock. On a simulated clock the timers
+    # fire from clock.process_order() as the simulated time goes past
+    # them, so a backtest fires them at the same simulated times on every
+    # run. On a real clock start() runs them on one scheduler thread,
+    # sleeping until the next tick holding timers.
+    def __init__(self, clock, resolution=1000000):
+        self.clock = clock
+        self.wheel = TimerWheel(clock.getTime(), resolution)
+        self.lock = threading.RLock()
+        self.wakeup = threading.Condition(self.lock)
+        self.thread = None
+        self.running = False
+        if clock.simulated:
+            clock.add_listener(self.advance)
+
+    def __len__(self):
+        return len(self.wheel)
+
+    def schedule_at(self, deadline, callback, *args):
+        with self.lock:
+            timer = self.wheel.schedule(deadline, callback, *args)
+            self.wakeup.notify()
+            return timer
+
+    def schedule_in(self, delay, callback, *args):
+        # delay in nanoseconds from the time of the clock
+        return self.schedule_at(self.clock.getTime() + delay, callback,
+                                *args)
+
+    def cancel(self, timer):
+        with self.lock:
+            return self.wheel.cancel(timer)
+
+    def advance(self, now=None):
+        with self.lock:
+            return self.wheel.advance(self.clock.getTime() if now is None
+                                      else now)
+
+    def start(self):
+        if self.clock.simulated:
+            raise ValueError('a simulated clock drives its timers, '
+                             'there is no thread to start')
+        if self.thread is not None:
+            raise ValueError('timer service already started')
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name='timers',
+                                       daemon=True)
+        self.thread.start()
+
+    def run(self):
+        wheel = self.wheel
+        with self.lock:
+            while self.running:
+                wheel.advance(self.clock.getTime())
+                tick = wheel.next_tick()
+                if tick is None:
+                    self.wakeup.wait()
+                else:
+                    delay = tick * wheel.resolution - self.clock.getTime()
+                    if delay > 0:
+                        self.wakeup.wait(delay / 1e9)
+
+    def stop(self):
+        with self.lock:
+            self.running = False
+            self.wakeup.notify()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
@@ -0,0 +1,61 @@
+import argparse
+from time import perf_counter_ns
+
+import numpy as np
+from chapter9.timerwheel import TimerWheel
+
+DAY = 24 * 3600 * 10 ** 9
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Arm order timeouts over a simulated day, cancel most of them and fire the rest')
+    parser.add_argument('--timers', type=int, default=1000000)
+    parser.add_argument('--timeout', type=float, default=5.0, help='seconds')
+    parser.add_argument('--resolution', type=int, default=10 ** 6, help='nanoseconds')
+    parser.add_argument('--cancel', type=float, default=0.9,
+                        help='fraction of the timers cancelled')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    sent = np.sort(rng.integers(0, DAY, args.timers)).tolist()
+    cancelled = (rng.random(args.timers) < args.cancel).tolist()
+    timeout = int(args.timeout * 1e9)
+    fired = [0]
+
+    def on_timeout():
+        fired[0] += 1
+
+    wheel = TimerWheel(0, args.resolution)
+    schedule = wheel.schedule
+    start = perf_counter_ns()
+    timers = [schedule(at + timeout, on_timeout) for at in sent]
+    arm = perf_counter_ns() - start
+
+    cancel = wheel.cancel
+    start = perf_counter_ns()
+    for timer, cancel_it in zip(timers, cancelled):
+        if cancel_it:
+            cancel(timer)
+    cancelling = perf_counter_ns() - start
+    nb_cancelled = sum(cancelled)
+    pending = len(wheel)
+
+    # the simulated clock moving on every order, as in a backtest
+    advance = wheel.advance
+    start = perf_counter_ns()
+    for now in sent:
+        advance(now)
+    advance(DAY + timeout)
+    advancing = perf_counter_ns() - start
+
+    print('%d timers, %d pending after the cancels, resolution %d ns'
+          % (args.timers, pending, args.resolution))
+    print('arm     : %6.0f ns/timer' % (arm / args.timers))
+    print('cancel  : %6.0f ns/timer' % (cancelling / max(nb_cancelled, 1)))
+    print('advance : %6.0f ns/step, %d steps, %d fired, %.0f fired/s'
+          % (advancing / (len(sent) + 1), len(sent) + 1, fired[0],
+             fired[0] / (advancing / 1e9)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+import contextlib
+import io
+import random
+import threading
+import unittest
+
+from chapter9.omstimeout import OMS, ORDER_TIME_OUT
+from chapter9.simulatedclock import SimulatedRealClock
+from chapter9.timerwheel import TimerWheel, TimerService, SLOTS, LEVELS
+
+
+class TestTimerWheel(unittest.TestCase):
+
+    def setUp(self):
+        self.wheel = TimerWheel()
+        self.fired = []
+
+    def schedule(self, deadline, name=None):
+        return self.wheel.schedule(deadline, self.fired.append,
+                                   deadline if name is None else name)
+
+    def test_fires_in_deadline_order(self):
+        for deadline in [30, 10, 20, 10]:
+            self.schedule(deadline)
+        self.assertEqual(self.wheel.advance(15), 2)
+        self.assertEqual(self.fired, [10, 10])
+        self.assertEqual(self.wheel.advance(100), 2)
+        self.assertEqual(self.fired, [10, 10, 20, 30])
+        self.assertEqual(len(self.wheel), 0)
+
+    def test_same_deadline_fires_in_scheduling_order(self):
+        for name in 'abc':
+            self.schedule(5, name)
+        self.wheel.advance(5)
+        self.assertEqual(self.fired, ['a', 'b', 'c'])
+
+    def test_never_fires_early(self):
+        wheel = TimerWheel(resolution=10)
+        fired = []
+        wheel.schedule(25, fired.append, 25)
+        wheel.advance(29)
+        self.assertEqual(fired, [])
+        wheel.advance(30)
+        self.assertEqual(fired, [25])
+
+    def test_cancel(self):
+        timer = self.schedule(10)
+        self.schedule(20)
+        self.assertTrue(timer.active)
+        self.assertTrue(self.wheel.cancel(timer))
+        self.assertFalse(timer.active)
+        self.assertFalse(self.wheel.cancel(timer))
+        self.wheel.advance(100)
+        self.assertEqual(self.fired, [20])
+
+    def test_cancel_from_callback(self):
+        later = self.schedule(6)
+        self.wheel.schedule(5, self.wheel.cancel, later)
+        self.assertEqual(self.wheel.advance(6), 1)
+        self.assertEqual(self.fired, [])
+
+    def test_callback_schedules_timers(self):
+        def rearm(deadline):
+            self.fired.append(deadline)
+            if deadline < 50:
+                self.wheel.schedule(deadline + 10, rearm, deadline + 10)
+                # already due, fires in the same advance
+                self.schedule(deadline, 'due')
+        self.wheel.schedule(10, rearm, 10)
+        self.wheel.advance(35)
+        self.assertEqual(self.fired, [10, 'due', 20, 'due', 30, 'due'])
+        self.assertEqual(len(self.wheel), 1)
+
+    def test_cascades_across_levels(self):
+        deadlines = [SLOTS - 1, SLOTS, SLOTS ** 2 + 3, SLOTS ** 3 + 7,
+                     5 * SLOTS ** 3 + 1]
+        for deadline in reversed(deadlines):
+            self.schedule(deadline)
+        for deadline in deadlines:
+            self.wheel.advance(deadline - 1)
+            self.assertNotIn(deadline, self.fired)
+            self.wheel.advance(deadline)
+            self.assertEqual(self.fired[-1], deadline)
+        self.assertEqual(self.fired, deadlines)
+
+    def test_earlier_timer_after_advance(self):
+        self.schedule(1000)
+        self.wheel.advance(10)
+        self.schedule(20)
+        self.wheel.advance(20)
+        self.assertEqual(self.fired, [20])
+        self.wheel.advance(1000)
+        self.assertEqual(self.fired, [20, 1000])
+
+    def test_earlier_timer_in_higher_level(self):
+        # the timer at 300 goes to a level 1 slot, which must cascade
+        # before the wheel reaches 300
+        self.schedule(100000)
+        self.wheel.advance(10)
+        self.schedule(300)
+        self.assertEqual(self.wheel.advance(1000), 1)
+        self.assertEqual(self.fired, [300])
+        self.assertEqual(self.wheel.advance(200000), 1)
+        self.assertEqual(self.fired, [300, 100000])
+        self.assertEqual(len(self.wheel), 0)
+
+    def test_against_sorted_reference(self):
+        # random schedules, cancels and advances at every scale, the timers
+        # fired by each advance being the due ones of a plain list
+        for seed in range(40):
+            rng = random.Random(seed)
+            wheel = TimerWheel()
+            now = 0
+            pending = {}
+            fired = []
+            for _ in range(300):
+                action = rng.random()
+                if action < 0.5:
+                    deadline = now + rng.randrange(SLOTS ** rng.randrange(1, LEVELS + 2))
+                    timer = wheel.schedule(deadline, fired.append, (deadline, wheel.seq + 1))
+                    pending[timer.seq] = timer
+                elif action < 0.6 and pending:
+                    seq = rng.choice(sorted(pending))
+                    self.assertTrue(wheel.cancel(pending.pop(seq)))
+                else:
+                    now += rng.randrange(SLOTS ** rng.randrange(0, LEVELS + 1))
+                    expected = sorted((timer.deadline, timer.seq) for timer in pending.values()
+                                      if timer.deadline <= now)
+                    del fired[:]
+                    self.assertEqual(wheel.advance(now), len(expected), seed)
+                    self.assertEqual(fired, expected, seed)
+                    for _, seq in expected:
+                        del pending[seq]
+                self.assertEqual(len(wheel), len(pending), seed)
+
+    def test_overflow(self):
+        deadline = 3 * SLOTS ** LEVELS + 11
+        self.schedule(deadline)
+        self.schedule(1)
+        self.assertEqual(self.wheel.advance(deadline - 1), 1)
+        self.assertEqual(self.wheel.advance(deadline), 1)
+        self.assertEqual(self.fired, [1, deadline])
+
+    def test_starts_at_now(self):
+        wheel = TimerWheel(now=10 ** 18, resolution=1000)
+        fired = []
+        wheel.schedule(10 ** 18 + 5000, fired.append, 'a')
+        wheel.schedule(10 ** 18 - 1, fired.append, 'late')
+        wheel.advance(10 ** 18)
+        self.assertEqual(fired, ['late'])
+        wheel.advance(10 ** 18 + 5000)
+        self.assertEqual(fired, ['late', 'a'])
+
+    def test_bad_resolution(self):
+        self.assertRaises(ValueError, TimerWheel, 0, 0)
+
+
+class TestTimerService(unittest.TestCase):
+
+    def test_simulated_order_timeout(self):
+        clock = SimulatedRealClock(simulated=True)
+        clock.process_order({'timestamp': '2018-06-29 08:15:27.243860'})
+        oms = OMS(clock)
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            oms.send_order(1)
+            oms.send_order(2)
+            oms.receive_market_reponse(2)
+            # the time out rounds up to the millisecond resolution
+            clock.process_order({'timestamp': '2018-06-29 08:15:32.243999'})
+            self.assertNotIn('Timeout', out.getvalue())
+            clock.process_order({'timestamp': '2018-06-29 08:15:32.244000'})
+        self.assertEqual(out.getvalue().count('Order Timeout'), 1)
+        self.assertEqual(oms.order_time_outs, {})
+        self.assertEqual(len(oms.timers), 0)
+
+    def test_orders_without_id(self):
+        clock = SimulatedRealClock(simulated=True)
+        clock.process_order({'timestamp': '2018-06-29 08:15:27.243860'})
+        oms = OMS(clock)
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            first = oms.send_order()
+            second = oms.send_order()
+            self.assertNotEqual(first, second)
+            oms.receive_market_reponse(first)
+            oms.receive_market_reponse(second)
+            clock.process_order({'timestamp': '2018-06-29 08:16:27.243860'})
+        self.assertNotIn('Timeout', out.getvalue())
+        self.assertEqual(len(oms.timers), 0)
+
+    def test_simulated_clock_has_no_thread(self):
+        timers = TimerService(SimulatedRealClock(simulated=True))
+        self.assertRaises(ValueError, timers.start)
+
+    def test_real_clock_thread(self):
+        clock = SimulatedRealClock()
+        timers = TimerService(clock)
+        timers.start()
+        try:
+            fired = threading.Event()
+            cancelled = timers.schedule_in(ORDER_TIME_OUT, fired.set)
+            timers.schedule_in(20 * 10 ** 6, fired.set)
+            start = clock.getTime()
+            self.assertTrue(fired.wait(5))
+            self.assertGreaterEqual(clock.getTime() - start, 19 * 10 ** 6)
+            self.assertTrue(timers.cancel(cancelled))
+            self.assertRaises(ValueError, timers.start)
+        finally:
+            timers.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
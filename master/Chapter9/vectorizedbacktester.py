@@ -0,0 +1,99 @@
+import numpy as np
+
+
+# Python program to get average of a list
+def average(lst):
+    return sum(lst) / len(lst)
+
+
+BLOCK = 1024
+
+
+def window_sums(prices, window, block=BLOCK):
+    # Returns the sums of prices[max(0, k - window + 1):k + 1] for every k,
+    # and a bound on their rounding error. The prefix sums restart every
+    # `block` prices so that the error stays proportional to the prices
+    # around k instead of growing with the length of the series.
+    block = max(block, window)
+    n = len(prices)
+    nb_blocks = -(-n // block)
+    padded = np.zeros(nb_blocks * block)
+    padded[:n] = prices
+    prefix = np.cumsum(padded.reshape(nb_blocks, block), axis=1)
+
+    sums = np.empty_like(prefix)
+    sums[:, window:] = prefix[:, window:] - prefix[:, :block - window]
+    sums[:, :window] = prefix[:, :window]
+    # Windows starting in the previous block add its tail
+    sums[1:, :window - 1] += \
+        prefix[:-1, -1:] - prefix[:-1, block - window:block - 1]
+
+    # Each sum involves at most two blocks of `block` roundings, and a
+    # sequential sum of the window as many again
+    abs_totals = np.abs(padded).reshape(nb_blocks, block).sum(axis=1)
+    abs_totals[1:] += abs_totals[:-1]
+    error = 4 * (block + window) * np.finfo(np.float64).eps * abs_totals
+    return sums.ravel()[:n], np.repeat(error, block)[:n]
+
+
+def dual_moving_average_signal(prices, short_window=50, long_window=100):
+    # Same rule as ForLoopBackTester: trading starts once the short window
+    # is full; the long window grows up to long_window prices and the
+    # strategy is long while the short average is above the long one.
+    # Returns the first tradable bar and the long signal from that bar on.
+    prices = np.asarray(prices, dtype=np.float64)
+    start = short_window - 1
+    if len(prices) <= start:
+        return start, np.zeros(0, dtype=bool)
+    lengths = np.minimum(np.arange(1, len(prices) + 1), long_window)[start:]
+    short_sums, short_error = window_sums(prices, short_window)
+    long_sums, long_error = window_sums(prices, long_window)
+    short_average = short_sums[start:] / short_window
+    long_average = long_sums[start:] / lengths
+    long_signal = short_average > long_average
+
+    # The vectorized sums do not add the prices in the same order as
+    # average(), so a comparison closer than their rounding error is
+    # decided again with average() on the same window.
+    error = short_error[start:] / short_window + long_error[start:] / lengths
+    ties = np.flatnonzero(np.abs(short_average - long_average) <= error)
+    if len(ties):
+        for index in ties.tolist():
+            end = start + index + 1
+            long_signal[index] = \
+                average(prices[end - short_window:end].tolist()) > \
+                average(prices[max(0, end - long_window):end].tolist())
+    return start, long_signal
+
+
+class VectorizedBackTester:
+    # Array version of ForLoopBackTester: signal(prices) returns the first
+    # tradable bar and a boolean long signal for every bar from there on,
+    # run() fills position, cash, holdings and total for those bars in one
+    # pass. The strategy holds `quantity` shares while the signal is long
+    # and is flat otherwise.
+    def __init__(self, signal=dual_moving_average_signal, quantity=10,
+                 initial_cash=10000):
+        self.signal = signal
+        self.quantity = quantity
+        self.initial_cash = initial_cash
+        self.position = None
+        self.cash = None
+        self.holdings = None
+        self.total = None
+
+    def run(self, prices):
+        prices = np.asarray(prices, dtype=np.float64)
+        start, long_signal = self.signal(prices)
+        prices = prices[start:start + len(long_signal)]
+
+        self.position = long_signal.astype(np.int64) * self.quantity
+        trades = np.diff(self.position, prepend=0)
+        # Cash is accumulated in bar order, like the loop does
+        flows = np.empty(len(prices) + 1)
+        flows[0] = self.initial_cash
+        flows[1:] = -(trades * prices)
+        self.cash = np.cumsum(flows)[1:]
+        self.holdings = self.position * prices
+        self.total = self.holdings + self.cash
+        return self.total
@@ -0,0 +1,56 @@
+import argparse
+from time import perf_counter
+
+import numpy as np
+from chapter9.forloopbacktester import ForLoopBackTester
+from chapter9.vectorizedbacktester import VectorizedBackTester
+
+
+def generate_prices(nb_bars, seed=0, start_price=100.0):
+    rng = np.random.default_rng(seed)
+    prices = start_price * np.exp(np.cumsum(rng.normal(0, 0.001, nb_bars)))
+    return prices.round(2)
+
+
+def run_for_loop(prices):
+    backtester = ForLoopBackTester(verbose=False)
+    start = perf_counter()
+    for date, price in enumerate(prices.tolist()):
+        price_information = {'date': date, 'price': price}
+        if backtester.create_metrics_out_of_prices(price_information):
+            backtester.buy_sell_or_hold_something(price_information)
+    return perf_counter() - start, backtester
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare ForLoopBackTester with VectorizedBackTester')
+    parser.add_argument('--bars', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--skip-loop', action='store_true',
+                        help='only time the vectorized engine')
+    args = parser.parse_args()
+
+    prices = generate_prices(args.bars, args.seed)
+
+    backtester = VectorizedBackTester()
+    start = perf_counter()
+    backtester.run(prices)
+    elapsed = perf_counter() - start
+    print('VectorizedBackTester: %d bars in %.3fs, %.0f bars/s'
+          % (len(prices), elapsed, len(prices) / elapsed))
+
+    if args.skip_loop:
+        return
+    loop_elapsed, expected = run_for_loop(prices)
+    print('ForLoopBackTester   : %d bars in %.3fs, %.0f bars/s'
+          % (len(prices), loop_elapsed, len(prices) / loop_elapsed))
+    print('speedup: %.1fx' % (loop_elapsed / elapsed))
+    print('results identical: %s'
+          % (backtester.position.tolist() == expected.list_position and
+             backtester.cash.tolist() == expected.list_cash and
+             backtester.holdings.tolist() == expected.list_holdings and
+             backtester.total.tolist() == expected.list_total))
+
+if __name__ == '__main__':
+    main()
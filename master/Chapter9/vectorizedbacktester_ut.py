@@ -0,0 +1,72 @@
+import unittest
+from random import Random
+
+import numpy as np
+from chapter9.forloopbacktester import ForLoopBackTester
+from chapter9.TradingStrategyDualMA import TradingStrategyDualMA
+from chapter9.vectorizedbacktester import VectorizedBackTester, \
+    dual_moving_average_signal
+
+
+def run_for_loop(prices):
+    backtester = ForLoopBackTester(verbose=False)
+    for date, price in enumerate(prices):
+        price_information = {'date': date, 'price': price}
+        if backtester.create_metrics_out_of_prices(price_information):
+            backtester.buy_sell_or_hold_something(price_information)
+    return backtester
+
+
+class TestVectorizedBackTester(unittest.TestCase):
+
+    def assert_same_as_for_loop(self, prices):
+        expected = run_for_loop(prices)
+        backtester = VectorizedBackTester()
+        backtester.run(prices)
+        self.assertEqual(backtester.position.tolist(), expected.list_position)
+        self.assertEqual(backtester.cash.tolist(), expected.list_cash)
+        self.assertEqual(backtester.holdings.tolist(), expected.list_holdings)
+        self.assertEqual(backtester.total.tolist(), expected.list_total)
+
+    def test_random_walk(self):
+        rng = Random(0)
+        prices = [100.0]
+        for _ in range(3000):
+            prices.append(max(1.0, prices[-1] + rng.gauss(0, 1)))
+        self.assert_same_as_for_loop(prices)
+
+    def test_ties_decided_like_for_loop(self):
+        # Flat and repeating prices make the two averages equal or closer
+        # than the rounding error of the vectorized sums
+        prices = [0.1, 0.2, 0.7] * 100 + [10.0] * 150 + [0.3] * 120
+        self.assert_same_as_for_loop(prices)
+
+    def test_ties_decided_like_trading_strategy(self):
+        prices = [0.1, 0.2, 0.7] * 100 + [10.0] * 150 + [0.3] * 120 + \
+            [1.1, 1.3, 1.7, 1.9] * 100
+        strategy = TradingStrategyDualMA(None, None, None)
+        long_signal = []
+        for price in prices:
+            if strategy.create_metrics_out_of_prices(price):
+                long_signal.append(strategy.long_signal)
+        start, expected = dual_moving_average_signal(prices)
+        self.assertEqual(len(long_signal), len(prices) - start)
+        self.assertEqual(long_signal, expected.tolist())
+
+    def test_fewer_bars_than_window(self):
+        backtester = VectorizedBackTester()
+        backtester.run([100.0] * 20)
+        self.assertEqual(len(backtester.total), 0)
+        self.assertEqual(run_for_loop([100.0] * 20).list_total, [])
+
+    def test_signal(self):
+        prices = np.concatenate([np.full(100, 10.0), np.full(20, 20.0)])
+        start, long_signal = dual_moving_average_signal(prices)
+        self.assertEqual(start, 49)
+        self.assertEqual(len(long_signal), 71)
+        self.assertFalse(long_signal[:51].any())
+        self.assertTrue(long_signal[51:].all())
+
+
+if __name__ == '__main__':
+    unittest.main()
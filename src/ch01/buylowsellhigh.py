@@ -1,12 +1,16 @@
-import yfinance as yf
+import os
+import sys
 import pandas as pd
 import matplotlib.pyplot as plt
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from marketdata import load_financial_data  # noqa: E402
+
 
 if __name__ == "__main__":
     start = "2014-01-01"
     end = "2015-01-01"
-    google = yf.download("GOOG", start=start, end=end)
+    google = load_financial_data(start, end)
     print(google.info)
 
     google_signal = pd.DataFrame(index=google.index)
@@ -1,7 +1,11 @@
-import yfinance as yf
+import os
+import sys
 import pandas as pd
 import matplotlib.pyplot as plt
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from marketdata import load_financial_data  # noqa: E402
+
 """
 The Absolute Price Oscillator (APO) is based
 on the absolute differences between two moving averages of different
@@ -12,11 +16,7 @@ APO = Fast Exponential Moving Average - Slow Exponential Moving Average
 
 if __name__ == "__main__":
     src_data = "../data/goog_data.pkl"
-    try:
-        google = pd.read_pickle(src_data)
-    except FileNotFoundError:
-        google = yf.download("GOOG", start="2014-01-01", end="2020-12-31")
-        google.to_pickle(src_data)
+    google = load_financial_data("2014-01-01", "2020-12-31", src_data)
 
     print(google.info)
     goog_data = google.tail(620)
@@ -1,10 +1,14 @@
-import yfinance as yf
+import os
+import sys
 import pandas as pd
 import matplotlib.pyplot as plt
 
 import statistics as stats
 import math as math
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from marketdata import load_financial_data  # noqa: E402
+
 
 """
 The Bollinger Band (BBANDS) study created by John Bollinger plots upper and lower envelope bands 
@@ -45,11 +49,7 @@ Lower Band = MA - delta
 
 if __name__ == "__main__":
     src_data = "../data/goog_data.pkl"
-    try:
-        google = pd.read_pickle(src_data)
-    except FileNotFoundError:
-        google = yf.download("GOOG", start="2014-01-01", end="2020-12-31")
-        google.to_pickle(src_data)
+    google = load_financial_data("2014-01-01", "2020-12-31", src_data)
 
     print(google.info)
     goog_data = google.tail(620)
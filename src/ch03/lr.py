@@ -1,5 +1,5 @@
-import yfinance as yf
-import pandas as pd
+import os
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 
@@ -7,16 +7,8 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
 from sklearn import linear_model
 
-
-def load_financial_data(start_date, end_date, output_file):
-    try:
-        df = pd.read_pickle(output_file)
-        print("Reading GOOG data...")
-    except FileNotFoundError:
-        print("Downloading the GOOG data...")
-        df = yf.download("GOOG", start=start_date, end=end_date)
-        df.to_pickle(output_file)
-    return df
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from marketdata import load_financial_data  # noqa: E402
 
 
 def create_classification_trading_condition(df):
@@ -1,18 +1,11 @@
-import yfinance as yf
+import os
+import sys
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 
-
-def load_financial_data(start_date, end_date, output_file):
-    try:
-        df = pd.read_pickle(output_file)
-        print("Reading GOOG data...")
-    except FileNotFoundError:
-        print("Downloading the GOOG data...")
-        df = yf.download("GOOG", start=start_date, end=end_date)
-        df.to_pickle(output_file)
-    return df
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from marketdata import load_financial_data  # noqa: E402
 
 
 def double_moving_average(financial_data, short_window, long_window):
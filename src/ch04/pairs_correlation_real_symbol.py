@@ -1,4 +1,5 @@
-import yfinance as yf
+import os
+import sys
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -6,16 +7,8 @@ import seaborn as sns
 
 from statsmodels.tsa.stattools import coint
 
-
-def load_financial_data(symbols, start_date, end_date, output_file):
-    try:
-        df = pd.read_pickle(output_file)
-        print("Reading symbols data...")
-    except FileNotFoundError:
-        print("Downloading the symbols data...")
-        df = yf.download(symbols, start=start_date, end=end_date)
-        df.to_pickle(output_file)
-    return df
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from marketdata import load_financial_data  # noqa: E402
 
 
 def find_cointegrated_pairs(data):
@@ -41,7 +34,7 @@ if __name__ == "__main__":
 
     src_data = "../data/multi_data_large.pkl"
     symbolsIds = ["SPY", "AAPL", "ADBE", "LUV", "MSFT", "SKYW", "QCOM", "HPQ", "JNPR", "AMD", "IBM"]
-    data = load_financial_data(symbolsIds, "2001-01-01", "2021-01-01", src_data)
+    data = load_financial_data("2001-01-01", "2021-01-01", src_data, symbolsIds)
 
     Symbol1_prices = data["Adj Close"]["MSFT"]
     Symbol1_prices.plot(figsize=(15, 7))
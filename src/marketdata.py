@@ -0,0 +1,47 @@
+import importlib.util
+import os
+
+import yfinance as yf
+
+
+"""
+The market data loader shared by the chapter scripts: the bars are kept in
+the market data store of master/Chapter9/marketdatastore.py, under
+data/market_data, and only the dates it does not cover yet are downloaded
+from Yahoo Finance. The pickles in data are imported into the store the
+first time they are asked for.
+
+Usage from a chapter directory:
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from marketdata import load_financial_data
+"""
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+STORE_ROOT = os.environ.get("MARKET_DATA_STORE", os.path.join(SRC_DIR, "data", "market_data"))
+
+_spec = importlib.util.spec_from_file_location(
+    "marketdatastore",
+    os.path.join(os.path.dirname(SRC_DIR), "master", "Chapter9", "marketdatastore.py"),
+)
+marketdatastore = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(marketdatastore)
+
+
+def download(symbol, start_date, end_date):
+    # yfinance excludes the end date and gives (attribute, ticker) columns
+    df = yf.download(symbol, start=start_date, end=end_date + marketdatastore.ONE_DAY)
+    if df.columns.nlevels > 1:
+        df = df.xs(symbol, axis=1, level=1)
+    return df
+
+
+def load_financial_data(start_date, end_date, output_file=None, symbols="GOOG"):
+    return marketdatastore.load_financial_data(
+        start_date,
+        end_date,
+        output_file,
+        symbols,
+        store=marketdatastore.MarketDataStore(STORE_ROOT),
+        download=download,
+    )